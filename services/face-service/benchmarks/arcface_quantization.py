@@ -0,0 +1,130 @@
+"""
+ArcFace accuracy-vs-latency benchmark: FP32 model vs. its INT8 dynamically quantized variant.
+
+Both variants embed the same fixed set of face crops through ArcFaceEmbedding (so preprocessing
+and the ARCFACE_ONNX_* session options are identical). Reported per variant: model size,
+per-batch latency p50/p95 and throughput. Accuracy is reported as embedding drift of INT8
+relative to FP32: cosine similarity between the two embeddings of each crop (mean / p5 / min)
+and how often the nearest neighbour of each crop within the set stays the same.
+
+With --quantize the INT8 model is (re)generated next to the FP32 one as <name>.int8.onnx, which
+is the file ArcFaceEmbedding loads when ARCFACE_MODEL_VARIANT=int8. Without --images a fixed,
+seeded set of synthetic crops is used; pass a directory of aligned face crops for real numbers.
+
+Usage (from services/face-service):
+
+    python -m benchmarks.arcface_quantization --quantize --images path/to/face_crops
+    ARCFACE_ONNX_INTRA_OP_THREADS=4 python -m benchmarks.arcface_quantization --batch-size 16
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from src.infrastructure.embeddings.arcface_embedding import ArcFaceEmbedding
+from src.infrastructure.embeddings.onnx_session import quantized_model_path
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def quantize(model_path: str, op_types: Optional[List[str]]) -> str:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = quantized_model_path(model_path)
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8, op_types_to_quantize=op_types)
+    return output_path
+
+
+def load_crops(images_dir: Optional[str], count: int, seed: int) -> List[np.ndarray]:
+    if images_dir:
+        names = sorted(name for name in os.listdir(images_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+        crops = [cv2.imread(os.path.join(images_dir, name), cv2.IMREAD_COLOR) for name in names[:count]]
+        return [crop for crop in crops if crop is not None]
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (112, 112, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def _unit(embeddings: List[List[float]]) -> np.ndarray:
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def measure(embedder: ArcFaceEmbedding, crops: List[np.ndarray], batch_size: int, repeat: int) -> Dict:
+    embedder.get_embeddings(crops[:batch_size])  # warm-up
+    timings = []
+    for _ in range(repeat):
+        for start in range(0, len(crops), batch_size):
+            batch = crops[start:start + batch_size]
+            began = time.perf_counter()
+            embedder.get_embeddings(batch)
+            timings.append((time.perf_counter() - began, len(batch)))
+    latencies = sorted(seconds for seconds, _ in timings)
+    return {
+        "model": embedder.model_path,
+        "model_bytes": os.path.getsize(embedder.model_path),
+        "batch_ms_p50": round(statistics.median(latencies) * 1000, 2),
+        "batch_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+        "faces_per_second": round(sum(n for _, n in timings) / sum(latencies), 1),
+    }
+
+
+def drift(reference: np.ndarray, candidate: np.ndarray) -> Dict:
+    cosines = np.sum(reference * candidate, axis=1)
+    report = {
+        "cosine_mean": round(float(cosines.mean()), 5),
+        "cosine_p5": round(float(np.percentile(cosines, 5)), 5),
+        "cosine_min": round(float(cosines.min()), 5),
+    }
+    if len(reference) > 1:
+        ref_sim, cand_sim = reference @ reference.T, candidate @ candidate.T
+        np.fill_diagonal(ref_sim, -np.inf)
+        np.fill_diagonal(cand_sim, -np.inf)
+        report["nearest_neighbour_agreement"] = round(
+            float(np.mean(ref_sim.argmax(axis=1) == cand_sim.argmax(axis=1))), 4
+        )
+    return report
+
+
+def main(args: argparse.Namespace):
+    if args.quantize:
+        op_types = args.op_types.split(",") if args.op_types else None
+        print(f"Quantized model written to {quantize(args.model, op_types)}")
+
+    crops = load_crops(args.images, args.count, args.seed)
+    if not crops:
+        raise SystemExit("No face crops to benchmark.")
+
+    fp32 = ArcFaceEmbedding(max_batch_size=args.batch_size, model_variant="fp32", model_path=args.model)
+    int8 = ArcFaceEmbedding(max_batch_size=args.batch_size, model_variant="int8", model_path=args.model)
+    if int8.model_variant != "int8":
+        raise SystemExit(f"{quantized_model_path(args.model)} not found; run with --quantize first.")
+
+    report = {
+        "crops": len(crops),
+        "batch_size": args.batch_size,
+        "fp32": measure(fp32, crops, args.batch_size, args.repeat),
+        "int8": measure(int8, crops, args.batch_size, args.repeat),
+        "drift": drift(_unit(fp32.get_embeddings(crops)), _unit(int8.get_embeddings(crops))),
+    }
+    report["int8_speedup"] = round(report["fp32"]["batch_ms_p50"] / report["int8"]["batch_ms_p50"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join("app", "models", "onnx_models", "w600k_r50.onnx"))
+    parser.add_argument("--quantize", action="store_true", help="(Re)generate the INT8 model before benchmarking")
+    parser.add_argument("--op-types", default=None, help="Comma-separated ops to quantize (default: all supported)")
+    parser.add_argument("--images", default=None, help="Directory of face crops (default: seeded synthetic crops)")
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,165 @@
+"""
+Logging overhead of the search/detect hot paths: previous eager logging vs. the current setup.
+
+"legacy" reproduces what one /faces/search_by_vector + one /faces/detect request logged before:
+an INFO line embedding every hit with its full payload, an f-string DEBUG dump of all detections
+(formatted even though DEBUG was off) and a `model_dump_json()` per detected face, written by a
+synchronous StreamHandler. "current" issues the calls the code makes now: lazy %-style INFO
+summaries, DEBUG dumps guarded by `isEnabledFor`, the per-template RateLimitFilter of
+src.infrastructure.logging_config and a QueueHandler whose listener thread does the file I/O.
+
+Both loggers write to temporary files; "log_bytes" is what ended up on disk.
+
+Usage (from services/face-service):
+
+    python -m benchmarks.hot_path_logging --requests 20000 --hits 10 --faces 5
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+from src.domain.entities.models import BoundingBox, FaceDetectionResult
+from src.infrastructure.logging_config import LOG_FORMAT, RateLimitFilter, TextFormatter
+
+
+def _hits(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "score": 0.9 - i * 0.01,
+            "payload": {
+                "face_id": str(uuid.uuid4()),
+                "member_id": str(uuid.uuid4()),
+                "family_id": str(uuid.uuid4()),
+                "local_db_id": str(uuid.uuid4()),
+                "thumbnail_url": "https://res.cloudinary.com/demo/image/upload/v1/family/thumbnail_%d.png" % i,
+                "original_image_url": "https://res.cloudinary.com/demo/image/upload/v1/family/original_%d.jpg" % i,
+                "bounding_box": {"x": 10, "y": 20, "width": 64, "height": 64},
+                "emotion": "",
+                "emotion_confidence": 0,
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def _detections(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"box": [10 * i, 20, 64, 64], "confidence": 0.99, "embedding": [0.01 * j for j in range(512)]}
+        for i in range(count)
+    ]
+
+
+def legacy_request(logger: logging.Logger, hits: List[Dict[str, Any]], detections: List[Dict[str, Any]]):
+    results = [{"id": hit["id"], "score": hit["score"], "payload": hit["payload"]} for hit in hits]
+    logger.info(f"Qdrant search completed. Found {len(results)} hits above threshold. Results: "
+                f"{[{'id': r['id'], 'score': r['score'], 'payload': r.get('payload', 'N/A')} for r in results]}")
+    logger.info(f"Returning {len(results)} search results by vector.")
+    logger.info(f"Face manager returned {len(detections)} detections with embeddings.")
+    logger.debug(f"Detections with embeddings: {detections}")
+    for det in detections:
+        x, y, w, h = det["box"]
+        face_result = FaceDetectionResult(
+            id=str(uuid.uuid4()),
+            bounding_box=BoundingBox(x=x, y=y, width=w, height=h),
+            confidence=det["confidence"],
+            embedding=det["embedding"],
+        )
+        logger.debug("Generated FaceDetectionResult: %s", face_result.model_dump_json())
+    logger.info(f"Returning {len(detections)} face detection results.")
+
+
+def current_request(logger: logging.Logger, hits: List[Dict[str, Any]], detections: List[Dict[str, Any]]):
+    results = [{"id": hit["id"], "score": hit["score"], "payload": hit["payload"]} for hit in hits]
+    logger.info("Qdrant search completed. Found %d hits above threshold.", len(results))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Qdrant search hits: %s", results)
+    logger.info("Returning %d search results by vector.", len(results))
+    logger.info("Face manager returned %d detections with embeddings.", len(detections))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Detections with embeddings: %s", detections)
+    for det in detections:
+        x, y, w, h = det["box"]
+        FaceDetectionResult(
+            id=str(uuid.uuid4()),
+            bounding_box=BoundingBox(x=x, y=y, width=w, height=h),
+            confidence=det["confidence"],
+            embedding=det["embedding"],
+        )
+    logger.info("Returning %d face detection results.", len(detections))
+
+
+def _logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def _measure(request: Callable, logger: logging.Logger, args: argparse.Namespace, flush: Callable[[], None]) -> Dict:
+    hits, detections = _hits(args.hits), _detections(args.faces)
+    timings = []
+    start_all = time.perf_counter()
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        request(logger, hits, detections)
+        timings.append(time.perf_counter() - start)
+    caller_seconds = time.perf_counter() - start_all
+    flush()
+    return {
+        "us_per_request_p50": round(statistics.median(timings) * 1e6, 1),
+        "us_per_request_mean": round(statistics.fmean(timings) * 1e6, 1),
+        "caller_seconds": round(caller_seconds, 3),
+    }
+
+
+def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path, current_path = os.path.join(tmp, "legacy.log"), os.path.join(tmp, "current.log")
+
+        legacy_handler = logging.FileHandler(legacy_path)
+        legacy_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        legacy_logger = _logger("benchmarks.hot_path_logging.legacy", legacy_handler)
+        legacy = _measure(legacy_request, legacy_logger, args, legacy_handler.flush)
+
+        current_handler = logging.FileHandler(current_path)
+        current_handler.setFormatter(TextFormatter(LOG_FORMAT))
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, current_handler)
+        listener.start()
+        current_logger = _logger("benchmarks.hot_path_logging.current", logging.handlers.QueueHandler(log_queue))
+        current_logger.addFilter(RateLimitFilter(args.rate_limit))
+        current = _measure(current_request, current_logger, args, listener.stop)
+
+        legacy["log_bytes"] = os.path.getsize(legacy_path)
+        current["log_bytes"] = os.path.getsize(current_path)
+
+    report = {
+        "requests": args.requests,
+        "hits_per_search": args.hits,
+        "faces_per_detect": args.faces,
+        "rate_limit_per_template": args.rate_limit,
+        "legacy": legacy,
+        "current": current,
+        "speedup": round(legacy["us_per_request_mean"] / current["us_per_request_mean"], 2),
+        "log_bytes_ratio": round(current["log_bytes"] / legacy["log_bytes"], 5),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--hits", type=int, default=10, help="Hits returned per search request")
+    parser.add_argument("--faces", type=int, default=5, help="Faces returned per detect request")
+    parser.add_argument("--rate-limit", type=float, default=5, help="LOG_HOT_PATH_RATE_LIMIT for the current setup")
+    main(parser.parse_args())
@@ -0,0 +1,130 @@
+"""
+Decode/crop pipeline benchmark: previous PIL path vs. the single cv2.imdecode BGR path.
+
+"legacy" reproduces what /faces/detect did before: PIL decode -> convert("RGB") -> np.array copy
+-> cv2.cvtColor in the detector, then PIL crop per face and another array + colour conversion per
+crop in the embedding service. "bgr" is the current path: cv2.imdecode straight into one BGR
+array, grayscale conversion for the detector, and crops as slice views passed to the embedder.
+Face detection and embedding inference are not run, so the numbers isolate the image handling.
+
+"bytes_copied" sums the sizes of all pixel buffers each pipeline materialises (the decoded image
+included); slice views count as zero.
+
+Usage (from services/face-service):
+
+    python -m benchmarks.image_decode --width 6000 --height 4000 --faces 20 --repeat 10
+    python -m benchmarks.image_decode --image path/to/photo.jpg
+"""
+import argparse
+import io
+import json
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.infrastructure.image_io import decode_image
+
+Box = Tuple[int, int, int, int]
+
+
+def _pil_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+def legacy_pipeline(data: bytes, boxes: List[Box]) -> int:
+    copied = 0
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    copied += _pil_bytes(image)
+    image_np = np.array(image)
+    copied += image_np.nbytes
+    gray = cv2.cvtColor(image_np, cv2.COLOR_BGR2GRAY)  # DlibFaceDetector
+    copied += gray.nbytes
+    for x, y, w, h in boxes:
+        crop = image.crop((x, y, x + w, y + h))
+        copied += _pil_bytes(crop)
+        crop_np = np.array(crop)  # ArcFaceEmbedding._to_bgr
+        copied += crop_np.nbytes
+        crop_bgr = cv2.cvtColor(crop_np, cv2.COLOR_RGB2BGR)
+        copied += crop_bgr.nbytes
+    return copied
+
+
+def bgr_pipeline(data: bytes, boxes: List[Box]) -> int:
+    copied = 0
+    image = decode_image(data)
+    copied += image.nbytes
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)  # DlibFaceDetector
+    copied += gray.nbytes
+    for x, y, w, h in boxes:
+        crop = image[y:y + h, x:x + w]  # view, handed to the embedder as-is
+        if not np.shares_memory(crop, image):
+            copied += crop.nbytes
+    return copied
+
+
+def _synthetic_jpeg(width: int, height: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 20, (height, width, 3)).astype(np.float32)
+    pixels = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode(".jpg", pixels, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    assert ok
+    return encoded.tobytes()
+
+
+def _face_boxes(width: int, height: int, count: int, seed: int) -> List[Box]:
+    rng = np.random.default_rng(seed)
+    size = max(16, min(width, height) // 10)
+    return [
+        (int(rng.integers(0, width - size)), int(rng.integers(0, height - size)), size, size)
+        for _ in range(count)
+    ]
+
+
+def _measure(pipeline: Callable[[bytes, List[Box]], int], data: bytes, boxes: List[Box], repeat: int) -> Dict:
+    pipeline(data, boxes)  # warm-up
+    timings, copied = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        copied = pipeline(data, boxes)
+        timings.append(time.perf_counter() - start)
+    return {
+        "ms_per_image_p50": round(statistics.median(timings) * 1000, 2),
+        "ms_per_image_min": round(min(timings) * 1000, 2),
+        "bytes_copied": copied,
+    }
+
+
+def main(args: argparse.Namespace):
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+        height, width = decode_image(data).shape[:2]
+    else:
+        width, height = args.width, args.height
+        data = _synthetic_jpeg(width, height, args.seed)
+    boxes = _face_boxes(width, height, args.faces, args.seed)
+
+    report = {
+        "image": {"width": width, "height": height, "encoded_bytes": len(data), "faces": len(boxes)},
+        "legacy": _measure(legacy_pipeline, data, boxes, args.repeat),
+        "bgr": _measure(bgr_pipeline, data, boxes, args.repeat),
+    }
+    report["speedup"] = round(report["legacy"]["ms_per_image_p50"] / report["bgr"]["ms_per_image_p50"], 2)
+    report["bytes_copied_ratio"] = round(report["bgr"]["bytes_copied"] / report["legacy"]["bytes_copied"], 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default=None, help="Encoded image to use instead of a synthetic JPEG")
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--faces", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,158 @@
+"""
+Load test for POST /faces/search_by_vector: blocking QdrantClient vs. pooled AsyncQdrantClient.
+
+The "blocking" mode reproduces the previous repository behaviour (synchronous QdrantClient
+calls inside `async def`, which stall the event loop for every round trip); the "async" mode
+uses the current QdrantFaceRepository. Both modes run the real FastAPI app in-process through
+httpx's ASGI transport against the same Qdrant instance and a freshly seeded collection.
+
+Usage (from services/face-service, with a Qdrant reachable at --qdrant-url):
+
+    python -m benchmarks.search_by_vector_load --qdrant-url http://localhost:6333 \\
+        --faces 2000 --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+from src.application.services.face_manager import FaceManager
+from src.infrastructure.persistence.qdrant_client import QdrantFaceRepository
+from src.presentation.dependencies import get_face_manager
+from src.presentation.main import app
+
+
+class BlockingQdrantFaceRepository(QdrantFaceRepository):
+    """Previous behaviour: a blocking client call inside an async method."""
+
+    def __init__(self, collection_name: str, url: str, api_key: Optional[str]):
+        super().__init__(collection_name=collection_name, client=AsyncQdrantClient(url=url, api_key=api_key))
+        self.sync_client = QdrantClient(url=url, api_key=api_key)
+
+    async def search_similar_faces(self, query_vector, family_id=None, member_id=None, top_k=5, threshold=0.75):
+        qdrant_filter = None
+        if family_id:
+            qdrant_filter = models.Filter(
+                must=[models.FieldCondition(key="family_id", match=models.MatchValue(value=family_id))]
+            )
+        result = self.sync_client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            limit=top_k,
+            query_filter=qdrant_filter,
+            score_threshold=threshold,
+        )
+        return [{"id": hit.id, "score": hit.score, "payload": hit.payload} for hit in result.points]
+
+
+def _random_unit_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def _seed(client: AsyncQdrantClient, collection: str, family_id: str, faces: int, dim: int, rng) -> np.ndarray:
+    await client.create_collection(
+        collection_name=collection,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+    )
+    await client.create_payload_index(collection, "family_id", models.PayloadSchemaType.KEYWORD)
+    vectors = _random_unit_vectors(faces, dim, rng)
+    for start in range(0, faces, 500):
+        chunk = vectors[start:start + 500]
+        await client.upsert(
+            collection_name=collection,
+            wait=True,
+            points=[
+                models.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=vector.tolist(),
+                    payload={"family_id": family_id, "member_id": f"member-{start + i}"},
+                )
+                for i, vector in enumerate(chunk)
+            ],
+        )
+    return vectors
+
+
+async def _drive(repository: QdrantFaceRepository, queries: np.ndarray, family_id: str, concurrency: int) -> Dict[str, Any]:
+    app.dependency_overrides[get_face_manager] = lambda: FaceManager(repository, None, None)
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            async def one(vector: np.ndarray):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await http.post(
+                        "/faces/search_by_vector",
+                        json={"embedding": vector.tolist(), "family_id": family_id, "top_k": 5, "threshold": 0.0},
+                    )
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(vector) for vector in queries))
+            elapsed = time.perf_counter() - started
+    finally:
+        app.dependency_overrides.pop(get_face_manager, None)
+
+    latencies.sort()
+    return {
+        "requests": len(queries),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(queries) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main(args: argparse.Namespace):
+    rng = np.random.default_rng(args.seed)
+    collection = f"bench_faces_{uuid.uuid4().hex[:8]}"
+    family_id = "bench-family"
+    admin = AsyncQdrantClient(url=args.qdrant_url, api_key=args.api_key)
+    await _seed(admin, collection, family_id, args.faces, args.dim, rng)
+    queries = _random_unit_vectors(args.requests, args.dim, rng)
+
+    report: Dict[str, Any] = {"faces": args.faces, "dim": args.dim, "concurrency": args.concurrency}
+    try:
+        blocking = BlockingQdrantFaceRepository(collection, args.qdrant_url, args.api_key)
+        report["blocking"] = await _drive(blocking, queries, family_id, args.concurrency)
+
+        pooled = QdrantFaceRepository(
+            collection_name=collection,
+            client=AsyncQdrantClient(
+                url=args.qdrant_url, api_key=args.api_key, prefer_grpc=args.grpc, pool_size=args.pool_size
+            ),
+        )
+        report["async"] = await _drive(pooled, queries, family_id, args.concurrency)
+        await pooled.close()
+        report["speedup"] = round(report["async"]["throughput_rps"] / report["blocking"]["throughput_rps"], 2)
+    finally:
+        await admin.delete_collection(collection)
+        await admin.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--faces", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pool-size", type=int, default=None)
+    parser.add_argument("--grpc", action="store_true", help="Use gRPC transport for the async client")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
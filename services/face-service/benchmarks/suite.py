@@ -0,0 +1,410 @@
+"""
+Face-service benchmark suite: detectors, embedders, FaceManager and an end-to-end API load test.
+
+Sections (all results in one JSON report, suitable for committing next to a release or diffing
+in CI for regressions):
+
+- detectors:     DlibFaceDetector / RetinaFaceDetector on every corpus image (resolution x faces).
+- embedders:     ArcFaceEmbedding / FaceNetEmbeddingService on batches of face crops.
+- face_manager:  FaceManager.detect_and_embed_faces per corpus image, for each available
+                 detector/embedder pair.
+- end_to_end:    the FastAPI app driven in-process through httpx against an in-memory Qdrant
+                 (AsyncQdrantClient(location=":memory:")): search_by_vector, batch-search-vectors
+                 and, when a detector and an embedder are available, /faces/detect.
+
+Every timing series reports p50/p95/p99/mean latency in milliseconds and throughput. peak_rss_mb
+is the process high-water mark (getrusage) right after each section, so it only ever grows and
+attributes memory to the first section that needed it.
+
+The default corpus is synthetic and seeded: textured backgrounds with drawn, face-like ellipses at
+several resolutions and face counts. Detectors are not guaranteed to find drawn faces, so each
+detector result includes how many faces it found; use --images with real photos (and
+--crops with real aligned face crops) for accuracy-relevant numbers. Components whose model files
+are missing are reported as {"skipped": "<reason>"} instead of failing the run.
+
+Usage (from services/face-service):
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --resolutions 640x480,1920x1080 --faces 1,10 --repeat 5 \\
+        --components dlib,arcface --images path/to/photos
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+
+from src.application.services.face_manager import FaceManager
+from src.domain.interfaces.face_detector import IFaceDetector
+from src.domain.interfaces.face_embedding import IFaceEmbedding
+from src.infrastructure.image_io import decode_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def _component_factories() -> Dict[str, Tuple[str, Callable[[], Any]]]:
+    # Import lazily so a missing optional dependency only skips its own component.
+    def dlib_detector():
+        from src.infrastructure.detectors.dlib_detector import DlibFaceDetector
+        return DlibFaceDetector()
+
+    def retinaface_detector():
+        from src.infrastructure.detectors.retinaface_detector import RetinaFaceDetector
+        return RetinaFaceDetector()
+
+    def arcface_embedding():
+        from src.infrastructure.embeddings.arcface_embedding import ArcFaceEmbedding
+        return ArcFaceEmbedding()
+
+    def facenet_embedding():
+        from src.infrastructure.embeddings.facenet_embedding import FaceNetEmbeddingService
+        return FaceNetEmbeddingService()
+
+    return {
+        "dlib": ("detector", dlib_detector),
+        "retinaface": ("detector", retinaface_detector),
+        "arcface": ("embedder", arcface_embedding),
+        "facenet": ("embedder", facenet_embedding),
+    }
+
+
+def summarize(latencies: List[float], items: Optional[int] = None) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput (items/s, one item per call unless given)."""
+    if not latencies:
+        return {"calls": 0}
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return round(float(np.percentile(ordered, q)) * 1000, 3)
+
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "throughput_per_s": round((items if items is not None else len(ordered)) / total, 2) if total else None,
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux báo KiB, macOS báo byte
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _draw_face(image: np.ndarray, cx: int, cy: int, size: int, rng: np.random.Generator):
+    skin = tuple(int(v) for v in rng.integers((90, 120, 160), (150, 180, 230)))
+    axes = (size // 2, int(size * 0.62))
+    cv2.ellipse(image, (cx, cy), axes, 0, 0, 360, skin, -1)
+    eye_dy, eye_dx, eye_r = size // 6, size // 5, max(2, size // 14)
+    for dx in (-eye_dx, eye_dx):
+        cv2.circle(image, (cx + dx, cy - eye_dy), eye_r, (40, 30, 30), -1)
+        cv2.line(image, (cx + dx - eye_r * 2, cy - eye_dy - eye_r * 2), (cx + dx + eye_r * 2, cy - eye_dy - eye_r * 2), (30, 30, 30), max(1, size // 40))
+    cv2.line(image, (cx, cy - eye_dy // 2), (cx - size // 16, cy + size // 8), tuple(v - 30 for v in skin), max(1, size // 40))
+    cv2.ellipse(image, (cx, cy + size // 4), (size // 5, size // 12), 0, 0, 180, (60, 60, 150), max(1, size // 30))
+
+
+def synthetic_image(width: int, height: int, faces: int, rng: np.random.Generator) -> np.ndarray:
+    base = rng.integers(60, 200, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    image = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    image = cv2.add(image, rng.integers(0, 25, image.shape, dtype=np.uint8))
+    cols = int(np.ceil(np.sqrt(faces)))
+    rows = int(np.ceil(faces / cols))
+    cell_w, cell_h = width // cols, height // rows
+    size = max(24, int(min(cell_w, cell_h) * 0.6))
+    for i in range(faces):
+        r, c = divmod(i, cols)
+        _draw_face(image, c * cell_w + cell_w // 2, r * cell_h + cell_h // 2, size, rng)
+    return image
+
+
+def load_corpus(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Returns [{"name", "image" (BGR), "encoded" (JPEG bytes), "faces" (drawn count or None)}]."""
+    corpus = []
+    if args.images:
+        names = sorted(name for name in os.listdir(args.images) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names[:args.max_images]:
+            with open(os.path.join(args.images, name), "rb") as f:
+                encoded = f.read()
+            image = decode_image(encoded)
+            corpus.append({"name": f"{name} ({image.shape[1]}x{image.shape[0]})", "image": image, "encoded": encoded, "faces": None})
+        return corpus
+
+    rng = np.random.default_rng(args.seed)
+    for resolution in args.resolutions.split(","):
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        for faces in (int(v) for v in args.faces.split(",")):
+            image = synthetic_image(width, height, faces, rng)
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            assert ok
+            corpus.append({"name": f"{width}x{height}/{faces}faces", "image": image, "encoded": encoded.tobytes(), "faces": faces})
+    return corpus
+
+
+def load_crops(args: argparse.Namespace, corpus: List[Dict[str, Any]], count: int) -> List[np.ndarray]:
+    if args.crops:
+        names = sorted(name for name in os.listdir(args.crops) if name.lower().endswith(IMAGE_EXTENSIONS))
+        crops = [cv2.imread(os.path.join(args.crops, name), cv2.IMREAD_COLOR) for name in names[:count]]
+        return [crop for crop in crops if crop is not None]
+    # Crop vuông ở tâm ảnh đầu tiên của corpus, lặp lại đủ số lượng (kích thước điển hình ~160px)
+    image = corpus[0]["image"]
+    height, width = image.shape[:2]
+    side = min(160, height, width)
+    y, x = (height - side) // 2, (width - side) // 2
+    return [image[y:y + side, x:x + side]] * count
+
+
+def _time_calls(fn: Callable[[], Any], repeat: int) -> Tuple[List[float], Any]:
+    result = fn()  # warm-up
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies, result
+
+
+def bench_detectors(detectors: Dict[str, IFaceDetector], corpus: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    report = {}
+    for name, detector in detectors.items():
+        per_image = {}
+        for item in corpus:
+            latencies, faces = _time_calls(lambda: detector.detect_faces(item["image"]), repeat)
+            per_image[item["name"]] = {**summarize(latencies), "faces_found": len(faces), "faces_drawn": item["faces"]}
+        report[name] = per_image
+    return report
+
+
+def bench_embedders(embedders: Dict[str, IFaceEmbedding], crops: List[np.ndarray], batch_sizes: List[int], repeat: int) -> Dict[str, Any]:
+    report = {}
+    for name, embedder in embedders.items():
+        per_batch = {}
+        for batch_size in batch_sizes:
+            batch = (crops * (batch_size // len(crops) + 1))[:batch_size]
+            latencies, _ = _time_calls(lambda: embedder.get_embeddings(batch), repeat)
+            per_batch[f"batch_{batch_size}"] = {
+                **summarize(latencies, items=batch_size * len(latencies)),
+                "throughput_unit": "faces/s",
+            }
+        report[name] = per_batch
+    return report
+
+
+def bench_face_manager(
+    detectors: Dict[str, IFaceDetector], embedders: Dict[str, IFaceEmbedding], corpus: List[Dict[str, Any]], repeat: int
+) -> Dict[str, Any]:
+    report = {}
+    for detector_name, detector in detectors.items():
+        for embedder_name, embedder in embedders.items():
+            manager = FaceManager(None, embedder, detector)
+            per_image = {}
+            for item in corpus:
+                latencies, results = _time_calls(lambda: manager.detect_and_embed_faces(item["image"]), repeat)
+                per_image[item["name"]] = {**summarize(latencies), "faces_embedded": len(results)}
+            report[f"{detector_name}+{embedder_name}"] = per_image
+    return report
+
+
+async def _drive(http: httpx.AsyncClient, requests: List[Callable[[], Any]], concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(make_request):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(make_request) for make_request in requests))
+    elapsed = time.perf_counter() - started
+    return {
+        **summarize(latencies),
+        "throughput_per_s": round(len(requests) / elapsed, 2),
+        "concurrency": concurrency,
+        "errors": errors,
+    }
+
+
+def _unit_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def bench_end_to_end(
+    args: argparse.Namespace,
+    detector: Optional[IFaceDetector],
+    embedder: Optional[IFaceEmbedding],
+    corpus: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    from src.infrastructure.embeddings.micro_batcher import EmbeddingMicroBatcher
+    from src.infrastructure.persistence.qdrant_client import QdrantFaceRepository
+    from src.presentation import dependencies
+    from src.presentation.main import app
+
+    rng = np.random.default_rng(args.seed)
+    dim = len(embedder.get_embedding(corpus[0]["image"][:112, :112])) if embedder is not None else args.dim
+    repository = QdrantFaceRepository(
+        collection_name=f"bench_faces_{uuid.uuid4().hex[:8]}", client=AsyncQdrantClient(location=":memory:")
+    )
+    repository.vector_size = dim
+    await repository.async_init()
+
+    family_id = "bench-family"
+    vectors = _unit_vectors(args.seed_faces, dim, rng)
+    started = time.perf_counter()
+    await repository.upsert_face_vectors([
+        {
+            "face_id": str(uuid.uuid4()),
+            "vector": vector.tolist(),
+            "metadata": {"family_id": family_id, "member_id": f"member-{i % 500}", "local_db_id": str(i)},
+        }
+        for i, vector in enumerate(vectors)
+    ])
+    report: Dict[str, Any] = {
+        "qdrant": "in-memory",
+        "dim": dim,
+        "seed_faces": args.seed_faces,
+        "seed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+    # Dùng đúng các component đã tải ở trên (None nếu không có) thay vì để registry tải theo biến môi trường
+    batcher = EmbeddingMicroBatcher(embedder) if embedder is not None else None
+    overrides = {
+        dependencies.get_face_repository: lambda: repository,
+        dependencies.get_embedding_batcher: lambda: batcher,
+        dependencies.get_face_embedding_service: lambda: embedder,
+        dependencies.get_face_detector: lambda: detector,
+    }
+    app.dependency_overrides.update(overrides)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            queries = _unit_vectors(args.requests, dim, rng)
+            report["search_by_vector"] = await _drive(http, [
+                (lambda q=q: http.post(
+                    "/faces/search_by_vector",
+                    json={"embedding": q.tolist(), "family_id": family_id, "top_k": 5, "threshold": 0.0},
+                ))
+                for q in queries
+            ], args.concurrency)
+
+            batches = [queries[i:i + args.batch_queries] for i in range(0, len(queries), args.batch_queries)]
+            report["batch_search_vectors"] = await _drive(http, [
+                (lambda b=b: http.post(
+                    "/faces/batch-search-vectors",
+                    json={"vectors": b.tolist(), "family_id": family_id, "top_k": 5, "threshold": 0.0, "columnar": True},
+                ))
+                for b in batches
+            ], args.concurrency)
+            report["batch_search_vectors"]["queries_per_request"] = args.batch_queries
+
+            if detector is not None and embedder is not None:
+                uploads = [corpus[i % len(corpus)]["encoded"] for i in range(args.detect_requests)]
+                report["detect"] = await _drive(http, [
+                    (lambda data=data: http.post("/faces/detect", files={"file": ("bench.jpg", data, "image/jpeg")}))
+                    for data in uploads
+                ], args.detect_concurrency)
+            else:
+                report["detect"] = {"skipped": "needs an available detector and embedder"}
+    finally:
+        for dependency in overrides:
+            app.dependency_overrides.pop(dependency, None)
+        if batcher is not None:
+            await batcher.stop()
+        await repository.close()
+    return report
+
+
+def main(args: argparse.Namespace) -> Dict[str, Any]:
+    wanted = [name.strip() for name in args.components.split(",") if name.strip()]
+    factories = _component_factories()
+    detectors: Dict[str, IFaceDetector] = {}
+    embedders: Dict[str, IFaceEmbedding] = {}
+    components: Dict[str, Any] = {}
+    for name in wanted:
+        kind, factory = factories[name]
+        start = time.perf_counter()
+        try:
+            component = factory()
+        except Exception as e:
+            components[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        components[name] = {"kind": kind, "load_seconds": round(time.perf_counter() - start, 3)}
+        (detectors if kind == "detector" else embedders)[name] = component
+    components["peak_rss_mb"] = peak_rss_mb()
+
+    corpus = load_corpus(args)
+    batch_sizes = [int(v) for v in args.batch_sizes.split(",")]
+    crops = load_crops(args, corpus, max(batch_sizes))
+
+    report: Dict[str, Any] = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "components": components,
+        "corpus": [{"name": item["name"], "encoded_bytes": len(item["encoded"])} for item in corpus],
+    }
+    report["detectors"] = bench_detectors(detectors, corpus, args.repeat)
+    report["detectors"]["peak_rss_mb"] = peak_rss_mb()
+    report["embedders"] = bench_embedders(embedders, crops, batch_sizes, args.repeat)
+    report["embedders"]["peak_rss_mb"] = peak_rss_mb()
+    report["face_manager"] = bench_face_manager(detectors, embedders, corpus, args.repeat)
+    report["face_manager"]["peak_rss_mb"] = peak_rss_mb()
+    if not args.skip_end_to_end:
+        report["end_to_end"] = asyncio.run(bench_end_to_end(
+            args, next(iter(detectors.values()), None), next(iter(embedders.values()), None), corpus
+        ))
+        report["end_to_end"]["peak_rss_mb"] = peak_rss_mb()
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--components", default="dlib,retinaface,arcface,facenet")
+    parser.add_argument("--resolutions", default="640x480,1920x1080,4000x3000")
+    parser.add_argument("--faces", default="1,5,20", help="Faces drawn per synthetic image")
+    parser.add_argument("--images", default=None, help="Directory of photos to use instead of the synthetic corpus")
+    parser.add_argument("--max-images", type=int, default=20)
+    parser.add_argument("--crops", default=None, help="Directory of face crops for the embedder section")
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=128, help="Vector size when no embedder is available")
+    parser.add_argument("--seed-faces", type=int, default=5000, help="Faces seeded into the in-memory collection")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--batch-queries", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--detect-requests", type=int, default=50)
+    parser.add_argument("--detect-concurrency", type=int, default=8)
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    cli_args = parser.parse_args()
+    result = json.dumps(main(cli_args), indent=2)
+    if cli_args.output:
+        with open(cli_args.output, "w") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class BulkOperationTracker:
+    """
+    Runs long bulk operations in the background and keeps their status for polling.
+
+    Only the most recent `max_operations` operations are remembered; older finished ones are
+    dropped first.
+    """
+
+    def __init__(self, max_operations: int = 1000):
+        self.max_operations = max_operations
+        self._operations: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, job: Callable[[], Awaitable[Dict[str, Any]]], **info: Any) -> str:
+        """Schedules `job` on the running loop and returns its operation id."""
+        operation_id = str(uuid.uuid4())
+        self._operations[operation_id] = {
+            "operation_id": operation_id,
+            "status": "pending",
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            **info,
+        }
+        self._evict()
+        self._tasks[operation_id] = asyncio.get_running_loop().create_task(self._run(operation_id, job))
+        return operation_id
+
+    async def _run(self, operation_id: str, job: Callable[[], Awaitable[Dict[str, Any]]]):
+        operation = self._operations.get(operation_id)
+        try:
+            if operation is not None:
+                operation["status"] = "running"
+            result = await job()
+            if operation is not None:
+                operation["status"] = "completed"
+                operation["result"] = result
+        except Exception as e:
+            logger.error(f"Bulk operation {operation_id} failed: {e}", exc_info=True)
+            if operation is not None:
+                operation["status"] = "failed"
+                operation["error"] = str(e)
+        finally:
+            if operation is not None:
+                operation["finished_at"] = time.time()
+            self._tasks.pop(operation_id, None)
+
+    def get(self, operation_id: str) -> Optional[Dict[str, Any]]:
+        operation = self._operations.get(operation_id)
+        return dict(operation) if operation is not None else None
+
+    def _evict(self):
+        while len(self._operations) > self.max_operations:
+            victim = next(
+                (op_id for op_id, op in self._operations.items() if op["status"] in ("completed", "failed")),
+                None,
+            )
+            if victim is None:
+                break
+            del self._operations[victim]
@@ -0,0 +1,113 @@
+import logging
+from typing import Any, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+CLUSTER_ID_FIELD = "cluster_id"
+CLUSTER_SIZE_FIELD = "cluster_size"
+
+
+def _find_roots(parent: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    roots = parent[nodes]
+    while True:
+        next_roots = parent[roots]
+        if np.array_equal(next_roots, roots):
+            return roots
+        roots = next_roots
+
+
+def _union_pairs(parent: np.ndarray, left: np.ndarray, right: np.ndarray):
+    """
+    Vectorized union-find: hooks the larger root of every pair onto the smaller one until all pairs
+    share a root, so a root is always the smallest index of its component.
+    """
+    # Khi nhiều cặp cùng ghi vào một gốc trong một vòng, chỉ một lần ghi có hiệu lực; các cặp còn lại
+    # vẫn khác gốc và được xử lý ở vòng sau.
+    while left.size:
+        left_roots = _find_roots(parent, left)
+        right_roots = _find_roots(parent, right)
+        pending = left_roots != right_roots
+        if not pending.any():
+            return
+        left, right = left[pending], right[pending]
+        left_roots, right_roots = left_roots[pending], right_roots[pending]
+        parent[np.maximum(left_roots, right_roots)] = np.minimum(left_roots, right_roots)
+
+
+class IncrementalFaceClusterer:
+    """
+    Groups embeddings into identities: two faces belong to the same cluster when they are linked by
+    a chain of pairs with cosine similarity >= `threshold` (connected components, single linkage).
+
+    Embeddings are added page by page; each new page is compared with every face seen so far in
+    `block_size` x `block_size` tiles of one matrix product each, so memory stays at
+    O(n * dim + block_size²) instead of the O(n²) of a full similarity matrix. Pairs above the
+    threshold are merged with a vectorized union-find.
+    """
+
+    def __init__(self, threshold: float, block_size: int = 2048):
+        self.threshold = float(threshold)
+        self.block_size = max(1, int(block_size))
+        self.ids: List[Any] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._parent = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _grow(self, rows: int, dim: int):
+        if self._matrix.shape[1] not in (0, dim):
+            raise ValueError(f"Embedding dimension {dim} does not match {self._matrix.shape[1]}.")
+        needed = len(self.ids) + rows
+        if needed > self._matrix.shape[0]:
+            capacity = max(needed, 2 * self._matrix.shape[0], self.block_size)
+            matrix = np.empty((capacity, dim), dtype=np.float32)
+            parent = np.arange(capacity, dtype=np.int64)
+            if self.ids:
+                matrix[:len(self.ids)] = self._matrix[:len(self.ids)]
+                parent[:len(self.ids)] = self._parent[:len(self.ids)]
+            self._matrix = matrix
+            self._parent = parent
+
+    def add(self, ids: Sequence[Any], vectors: Sequence[Sequence[float]]):
+        """Adds one page of faces and merges them with every face already added."""
+        if not len(ids):
+            return
+        page = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(page, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        start = len(self.ids)
+        self._grow(len(ids), page.shape[1])
+        self._matrix[start:start + len(ids)] = page / norms
+        self.ids.extend(ids)
+        end = len(self.ids)
+
+        matrix = self._matrix
+        for row_start in range(start, end, self.block_size):
+            row_end = min(row_start + self.block_size, end)
+            rows = matrix[row_start:row_end]
+            # Chỉ so sánh với các khuôn mặt đứng trước (cột < hàng) để mỗi cặp được xét đúng một lần
+            for col_start in range(0, row_end, self.block_size):
+                col_end = min(col_start + self.block_size, row_end)
+                similarity = rows @ matrix[col_start:col_end].T
+                linked = similarity >= self.threshold
+                if col_end > row_start:
+                    linked &= (
+                        np.arange(col_start, col_end)[None, :] < np.arange(row_start, row_end)[:, None]
+                    )
+                row_idx, col_idx = np.nonzero(linked)
+                if row_idx.size:
+                    _union_pairs(self._parent, row_idx + row_start, col_idx + col_start)
+
+    def labels(self) -> np.ndarray:
+        """Cluster root of every face, in insertion order (the root is the cluster's first face)."""
+        count = len(self.ids)
+        roots = _find_roots(self._parent, np.arange(count))
+        self._parent[:count] = roots
+        return roots
+
+    def cluster_sizes(self, labels: np.ndarray) -> np.ndarray:
+        return np.bincount(labels, minlength=len(self.ids))[labels]
@@ -1,21 +1,139 @@
-from typing import List, Dict, Any, Optional
-from PIL import Image
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union, TYPE_CHECKING
+import asyncio
+import time
+import cv2
 import numpy as np
+import os
 import logging
 
 from src.domain.interfaces.face_repository import IFaceRepository
-from src.domain.interfaces.face_embedding import IFaceEmbedding
+from src.domain.interfaces.face_embedding import IFaceEmbedding, FaceImage, AlignedFace
 from src.domain.interfaces.face_detector import IFaceDetector
+from src.application.services.face_clustering import (
+    CLUSTER_ID_FIELD,
+    CLUSTER_SIZE_FIELD,
+    IncrementalFaceClusterer,
+)
+from src.application.services.instrumentation import record_value, timed_stage
+
+if TYPE_CHECKING:
+    from src.infrastructure.embeddings.micro_batcher import EmbeddingMicroBatcher
+    from src.infrastructure.inference_executor import InferenceExecutor
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def _deduplicate_vectors(
+    vectors: List[List[float]], threshold: float, block_size: int = 1024
+) -> Tuple[List[int], List[int]]:
+    """
+    Gom các vector gần như trùng nhau (cosine >= threshold).
+    Trả về chỉ số của các vector đại diện và, với mỗi vector đầu vào, vị trí đại diện của nó.
+    Độ tương đồng được tính theo từng khối `block_size` hàng nên bộ nhớ là O(block_size * n), không phải O(n²).
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = matrix / norms
+
+    count = len(vectors)
+    representatives: List[int] = []
+    assignment = np.full(count, -1, dtype=np.int64)
+    for block_start in range(0, count, block_size):
+        block_end = min(block_start + block_size, count)
+        # Chỉ vector chưa được gán mới có thể thành đại diện; so với các vector đứng sau nó
+        candidates = np.nonzero(assignment[block_start:block_end] == -1)[0] + block_start
+        if not candidates.size:
+            continue
+        similarity = unit[candidates] @ unit[block_start:].T
+        for row, i in enumerate(candidates):
+            if assignment[i] != -1:
+                continue
+            group = len(representatives)
+            duplicates = np.nonzero(similarity[row, i - block_start + 1:] >= threshold)[0] + i + 1
+            assignment[i] = group
+            duplicates = duplicates[assignment[duplicates] == -1]
+            assignment[duplicates] = group
+            representatives.append(int(i))
+    return representatives, assignment.tolist()
+
+
+def _as_bgr_array(image: FaceImage) -> np.ndarray:
+    # Ảnh chuẩn của pipeline là mảng BGR uint8; PIL Image (RGB) chỉ được chuyển đổi một lần ở đây.
+    if isinstance(image, np.ndarray):
+        return image
+    return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+
+# Chế độ upsample khi phát hiện: None (mặc định của detector), số lần phóng to, hoặc "adaptive"
+# (chạy không phóng to trước, chỉ phóng to 1 lần khi không tìm thấy khuôn mặt nào).
+UpsampleMode = Union[None, int, str]
+ADAPTIVE_UPSAMPLE = "adaptive"
+
+
+def parse_upsample_mode(value: Optional[str]) -> UpsampleMode:
+    if value is None or value == "" or value == "default":
+        return None
+    if value == ADAPTIVE_UPSAMPLE:
+        return ADAPTIVE_UPSAMPLE
+    return int(value)
+
+
+# Xử lý khuôn mặt gần như trùng lặp khi thêm bằng vector: "off" (không kiểm tra), "skip" (không lưu bản
+# trùng), "merge" (không lưu, ghi face_id của bản trùng vào 'merged_face_ids' của khuôn mặt được giữ lại)
+# hoặc "flag" (vẫn lưu, kèm 'duplicate_of' và 'duplicate_score' trong payload).
+DUPLICATE_POLICIES = ("off", "skip", "merge", "flag")
+DUPLICATE_ACTIONS = {"skip": "skipped", "merge": "merged", "flag": "flagged"}
+MERGED_FACE_IDS_FIELD = "merged_face_ids"
+
+
+def parse_duplicate_policy(value: Optional[str]) -> str:
+    policy = (value or "off").lower()
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Invalid duplicate policy '{value}'. Expected one of {DUPLICATE_POLICIES}.")
+    return policy
+
+
 class FaceManager:
-    def __init__(self, face_repository: IFaceRepository, face_embedding_service: IFaceEmbedding, face_detector_service: IFaceDetector):
+    def __init__(
+        self,
+        face_repository: IFaceRepository,
+        face_embedding_service: IFaceEmbedding,
+        face_detector_service: IFaceDetector,
+        embedding_batcher: Optional["EmbeddingMicroBatcher"] = None,
+        inference_executor: Optional["InferenceExecutor"] = None,
+        backfill_embedding_service: Optional[IFaceEmbedding] = None,
+        backfill_vector_name: Optional[str] = None,
+    ):
         self.face_repository = face_repository
         self.face_embedding_service = face_embedding_service
         self.face_detector_service = face_detector_service
+        # Nếu được cấu hình, embedding của các request đồng thời được gom lô qua micro-batcher
+        self.embedding_batcher = embedding_batcher
+        # Nếu được cấu hình, phát hiện/embedding (CPU-bound) chạy ngoài event loop
+        self.inference_executor = inference_executor
+        # Phát hiện trên bản thu nhỏ (cạnh dài tối đa, 0 = giữ nguyên độ phân giải); crop vẫn lấy từ ảnh gốc
+        self.detection_max_side = int(os.getenv("DETECTION_MAX_SIDE", 0))
+        self.detection_upsample = parse_upsample_mode(os.getenv("DETECTION_UPSAMPLE"))
+        # Căn chỉnh khuôn mặt theo landmark của detector (nếu detector và embedding service hỗ trợ).
+        # Embedding thay đổi so với crop không căn chỉnh nên chỉ bật khi collection được embedding lại.
+        self.face_alignment = os.getenv("FACE_ALIGNMENT", "false").lower() == "true"
+        # Trong lúc chuyển model embedding: khuôn mặt mới được ghi thêm vector của model đích
+        # (backfill_vector_name) để job re-embedding không phải xử lý lại chúng.
+        self.backfill_embedding_service = backfill_embedding_service
+        self.backfill_vector_name = backfill_vector_name
+        # Tìm kiếm hàng loạt: các vector query gần như trùng nhau (cosine >= ngưỡng) chỉ được tìm một lần
+        self.batch_search_dedup_threshold = float(os.getenv("BATCH_SEARCH_DEDUP_THRESHOLD", 0.9999))
+        # Kiểm tra trùng lặp khi thêm khuôn mặt bằng vector (kể cả sự kiện face.add từ RabbitMQ)
+        self.duplicate_policy = parse_duplicate_policy(os.getenv("DUPLICATE_FACE_POLICY"))
+        self.duplicate_threshold = float(os.getenv("DUPLICATE_FACE_THRESHOLD", 0.97))
+        # Phân cụm khuôn mặt theo family: ngưỡng cosine, kích thước cụm tối thiểu, kích thước khối
+        # của phép nhân ma trận và số khuôn mặt đọc mỗi trang
+        self.clustering_threshold = float(os.getenv("FACE_CLUSTERING_THRESHOLD", 0.75))
+        self.clustering_min_size = max(1, int(os.getenv("FACE_CLUSTERING_MIN_SIZE", 2)))
+        self.clustering_block_size = max(1, int(os.getenv("FACE_CLUSTERING_BLOCK_SIZE", 2048)))
+        self.clustering_page_size = max(1, int(os.getenv("FACE_CLUSTERING_PAGE_SIZE", 1000)))
 
     def detect_faces_in_image(self, image_np: np.ndarray) -> List[Dict[str, Any]]:
         """
@@ -23,25 +141,128 @@ class FaceManager:
         """
         return self.face_detector_service.detect_faces(image_np)
 
-    def detect_and_embed_faces(self, image: Image.Image) -> List[Dict[str, Any]]:
+    def detect_and_embed_faces(
+        self,
+        image: FaceImage,
+        max_side: Optional[int] = None,
+        upsample: UpsampleMode = None,
+        tier: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Phát hiện các khuôn mặt trong một ảnh, cắt từng khuôn mặt và tạo embedding cho chúng.
         Args:
-            image (Image.Image): Ảnh đầu vào dưới dạng đối tượng PIL Image.
+            image (FaceImage): Ảnh đầu vào, mảng NumPy BGR (từ image_io.decode_image) hoặc PIL Image.
+            max_side (Optional[int]): Cạnh dài tối đa của ảnh dùng để phát hiện (0 = không thu nhỏ).
+                                      None dùng giá trị cấu hình DETECTION_MAX_SIDE.
+            upsample (UpsampleMode): Số lần phóng to hoặc "adaptive". None dùng DETECTION_UPSAMPLE.
+            tier (Optional[str]): Tier của DetectorPool (ví dụ "fast", "accurate"). None dùng tier mặc định.
         Returns:
             List[Dict[str, Any]]: Danh sách các từ điển, mỗi từ điển chứa
                                   'box' (bounding box), 'confidence' (điểm tin cậy),
                                   và 'embedding' (vector nhúng).
         """
-        # Convert PIL Image to numpy array for detection
-        image_np = np.array(image)
+        detected_faces_data, boxes, cropped_faces = self._detect_and_crop_faces(image, max_side, upsample, tier)
 
-        detected_faces_data = self.face_detector_service.detect_faces(image_np)
-        
-        results = []
+        # Tạo embedding cho tất cả khuôn mặt đã cắt trong một lần suy luận theo lô
+        embeddings = []
+        if cropped_faces:
+            record_value("embedding_inference_batch_size", len(cropped_faces))
+            with timed_stage("embed"):
+                embeddings = self.face_embedding_service.get_embeddings(cropped_faces)
+        return self._build_detection_results(detected_faces_data, boxes, embeddings)
+
+    async def detect_and_embed_faces_async(
+        self,
+        image: FaceImage,
+        max_side: Optional[int] = None,
+        upsample: UpsampleMode = None,
+        tier: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Giống detect_and_embed_faces nhưng embedding được tạo qua micro-batcher (nếu có),
+        để các khuôn mặt từ nhiều request đồng thời dùng chung một lần suy luận.
+        """
+        detected_faces_data, boxes, cropped_faces = await self._run_inference(
+            self._detect_and_crop_faces, image, max_side, upsample, tier
+        )
+        with timed_stage("embed"):
+            embeddings = await self._embed_faces(cropped_faces)
+        return self._build_detection_results(detected_faces_data, boxes, embeddings)
+
+    def resolve_detection_params(
+        self, max_side: Optional[int] = None, upsample: UpsampleMode = None
+    ) -> Tuple[int, UpsampleMode]:
+        """
+        Trả về (max_side, upsample) thực sự được dùng khi phát hiện, thay None bằng giá trị cấu hình.
+        """
+        max_side = self.detection_max_side if max_side is None else max_side
+        upsample = self.detection_upsample if upsample is None else upsample
+        return max_side, upsample
+
+    def _detect(
+        self, image_bgr: np.ndarray, max_side: Optional[int], upsample: UpsampleMode, tier: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Phát hiện khuôn mặt, có thể trên bản thu nhỏ của ảnh; bounding box luôn theo tọa độ ảnh gốc.
+        """
+        max_side, upsample = self.resolve_detection_params(max_side, upsample)
+
+        height, width = image_bgr.shape[:2]
+        scale = 1.0
+        detection_image = image_bgr
+        if max_side and max(height, width) > max_side:
+            scale = max_side / max(height, width)
+            detection_image = cv2.resize(
+                image_bgr,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        # Chỉ DetectorPool nhận tham số tier; các detector đơn lẻ được gọi như trước
+        options = {"tier": tier} if tier is not None else {}
+        if upsample == ADAPTIVE_UPSAMPLE and not self.face_detector_service.upsample_improves_recall(**options):
+            # Detector có kích thước input cố định (RetinaFace/SCRFD) không tìm thêm được mặt khi phóng to:
+            # chỉ chạy một lượt với mặc định của detector
+            upsample = None
+        if upsample == ADAPTIVE_UPSAMPLE:
+            detected_faces_data = self.face_detector_service.detect_faces(detection_image, upsample=0, **options)
+            if not detected_faces_data:
+                detected_faces_data = self.face_detector_service.detect_faces(detection_image, upsample=1, **options)
+        elif upsample is None:
+            detected_faces_data = self.face_detector_service.detect_faces(detection_image, **options)
+        else:
+            detected_faces_data = self.face_detector_service.detect_faces(detection_image, upsample=upsample, **options)
+
+        if scale != 1.0:
+            rescaled = []
+            for face_data in detected_faces_data:
+                face_data = {**face_data, 'box': [int(round(val / scale)) for val in face_data['box']]}
+                if face_data.get('landmarks') is not None:
+                    face_data['landmarks'] = [[px / scale, py / scale] for px, py in face_data['landmarks']]
+                rescaled.append(face_data)
+            detected_faces_data = rescaled
+        return detected_faces_data
+
+    def _detect_and_crop_faces(
+        self, image: FaceImage, max_side: Optional[int] = None, upsample: UpsampleMode = None, tier: Optional[str] = None
+    ):
+        image_bgr = _as_bgr_array(image)
+        with timed_stage("detect"):
+            detected_faces_data = self._detect(image_bgr, max_side, upsample, tier)
+        record_value("faces_detected_per_image", len(detected_faces_data))
+        with timed_stage("crop"):
+            boxes, cropped_faces = self._crop_faces(image_bgr, detected_faces_data)
+        return detected_faces_data, boxes, cropped_faces
+
+    def _crop_faces(self, image_bgr: np.ndarray, detected_faces_data: List[Dict[str, Any]]):
+        height, width = image_bgr.shape[:2]
+        align = self.face_alignment and self.face_embedding_service.supports_alignment
+
+        boxes = []
+        cropped_faces = []
         for face_data in detected_faces_data:
             x, y, w, h = [int(val) for val in face_data['box']]
-            
+
             # Đảm bảo tọa độ hợp lệ và không vượt ra ngoài biên ảnh
             # Thêm một khoảng đệm nhỏ (ví dụ: 10% chiều rộng/chiều cao)
             padding_w = int(w * 0.1)
@@ -49,30 +270,60 @@ class FaceManager:
 
             x1 = max(0, x - padding_w)
             y1 = max(0, y - padding_h)
-            x2 = min(image.width, x + w + padding_w)
-            y2 = min(image.height, y + h + padding_h)
+            x2 = min(width, x + w + padding_w)
+            y2 = min(height, y + h + padding_h)
+
+            boxes.append([x1, y1, x2 - x1, y2 - y1])
+            if align and face_data.get('landmarks') is not None:
+                # Không cắt: embedding service warp thẳng từ ảnh gốc theo landmark sang kích thước input của model
+                cropped_faces.append(AlignedFace(image_bgr, np.asarray(face_data['landmarks'], dtype=np.float32)))
+                continue
+
+            # Cắt khuôn mặt bằng slicing: một view trên ảnh gốc, không sao chép dữ liệu
+            cropped_face_image = image_bgr[y1:y2, x1:x2]
 
-            # Cắt khuôn mặt từ ảnh PIL
-            cropped_face_image = image.crop((x1, y1, x2, y2))
-            
             # Debug: Log the size of the cropped face image
-            logger.debug(f"Kích thước ảnh khuôn mặt đã cắt (có đệm): {cropped_face_image.size}")
-            
-            # Tạo embedding cho khuôn mặt đã cắt
-            embedding = self.face_embedding_service.get_embedding(cropped_face_image)
+            logger.debug("Kích thước ảnh khuôn mặt đã cắt (có đệm): %s", cropped_face_image.shape[1::-1])
+            cropped_faces.append(cropped_face_image)
+        return boxes, cropped_faces
 
+    def _build_detection_results(self, detected_faces_data, boxes, embeddings) -> List[Dict[str, Any]]:
+        results = []
+        for face_data, box, embedding in zip(detected_faces_data, boxes, embeddings):
             if not embedding:
-                logger.warning(f"Embedding trả về rỗng cho khuôn mặt tại hộp: {[x1, y1, x2 - x1, y2 - y1]}. Bỏ qua khuôn mặt này.")
+                logger.warning(f"Embedding trả về rỗng cho khuôn mặt tại hộp: {box}. Bỏ qua khuôn mặt này.")
                 continue # Bỏ qua khuôn mặt nếu embedding trống
-            
-            results.append({
-                'box': [x1, y1, x2 - x1, y2 - y1], # Return box in x, y, w, h format
+
+            result = {
+                'box': box, # Return box in x, y, w, h format
                 'confidence': face_data['confidence'],
                 'embedding': embedding
-            })
+            }
+            if face_data.get('landmarks') is not None:
+                result['landmarks'] = face_data['landmarks']
+            results.append(result)
         return results
 
-    async def add_face(self, face_image: Image.Image, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    async def _run_inference(self, fn, *args):
+        if self.inference_executor is not None:
+            return await self.inference_executor.run(fn, *args)
+        return fn(*args)
+
+    async def _embed_faces(self, face_images: List[FaceImage]) -> List[List[float]]:
+        if not face_images:
+            return []
+        if self.embedding_batcher is not None:
+            return await self.embedding_batcher.embed(face_images)
+        record_value("embedding_inference_batch_size", len(face_images))
+        return await self._run_inference(self.face_embedding_service.get_embeddings, face_images)
+
+    async def _embed_face(self, face_image: FaceImage) -> List[float]:
+        if self.embedding_batcher is not None:
+            return (await self.embedding_batcher.embed([face_image]))[0]
+        record_value("embedding_inference_batch_size", 1)
+        return await self._run_inference(self.face_embedding_service.get_embedding, face_image)
+
+    async def add_face(self, face_image: FaceImage, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """
         Thêm một khuôn mặt mới vào hệ thống, tạo embedding và lưu trữ vào Qdrant.
         Metadata phải chứa 'memberId' và 'familyId'.
@@ -80,51 +331,99 @@ class FaceManager:
         if "member_id" not in metadata or "family_id" not in metadata:
             raise ValueError("Metadata phải chứa 'member_id' và 'family_id'.")
 
-        embedding = self.face_embedding_service.get_embedding(face_image)
+        with timed_stage("embed"):
+            embedding = await self._embed_face(face_image)
 
         if "face_id" not in metadata:
             raise ValueError("Metadata phải chứa 'face_id'.")
         face_id = metadata["face_id"]
 
         await self.face_repository.upsert_face_vector(face_id, embedding, metadata)
-        logger.info(f"Đã thêm khuôn mặt {face_id} cho member {metadata['member_id']} trong family {metadata['family_id']}.")
+        if self.backfill_embedding_service is not None and self.backfill_vector_name:
+            await self._write_backfill_vector(face_id, face_image)
+        logger.info("Đã thêm khuôn mặt %s cho member %s trong family %s.", face_id, metadata['member_id'], metadata['family_id'])
         return {"face_id": face_id, "embedding": embedding, "metadata": metadata}
 
-    async def get_faces_by_family_id(self, family_id: str) -> List[Dict[str, Any]]:
+    async def _write_backfill_vector(self, face_id: str, face_image: FaceImage):
+        # Lỗi ở đây không làm hỏng thao tác thêm khuôn mặt: job re-embedding sẽ điền vector còn thiếu sau.
+        try:
+            with timed_stage("embed"):
+                embedding = await self._run_inference(self.backfill_embedding_service.get_embedding, face_image)
+            if embedding:
+                await self.face_repository.update_face_vectors({face_id: embedding}, self.backfill_vector_name)
+        except Exception as e:
+            logger.warning("Không thể ghi vector '%s' cho khuôn mặt %s: %s", self.backfill_vector_name, face_id, e)
+
+    async def get_faces_by_family_id(self, family_id: str, with_vectors: bool = False) -> List[Dict[str, Any]]:
         """
         Lấy tất cả các khuôn mặt thuộc về một family_id cụ thể.
         """
-        faces_data = await self.face_repository.get_faces_by_family_id(family_id)
-        logger.info(f"Đã truy xuất {len(faces_data)} khuôn mặt cho family {family_id}.")
+        faces_data = await self.face_repository.get_faces_by_family_id(family_id, with_vectors=with_vectors)
+        logger.info("Đã truy xuất %d khuôn mặt cho family %s.", len(faces_data), family_id)
         return faces_data
 
+    async def get_faces_page_by_family_id(
+        self, family_id: str, limit: int, offset: Optional[Any] = None, with_vectors: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """
+        Lấy một trang khuôn mặt của family; trả về danh sách khuôn mặt và con trỏ của trang tiếp theo.
+        """
+        return await self.face_repository.get_faces_page_by_family_id(
+            family_id, limit, offset=offset, with_vectors=with_vectors
+        )
+
+    def iter_faces_by_family_id(
+        self, family_id: str, page_size: int = 1000, offset: Optional[Any] = None, with_vectors: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Duyệt lần lượt tất cả khuôn mặt của family theo từng trang (không giữ toàn bộ trong bộ nhớ).
+        """
+        return self.face_repository.iter_faces_by_family_id(
+            family_id, page_size=page_size, offset=offset, with_vectors=with_vectors
+        )
+
     async def delete_face(self, face_id: str) -> bool:
         """
         Xóa một khuôn mặt dựa trên face_id.
         """
         success = await self.face_repository.delete_face(face_id)
         if success:
-            logger.info(f"Đã xóa khuôn mặt với face_id: {face_id}.")
+            logger.info("Đã xóa khuôn mặt với face_id: %s.", face_id)
         else:
             logger.warning(f"Không tìm thấy hoặc không thể xóa khuôn mặt với faceId: {face_id}.")
         return success
 
+    async def delete_faces(self, face_ids: List[str]) -> bool:
+        """
+        Xóa nhiều khuôn mặt cùng lúc dựa trên danh sách face_id (một lần gọi tới repository).
+        """
+        success = await self.face_repository.delete_faces(face_ids)
+        if success:
+            logger.info("Đã xóa %d khuôn mặt.", len(face_ids))
+        else:
+            logger.warning(f"Không thể xóa một phần hoặc toàn bộ {len(face_ids)} khuôn mặt.")
+        return success
+
     async def delete_faces_by_family_id(self, family_id: str) -> bool:
         """
         Xóa tất cả các khuôn mặt thuộc về một family_id cụ thể.
         """
-        logger.info(f"Đang xóa các khuôn mặt cho family {family_id}...")
+        logger.info("Đang xóa các khuôn mặt cho family %s...", family_id)
         success = await self.face_repository.delete_faces_by_family_id(family_id)
         if success:
-            logger.info(f"Đã xóa thành công các khuôn mặt cho family {family_id}.")
+            logger.info("Đã xóa thành công các khuôn mặt cho family %s.", family_id)
         else:
             logger.warning(f"Không thể xóa các khuôn mặt cho family {family_id}.")
         return success
 
-    async def add_face_by_vector(self, vector: List[float], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    async def add_face_by_vector(
+        self, vector: List[float], metadata: Dict[str, Any], duplicate_policy: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Thêm một khuôn mặt mới vào hệ thống trực tiếp bằng vector embedding và metadata.
         Metadata phải chứa 'memberId' và 'familyId'.
+        Với duplicate_policy (mặc định DUPLICATE_FACE_POLICY) khác "off", khuôn mặt được tìm trong chính family
+        với ngưỡng cao (DUPLICATE_FACE_THRESHOLD); nếu trùng, kết quả có thêm 'duplicate'.
         """
         if "member_id" not in metadata or "family_id" not in metadata:
             raise ValueError("Metadata phải chứa 'member_id' và 'family_id'.")
@@ -132,17 +431,263 @@ class FaceManager:
         if "face_id" not in metadata:
             raise ValueError("Metadata phải chứa 'face_id'.")
         face_id = metadata["face_id"]
+        policy = self.duplicate_policy if duplicate_policy is None else parse_duplicate_policy(duplicate_policy)
+
+        duplicate = None
+        merges: Dict[Any, List[Any]] = {}
+        if policy != "off":
+            items, reports, merges = await self._resolve_duplicates(
+                [{"face_id": face_id, "vector": vector, "metadata": metadata}], policy
+            )
+            duplicate = reports[0] if reports else None
+            metadata = items[0]["metadata"] if items else metadata
 
-        await self.face_repository.upsert_face_vector(face_id, vector, metadata)
-        logger.info(f"Đã thêm khuôn mặt {face_id} (từ vector) cho member {metadata['member_id']} trong family {metadata['family_id']}.")
-        return {"face_id": face_id, "embedding": vector, "metadata": metadata}
+        if duplicate is None or duplicate["action"] == "flagged":
+            await self.face_repository.upsert_face_vector(face_id, vector, metadata)
+            logger.info(
+                "Đã thêm khuôn mặt %s (từ vector) cho member %s trong family %s.",
+                face_id, metadata['member_id'], metadata['family_id'],
+            )
+        await self._merge_into_existing(merges)
 
-    async def search_similar_faces(self, face_image: Image.Image, family_id: Optional[str] = None, limit: int = 5, threshold: float = 0.7) -> List[Dict[str, Any]]:
+        result = {"face_id": face_id, "embedding": vector, "metadata": metadata}
+        if duplicate is not None:
+            logger.info(
+                "Khuôn mặt %s trùng với %s (cosine %.4f): %s.",
+                face_id, duplicate["duplicate_of"], duplicate["score"], duplicate["action"],
+            )
+            result["duplicate"] = {key: value for key, value in duplicate.items() if key != "face_id"}
+        return result
+
+    async def add_faces_by_vectors(
+        self, faces: List[Dict[str, Any]], wait: bool = True, duplicate_policy: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Thêm nhiều khuôn mặt cùng lúc bằng vector embedding và metadata (ghi theo lô vào Qdrant).
+        Mỗi phần tử gồm 'vector' và 'metadata'; metadata phải chứa 'face_id', 'member_id' và 'family_id'.
+        Với duplicate_policy khác "off", các vector được kiểm tra trùng lặp với nhau và với index trong một
+        lượt cho mỗi family; 'face_ids' chỉ gồm các khuôn mặt đã lưu và 'duplicates' liệt kê các bản trùng.
+        """
+        items = []
+        for face in faces:
+            metadata = face["metadata"]
+            if "member_id" not in metadata or "family_id" not in metadata:
+                raise ValueError("Metadata phải chứa 'member_id' và 'family_id'.")
+            if "face_id" not in metadata:
+                raise ValueError("Metadata phải chứa 'face_id'.")
+            items.append({"face_id": metadata["face_id"], "vector": face["vector"], "metadata": metadata})
+        policy = self.duplicate_policy if duplicate_policy is None else parse_duplicate_policy(duplicate_policy)
+
+        reports: List[Dict[str, Any]] = []
+        merges: Dict[Any, List[Any]] = {}
+        if policy != "off" and items:
+            items, reports, merges = await self._resolve_duplicates(items, policy)
+
+        count = await self.face_repository.upsert_face_vectors(items, wait=wait) if items else 0
+        await self._merge_into_existing(merges)
+        logger.info("Đã thêm %d khuôn mặt (từ vector) theo lô.", count)
+        result = {"count": count, "face_ids": [item["face_id"] for item in items]}
+        if policy != "off":
+            logger.info("Phát hiện %d khuôn mặt trùng lặp trong lô (%s).", len(reports), policy)
+            result["duplicates"] = reports
+        return result
+
+    async def _find_duplicates(self, items: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Tìm bản trùng (cosine >= duplicate_threshold) của từng khuôn mặt sắp thêm, theo từng family: mọi vector
+        đầu vào được tìm trong index bằng một lệnh batch search, và được so với nhau bằng phép nhân ma trận theo
+        khối. Một khuôn mặt trùng với khuôn mặt đã lưu ('existing' = True) hoặc với một khuôn mặt đứng trước nó
+        trong cùng lô.
+        """
+        duplicates: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        by_family: Dict[str, List[int]] = {}
+        for position, item in enumerate(items):
+            by_family.setdefault(item["metadata"]["family_id"], []).append(position)
+
+        for family_id, positions in by_family.items():
+            vectors = [items[position]["vector"] for position in positions]
+            representatives, assignment = _deduplicate_vectors(vectors, self.duplicate_threshold)
+            # Nhóm trong lô không bắc cầu (A~B, B~C nhưng A không ~ C), nên mỗi vector được tìm riêng thay vì
+            # dùng lại kết quả của vector đại diện
+            with timed_stage("duplicate_check"):
+                hits = await self.face_repository.batch_search_similar_faces(
+                    vectors,
+                    family_id=family_id,
+                    top_k=2,
+                    threshold=self.duplicate_threshold,
+                )
+
+            unit = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(unit, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            unit = unit / norms
+            for local, (group, item_hits) in enumerate(zip(assignment, hits)):
+                # Ghi lại cùng face_id là cập nhật, không phải bản trùng
+                own_id = str(items[positions[local]]["face_id"]).lower()
+                match = next((hit for hit in item_hits if str(hit["id"]).lower() != own_id), None)
+                representative = representatives[group]
+                if match is not None:
+                    duplicates[positions[local]] = {
+                        "duplicate_of": match["id"],
+                        "score": float(match["score"]),
+                        "existing": True,
+                        "payload": match.get("payload") or {},
+                    }
+                elif local != representative:
+                    duplicates[positions[local]] = {
+                        "duplicate_of": items[positions[representative]]["face_id"],
+                        "score": float(unit[local] @ unit[representative]),
+                        "existing": False,
+                    }
+        return duplicates
+
+    async def _resolve_duplicates(
+        self, items: List[Dict[str, Any]], policy: str
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[Any, List[Any]]]:
+        """
+        Áp dụng policy cho các bản trùng. Trả về các khuôn mặt cần lưu (metadata đã được bổ sung nếu cần,
+        không sửa dict của người gọi), báo cáo cho từng bản trùng và danh sách face_id cần gộp vào
+        'merged_face_ids' của từng khuôn mặt đã lưu.
+        """
+        duplicates = await self._find_duplicates(items)
+        action = DUPLICATE_ACTIONS[policy]
+        to_store: List[Dict[str, Any]] = []
+        reports: List[Dict[str, Any]] = []
+        merges: Dict[Any, List[Any]] = {}
+        batch_merges: Dict[Any, List[Any]] = {}
+        for item, duplicate in zip(items, duplicates):
+            if duplicate is None:
+                to_store.append(item)
+                continue
+            reports.append({
+                "face_id": item["face_id"],
+                "duplicate_of": duplicate["duplicate_of"],
+                "score": round(duplicate["score"], 6),
+                "action": action,
+            })
+            if policy == "flag":
+                to_store.append(dict(item, metadata={
+                    **item["metadata"],
+                    "duplicate_of": duplicate["duplicate_of"],
+                    "duplicate_score": round(duplicate["score"], 6),
+                }))
+            elif policy == "merge" and duplicate["existing"]:
+                merged = merges.setdefault(
+                    duplicate["duplicate_of"], list(duplicate["payload"].get(MERGED_FACE_IDS_FIELD) or [])
+                )
+                merged.append(item["face_id"])
+            elif policy == "merge":
+                batch_merges.setdefault(duplicate["duplicate_of"], []).append(item["face_id"])
+
+        if batch_merges:
+            # Bản trùng của một khuôn mặt trong cùng lô được gộp thẳng vào metadata của khuôn mặt đó
+            to_store = [
+                dict(item, metadata={
+                    **item["metadata"],
+                    MERGED_FACE_IDS_FIELD: list(item["metadata"].get(MERGED_FACE_IDS_FIELD) or [])
+                    + batch_merges[item["face_id"]],
+                }) if item["face_id"] in batch_merges else item
+                for item in to_store
+            ]
+        return to_store, reports, merges
+
+    async def _merge_into_existing(self, merges: Dict[Any, List[Any]]):
+        if merges:
+            await self.face_repository.set_faces_payload([
+                ({MERGED_FACE_IDS_FIELD: face_ids}, [existing_id]) for existing_id, face_ids in merges.items()
+            ])
+
+    async def cluster_family_faces(
+        self,
+        family_id: str,
+        threshold: Optional[float] = None,
+        min_cluster_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Gom các khuôn mặt của một family thành các danh tính và lưu 'cluster_id' / 'cluster_size' vào payload.
+        Embedding được đọc theo trang và phân cụm dần (ngưỡng cosine, union-find) ngoài event loop.
+        cluster_id là id của khuôn mặt đầu tiên trong cụm nên ổn định giữa các lần chạy; khuôn mặt thuộc
+        cụm nhỏ hơn min_cluster_size được coi là chưa phân cụm (cluster_id = None).
+        Chỉ các khuôn mặt có cụm thay đổi so với payload hiện tại mới được ghi lại. Khuôn mặt chưa có vector của
+        model đang dùng không được phân cụm và bị xóa cụm của lần chạy trước, để family không lẫn cụm cũ và mới.
+        """
+        threshold = self.clustering_threshold if threshold is None else threshold
+        min_cluster_size = self.clustering_min_size if min_cluster_size is None else max(1, min_cluster_size)
+        start = time.perf_counter()
+        clusterer = IncrementalFaceClusterer(threshold, self.clustering_block_size)
+        previous: List[Tuple[Any, Any]] = []
+        stale: List[Any] = []
+        skipped = 0
+        offset = None
+        while True:
+            faces, offset = await self.face_repository.get_faces_page_by_family_id(
+                family_id, self.clustering_page_size, offset=offset, with_vectors=True
+            )
+            # Khuôn mặt chưa có vector của model đang dùng (đang re-embedding) không được phân cụm
+            for face in faces:
+                if not face.get("vector"):
+                    skipped += 1
+                    payload = face.get("payload") or {}
+                    if payload.get(CLUSTER_ID_FIELD) is not None or payload.get(CLUSTER_SIZE_FIELD) is not None:
+                        stale.append(face["id"])
+            faces = [face for face in faces if face.get("vector")]
+            if faces:
+                for face in faces:
+                    payload = face.get("payload") or {}
+                    previous.append((payload.get(CLUSTER_ID_FIELD), payload.get(CLUSTER_SIZE_FIELD)))
+                with timed_stage("face_clustering"):
+                    await asyncio.to_thread(
+                        clusterer.add, [face["id"] for face in faces], [face["vector"] for face in faces]
+                    )
+            if offset is None:
+                break
+
+        labels = clusterer.labels()
+        sizes = clusterer.cluster_sizes(labels)
+        changes: Dict[Tuple[Any, Any], List[Any]] = {}
+        clusters = set()
+        for position, (root, size) in enumerate(zip(labels.tolist(), sizes.tolist())):
+            if size >= min_cluster_size:
+                assigned = (str(clusterer.ids[root]), size)
+                clusters.add(root)
+            else:
+                assigned = (None, None)
+            if previous[position] != assigned:
+                changes.setdefault(assigned, []).append(clusterer.ids[position])
+        if stale:
+            changes.setdefault((None, None), []).extend(stale)
+
+        updated = 0
+        if changes:
+            updated = await self.face_repository.set_faces_payload([
+                ({CLUSTER_ID_FIELD: cluster_id, CLUSTER_SIZE_FIELD: size}, face_ids)
+                for (cluster_id, size), face_ids in changes.items()
+            ])
+        clustered_faces = int(sizes[sizes >= min_cluster_size].size)
+        logger.info(
+            "Đã phân cụm %d khuôn mặt của family %s thành %d cụm (%d khuôn mặt được cập nhật).",
+            len(clusterer), family_id, len(clusters), updated,
+        )
+        return {
+            "family_id": family_id,
+            "faces": len(clusterer),
+            "clusters": len(clusters),
+            "clustered_faces": clustered_faces,
+            "unclustered_faces": len(clusterer) - clustered_faces,
+            "skipped_faces": skipped,
+            "updated": updated,
+            "threshold": threshold,
+            "min_cluster_size": min_cluster_size,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    async def search_similar_faces(self, face_image: FaceImage, family_id: Optional[str] = None, limit: int = 5, threshold: float = 0.7) -> List[Dict[str, Any]]:
         """
         Tìm kiếm các khuôn mặt tương tự trong Qdrant.
         Có thể lọc theo family_id.
         """
-        query_embedding = self.face_embedding_service.get_embedding(face_image)
+        with timed_stage("embed"):
+            query_embedding = await self._embed_face(face_image)
 
         search_results = await self.face_repository.search_similar_faces(
             query_embedding,
@@ -150,7 +695,7 @@ class FaceManager:
             top_k=limit,
             threshold=threshold
         )
-        logger.info(f"Đã tìm thấy {len(search_results)} khuôn mặt tương tự cho query.")
+        logger.info("Đã tìm thấy %d khuôn mặt tương tự cho query.", len(search_results))
         return search_results
 
     async def search_similar_faces_by_vector(self, query_embedding: List[float], family_id: Optional[str] = None, member_id: Optional[str] = None, limit: int = 5, threshold: float = 0.7) -> List[Dict[str, Any]]:
@@ -165,7 +710,7 @@ class FaceManager:
             top_k=limit,
             threshold=threshold
         )
-        logger.info(f"Đã tìm thấy {len(search_results)} khuôn mặt tương tự từ vector query.")
+        logger.info("Đã tìm thấy %d khuôn mặt tương tự từ vector query.", len(search_results))
         return search_results
 
     async def search_similar_faces_by_vectors(self, query_embeddings: List[List[float]], family_id: Optional[str] = None, limit: int = 5, threshold: float = 0.7) -> List[List[Dict[str, Any]]]:
@@ -173,11 +718,21 @@ class FaceManager:
         Tìm kiếm các khuôn mặt tương tự trong Qdrant sử dụng một danh sách các vector embedding trực tiếp.
         Có thể lọc theo family_id.
         """
-        batch_search_results = await self.face_repository.batch_search_similar_faces(
-            query_embeddings,
+        if not query_embeddings:
+            return []
+        # Ảnh chụp nhóm thường chứa các embedding gần như trùng nhau (cùng một khuôn mặt bị phát hiện
+        # nhiều lần): chỉ tìm kiếm một lần cho mỗi nhóm rồi sao chép kết quả.
+        representatives, assignment = _deduplicate_vectors(query_embeddings, self.batch_search_dedup_threshold)
+
+        unique_results = await self.face_repository.batch_search_similar_faces(
+            [query_embeddings[i] for i in representatives],
             family_id=family_id,
             top_k=limit,
             threshold=threshold
         )
-        logger.info(f"Đã tìm thấy {len(batch_search_results)} kết quả tìm kiếm hàng loạt từ các vector query.")
+        batch_search_results = [list(unique_results[position]) for position in assignment]
+        logger.info(
+            "Đã tìm thấy %d kết quả tìm kiếm hàng loạt từ các vector query (%d vector sau khi loại trùng).",
+            len(batch_search_results), len(representatives),
+        )
         return batch_search_results
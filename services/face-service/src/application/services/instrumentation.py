@@ -0,0 +1,72 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Đo thời gian từng giai đoạn xử lý (decode, detect, crop, embed, qdrant_*) mà không phụ thuộc
+# vào tầng infrastructure: nơi lắp ráp ứng dụng (main.py) đăng ký observer để ghi vào histogram.
+StageObserver = Callable[[str, float], None]
+ValueObserver = Callable[[str, float], None]
+
+_stage_observers: List[StageObserver] = []
+_value_observers: List[ValueObserver] = []
+
+# Danh sách (stage, giây) của request hiện tại; chỉ tồn tại khi middleware Server-Timing bật.
+# Danh sách được chia sẻ theo tham chiếu nên các task/thread con sao chép context vẫn ghi vào đúng request.
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def add_stage_observer(observer: StageObserver):
+    if observer not in _stage_observers:
+        _stage_observers.append(observer)
+
+
+def add_value_observer(observer: ValueObserver):
+    if observer not in _value_observers:
+        _value_observers.append(observer)
+
+
+def remove_stage_observer(observer: StageObserver):
+    if observer in _stage_observers:
+        _stage_observers.remove(observer)
+
+
+def remove_value_observer(observer: ValueObserver):
+    if observer in _value_observers:
+        _value_observers.remove(observer)
+
+
+def record_stage(stage: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+    for observer in _stage_observers:
+        observer(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Đo thời gian của khối lệnh (kể cả khi lỗi) và ghi nhận dưới tên `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_value(name: str, value: float):
+    """Ghi nhận một giá trị phân phối, ví dụ số khuôn mặt mỗi ảnh hoặc kích thước lô embedding."""
+    for observer in _value_observers:
+        observer(name, value)
+
+
+def begin_request_timings() -> Token:
+    return _request_timings.set([])
+
+
+def request_timings() -> List[Tuple[str, float]]:
+    return list(_request_timings.get() or [])
+
+
+def end_request_timings(token: Token):
+    _request_timings.reset(token)
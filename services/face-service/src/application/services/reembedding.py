@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from src.application.services.instrumentation import timed_stage
+from src.domain.interfaces.face_embedding import IFaceEmbedding
+from src.domain.interfaces.face_repository import IFaceRepository
+from src.domain.interfaces.image_store import IImageStore
+
+if TYPE_CHECKING:
+    from src.infrastructure.inference_executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def _crop_to_box(image: np.ndarray, box: Dict[str, Any]) -> Optional[np.ndarray]:
+    height, width = image.shape[:2]
+    x1 = max(0, int(box.get("x", 0)))
+    y1 = max(0, int(box.get("y", 0)))
+    x2 = min(width, x1 + int(box.get("width", 0)))
+    y2 = min(height, y1 + int(box.get("height", 0)))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return image[y1:y2, x1:x2]
+
+
+class ReembeddingJob:
+    """
+    Backfills the vectors of another embedding model (`vector_name`) for every stored face.
+
+    Faces without that vector are walked page by page (REEMBEDDING_BATCH_SIZE, default 32). Each
+    face's image comes from the image store: the stored thumbnail (already a face crop) or, failing
+    that, the original photo cropped to the stored bounding box. One embedding inference runs per
+    page and the vectors are written without touching payloads or the active model's vectors, so
+    searches keep reading the active model while the job runs. Faces without a usable image are
+    counted as skipped; the job can simply be re-run since it only visits faces still missing the
+    vector.
+    """
+
+    def __init__(
+        self,
+        face_repository: IFaceRepository,
+        embedding_service: IFaceEmbedding,
+        image_store: IImageStore,
+        vector_name: str,
+        batch_size: Optional[int] = None,
+        inference_executor: Optional["InferenceExecutor"] = None,
+    ):
+        self.face_repository = face_repository
+        self.embedding_service = embedding_service
+        self.image_store = image_store
+        self.vector_name = vector_name
+        self.batch_size = max(1, int(batch_size or os.getenv("REEMBEDDING_BATCH_SIZE", 32)))
+        self.inference_executor = inference_executor
+        self._task: Optional[asyncio.Task] = None
+        self._cancelled = False
+        self._reset("idle")
+
+    def _reset(self, status: str):
+        self.status = status
+        self.total = 0
+        self.embedded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def processed(self) -> int:
+        return self.embedded + self.skipped + self.failed
+
+    def start(self) -> bool:
+        """Starts the job in the background; returns False if it is already running."""
+        if self.running:
+            return False
+        self._reset("pending")
+        self._cancelled = False
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        return True
+
+    def cancel(self) -> bool:
+        """Stops the job after the page being processed; returns False if it is not running."""
+        if not self.running:
+            return False
+        self._cancelled = True
+        return True
+
+    def progress(self) -> Dict[str, Any]:
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        throughput = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total - self.processed)
+        return {
+            "status": self.status,
+            "vector_name": self.vector_name,
+            "batch_size": self.batch_size,
+            "total": self.total,
+            "processed": self.processed,
+            "embedded": self.embedded,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "remaining": remaining,
+            "elapsed_seconds": round(elapsed, 3),
+            "faces_per_second": round(throughput, 2),
+            "eta_seconds": round(remaining / throughput, 1) if throughput > 0 else None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        self._reset("running")
+        self.started_at = time.time()
+        try:
+            self.total = await self.face_repository.count_faces(missing_vector=self.vector_name)
+            logger.info("Re-embedding %d faces into vector '%s'.", self.total, self.vector_name)
+            offset = None
+            while not self._cancelled:
+                faces, offset = await self.face_repository.get_faces_page(
+                    self.batch_size, offset=offset, missing_vector=self.vector_name
+                )
+                if faces:
+                    with timed_stage("reembed_batch"):
+                        await self._process_page(faces)
+                    logger.info("Re-embedding progress: %d/%d faces.", self.processed, self.total)
+                if offset is None:
+                    break
+            self.status = "cancelled" if self._cancelled else "completed"
+        except Exception as e:
+            logger.error("Re-embedding into vector '%s' failed: %s", self.vector_name, e, exc_info=True)
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            self._cancelled = False
+        return self.progress()
+
+    async def _process_page(self, faces: List[Dict[str, Any]]):
+        images = await asyncio.gather(*(self._load_face_image(face.get("payload") or {}) for face in faces))
+        pending: List[Tuple[Any, np.ndarray]] = [
+            (face["id"], image) for face, image in zip(faces, images) if image is not None
+        ]
+        self.skipped += len(faces) - len(pending)
+        if not pending:
+            return
+        try:
+            embeddings = await self._run_inference(
+                self.embedding_service.get_embeddings, [image for _, image in pending]
+            )
+        except Exception as e:
+            logger.warning("Embedding %d faces for vector '%s' failed: %s", len(pending), self.vector_name, e)
+            self.failed += len(pending)
+            return
+        vectors = {face_id: embedding for (face_id, _), embedding in zip(pending, embeddings) if embedding}
+        self.failed += len(pending) - len(vectors)
+        self.embedded += await self.face_repository.update_face_vectors(vectors, self.vector_name)
+
+    async def _load_face_image(self, payload: Dict[str, Any]) -> Optional[np.ndarray]:
+        # Ưu tiên thumbnail (đã là ảnh khuôn mặt); nếu không có thì cắt ảnh gốc theo bounding box đã lưu
+        thumbnail_url = payload.get("thumbnail_url")
+        if thumbnail_url:
+            image = await self.image_store.load_image(thumbnail_url)
+            if image is not None:
+                return image
+        original_url = payload.get("original_image_url")
+        box = payload.get("bounding_box")
+        if original_url and box:
+            image = await self.image_store.load_image(original_url)
+            if image is not None:
+                return _crop_to_box(image, box)
+        return None
+
+    async def _run_inference(self, fn, *args):
+        if self.inference_executor is not None:
+            return await self.inference_executor.run(fn, *args)
+        return fn(*args)
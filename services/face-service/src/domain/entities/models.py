@@ -1,5 +1,5 @@
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, Field
 
 
 # --- Nested Models ---
@@ -67,6 +67,7 @@ class FaceDetectionResult(BaseModel):
     confidence: float
     thumbnail: Optional[str] = None
     embedding: Optional[List[float]] = None
+    landmarks: Optional[List[List[float]]] = None
 
 
 class FaceMetadata(BaseModel):
@@ -97,6 +98,43 @@ class FaceAddVectorRequest(BaseModel):
     metadata: FaceMetadata
 
 
+# Số khuôn mặt tối đa trong một request ghi hàng loạt; lô lớn hơn cần được client chia nhỏ
+MAX_BULK_FACES = 1000
+
+
+class BulkFaceAddVectorRequest(BaseModel):
+    faces: List[FaceAddVectorRequest] = Field(..., max_length=MAX_BULK_FACES)
+    wait: bool = True  # False: trả về operation_id ngay, ghi Qdrant ở nền
+
+
+class BulkOperationStatus(BaseModel):
+    operation_id: Optional[str] = None
+    status: str
+    count: int = 0
+    face_ids: List[str] = []
+    duplicates: List[Dict[str, Any]] = []  # Bản trùng phát hiện được khi duplicate_policy khác "off"
+    error: Optional[str] = None
+
+
+class FamilyFacesPage(BaseModel):
+    faces: List[Dict[str, Any]]
+    next_page_offset: Optional[Union[int, str]] = None  # None khi đã hết dữ liệu
+
+
+class FamilyClusteringRequest(BaseModel):
+    threshold: Optional[float] = None  # Ngưỡng cosine; mặc định FACE_CLUSTERING_THRESHOLD
+    min_cluster_size: Optional[int] = None  # Mặc định FACE_CLUSTERING_MIN_SIZE
+    wait: bool = False  # True: chờ phân cụm xong và trả kết quả thay vì operation_id
+
+
+class FamilyClusteringStatus(BaseModel):
+    operation_id: Optional[str] = None
+    family_id: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
 class FaceSearchVectorRequest(BaseModel):
     embedding: List[float]
     family_id: Optional[str] = None
@@ -109,3 +147,12 @@ class BatchFaceSearchVectorRequest(BaseModel):
     family_id: Optional[str] = None
     top_k: int = 1 # Changed from 5 to 1 based on the context of DetectFacesCommandHandler
     threshold: float = 0.7  # Add threshold for vector search
+    columnar: bool = False  # True: trả về BatchFaceSearchColumnarResult thay vì danh sách kết quả
+    with_payload: bool = True  # Chỉ áp dụng cho phản hồi columnar
+
+
+class BatchFaceSearchColumnarResult(BaseModel):
+    # Mỗi phần tử ứng với một vector query, theo đúng thứ tự gửi lên
+    ids: List[List[str]]
+    scores: List[List[float]]
+    payloads: Optional[List[List[Dict[str, Any]]]] = None
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
 
 class IFaceDetector(ABC):
@@ -8,17 +8,30 @@ class IFaceDetector(ABC):
     Defines the contract for any class that provides face detection functionality.
     """
     @abstractmethod
-    def detect_faces(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def detect_faces(self, image: np.ndarray, upsample: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Detects faces in a given image.
 
         Args:
-            image (np.ndarray): The input image as a NumPy array (e.g., from PIL.Image.open and np.array).
+            image (np.ndarray): The input image as a BGR uint8 NumPy array (H, W, 3).
+            upsample (Optional[int]): How many times to upsample (2x each) the image before detecting,
+                                      to find smaller faces. None uses the detector's default.
 
         Returns:
             List[Dict[str, Any]]: A list of dictionaries, where each dictionary
                                   represents a detected face and contains its bounding box
-                                  (x, y, w, h) and confidence score.
-                                  Example: [{'box': [x, y, w, h], 'confidence': score}]
+                                  (x, y, w, h) and confidence score. Detectors that predict
+                                  facial landmarks also return the 5 points (left eye, right eye,
+                                  nose, left and right mouth corner) under 'landmarks'.
+                                  Example: [{'box': [x, y, w, h], 'confidence': score,
+                                             'landmarks': [[x, y], ...]}]
         """
         pass
+
+    def upsample_improves_recall(self) -> bool:
+        """
+        Whether running detection again on an upsampled image can find faces the first pass missed.
+        The "adaptive" upsample mode only pays for a second pass when this is True; detectors that
+        resize every image to a fixed network input (RetinaFace/SCRFD) gain nothing from it.
+        """
+        return False
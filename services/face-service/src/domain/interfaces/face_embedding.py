@@ -1,21 +1,55 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, NamedTuple, Union
+import numpy as np
 from PIL.Image import Image as PILImage
 
+
+class AlignedFace(NamedTuple):
+    """
+    A face given by the full BGR image and its 5 detector landmarks (left eye, right eye, nose,
+    left and right mouth corner) in image coordinates. Embedding services that support alignment
+    warp it straight from `image` to their input size instead of receiving a crop.
+    """
+    image: np.ndarray
+    landmarks: np.ndarray
+
+
+# Ảnh khuôn mặt: PIL Image (RGB), mảng NumPy BGR (thường là view cắt từ ảnh gốc, không sao chép)
+# hoặc AlignedFace (chỉ với embedding service có supports_alignment = True)
+FaceImage = Union[PILImage, np.ndarray, AlignedFace]
+
 class IFaceEmbedding(ABC):
     """
     Abstract Base Class for face embedding services.
     Defines the contract for any class that provides face embedding functionality.
     """
+    # True if get_embedding(s) accept AlignedFace inputs
+    supports_alignment: bool = False
+
     @abstractmethod
-    def get_embedding(self, face_image: PILImage) -> List[float]:
+    def get_embedding(self, face_image: FaceImage) -> List[float]:
         """
         Generates a 128-dimensional face embedding for a given cropped face image.
 
         Args:
-            face_image (PILImage): A cropped PIL Image containing a single face.
+            face_image (FaceImage): A cropped face, either a PIL Image or a BGR NumPy array.
 
         Returns:
             List[float]: A list of floats representing the 128-dimensional face embedding.
         """
         pass
+
+    def get_embeddings(self, face_images: List[FaceImage]) -> List[List[float]]:
+        """
+        Generates embeddings for several cropped face images at once.
+
+        The default implementation calls `get_embedding` for each image; implementations backed by
+        a batch-capable model should override it to run a single inference per batch.
+
+        Args:
+            face_images (List[FaceImage]): Cropped faces (PIL Images or BGR NumPy arrays).
+
+        Returns:
+            List[List[float]]: One embedding per input image, in the same order.
+        """
+        return [self.get_embedding(face_image) for face_image in face_images]
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 
 class IFaceRepository(ABC):
     """
@@ -7,6 +7,29 @@ class IFaceRepository(ABC):
     Defines the contract for any class that provides persistent storage for face vectors and metadata.
     """
 
+    async def async_init(self):
+        """
+        Performs asynchronous start-up work (e.g. creating collections). Called once at application
+        start-up; the default implementation does nothing.
+        """
+        pass
+
+    async def close(self):
+        """
+        Releases connections held by the repository. The default implementation does nothing.
+        """
+        pass
+
+    async def collection_stats(self) -> Dict[str, Any]:
+        """
+        Reports storage statistics of the underlying collection (segments, indexed fields, memory).
+        The default implementation reports nothing.
+
+        Returns:
+            Dict[str, Any]: Implementation-specific statistics.
+        """
+        return {}
+
     @abstractmethod
     async def upsert_face_vector(self, face_id: str, vector: List[float], metadata: Dict[str, Any]):
         """
@@ -19,6 +42,24 @@ class IFaceRepository(ABC):
         """
         pass
 
+    async def upsert_face_vectors(self, faces: List[Dict[str, Any]], wait: bool = True) -> int:
+        """
+        Inserts or updates many face vectors at once.
+
+        The default implementation calls `upsert_face_vector` for each face; implementations should
+        override it to batch the writes.
+
+        Args:
+            faces (List[Dict[str, Any]]): Items with 'face_id', 'vector' and 'metadata' keys.
+            wait (bool): Whether to wait until the writes are applied before returning.
+
+        Returns:
+            int: The number of faces written.
+        """
+        for face in faces:
+            await self.upsert_face_vector(face["face_id"], face["vector"], face["metadata"])
+        return len(faces)
+
     @abstractmethod
     async def search_similar_faces(
         self,
@@ -45,12 +86,13 @@ class IFaceRepository(ABC):
         pass
 
     @abstractmethod
-    async def get_faces_by_family_id(self, family_id: str) -> List[Dict[str, Any]]:
+    async def get_faces_by_family_id(self, family_id: str, with_vectors: bool = False) -> List[Dict[str, Any]]:
         """
         Retrieves all faces associated with a given family ID.
 
         Args:
             family_id (str): The ID of the family.
+            with_vectors (bool): Whether to include each face's embedding under 'vector'.
 
         Returns:
             List[Dict[str, Any]]: A list of dictionaries, each representing a face
@@ -58,6 +100,118 @@ class IFaceRepository(ABC):
         """
         pass
 
+    async def get_faces_page_by_family_id(
+        self,
+        family_id: str,
+        limit: int,
+        offset: Optional[Any] = None,
+        with_vectors: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """
+        Retrieves one page of the faces associated with a given family ID.
+
+        The default implementation slices the result of `get_faces_by_family_id` and uses the list
+        index as the cursor; implementations should override it with a native cursor.
+
+        Args:
+            family_id (str): The ID of the family.
+            limit (int): The maximum number of faces in the page.
+            offset (Optional[Any]): The cursor returned by the previous page, or None for the first page.
+            with_vectors (bool): Whether to include each face's embedding under 'vector'.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Any]]: The faces of the page and the cursor of the
+                                                         next page (None when there are no more faces).
+        """
+        faces = await self.get_faces_by_family_id(family_id, with_vectors=with_vectors)
+        start = int(offset or 0)
+        end = start + limit
+        return faces[start:end], (end if end < len(faces) else None)
+
+    async def iter_faces_by_family_id(
+        self,
+        family_id: str,
+        page_size: int = 1000,
+        offset: Optional[Any] = None,
+        with_vectors: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterates over all faces of a family, fetching them page by page.
+
+        Args:
+            family_id (str): The ID of the family.
+            page_size (int): The number of faces fetched per page.
+            offset (Optional[Any]): The cursor to start from, or None to start at the beginning.
+            with_vectors (bool): Whether to include each face's embedding under 'vector'.
+
+        Yields:
+            Dict[str, Any]: One face with its ID and metadata.
+        """
+        while True:
+            faces, offset = await self.get_faces_page_by_family_id(
+                family_id, page_size, offset=offset, with_vectors=with_vectors
+            )
+            for face in faces:
+                yield face
+            if offset is None:
+                break
+
+    async def get_faces_page(
+        self,
+        limit: int,
+        offset: Optional[Any] = None,
+        missing_vector: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """
+        Retrieves one page over all stored faces (ID and metadata), e.g. for re-embedding jobs.
+
+        Args:
+            limit (int): The maximum number of faces in the page.
+            offset (Optional[Any]): The cursor returned by the previous page, or None for the first page.
+            missing_vector (Optional[str]): Only return faces that have no vector of this embedding model.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Any]]: The faces of the page and the cursor of the next page.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot list all faces.")
+
+    async def count_faces(self, missing_vector: Optional[str] = None) -> int:
+        """
+        Counts the stored faces.
+
+        Args:
+            missing_vector (Optional[str]): Only count faces that have no vector of this embedding model.
+
+        Returns:
+            int: The number of faces.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot count faces.")
+
+    async def update_face_vectors(self, vectors: Dict[Any, List[float]], vector_name: str) -> int:
+        """
+        Stores the embeddings of another embedding model for existing faces, keeping their metadata.
+
+        Args:
+            vectors (Dict[Any, List[float]]): Embedding per face ID.
+            vector_name (str): The embedding model the vectors belong to (e.g. 'arcface').
+
+        Returns:
+            int: The number of faces updated.
+        """
+        raise NotImplementedError(f"{type(self).__name__} stores a single embedding per face.")
+
+    async def set_faces_payload(self, updates: List[Tuple[Dict[str, Any], List[Any]]]) -> int:
+        """
+        Merges payload fields into existing faces, keeping their vectors and other payload fields.
+
+        Args:
+            updates (List[Tuple[Dict[str, Any], List[Any]]]): Pairs of (payload fields, face IDs that receive them).
+
+        Returns:
+            int: The number of faces updated.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot update payloads in place.")
+
     @abstractmethod
     async def delete_face(self, face_id: str) -> bool:
         """
@@ -71,6 +225,22 @@ class IFaceRepository(ABC):
         """
         pass
 
+    async def delete_faces(self, face_ids: List[str]) -> bool:
+        """
+        Deletes several faces by their IDs.
+
+        The default implementation calls `delete_face` for each ID; implementations should
+        override it to delete in a single request.
+
+        Args:
+            face_ids (List[str]): The unique identifiers of the faces to delete.
+
+        Returns:
+            bool: True if all faces were successfully deleted, False otherwise.
+        """
+        results = [await self.delete_face(face_id) for face_id in face_ids]
+        return all(results)
+
     @abstractmethod
     async def delete_faces_by_family_id(self, family_id: str) -> bool:
         """
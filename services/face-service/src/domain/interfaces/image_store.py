@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+
+class IImageStore(ABC):
+    """
+    Abstract Base Class for reading the stored images of faces (thumbnails, original photos)
+    referenced by URL in the face metadata.
+    """
+
+    @abstractmethod
+    async def load_image(self, url: str) -> Optional[np.ndarray]:
+        """
+        Loads and decodes the image stored under `url`.
+
+        Args:
+            url (str): The image URL from the face metadata (e.g. 'thumbnail_url').
+
+        Returns:
+            Optional[np.ndarray]: The image as a BGR uint8 array, or None if it is not available.
+        """
+        pass
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DetectionResults = List[Dict[str, Any]]
+
+
+class _SqliteTier:
+    """On-disk tier: one SQLite table of JSON-encoded results, evicted by last access."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS detection_cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS detection_cache_accessed ON detection_cache (accessed_at)")
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM detection_cache").fetchone()[0]
+
+    def get(self, key: str, min_created_at: float) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM detection_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if created_at < min_created_at:
+                self._conn.execute("DELETE FROM detection_cache WHERE key = ?", (key,))
+                self._bytes -= len(value)
+                return None
+            self._conn.execute("UPDATE detection_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return value
+
+    def put(self, key: str, value: bytes) -> int:
+        """Stores `value` and returns how many entries were evicted to stay within max_bytes."""
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT LENGTH(value) FROM detection_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO detection_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._bytes += len(value) - (previous[0] if previous else 0)
+            return self._evict()
+
+    def _evict(self) -> int:
+        evicted = 0
+        while self._bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(value) FROM detection_cache ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                break
+            for key, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM detection_cache WHERE key = ?", (key,))
+                self._bytes -= size
+                evicted += 1
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM detection_cache").fetchone()[0]
+        return {"path": self.path, "entries": entries, "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DetectionResultCache:
+    """
+    Caches detection + embedding results keyed by a hash of the uploaded image bytes, the
+    detector/embedding model identifiers and the effective detection parameters.
+
+    Results are kept as compact JSON in an in-memory LRU (bounded by entry count and bytes) and,
+    when `disk_dir` is set, in a SQLite file that survives restarts and is shared by workers on
+    the same host. Memory misses that hit on disk are promoted back into memory. Entries older
+    than `ttl_seconds` (0 = never) are treated as misses. Hits and misses are counted per endpoint.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: Optional[int] = None,
+    ):
+        self.model_id = model_id
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("DETECTION_CACHE_MAX_ENTRIES", 10000))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("DETECTION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("DETECTION_CACHE_TTL_SECONDS", 86400))
+        disk_dir = disk_dir if disk_dir is not None else os.getenv("DETECTION_CACHE_DIR")
+        disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else int(
+            os.getenv("DETECTION_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024)
+        )
+
+        self._memory: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk: Optional[_SqliteTier] = None
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk = _SqliteTier(os.path.join(disk_dir, "detections.sqlite3"), disk_max_bytes)
+            logger.info(f"Detection result cache disk tier at {self._disk.path}")
+        self._endpoints: Dict[str, Dict[str, int]] = {}
+        self._evictions = {"memory": 0, "disk": 0}
+
+    def make_key(self, image_data: bytes, **params: Any) -> str:
+        digest = hashlib.blake2b(image_data, digest_size=20).hexdigest()
+        options = ",".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{self.model_id}|{options}|{digest}"
+
+    def get(self, key: str, endpoint: str = "default") -> Optional[DetectionResults]:
+        """Returns the cached results (possibly an empty list) or None on a miss."""
+        min_created_at = time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        value = self._memory_get(key, min_created_at)
+        tier = "memory_hits"
+        if value is None and self._disk is not None:
+            value = self._disk.get(key, min_created_at)
+            tier = "disk_hits"
+            if value is not None:
+                self._memory_put(key, value)
+        self._count(endpoint, tier if value is not None else "misses")
+        return json.loads(value) if value is not None else None
+
+    def put(self, key: str, results: DetectionResults, endpoint: str = "default"):
+        entries = []
+        for r in results:
+            entry = {"box": [int(v) for v in r["box"]], "confidence": float(r["confidence"]), "embedding": r["embedding"]}
+            if r.get("landmarks") is not None:
+                entry["landmarks"] = [[float(px), float(py)] for px, py in r["landmarks"]]
+            entries.append(entry)
+        value = json.dumps(entries, separators=(",", ":")).encode("utf-8")
+        self._memory_put(key, value)
+        if self._disk is not None:
+            evicted = self._disk.put(key, value)
+            with self._lock:
+                self._evictions["disk"] += evicted
+        self._count(endpoint, "stores")
+
+    async def get_async(self, key: str, endpoint: str = "default") -> Optional[DetectionResults]:
+        if self._disk is None:
+            return self.get(key, endpoint)
+        return await asyncio.to_thread(self.get, key, endpoint)
+
+    async def put_async(self, key: str, results: DetectionResults, endpoint: str = "default"):
+        if self._disk is None:
+            return self.put(key, results, endpoint)
+        return await asyncio.to_thread(self.put, key, results, endpoint)
+
+    def _memory_get(self, key: str, min_created_at: float) -> Optional[bytes]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if created_at < min_created_at:
+                del self._memory[key]
+                self._memory_bytes -= len(value)
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous[0])
+            self._memory[key] = (value, time.time())
+            self._memory_bytes += len(value)
+            while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self._evictions["memory"] += 1
+
+    def _count(self, endpoint: str, counter: str):
+        with self._lock:
+            counters = self._endpoints.setdefault(
+                endpoint, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+            )
+            counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {}
+            for endpoint, counters in self._endpoints.items():
+                lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+                hits = counters["memory_hits"] + counters["disk_hits"]
+                endpoints[endpoint] = {**counters, "hit_ratio": round(hits / lookups, 4) if lookups else 0.0}
+            memory = {
+                "entries": len(self._memory),
+                "bytes": self._memory_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions["memory"],
+            }
+            disk_evictions = self._evictions["disk"]
+        disk = {**self._disk.stats(), "evictions": disk_evictions} if self._disk is not None else None
+        return {
+            "model_id": self.model_id,
+            "ttl_seconds": self.ttl_seconds,
+            "memory": memory,
+            "disk": disk,
+            "endpoints": endpoints,
+        }
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,112 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.domain.interfaces.face_detector import IFaceDetector
+from src.infrastructure.metrics import Histogram, get_histogram
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class UnknownDetectorTierError(ValueError):
+    """Raised when a request asks for a detector tier that is not configured."""
+
+
+def parse_detector_tiers(spec: str) -> Dict[str, Tuple[str, Optional[int]]]:
+    """
+    Parses FACE_DETECTOR_TIERS, e.g. "fast=retinaface:320,balanced=retinaface:640,legacy=dlib",
+    into {tier: (backend, det_size)}. det_size is optional and only meaningful for retinaface.
+    """
+    tiers: Dict[str, Tuple[str, Optional[int]]] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, target = item.partition("=")
+        if not sep or not name.strip() or not target.strip():
+            raise ValueError(f"Invalid detector tier '{item}'. Expected '<tier>=<backend>[:<det_size>]'.")
+        backend, _, size = target.strip().partition(":")
+        tiers[name.strip()] = (backend.strip().lower(), int(size) if size else None)
+    if not tiers:
+        raise ValueError("FACE_DETECTOR_TIERS does not define any tier.")
+    return tiers
+
+
+class DetectorPool(IFaceDetector):
+    """
+    Several face detectors loaded side by side, selected per call by a named tier.
+
+    A tier maps to a backend (one loaded model, e.g. "dlib" or "retinaface") plus per-call options
+    such as the RetinaFace input size, so "fast" and "accurate" tiers can share one model. Only the
+    backends referenced by a tier are built. Detection latency is recorded per tier.
+    """
+
+    def __init__(
+        self,
+        backend_factories: Dict[str, Callable[[], IFaceDetector]],
+        tiers: Dict[str, Tuple[str, Optional[int]]],
+        default_tier: Optional[str] = None,
+    ):
+        unknown = {backend for backend, _ in tiers.values()} - set(backend_factories)
+        if unknown:
+            raise ValueError(f"Unknown detector backend(s): {sorted(unknown)}. Expected one of {sorted(backend_factories)}.")
+        for tier, (backend, det_size) in tiers.items():
+            if det_size is not None and backend != "retinaface":
+                raise ValueError(f"Detector tier '{tier}': an input size is only supported by retinaface.")
+        self.tiers = dict(tiers)
+        self.default_tier = default_tier or next(iter(self.tiers))
+        if self.default_tier not in self.tiers:
+            raise ValueError(f"Default detector tier '{self.default_tier}' is not one of {sorted(self.tiers)}.")
+
+        self.backends: Dict[str, IFaceDetector] = {}
+        for backend in dict.fromkeys(backend for backend, _ in self.tiers.values()):
+            start = time.perf_counter()
+            self.backends[backend] = backend_factories[backend]()
+            logger.info(f"Loaded face detector backend '{backend}' in {time.perf_counter() - start:.3f}s.")
+        self._latency: Dict[str, Histogram] = {
+            tier: get_histogram(
+                "face_detector_latency_seconds",
+                _LATENCY_BUCKETS,
+                labels={"tier": tier},
+                documentation="Face detection latency per detector tier.",
+            )
+            for tier in self.tiers
+        }
+
+    def resolve_tier(self, tier: Optional[str] = None) -> str:
+        tier = tier or self.default_tier
+        if tier not in self.tiers:
+            raise UnknownDetectorTierError(f"Unknown detector tier '{tier}'. Available tiers: {sorted(self.tiers)}.")
+        return tier
+
+    def detect_faces(
+        self, image: np.ndarray, upsample: Optional[int] = None, tier: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        tier = self.resolve_tier(tier)
+        backend, det_size = self.tiers[tier]
+        options: Dict[str, Any] = {"upsample": upsample}
+        if det_size is not None:
+            options["det_size"] = det_size
+        start = time.perf_counter()
+        try:
+            return self.backends[backend].detect_faces(image, **options)
+        finally:
+            self._latency[tier].observe(time.perf_counter() - start)
+
+    def upsample_improves_recall(self, tier: Optional[str] = None) -> bool:
+        backend, _ = self.tiers[self.resolve_tier(tier)]
+        return self.backends[backend].upsample_improves_recall()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default_tier": self.default_tier,
+            "tiers": {
+                tier: {"backend": backend, "det_size": det_size, "latency_seconds": self._latency[tier].snapshot()}
+                for tier, (backend, det_size) in self.tiers.items()
+            },
+        }
@@ -1,36 +1,66 @@
+import logging
+import os
 import numpy as np
-from typing import List, Dict, Any
-from insightface.app import FaceAnalysis
+from typing import List, Dict, Any, Optional
+from insightface import model_zoo
+from insightface.utils import ensure_available
 
 from src.domain.interfaces.face_detector import IFaceDetector
 
+logger = logging.getLogger(__name__)
+
+# Model phát hiện (SCRFD/RetinaFace) trong gói buffalo_l của insightface
+DEFAULT_DETECTION_MODEL = "det_10g.onnx"
+
+
+def _default_model_path() -> str:
+    # Tải gói buffalo_l nếu chưa có (giống FaceAnalysis) nhưng chỉ trả về file model phát hiện
+    model_dir = ensure_available("models", "buffalo_l", root="~/.insightface")
+    return os.path.join(model_dir, DEFAULT_DETECTION_MODEL)
+
+
 class RetinaFaceDetector(IFaceDetector):
-    def __init__(self):
-        # Khởi tạo FaceAnalysis với det_name='retinaface_mnet025' cho RetinaFace MobileNetV2
-        # và providers=['CPUExecutionProvider'] để đảm bảo chạy trên CPU
-        self.app = FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])
-        self.app.prepare(ctx_id=0, det_size=(640, 640)) # ctx_id=0 cho CPU
-
-    def detect_faces(self, image: np.ndarray) -> List[Dict[str, Any]]:
-        # Insightface FaceAnalysis mong đợi input là BGR
-        # OpenCV mặc định đọc ảnh là BGR, nhưng nếu ảnh được load bằng PIL thì có thể là RGB
-        # Để đảm bảo, nếu ảnh là RGB, cần chuyển đổi sang BGR
-        # Hiện tại, giả định input image đã là BGR hoặc không cần chuyển đổi
-        
-        faces = self.app.get(image)
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        det_size: Optional[int] = None,
+        det_thresh: Optional[float] = None,
+    ):
+        # Chỉ tải model phát hiện ONNX; FaceAnalysis(buffalo_l) tải thêm cả model nhận dạng,
+        # landmark, giới tính/tuổi mà detector không dùng tới.
+        self.model_path = model_path or os.getenv("RETINAFACE_MODEL_PATH") or _default_model_path()
+        self.det_size = int(det_size or os.getenv("RETINAFACE_DET_SIZE", 640))
+        self.det_thresh = float(det_thresh if det_thresh is not None else os.getenv("RETINAFACE_DET_THRESH", 0.5))
+        self.model = model_zoo.get_model(self.model_path, providers=['CPUExecutionProvider'])
+        if self.model is None:
+            raise ValueError(f"{self.model_path} is not a recognised face detection model.")
+        self.model.prepare(ctx_id=0, input_size=(self.det_size, self.det_size), det_thresh=self.det_thresh)
+
+    def detect_faces(
+        self, image: np.ndarray, upsample: Optional[int] = None, det_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        # Input là mảng BGR (image_io.decode_image), đúng định dạng insightface mong đợi
+
+        # upsample bị bỏ qua: insightface luôn resize ảnh về input det_size, nên phóng to trước chỉ tốn thêm
+        # một lần resize toàn ảnh mà không tìm thêm được mặt. Dùng tier có det_size lớn hơn để tìm mặt nhỏ.
+        if upsample:
+            logger.debug("RetinaFaceDetector ignores upsample=%d; use a tier with a larger det_size instead.", upsample)
+
+        # det_size: kích thước input của mạng cho request này (nhỏ = nhanh, lớn = tìm được mặt nhỏ)
+        size = det_size or self.det_size
+        bboxes, kpss = self.model.detect(image, input_size=(size, size))
         detected_faces = []
-        for face in faces:
-            # Bounding box từ insightface là [x1, y1, x2, y2]
-            # Cần chuyển đổi sang [x, y, w, h]
-            bbox = face.bbox.astype(int)
-            x, y, x2, y2 = bbox
+        for i, det in enumerate(bboxes):
+            # Bounding box là [x1, y1, x2, y2, score]; chuyển sang [x, y, w, h]
+            x, y, x2, y2 = det[:4].astype(int)
             w, h = x2 - x, y2 - y
-            
-            # Confidence score
-            det_score = face.det_score
-            
-            detected_faces.append({
+
+            face = {
                 'box': [x, y, w, h],
-                'confidence': float(det_score)
-            })
+                'confidence': float(det[4])
+            }
+            # 5 landmark (mắt trái, mắt phải, mũi, 2 khóe miệng) theo tọa độ ảnh gốc, dùng để căn chỉnh khi embedding
+            if kpss is not None:
+                face['landmarks'] = kpss[i].tolist()
+            detected_faces.append(face)
         return detected_faces
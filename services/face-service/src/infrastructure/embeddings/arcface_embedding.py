@@ -1,65 +1,118 @@
 import os
+import logging
 import numpy as np
-from typing import List
-from PIL import Image as PILImage
+from typing import List, Optional
 import cv2
-import onnxruntime
 
-from src.domain.interfaces.face_embedding import IFaceEmbedding
+from src.domain.interfaces.face_embedding import IFaceEmbedding, FaceImage, AlignedFace
+from src.infrastructure.embeddings.onnx_session import create_inference_session, quantized_model_path
+from src.infrastructure.embeddings.face_alignment import warp_aligned_face
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 class ArcFaceEmbedding(IFaceEmbedding):
-    def __init__(self):
+    supports_alignment = True
+
+    def __init__(
+        self,
+        max_batch_size: Optional[int] = None,
+        model_variant: Optional[str] = None,
+        model_path: Optional[str] = None,
+    ):
         # Tải mô hình nhận dạng trực tiếp từ file .onnx
-        model_path = os.path.join('app', 'models', 'onnx_models', 'w600k_r50.onnx')
+        model_path = model_path or os.path.join('app', 'models', 'onnx_models', 'w600k_r50.onnx')
 
-        self.rec_session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        # "int8": bản lượng tử hóa động (w600k_r50.int8.onnx, tạo bằng benchmarks/arcface_quantization.py)
+        self.model_variant = (model_variant or os.getenv("ARCFACE_MODEL_VARIANT", "fp32")).lower()
+        if self.model_variant == "int8":
+            int8_path = quantized_model_path(model_path)
+            if os.path.exists(int8_path):
+                model_path = int8_path
+            else:
+                logger.warning(f"ARCFACE_MODEL_VARIANT=int8 but {int8_path} does not exist; falling back to {model_path}")
+                self.model_variant = "fp32"
+        elif self.model_variant != "fp32":
+            raise ValueError(f"Invalid ARCFACE_MODEL_VARIANT: {self.model_variant}. Expected 'fp32' or 'int8'.")
+        self.model_path = model_path
+
+        # Số luồng, mức tối ưu đồ thị, chế độ thực thi... cấu hình qua biến môi trường ARCFACE_ONNX_*
+        self.rec_session = create_inference_session(model_path, "ARCFACE_ONNX", providers=['CPUExecutionProvider'])
         # Lấy tên input và output của mô hình
         self.input_name = self.rec_session.get_inputs()[0].name
-        self.output_name = self.rec_session.get_outputs()[0].name 
+        self.output_name = self.rec_session.get_outputs()[0].name
+        # Số khuôn mặt tối đa trong một lần suy luận (giới hạn bộ nhớ cho ảnh đông người)
+        self.max_batch_size = max(1, int(max_batch_size or os.getenv("ARCFACE_MAX_BATCH_SIZE", 32)))
 
     def _preprocess(self, face_bgr: np.ndarray) -> np.ndarray:
         """
         Chuẩn hóa ảnh face cho ArcFace MobileFaceNet.
         Output shape: (1, 3, 112, 112)
         """
-        face = cv2.resize(face_bgr, (112, 112))
+        # Khuôn mặt đã căn chỉnh (warp từ landmark) có sẵn kích thước 112x112, không cần resize
+        face = face_bgr if face_bgr.shape[:2] == (112, 112) else cv2.resize(face_bgr, (112, 112))
         face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
         face = face.astype(np.float32)
         face = (face - 127.5) / 128.0
         face = np.transpose(face, (2, 0, 1))  # HWC → CHW
         face = np.expand_dims(face, axis=0)
-        return face 
+        return face
+
+    def _to_bgr(self, face_image: FaceImage) -> np.ndarray:
+        # Một lần warp tương tự (similarity) từ ảnh gốc thẳng ra ảnh 112x112 đã căn chỉnh
+        if isinstance(face_image, AlignedFace):
+            return warp_aligned_face(face_image.image, face_image.landmarks, 112)
 
+        # Mảng NumPy đã là BGR (view cắt từ ảnh gốc): dùng trực tiếp, không sao chép
+        if isinstance(face_image, np.ndarray):
+            return face_image
 
-    def get_embedding(self, face_image: PILImage) -> List[float]:
         # Chuyển đổi PIL Image (RGB) sang mảng NumPy
         img_np = np.array(face_image)
 
         # Các mô hình của Insightface thường mong đợi định dạng ảnh BGR.
         # Chuyển đổi RGB (từ PIL) sang BGR (cho insightface).
         if img_np.ndim == 3 and img_np.shape[2] == 3:
-            img_np_bgr = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+            return cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
         elif img_np.ndim == 2:
-            img_np_bgr = cv2.cvtColor(img_np, cv2.COLOR_GRAY2BGR)
+            return cv2.cvtColor(img_np, cv2.COLOR_GRAY2BGR)
         elif img_np.shape[2] == 4:
-            img_np_bgr = cv2.cvtColor(img_np, cv2.COLOR_RGBA2BGR)
-        else:
-            img_np_bgr = img_np
+            return cv2.cvtColor(img_np, cv2.COLOR_RGBA2BGR)
+        return img_np
 
+    def get_embedding(self, face_image: FaceImage) -> List[float]:
         # Tiền xử lý ảnh theo yêu cầu của model
-        preprocessed_face = self._preprocess(img_np_bgr)
-
+        preprocessed_face = self._preprocess(self._to_bgr(face_image))
 
         # Thực hiện suy luận bằng ONNX Runtime Session
         # Input name và output name đã được lấy từ __init__
         embedding_array = self.rec_session.run([self.output_name], {self.input_name: preprocessed_face})[0]
-        
+
         # Flatten the array if it's 2D (e.g., (1, D)) to ensure .tolist() returns List[float]
         if embedding_array.ndim == 2 and embedding_array.shape[0] == 1:
             embedding_array = embedding_array[0] # Take the first (and only) row
-        
+
         if embedding_array.size == 0:
             return []
-        
+
         return embedding_array.tolist()
-        
\ No newline at end of file
+
+    def get_embeddings(self, face_images: List[FaceImage]) -> List[List[float]]:
+        """
+        Tạo embedding cho nhiều khuôn mặt: các crop được ghép thành tensor (N, 3, 112, 112)
+        và chạy một lần suy luận ONNX cho mỗi lô tối đa `max_batch_size` khuôn mặt.
+        """
+        if not face_images:
+            return []
+
+        preprocessed = [self._preprocess(self._to_bgr(face_image)) for face_image in face_images]
+
+        embeddings: List[List[float]] = []
+        for start in range(0, len(preprocessed), self.max_batch_size):
+            batch = np.concatenate(preprocessed[start:start + self.max_batch_size], axis=0)
+            embedding_array = self.rec_session.run([self.output_name], {self.input_name: batch})[0]
+            if embedding_array.size == 0:
+                embeddings.extend([] for _ in range(batch.shape[0]))
+                continue
+            embeddings.extend(embedding_array.reshape(batch.shape[0], -1).tolist())
+        return embeddings
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+
+# Vị trí chuẩn của 5 landmark (mắt trái, mắt phải, mũi, khóe miệng trái, khóe miệng phải)
+# trên ảnh 112x112 mà các model ArcFace của insightface được huấn luyện.
+ARCFACE_TEMPLATE = np.array(
+    [
+        [38.2946, 51.6963],
+        [73.5318, 51.5014],
+        [56.0252, 71.7366],
+        [41.5493, 92.3655],
+        [70.7299, 92.2041],
+    ],
+    dtype=np.float32,
+)
+
+
+def estimate_similarity_transform(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """
+    Least-squares similarity transform (rotation, uniform scale, translation) mapping `src`
+    points onto `dst` points (Umeyama, 1991). Returns a 2x3 matrix for cv2.warpAffine.
+    """
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    src_mean, dst_mean = src.mean(axis=0), dst.mean(axis=0)
+    src_centered, dst_centered = src - src_mean, dst - dst_mean
+
+    covariance = dst_centered.T @ src_centered / len(src)
+    u, singular_values, vt = np.linalg.svd(covariance)
+    reflection = np.eye(2)
+    if np.linalg.det(u) * np.linalg.det(vt) < 0:
+        reflection[1, 1] = -1
+    rotation = u @ reflection @ vt
+    scale = np.trace(np.diag(singular_values) @ reflection) / src_centered.var(axis=0).sum()
+
+    matrix = np.empty((2, 3), dtype=np.float64)
+    matrix[:, :2] = scale * rotation
+    matrix[:, 2] = dst_mean - matrix[:, :2] @ src_mean
+    return matrix
+
+
+def warp_aligned_face(image: np.ndarray, landmarks: np.ndarray, size: int = 112) -> np.ndarray:
+    """Warps the face described by `landmarks` from the full `image` into an aligned size x size crop."""
+    template = ARCFACE_TEMPLATE * (size / 112.0)
+    matrix = estimate_similarity_transform(landmarks, template)
+    return cv2.warpAffine(image, matrix, (size, size), flags=cv2.INTER_LINEAR, borderValue=0.0)
@@ -1,22 +1,15 @@
 import dlib
 import cv2
 import numpy as np
-from PIL import Image
 from typing import List
 import logging
 
-from src.domain.interfaces.face_embedding import IFaceEmbedding
+from src.domain.interfaces.face_embedding import IFaceEmbedding, FaceImage
 
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 
 class FaceNetEmbeddingService(IFaceEmbedding):
@@ -34,13 +27,14 @@ class FaceNetEmbeddingService(IFaceEmbedding):
             logger.error(f"Error initializing Dlib face embedding models: {e}")
             raise
 
-    def get_embedding(self, face_image: Image.Image) -> List[float]:
+    def get_embedding(self, face_image: FaceImage) -> List[float]:
         """
-        Generates a 128-dimensional face embedding (Non-normalized) for a given face image
+        Generates a 128-dimensional, L2-normalized face embedding for a given face image
         using Dlib.
 
         Args:
-            face_image (Image.Image): A PIL Image object of the cropped face.
+            face_image (FaceImage): The cropped face as a BGR NumPy array (the pipeline's format);
+                                    a PIL Image is still accepted and converted.
 
         Returns:
             List[float]: A list of 128 floats
@@ -48,8 +42,12 @@ class FaceNetEmbeddingService(IFaceEmbedding):
             embedding.
         """
         try:
-            # Convert PIL Image to NumPy array (RGB)
-            image_np = np.array(face_image.convert('RGB'))
+            if isinstance(face_image, np.ndarray):
+                # BGR crop (possibly a non-contiguous view): dlib needs a contiguous RGB array
+                image_np = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
+            else:
+                # Convert PIL Image to NumPy array (RGB)
+                image_np = np.array(face_image.convert('RGB'))
 
             # Dlib's face detector works on grayscale images
             gray_image = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+
+from src.application.services.instrumentation import record_value
+from src.domain.interfaces.face_embedding import IFaceEmbedding, FaceImage
+from src.infrastructure.inference_executor import InferenceQueueFullError
+from src.infrastructure.metrics import Histogram
+
+if TYPE_CHECKING:
+    from src.infrastructure.inference_executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingMicroBatcher:
+    """
+    Collects face crops from concurrent callers and embeds them together.
+
+    Each call to `embed` enqueues its crops and awaits one future per crop. A single worker task
+    drains the queue once `max_batch_size` crops are waiting or `max_wait_ms` has elapsed since
+    the first crop arrived, runs one `get_embeddings` pass on a worker thread and resolves every
+    caller's futures.
+
+    With an `inference_executor`, every batch goes through its admission control like direct
+    inference calls: a batch rejected because the executor is saturated fails its callers with
+    InferenceQueueFullError (503 + Retry-After), as does an embed call that would grow the
+    batcher's own queue beyond `max_pending`.
+    """
+
+    def __init__(
+        self,
+        embedding_service: IFaceEmbedding,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        executor: Optional[Executor] = None,
+        max_pending: Optional[int] = None,
+        inference_executor: Optional["InferenceExecutor"] = None,
+    ):
+        self.embedding_service = embedding_service
+        self.max_batch_size = max(1, int(max_batch_size or os.getenv("EMBEDDING_BATCH_MAX_SIZE", 32)))
+        self.max_wait = float(
+            max_wait_ms if max_wait_ms is not None else os.getenv("EMBEDDING_BATCH_WINDOW_MS", 5)
+        ) / 1000.0
+        # Giới hạn số crop chờ trong hàng đợi; vượt quá thì từ chối ngay (backpressure)
+        self.max_pending = max(1, int(max_pending or os.getenv("EMBEDDING_BATCH_MAX_PENDING", 1024)))
+        self.inference_executor = inference_executor
+        self.retry_after = (
+            inference_executor.retry_after if inference_executor is not None
+            else int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", 1))
+        )
+        # Không có executor suy luận chung: một thread riêng giữ cho các lần suy luận được tuần tự hóa.
+        # Với executor chung, worker chỉ chạy một lô tại một thời điểm nên thứ tự vẫn được giữ.
+        self._executor = None
+        if inference_executor is None:
+            self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-batcher")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.queue_depth = Histogram("embedding_batcher_queue_depth", _SIZE_BUCKETS)
+        self.batch_size = Histogram("embedding_batcher_batch_size", _SIZE_BUCKETS)
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._batch_full = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, face_images: List[FaceImage]) -> List[List[float]]:
+        """Embeds `face_images`, sharing the model pass with any concurrent callers."""
+        if not face_images:
+            return []
+        self._ensure_worker()
+        if self._queue.qsize() + len(face_images) > self.max_pending:
+            raise InferenceQueueFullError(
+                f"Embedding queue is full ({self._queue.qsize()} crops pending).", retry_after=self.retry_after
+            )
+        loop = asyncio.get_running_loop()
+        futures = []
+        for face_image in face_images:
+            future = loop.create_future()
+            self._queue.put_nowait((face_image, future))
+            futures.append(future)
+        depth = self._queue.qsize()
+        self.queue_depth.observe(depth)
+        if depth >= self.max_batch_size:
+            self._batch_full.set()
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self):
+        batch: List[Tuple[FaceImage, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                if self._queue.qsize() + 1 < self.max_batch_size and self.max_wait > 0:
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), timeout=self.max_wait)
+                    except asyncio.TimeoutError:
+                        pass
+                self._batch_full.clear()
+
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                batch = [(image, future) for image, future in batch if not future.done()]
+                if not batch:
+                    continue
+
+                self.batch_size.observe(len(batch))
+                record_value("embedding_inference_batch_size", len(batch))
+                try:
+                    embeddings = await self._run_batch([image for image, _ in batch])
+                    if len(embeddings) != len(batch):
+                        raise RuntimeError(f"Expected {len(batch)} embeddings, got {len(embeddings)}.")
+                except InferenceQueueFullError as e:
+                    logger.warning("Micro-batch of %d faces rejected: %s", len(batch), e)
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                except Exception as e:
+                    logger.error(f"Micro-batch embedding of {len(batch)} faces failed: {e}", exc_info=True)
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future), embedding in zip(batch, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+        except asyncio.CancelledError:
+            # Không để caller nào chờ mãi khi worker bị dừng.
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+
+    async def _run_batch(self, face_images: List[FaceImage]) -> List[List[float]]:
+        if self.inference_executor is not None:
+            return await self.inference_executor.run(self.embedding_service.get_embeddings, face_images)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.embedding_service.get_embeddings, face_images
+        )
+
+    async def stop(self):
+        """Cancels the worker task; pending callers receive CancelledError."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "queue_depth": self.queue_depth.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
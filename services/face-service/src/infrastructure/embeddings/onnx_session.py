@@ -0,0 +1,87 @@
+import logging
+import os
+from typing import List, Optional
+
+import onnxruntime
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def quantized_model_path(model_path: str) -> str:
+    """Path of the INT8 dynamically quantized variant stored next to `model_path` (x.onnx -> x.int8.onnx)."""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.int8{ext}"
+
+
+def build_session_options(env_prefix: str, model_path: Optional[str] = None) -> onnxruntime.SessionOptions:
+    """
+    Builds SessionOptions from `<env_prefix>_*` environment variables:
+
+    - INTRA_OP_THREADS / INTER_OP_THREADS: thread pool sizes (0 = onnxruntime default, all cores).
+    - GRAPH_OPTIMIZATION: disable | basic | extended | all (default all).
+    - EXECUTION_MODE: sequential | parallel (default sequential; parallel only helps branchy graphs).
+    - ENABLE_MEM_ARENA: true | false (default true; false lowers idle RSS at some latency cost).
+    - OPTIMIZED_MODEL_DIR: if set, the optimized graph of `model_path` is serialized there on first
+      load so later processes can skip graph optimization (see `resolve_optimized_model`).
+    """
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = int(os.getenv(f"{env_prefix}_INTRA_OP_THREADS", 0))
+    options.inter_op_num_threads = int(os.getenv(f"{env_prefix}_INTER_OP_THREADS", 0))
+
+    level = os.getenv(f"{env_prefix}_GRAPH_OPTIMIZATION", "all").lower()
+    if level not in _GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Invalid {env_prefix}_GRAPH_OPTIMIZATION: {level}. Expected one of {sorted(_GRAPH_OPTIMIZATION_LEVELS)}.")
+    options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS[level]
+
+    mode = os.getenv(f"{env_prefix}_EXECUTION_MODE", "sequential").lower()
+    if mode not in _EXECUTION_MODES:
+        raise ValueError(f"Invalid {env_prefix}_EXECUTION_MODE: {mode}. Expected one of {sorted(_EXECUTION_MODES)}.")
+    options.execution_mode = _EXECUTION_MODES[mode]
+
+    options.enable_cpu_mem_arena = os.getenv(f"{env_prefix}_ENABLE_MEM_ARENA", "true").lower() == "true"
+
+    optimized_dir = os.getenv(f"{env_prefix}_OPTIMIZED_MODEL_DIR")
+    if optimized_dir and model_path:
+        os.makedirs(optimized_dir, exist_ok=True)
+        options.optimized_model_filepath = optimized_model_path(optimized_dir, model_path, level)
+    return options
+
+
+def optimized_model_path(optimized_dir: str, model_path: str, level: str) -> str:
+    root, ext = os.path.splitext(os.path.basename(model_path))
+    return os.path.join(optimized_dir, f"{root}.{level}.opt{ext}")
+
+
+def create_inference_session(
+    model_path: str, env_prefix: str, providers: Optional[List[str]] = None
+) -> onnxruntime.InferenceSession:
+    """
+    Creates an InferenceSession for `model_path` with options from `build_session_options`.
+
+    When an optimized copy already exists in OPTIMIZED_MODEL_DIR (and is newer than the source
+    model) it is loaded instead, with graph optimization turned off since it was already applied.
+    """
+    providers = providers or ["CPUExecutionProvider"]
+    options = build_session_options(env_prefix, model_path)
+    optimized_path = options.optimized_model_filepath
+    if optimized_path and os.path.exists(optimized_path) and (
+        not os.path.exists(model_path) or os.path.getmtime(optimized_path) >= os.path.getmtime(model_path)
+    ):
+        options.optimized_model_filepath = ""
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        logger.info(f"Loading pre-optimized ONNX model {optimized_path}")
+        return onnxruntime.InferenceSession(optimized_path, sess_options=options, providers=providers)
+    return onnxruntime.InferenceSession(model_path, sess_options=options, providers=providers)
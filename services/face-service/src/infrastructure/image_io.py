@@ -0,0 +1,78 @@
+import io
+import logging
+from typing import Union
+
+import cv2
+import numpy as np
+from PIL import Image
+from PIL.Image import Image as PILImage
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Giữ nguyên hướng ảnh như khi decode bằng PIL trước đây (không xoay theo EXIF), để tọa độ
+# bounding box trả về không thay đổi đối với client.
+_IMDECODE_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+
+
+class ImageDecodeError(ValueError):
+    """Raised when uploaded bytes cannot be decoded as an image."""
+
+
+def decode_image(data: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+    """
+    Decodes an encoded image (JPEG, PNG, ...) straight into a BGR uint8 array of shape (H, W, 3).
+
+    The upload buffer is wrapped with np.frombuffer (no copy) and decoded once by cv2.imdecode;
+    the result is the canonical image that detectors, crops and thumbnails all share. Formats
+    OpenCV cannot read fall back to PIL.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, _IMDECODE_FLAGS) if buffer.size else None
+    if image is not None:
+        return image
+    try:
+        with Image.open(io.BytesIO(data)) as pil_image:
+            return to_bgr_array(pil_image)
+    except Exception as e:
+        raise ImageDecodeError(f"Invalid image data: {e}") from e
+
+
+def to_bgr_array(image: Union[PILImage, np.ndarray]) -> np.ndarray:
+    """Returns `image` as a BGR uint8 array; NumPy arrays are assumed to be BGR already."""
+    if isinstance(image, np.ndarray):
+        return image
+    return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encodes a BGR array (or a view of one) as PNG."""
+    return encode_image(image, "png")
+
+
+# Định dạng ảnh đầu ra được hỗ trợ: phần mở rộng cho cv2.imencode và media type tương ứng
+IMAGE_FORMATS = {
+    "png": (".png", "image/png"),
+    "jpeg": (".jpg", "image/jpeg"),
+    "webp": (".webp", "image/webp"),
+}
+
+
+def encode_image(image: np.ndarray, image_format: str = "png", quality: int = 85) -> bytes:
+    """
+    Encodes a BGR array (or a view of one) as PNG, JPEG or WebP.
+
+    `quality` (1-100) applies to JPEG and WebP; PNG is lossless and ignores it.
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format '{image_format}'. Expected one of {sorted(IMAGE_FORMATS)}.")
+    extension, _ = IMAGE_FORMATS[image_format]
+    params = []
+    if image_format == "jpeg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    elif image_format == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    ok, encoded = cv2.imencode(extension, image, params)
+    if not ok:
+        raise ValueError(f"Failed to encode image as {image_format.upper()}.")
+    return encoded.tobytes()
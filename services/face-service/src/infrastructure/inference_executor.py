@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.domain.interfaces.face_detector import IFaceDetector
+from src.domain.interfaces.face_embedding import IFaceEmbedding, FaceImage
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class InferenceQueueFullError(RuntimeError):
+    """Raised when an inference job is rejected because the executor queue is full."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound detection/embedding work off the event loop with bounded admission.
+
+    At most `max_workers` jobs run concurrently and at most `max_queue` more may wait; further
+    submissions fail fast with InferenceQueueFullError so the API can answer 503 instead of
+    piling up latency.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        retry_after: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.max_workers = max(1, int(max_workers or os.getenv("INFERENCE_MAX_WORKERS", os.cpu_count() or 1)))
+        self.max_queue = max(0, int(max_queue if max_queue is not None else os.getenv("INFERENCE_MAX_QUEUE", 32)))
+        self.retry_after = int(retry_after or os.getenv("INFERENCE_RETRY_AFTER_SECONDS", 1))
+        self._executor = executor or ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _acquire(self):
+        with self._lock:
+            if self._inflight >= self.max_workers + self.max_queue:
+                raise InferenceQueueFullError(
+                    f"Inference queue is full ({self._inflight} jobs in flight).", retry_after=self.retry_after
+                )
+            self._inflight += 1
+
+    def _release(self):
+        with self._lock:
+            self._inflight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Runs `fn(*args)` on the executor, rejecting the call if the queue is full."""
+        self._acquire()
+        try:
+            # Chạy trong bản sao context của caller để số đo theo từng request (Server-Timing) vẫn được ghi nhận
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Trả slot khi job thực sự xong (hoặc bị hủy khi còn chờ), không phải khi caller thôi chờ: request bị hủy
+        # (client ngắt kết nối, timeout) vẫn chiếm slot đến khi worker chạy xong model.
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_workers": self.max_workers, "max_queue": self.max_queue, "inflight": self._inflight}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Process pool for GIL-bound (dlib) components ---
+
+_worker_components: Dict[str, Any] = {}
+
+
+def _init_component_worker(factories: Dict[str, Callable[[], Any]]):
+    # Chạy một lần trong mỗi process con: tải model riêng cho process đó.
+    for name, factory in factories.items():
+        _worker_components[name] = factory()
+
+
+def _call_component(name: str, method: str, *args: Any) -> Any:
+    return getattr(_worker_components[name], method)(*args)
+
+
+def _ping_component_worker() -> int:
+    return os.getpid()
+
+
+def create_component_process_pool(factories: Dict[str, Callable[[], Any]], processes: int) -> ProcessPoolExecutor:
+    """
+    Creates a process pool whose workers each build the components produced by `factories`.
+
+    Factories must be module-level functions so they can be pickled to the worker processes.
+    The `spawn` start method is used because forking a process that already runs ONNX Runtime
+    and uvicorn threads is unsafe.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_component_worker,
+        initargs=(factories,),
+    )
+
+
+def warm_up_process_pool(pool: ProcessPoolExecutor, processes: int):
+    """Forces the worker processes to start (and load their models) before traffic arrives."""
+    pids = {future.result() for future in [pool.submit(_ping_component_worker) for _ in range(processes)]}
+    logger.info(f"Component process pool ready with {len(pids)} worker process(es).")
+
+
+class ProcessPoolComponent:
+    """
+    Proxy that forwards method calls to a component living in the worker processes of a pool.
+
+    Calls block the calling thread (normally an InferenceExecutor thread) until the worker
+    process returns, so the GIL of the API process stays free while dlib runs.
+    """
+
+    def __init__(self, name: str, pool: Executor):
+        self._name = name
+        self._pool = pool
+
+    def _call(self, method: str, *args: Any) -> Any:
+        return self._pool.submit(_call_component, self._name, method, *args).result()
+
+
+class ProcessPoolFaceDetector(ProcessPoolComponent, IFaceDetector):
+    def __init__(self, name: str, pool: Executor):
+        super().__init__(name, pool)
+        self._upsample_improves_recall: Optional[bool] = None
+
+    def detect_faces(self, image: np.ndarray, upsample: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self._call("detect_faces", image, upsample)
+
+    def upsample_improves_recall(self) -> bool:
+        # Hỏi detector trong worker một lần rồi nhớ kết quả, tránh một lượt gọi sang process mỗi request
+        if self._upsample_improves_recall is None:
+            self._upsample_improves_recall = self._call("upsample_improves_recall")
+        return self._upsample_improves_recall
+
+
+class ProcessPoolFaceEmbedding(ProcessPoolComponent, IFaceEmbedding):
+    def get_embedding(self, face_image: FaceImage) -> List[float]:
+        return self._call("get_embedding", face_image)
+
+    def get_embeddings(self, face_images: List[FaceImage]) -> List[List[float]]:
+        return self._call("get_embeddings", face_images)
@@ -0,0 +1,154 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Logger của các đường xử lý theo từng request/message (detect, search, upsert, consumer).
+HOT_PATH_LOGGERS = (
+    "src.presentation.api.v1.endpoints.face_endpoints",
+    "src.application.services.face_manager",
+    "src.infrastructure.persistence.qdrant_client",
+    "src.infrastructure.persistence.family_vector_cache",
+    "src.infrastructure.message_bus.consumer_impl",
+    "src.infrastructure.detectors.dlib_detector",
+    "src.infrastructure.embeddings.facenet_embedding",
+)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `per_second` records per message template through (token bucket with a burst of
+    `per_second`); WARNING and above always pass. The next record that passes after some were
+    dropped carries `record.suppressed` with the number of dropped records.
+
+    Works because hot-path log calls use lazy %-style arguments, so `record.msg` is the template
+    and the arguments of dropped records are never formatted. At most `max_templates` buckets are
+    kept; the least recently used one is dropped first, so a stray f-string log (one template per
+    value) cannot grow the filter without bound.
+    """
+
+    def __init__(self, per_second: float, max_templates: int = 1024):
+        super().__init__()
+        self.per_second = float(per_second)
+        self.max_templates = max(1, int(max_templates))
+        # template -> [tokens, last refill, suppressed], theo thứ tự dùng gần nhất
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.per_second <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.per_second, now, 0]
+                if len(self._buckets) > self.max_templates:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(self.per_second, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1
+            if bucket[2]:
+                record.suppressed = int(bucket[2])
+                bucket[2] = 0
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """The service's plain-text format, plus a note when similar records were rate-limited."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} similar suppressed)" if suppressed else text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers that index fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(
+    log_format: Optional[str] = None,
+    async_handler: Optional[bool] = None,
+    hot_path_rate_limit: Optional[float] = None,
+    full_dumps: Optional[bool] = None,
+    hot_path_loggers: Sequence[str] = HOT_PATH_LOGGERS,
+) -> Optional[logging.handlers.QueueListener]:
+    """
+    Configures the root logger and the hot-path loggers.
+
+    - LOG_FORMAT: "text" (default) or "json".
+    - LOG_ASYNC (default true): records are handed to a QueueHandler and written to stderr by a
+      QueueListener thread, so request handlers never block on log I/O.
+    - LOG_HOT_PATH_RATE_LIMIT (default 5): max INFO/DEBUG records per second per message template on
+      the hot-path loggers; 0 disables the limit.
+    - LOG_FULL_DUMPS (default false): debugging switch that enables DEBUG on the hot-path loggers
+      (full detection/search result dumps) and disables the rate limit.
+
+    Returns the started QueueListener (stopped automatically at exit), or None if logging was
+    already configured or LOG_ASYNC is off.
+    """
+    log_format = (log_format or os.getenv("LOG_FORMAT", "text")).lower()
+    async_handler = async_handler if async_handler is not None else os.getenv("LOG_ASYNC", "true").lower() == "true"
+    hot_path_rate_limit = float(
+        hot_path_rate_limit if hot_path_rate_limit is not None else os.getenv("LOG_HOT_PATH_RATE_LIMIT", 5)
+    )
+    full_dumps = full_dumps if full_dumps is not None else os.getenv("LOG_FULL_DUMPS", "false").lower() == "true"
+
+    formatter = JsonFormatter() if log_format == "json" else TextFormatter(LOG_FORMAT)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    listener = None
+    root_handler: logging.Handler = stream_handler
+    if async_handler:
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        root_handler = logging.handlers.QueueHandler(log_queue)
+        listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    logging.basicConfig(level=logging.INFO, handlers=[root_handler])
+    if root_handler not in logging.getLogger().handlers:
+        # Logging đã được cấu hình ở nơi khác (ví dụ test runner): giữ nguyên handler hiện có
+        listener = None
+    elif listener is not None:
+        listener.start()
+        # Ghi nốt các bản ghi còn trong hàng đợi khi process thoát
+        atexit.register(listener.stop)
+
+    for name in hot_path_loggers:
+        hot_logger = logging.getLogger(name)
+        for existing in [f for f in hot_logger.filters if isinstance(f, RateLimitFilter)]:
+            hot_logger.removeFilter(existing)
+        if full_dumps:
+            hot_logger.setLevel(logging.DEBUG)
+        elif hot_path_rate_limit > 0:
+            hot_logger.addFilter(RateLimitFilter(hot_path_rate_limit))
+    return listener
@@ -1,7 +1,11 @@
+import asyncio
 import json
 import logging
 import os
-from typing import Optional
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 import aio_pika
 from aio_pika.abc import AbstractRobustConnection
@@ -12,6 +16,7 @@ from src.domain.entities.models import (
     MemberFaceDeletedMessage,
     MessageBusConstants,
 )
+from src.infrastructure.metrics import Histogram, get_counter, get_histogram
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -23,24 +28,92 @@ RABBITMQ_PORT = os.getenv("RABBITMQ__PORT", "5672")
 
 RABBITMQ_URL = f"amqp://{RABBITMQ_USERNAME}:{RABBITMQ_PASSWORD}@{RABBITMQ_HOSTNAME}:{RABBITMQ_PORT}/"
 
+_LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+_PROCESSING_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _message_lag_seconds(message: aio_pika.abc.AbstractIncomingMessage) -> Optional[float]:
+    """Seconds since the publisher stamped the message, or None if it has no timestamp."""
+    timestamp = getattr(message, "timestamp", None)
+    if not isinstance(timestamp, datetime):
+        return None
+    if timestamp.tzinfo is None:
+        # aio-pika trả về timestamp AMQP (giây, UTC) dưới dạng datetime không có múi giờ
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return max(0.0, time.time() - timestamp.timestamp())
+
+
+def _observe_lag(message: aio_pika.abc.AbstractIncomingMessage):
+    lag = _message_lag_seconds(message)
+    if lag is not None:
+        get_histogram(
+            "consumer_lag_seconds",
+            _LAG_BUCKETS,
+            labels={"routing_key": message.routing_key},
+            documentation="Time between publishing and delivery to the consumer.",
+        ).observe(lag)
+
+
+def _observe_processing(routing_key: str, seconds: float):
+    get_histogram(
+        "consumer_processing_seconds",
+        _PROCESSING_BUCKETS,
+        labels={"routing_key": routing_key},
+        documentation="Time spent handling a message (the whole batch write in batching mode).",
+    ).observe(seconds)
+
+
+def _count_message(routing_key: str, outcome: str, amount: int = 1):
+    get_counter(
+        "consumer_messages_total",
+        labels={"routing_key": routing_key, "outcome": outcome},
+        documentation="Consumed messages by routing key and outcome (processed, failed, unhandled, requeued, dropped).",
+    ).inc(amount)
+
 
 class MessageConsumer:
     """
     Consumes messages from RabbitMQ related to member face events.
     """
 
-    def __init__(self, face_manager: FaceManager):
+    def __init__(
+        self,
+        face_manager: FaceManager,
+        batching: Optional[bool] = None,
+        batch_size: Optional[int] = None,
+        batch_window_ms: Optional[float] = None,
+        prefetch_count: Optional[int] = None,
+    ):
         self.face_manager = face_manager
         self.connection: Optional[AbstractRobustConnection] = None
         self.channel: Optional[aio_pika.abc.AbstractRobustChannel] = None
         self.queue: Optional[aio_pika.abc.AbstractRobustQueue] = None
 
+        # Chế độ gom lô: tích lũy tối đa batch_size message hoặc batch_window_ms mili giây,
+        # ghi Qdrant một lần cho cả lô rồi ack toàn bộ bằng multiple=True.
+        self.batching = batching if batching is not None else os.getenv("CONSUMER_BATCHING", "false").lower() == "true"
+        self.batch_size = max(1, int(batch_size or os.getenv("CONSUMER_BATCH_SIZE", 100)))
+        self.batch_window_ms = float(
+            batch_window_ms if batch_window_ms is not None else os.getenv("CONSUMER_BATCH_WINDOW_MS", 200)
+        )
+        # Prefetch phải lớn hơn batch_size, nếu không broker sẽ ngừng giao message trước khi lô đầy.
+        default_prefetch = self.batch_size * 2 if self.batching else 10
+        self.prefetch_count = int(prefetch_count or os.getenv("CONSUMER_PREFETCH_COUNT", default_prefetch))
+
+        self._pending: List[aio_pika.abc.AbstractIncomingMessage] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_timer: Optional[asyncio.Task] = None
+        self.batch_size_histogram = Histogram("consumer_batch_size", buckets=(1, 5, 10, 25, 50, 100, 250, 500))
+
     async def _connect(self):
         """Establishes connection to RabbitMQ."""
-        logger.info(f"Connecting to RabbitMQ at {RABBITMQ_URL}")
+        logger.info("Connecting to RabbitMQ at %s", RABBITMQ_URL)
         self.connection = await aio_pika.connect_robust(RABBITMQ_URL)
         self.channel = await self.connection.channel()
-        logger.info("Successfully connected to RabbitMQ and opened channel.")
+        await self.channel.set_qos(prefetch_count=self.prefetch_count)
+        logger.info(
+            f"Successfully connected to RabbitMQ and opened channel (prefetch_count={self.prefetch_count})."
+        )
 
     async def _declare_exchange(self):
         """Declares the necessary exchange."""
@@ -49,7 +122,7 @@ class MessageConsumer:
         self.exchange = await self.channel.declare_exchange(
             MessageBusConstants.Exchanges.MEMBER_FACE, aio_pika.ExchangeType.TOPIC, durable=True
         )
-        logger.info(f"Declared exchange: {MessageBusConstants.Exchanges.MEMBER_FACE}")
+        logger.info("Declared exchange: %s", MessageBusConstants.Exchanges.MEMBER_FACE)
 
     async def _setup_queue(self):
         """Sets up the queue and binds it to routing keys."""
@@ -61,7 +134,7 @@ class MessageConsumer:
             durable=True,
             arguments={"x-expires": 1800000}  # Queue expires after 30 minutes of inactivity
         )
-        logger.info(f"Declared queue: {self.queue.name}")
+        logger.info("Declared queue: %s", self.queue.name)
 
         # Bind for added messages
         await self.queue.bind(self.exchange, MessageBusConstants.RoutingKeys.MEMBER_FACE_ADDED)
@@ -77,45 +150,55 @@ class MessageConsumer:
             f"with routing key: {MessageBusConstants.RoutingKeys.MEMBER_FACE_DELETED}"
         )
 
+    @staticmethod
+    def _parse_added_message(
+        message: aio_pika.abc.AbstractIncomingMessage,
+    ) -> Tuple[MemberFaceAddedMessage, List[float], Dict[str, Any]]:
+        data = json.loads(message.body.decode())
+        added_message = MemberFaceAddedMessage.model_validate(data)
+
+        face_add_request = added_message.face_add_request
+        vector = face_add_request.vector
+        metadata = face_add_request.metadata.model_dump()
+
+        # The BoundingBox model has float fields, but FaceManager's BoundingBox expects int.
+        # Need to convert BoundingBox fields to int.
+        if "bounding_box" in metadata and metadata["bounding_box"] is not None:
+            bbox = metadata["bounding_box"]
+            metadata["bounding_box"] = {
+                "x": int(bbox["x"]),
+                "y": int(bbox["y"]),
+                "width": int(bbox["width"]),
+                "height": int(bbox["height"]),
+            }
+        return added_message, vector, metadata
+
     async def _on_message_added(self, message: aio_pika.abc.AbstractIncomingMessage):
         """Callback for MemberFaceAddedMessage."""
         async with message.process():
             try:
-                logger.info(f"Received MemberFaceAddedMessage: {message.routing_key}")
-                data = json.loads(message.body.decode())
-                added_message = MemberFaceAddedMessage.model_validate(data)
-
-                face_add_request = added_message.face_add_request
-                vector = face_add_request.vector
-                metadata = face_add_request.metadata.model_dump()
-
-                # The BoundingBox model has float fields, but FaceManager's BoundingBox expects int.
-                # Need to convert BoundingBox fields to int.
-                if "bounding_box" in metadata and metadata["bounding_box"] is not None:
-                    bbox = metadata["bounding_box"]
-                    metadata["bounding_box"] = {
-                        "x": int(bbox["x"]),
-                        "y": int(bbox["y"]),
-                        "width": int(bbox["width"]),
-                        "height": int(bbox["height"]),
-                    }
+                logger.info("Received MemberFaceAddedMessage: %s", message.routing_key)
+                added_message, vector, metadata = self._parse_added_message(message)
 
                 await self.face_manager.add_face_by_vector(vector, metadata)
-                logger.info(f"Metadata passed to add_face_by_vector: {metadata}")
+                logger.debug("Metadata passed to add_face_by_vector: %s", metadata)
                 logger.info(
-                    f"Processed MemberFaceAddedMessage for FaceId: {metadata['face_id']} "
-                    f"from MemberFaceLocalId: {added_message.member_face_local_id}"
+                    "Processed MemberFaceAddedMessage for FaceId: %s from MemberFaceLocalId: %s",
+                    metadata['face_id'], added_message.member_face_local_id,
                 )
+                _count_message(message.routing_key, "processed")
             except json.JSONDecodeError:
                 logger.error(f"Failed to decode JSON from message: {message.body}", exc_info=True)
+                _count_message(message.routing_key, "failed")
             except Exception as e:
                 logger.error(f"Error processing MemberFaceAddedMessage: {e}", exc_info=True)
+                _count_message(message.routing_key, "failed")
 
     async def _on_message_deleted(self, message: aio_pika.abc.AbstractIncomingMessage):
         """Callback for MemberFaceDeletedMessage."""
         async with message.process():
             try:
-                logger.info(f"Received MemberFaceDeletedMessage: {message.routing_key}")
+                logger.info("Received MemberFaceDeletedMessage: %s", message.routing_key)
                 data = json.loads(message.body.decode())
                 deleted_message = MemberFaceDeletedMessage.model_validate(data)
 
@@ -124,8 +207,9 @@ class MessageConsumer:
                     success = await self.face_manager.delete_face(vector_db_id)
                     if success:
                         logger.info(
-                            f"Processed MemberFaceDeletedMessage for VectorDbId: {vector_db_id} "
-                            f"from MemberFaceId: {deleted_message.member_face_id}. Face deleted successfully."
+                            "Processed MemberFaceDeletedMessage for VectorDbId: %s from MemberFaceId: %s. "
+                            "Face deleted successfully.",
+                            vector_db_id, deleted_message.member_face_id,
                         )
                     else:
                         logger.warning(
@@ -137,10 +221,13 @@ class MessageConsumer:
                         f"MemberFaceDeletedMessage for MemberFaceId: {deleted_message.member_face_id} "
                         "has no VectorDbId. Skipping deletion from vector DB."
                     )
+                _count_message(message.routing_key, "processed")
             except json.JSONDecodeError:
                 logger.error(f"Failed to decode JSON from message: {message.body}", exc_info=True)
+                _count_message(message.routing_key, "failed")
             except Exception as e:
                 logger.error(f"Error processing MemberFaceDeletedMessage: {e}", exc_info=True)
+                _count_message(message.routing_key, "failed")
 
     async def start(self):
         """Starts the message consumer."""
@@ -161,6 +248,11 @@ class MessageConsumer:
 
     async def _dispatch_message(self, message: aio_pika.abc.AbstractIncomingMessage):
         """Dispatches messages to appropriate handlers based on routing key."""
+        _observe_lag(message)
+        if self.batching:
+            await self._enqueue_message(message)
+            return
+        start = time.perf_counter()
         if message.routing_key == MessageBusConstants.RoutingKeys.MEMBER_FACE_ADDED:
             await self._on_message_added(message)
         elif message.routing_key == MessageBusConstants.RoutingKeys.MEMBER_FACE_DELETED:
@@ -168,9 +260,136 @@ class MessageConsumer:
         else:
             logger.warning(f"Received message with unhandled routing key: {message.routing_key}. Body: {message.body.decode()}")
             await message.ack()
+            _count_message(message.routing_key, "unhandled")
+            return
+        _observe_processing(message.routing_key, time.perf_counter() - start)
+
+    async def _enqueue_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+        """Adds a message to the current batch and flushes it when full."""
+        self._pending.append(message)
+        if len(self._pending) >= self.batch_size:
+            self._cancel_flush_timer()
+            await self._flush()
+        elif self._flush_timer is None or self._flush_timer.done():
+            self._flush_timer = asyncio.create_task(self._flush_after_window())
+
+    def _cancel_flush_timer(self):
+        # Chỉ hủy timer khi nó còn đang chờ; timer đã bắt đầu flush thì phải chạy xong để ack/nack lô đã lấy.
+        if self._flush_timer is not None and not self._flush_timer.done():
+            self._flush_timer.cancel()
+        self._flush_timer = None
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.batch_window_ms / 1000)
+        # Từ đây timer không còn hủy được nữa (_cancel_flush_timer không thấy nó)
+        self._flush_timer = None
+        await self._flush()
+
+    def _coalesce(
+        self, messages: List[aio_pika.abc.AbstractIncomingMessage]
+    ) -> Tuple[List[Dict[str, Any]], List[str], List[aio_pika.abc.AbstractIncomingMessage]]:
+        """
+        Reduces a batch to one upsert list and one delete list.
+
+        Messages are applied in delivery order and only the last operation per face_id is kept,
+        so an add followed by a delete of the same face becomes a single delete (and vice versa).
+        Malformed messages and unhandled routing keys are logged and dropped; they are returned
+        as the third element so they can be counted separately.
+        """
+        rejected: List[aio_pika.abc.AbstractIncomingMessage] = []
+        operations: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        for message in messages:
+            try:
+                if message.routing_key == MessageBusConstants.RoutingKeys.MEMBER_FACE_ADDED:
+                    _, vector, metadata = self._parse_added_message(message)
+                    operations.pop(metadata["face_id"], None)
+                    operations[metadata["face_id"]] = ("add", {"vector": vector, "metadata": metadata})
+                elif message.routing_key == MessageBusConstants.RoutingKeys.MEMBER_FACE_DELETED:
+                    deleted_message = MemberFaceDeletedMessage.model_validate(json.loads(message.body.decode()))
+                    if deleted_message.vector_db_id:
+                        operations.pop(deleted_message.vector_db_id, None)
+                        operations[deleted_message.vector_db_id] = ("delete", None)
+                    else:
+                        logger.warning(
+                            f"MemberFaceDeletedMessage for MemberFaceId: {deleted_message.member_face_id} "
+                            "has no VectorDbId. Skipping deletion from vector DB."
+                        )
+                else:
+                    logger.warning(f"Received message with unhandled routing key: {message.routing_key}. Body: {message.body.decode()}")
+                    rejected.append(message)
+            except json.JSONDecodeError:
+                logger.error(f"Failed to decode JSON from message: {message.body}", exc_info=True)
+                rejected.append(message)
+            except Exception as e:
+                logger.error(f"Error parsing message with routing key {message.routing_key}: {e}", exc_info=True)
+                rejected.append(message)
+
+        adds = [item for op, item in operations.values() if op == "add"]
+        deletes = [face_id for face_id, (op, _) in operations.items() if op == "delete"]
+        return adds, deletes, rejected
+
+    async def _flush(self):
+        """Writes the pending batch to the vector DB and acks it with a single multiple=True ack."""
+        async with self._flush_lock:
+            messages, self._pending = self._pending, []
+            if not messages:
+                return
+            self.batch_size_histogram.observe(len(messages))
+            start = time.perf_counter()
+            adds, deletes, rejected = self._coalesce(messages)
+            # Cùng một channel giao message theo thứ tự delivery_tag tăng dần, nên ack message
+            # có tag lớn nhất với multiple=True sẽ xác nhận cả lô.
+            last_message = max(messages, key=lambda m: m.delivery_tag)
+            try:
+                if adds:
+                    await self.face_manager.add_faces_by_vectors(adds, wait=True)
+                if deletes and not await self.face_manager.delete_faces(deletes):
+                    logger.warning(f"Batch deletion of {len(deletes)} faces failed or faces not found.")
+            except Exception as e:
+                # Giao lại lô một lần; nếu lô đã được giao lại trước đó thì bỏ để tránh vòng lặp vô hạn.
+                requeue = not last_message.redelivered
+                logger.error(
+                    f"Error processing batch of {len(messages)} messages (requeue={requeue}): {e}", exc_info=True
+                )
+                await last_message.nack(multiple=True, requeue=requeue)
+                self._record_batch(messages, "requeued" if requeue else "dropped", time.perf_counter() - start)
+                return
+            await last_message.ack(multiple=True)
+            rejected_ids = {id(message) for message in rejected}
+            for message in rejected:
+                _count_message(message.routing_key, "failed")
+            self._record_batch(
+                [message for message in messages if id(message) not in rejected_ids],
+                "processed",
+                time.perf_counter() - start,
+            )
+            logger.info(
+                "Processed batch of %d messages: %d upserts, %d deletes.", len(messages), len(adds), len(deletes)
+            )
+
+    @staticmethod
+    def _record_batch(messages: List[aio_pika.abc.AbstractIncomingMessage], outcome: str, seconds: float):
+        # Mỗi message trong lô chờ cả lô được ghi xong, nên thời gian xử lý của lô được ghi cho từng message
+        for routing_key, count in Counter(message.routing_key for message in messages).items():
+            _count_message(routing_key, outcome, count)
+            for _ in range(count):
+                _observe_processing(routing_key, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batching": self.batching,
+            "batch_size": self.batch_size,
+            "batch_window_ms": self.batch_window_ms,
+            "prefetch_count": self.prefetch_count,
+            "pending": len(self._pending),
+            "batches": self.batch_size_histogram.snapshot(),
+        }
 
     async def stop(self):
         """Closes the RabbitMQ connection gracefully."""
+        if self.batching and self.channel is not None:
+            await self._flush()
+        self._cancel_flush_timer()
         if self.connection:
             logger.info("Closing RabbitMQ connection...")
             await self.connection.close()
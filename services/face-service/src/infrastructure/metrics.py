@@ -0,0 +1,170 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+Labels = Optional[Dict[str, str]]
+
+
+def _series_key(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """
+    Minimal thread-safe bucketed histogram (cumulative buckets, Prometheus style).
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float], labels: Labels = None, documentation: str = ""):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.documentation = documentation
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative = {}
+            running = 0
+            for bound, count in zip(self.buckets + [float("inf")], self._counts):
+                running += count
+                cumulative["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+            return {"buckets": cumulative, "count": self._count, "sum": self._sum}
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+
+
+class Counter:
+    """
+    Minimal thread-safe monotonically increasing counter.
+    """
+
+    def __init__(self, name: str, labels: Labels = None, documentation: str = ""):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.documentation = documentation
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = 0.0
+
+
+Metric = Union[Histogram, Counter]
+
+_registry: Dict[str, Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def get_histogram(name: str, buckets: Sequence[float], labels: Labels = None, documentation: str = "") -> Histogram:
+    """Returns the process-wide histogram called `name` with `labels`, creating it on first use."""
+    key = _series_key(name, labels or {})
+    with _registry_lock:
+        histogram = _registry.get(key)
+        if histogram is None:
+            histogram = _registry[key] = Histogram(name, buckets, labels, documentation)
+        return histogram
+
+
+def get_counter(name: str, labels: Labels = None, documentation: str = "") -> Counter:
+    """Returns the process-wide counter called `name` with `labels`, creating it on first use."""
+    key = _series_key(name, labels or {})
+    with _registry_lock:
+        counter = _registry.get(key)
+        if counter is None:
+            counter = _registry[key] = Counter(name, labels, documentation)
+        return counter
+
+
+def registered_histograms() -> Dict[str, Histogram]:
+    """Registered histograms keyed by series, e.g. `name` or `name{tier="fast"}`."""
+    with _registry_lock:
+        return {key: metric for key, metric in _registry.items() if isinstance(metric, Histogram)}
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus() -> str:
+    """Renders every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    families: Dict[str, List[Metric]] = {}
+    for metric in metrics:
+        families.setdefault(metric.name, []).append(metric)
+
+    lines: List[str] = []
+    for name in sorted(families):
+        series = sorted(families[name], key=lambda m: _series_key(m.name, m.labels))
+        first = series[0]
+        if first.documentation:
+            lines.append(f"# HELP {name} {first.documentation}")
+        if isinstance(first, Counter):
+            lines.append(f"# TYPE {name} counter")
+            for counter in series:
+                lines.append(f"{_series_key(name, counter.labels)} {_format_value(counter.value)}")
+            continue
+        lines.append(f"# TYPE {name} histogram")
+        for histogram in series:
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f"{_series_key(name + '_bucket', {**histogram.labels, 'le': bound})} {count}")
+            lines.append(f"{_series_key(name + '_sum', histogram.labels)} {_format_value(snapshot['sum'])}")
+            lines.append(f"{_series_key(name + '_count', histogram.labels)} {snapshot['count']}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+# --- Per-stage timings and value distributions recorded by the application layer ---
+
+STAGE_DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_VALUE_BUCKETS: Dict[str, Sequence[float]] = {
+    "faces_detected_per_image": (0, 1, 2, 3, 5, 10, 20, 50, 100),
+    "embedding_inference_batch_size": (1, 2, 4, 8, 16, 32, 64, 128, 256),
+}
+_DEFAULT_VALUE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Stage observer for application.services.instrumentation: one histogram series per stage."""
+    get_histogram(
+        "face_service_stage_duration_seconds",
+        STAGE_DURATION_BUCKETS,
+        labels={"stage": stage},
+        documentation="Duration of each processing stage (decode, detect, crop, embed, qdrant_*).",
+    ).observe(seconds)
+
+
+def observe_value(name: str, value: float):
+    """Value observer for application.services.instrumentation: one histogram per value name."""
+    get_histogram(name, _VALUE_BUCKETS.get(name, _DEFAULT_VALUE_BUCKETS)).observe(value)
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of heavy, shareable components (detectors, embedders, Qdrant client).
+
+    Each component is registered with a factory and constructed at most once. The FastAPI
+    dependencies and the MessageConsumer resolve components through the same registry, so
+    models are loaded once per process instead of once per request.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Registers (or replaces) the factory used to build the component `name`."""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+            self._load_times.pop(name, None)
+            self._errors.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Returns the shared instance of `name`, building it on first access."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            if name not in self._factories:
+                raise KeyError(f"No factory registered for component '{name}'.")
+            start = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                self._errors[name] = str(e)
+                logger.error(f"Failed to load component '{name}': {e}", exc_info=True)
+                raise
+            self._instances[name] = instance
+            self._load_times[name] = time.perf_counter() - start
+            self._errors.pop(name, None)
+            logger.info(f"Loaded component '{name}' in {self._load_times[name]:.3f}s.")
+            return instance
+
+    def warm_up(self) -> bool:
+        """
+        Eagerly builds every registered component.
+
+        Failures are recorded rather than raised so that one broken model does not prevent the
+        others from loading; use `is_ready` / `status` to inspect the outcome.
+        """
+        for name in list(self._factories):
+            try:
+                self.get(name)
+            except Exception:
+                pass
+        return self.is_ready
+
+    @property
+    def is_ready(self) -> bool:
+        with self._lock:
+            return bool(self._factories) and all(name in self._instances for name in self._factories)
+
+    def status(self) -> Dict[str, Dict[str, Optional[Any]]]:
+        """Returns the load state of each registered component."""
+        with self._lock:
+            return {
+                name: {
+                    "loaded": name in self._instances,
+                    "load_seconds": self._load_times.get(name),
+                    "error": self._errors.get(name),
+                }
+                for name in self._factories
+            }
+
+    def reset(self):
+        """Drops all cached instances (factories are kept)."""
+        with self._lock:
+            self._instances.clear()
+            self._load_times.clear()
+            self._errors.clear()
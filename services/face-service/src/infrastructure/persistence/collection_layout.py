@@ -0,0 +1,273 @@
+import math
+import os
+from typing import Any, Dict, List, Optional, Union
+
+from qdrant_client import AsyncQdrantClient, models
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+# Không hỗ trợ uint8: Qdrant lưu nguyên phần nguyên 0-255 của từng chiều, trong khi embedding chuẩn hóa
+# L2 có giá trị trong [-1, 1] nên gần như mọi chiều thành 0. Muốn nén int8 thì dùng QDRANT_QUANTIZATION=scalar.
+VECTOR_DATATYPES = {
+    "float32": models.Datatype.FLOAT32,
+    "float16": models.Datatype.FLOAT16,
+}
+
+# Số chiều embedding của từng model; với named vectors, mỗi model là một vector có tên riêng
+EMBEDDING_VECTOR_SIZES = {"facenet": 128, "arcface": 512}
+
+# Payload index được khai báo cho collection. family_id là khóa tenant: Qdrant gom các điểm cùng
+# family vào chung vùng lưu trữ, nên tìm kiếm/scroll theo family chỉ đọc dữ liệu của family đó.
+PayloadIndexSchema = Union[models.PayloadSchemaType, models.KeywordIndexParams]
+PAYLOAD_INDEXES: Dict[str, PayloadIndexSchema] = {
+    "family_id": models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+    "member_id": models.PayloadSchemaType.KEYWORD,
+    "face_id": models.PayloadSchemaType.KEYWORD,
+    "local_db_id": models.PayloadSchemaType.KEYWORD,
+}
+
+# Số byte mỗi chiều của vector gốc theo datatype (uint8 vẫn được tính cho collection tạo từ trước)
+_DATATYPE_BYTES = {"float32": 4, "float16": 2, "uint8": 1}
+
+
+def index_matches(info: Optional[models.PayloadIndexInfo], schema: PayloadIndexSchema) -> bool:
+    """Whether an existing payload index has the type (and params, e.g. is_tenant) of `schema`."""
+    if info is None:
+        return False
+    data_type = getattr(info.data_type, "value", info.data_type)
+    if isinstance(schema, models.PayloadSchemaType):
+        return data_type == schema.value
+    expected = schema.model_dump(mode="json", exclude_none=True)
+    actual = info.params.model_dump(mode="json", exclude_none=True) if info.params is not None else {"type": data_type}
+    return all(actual.get(key) == value for key, value in expected.items())
+
+
+async def ensure_payload_indexes(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    payload_indexes: Dict[str, PayloadIndexSchema] = PAYLOAD_INDEXES,
+) -> List[str]:
+    """Creates the declared payload indexes that are missing or differ; returns the fields (re)created."""
+    info = await client.get_collection(collection_name=collection_name)
+    existing = info.payload_schema or {}
+    created = []
+    for field_name, schema in payload_indexes.items():
+        if index_matches(existing.get(field_name), schema):
+            continue
+        await client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=schema,
+            wait=True,
+        )
+        created.append(field_name)
+    return created
+
+
+def estimate_memory(info: models.CollectionInfo) -> Dict[str, Any]:
+    """
+    Rough memory footprint of a collection from its config and point count: original vectors,
+    quantized vectors and HNSW links, split into what stays in RAM and what is memory-mapped.
+    """
+    points = info.points_count or 0
+    vectors = info.config.params.vectors
+    vector_params = list(vectors.values()) if isinstance(vectors, dict) else [vectors]
+    hnsw_m = info.config.hnsw_config.m if info.config.hnsw_config else 16
+    quantization = info.config.quantization_config
+
+    ram_bytes = disk_bytes = 0
+    original_bytes = quantized_bytes = 0
+    for params in vector_params:
+        datatype = getattr(params.datatype, "value", params.datatype) or "float32"
+        size = points * params.size * _DATATYPE_BYTES.get(datatype, 4)
+        original_bytes += size
+        if params.on_disk:
+            disk_bytes += size
+        else:
+            ram_bytes += size
+        if isinstance(quantization, models.ScalarQuantization):
+            quantized = points * params.size
+            always_ram = quantization.scalar.always_ram
+        elif isinstance(quantization, models.BinaryQuantization):
+            quantized = points * math.ceil(params.size / 8)
+            always_ram = quantization.binary.always_ram
+        else:
+            continue
+        quantized_bytes += quantized
+        if always_ram:
+            ram_bytes += quantized
+        else:
+            disk_bytes += quantized
+    # Mỗi điểm giữ khoảng 2*m liên kết 4 byte ở tầng 0 của đồ thị HNSW
+    hnsw_bytes = points * 2 * hnsw_m * 4 * len(vector_params)
+    ram_bytes += hnsw_bytes
+    return {
+        "original_vectors_bytes": original_bytes,
+        "quantized_vectors_bytes": quantized_bytes,
+        "hnsw_links_bytes": hnsw_bytes,
+        "estimated_ram_bytes": ram_bytes,
+        "estimated_mmap_bytes": disk_bytes,
+    }
+
+
+def _optional_int(value: Optional[int], env_name: str) -> Optional[int]:
+    if value is not None:
+        return int(value)
+    raw = os.getenv(env_name)
+    return int(raw) if raw not in (None, "") else None
+
+
+def _flag(value: Optional[bool], env_name: str, default: str) -> bool:
+    return value if value is not None else os.getenv(env_name, default).lower() == "true"
+
+
+class CollectionLayout:
+    """
+    Storage layout of the face collection: vector datatype, quantization, on-disk originals and
+    HNSW parameters, plus the search params that go with them.
+
+    - QDRANT_VECTOR_DATATYPE: float32 (default) or float16 storage for the original vectors
+      (uint8 is rejected: it would truncate the float embeddings; use scalar quantization instead).
+    - QDRANT_VECTORS_ON_DISK (default false): keep the original vectors memory-mapped on disk.
+    - QDRANT_QUANTIZATION: none (default), scalar (int8) or binary; QDRANT_QUANTIZATION_ALWAYS_RAM
+      (default true) pins the quantized vectors in RAM, QDRANT_SCALAR_QUANTILE (default 0.99).
+    - QDRANT_SEARCH_OVERSAMPLING (default 2.0) / QDRANT_SEARCH_RESCORE (default true): with
+      quantization, fetch `oversampling * limit` candidates from the quantized index and rescore
+      them against the original vectors.
+    - QDRANT_NAMED_VECTORS (default false): store one named vector per embedding model listed in
+      QDRANT_VECTOR_MODELS (default "facenet,arcface", sizes from EMBEDDING_VECTOR_SIZES), so the
+      embedding model can be switched after re-embedding without recreating the collection.
+    - QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT, QDRANT_HNSW_PAYLOAD_M: graph parameters
+      (payload_m builds per-tenant links for indexed payload fields such as family_id; m=0 turns
+      off the global graph). QDRANT_HNSW_EF sets the search-time beam width.
+
+    Unset values keep Qdrant's defaults, so the default layout is the plain float32 COSINE collection.
+    """
+
+    def __init__(
+        self,
+        datatype: Optional[str] = None,
+        vectors_on_disk: Optional[bool] = None,
+        quantization: Optional[str] = None,
+        quantization_always_ram: Optional[bool] = None,
+        scalar_quantile: Optional[float] = None,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        hnsw_m: Optional[int] = None,
+        hnsw_ef_construct: Optional[int] = None,
+        hnsw_payload_m: Optional[int] = None,
+        hnsw_ef: Optional[int] = None,
+        named_vectors: Optional[bool] = None,
+        vector_models: Optional[List[str]] = None,
+    ):
+        self.datatype = (datatype or os.getenv("QDRANT_VECTOR_DATATYPE", "float32")).lower()
+        if self.datatype not in VECTOR_DATATYPES:
+            raise ValueError(
+                f"Invalid QDRANT_VECTOR_DATATYPE '{self.datatype}'. Expected one of {sorted(VECTOR_DATATYPES)}."
+            )
+        self.quantization = (quantization or os.getenv("QDRANT_QUANTIZATION", "none")).lower()
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Invalid QDRANT_QUANTIZATION '{self.quantization}'. Expected one of {list(QUANTIZATION_MODES)}."
+            )
+        self.vectors_on_disk = _flag(vectors_on_disk, "QDRANT_VECTORS_ON_DISK", "false")
+        self.quantization_always_ram = _flag(quantization_always_ram, "QDRANT_QUANTIZATION_ALWAYS_RAM", "true")
+        self.scalar_quantile = float(
+            scalar_quantile if scalar_quantile is not None else os.getenv("QDRANT_SCALAR_QUANTILE", 0.99)
+        )
+        self.oversampling = max(1.0, float(
+            oversampling if oversampling is not None else os.getenv("QDRANT_SEARCH_OVERSAMPLING", 2.0)
+        ))
+        self.rescore = _flag(rescore, "QDRANT_SEARCH_RESCORE", "true")
+        self.hnsw_m = _optional_int(hnsw_m, "QDRANT_HNSW_M")
+        self.hnsw_ef_construct = _optional_int(hnsw_ef_construct, "QDRANT_HNSW_EF_CONSTRUCT")
+        self.hnsw_payload_m = _optional_int(hnsw_payload_m, "QDRANT_HNSW_PAYLOAD_M")
+        self.hnsw_ef = _optional_int(hnsw_ef, "QDRANT_HNSW_EF")
+        self.named_vectors = _flag(named_vectors, "QDRANT_NAMED_VECTORS", "false")
+        if vector_models is None:
+            vector_models = [
+                name.strip().lower()
+                for name in os.getenv("QDRANT_VECTOR_MODELS", ",".join(EMBEDDING_VECTOR_SIZES)).split(",")
+                if name.strip()
+            ]
+        unknown = [name for name in vector_models if name not in EMBEDDING_VECTOR_SIZES]
+        if unknown:
+            raise ValueError(
+                f"Invalid QDRANT_VECTOR_MODELS {unknown}. Expected names from {sorted(EMBEDDING_VECTOR_SIZES)}."
+            )
+        self.vector_models = list(vector_models)
+
+    def vector_params(self, vector_size: int) -> models.VectorParams:
+        params: Dict[str, Any] = {"size": vector_size, "distance": models.Distance.COSINE}
+        if self.datatype != "float32":
+            params["datatype"] = VECTOR_DATATYPES[self.datatype]
+        if self.vectors_on_disk:
+            params["on_disk"] = True
+        return models.VectorParams(**params)
+
+    def hnsw_config(self) -> Optional[models.HnswConfigDiff]:
+        values = {
+            "m": self.hnsw_m,
+            "ef_construct": self.hnsw_ef_construct,
+            "payload_m": self.hnsw_payload_m,
+        }
+        values = {key: value for key, value in values.items() if value is not None}
+        return models.HnswConfigDiff(**values) if values else None
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=self.scalar_quantile,
+                    always_ram=self.quantization_always_ram,
+                )
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=self.quantization_always_ram)
+            )
+        return None
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        """Search params for query_points; None when the layout needs none (Qdrant defaults)."""
+        params: Dict[str, Any] = {}
+        if self.hnsw_ef is not None:
+            params["hnsw_ef"] = self.hnsw_ef
+        if self.quantization != "none":
+            params["quantization"] = models.QuantizationSearchParams(
+                rescore=self.rescore,
+                oversampling=self.oversampling,
+            )
+        return models.SearchParams(**params) if params else None
+
+    def vectors_config(self, vector_size: int) -> Union[models.VectorParams, Dict[str, models.VectorParams]]:
+        """One unnamed vector of `vector_size`, or one named vector per model with named vectors."""
+        if not self.named_vectors:
+            return self.vector_params(vector_size)
+        return {name: self.vector_params(EMBEDDING_VECTOR_SIZES[name]) for name in self.vector_models}
+
+    def collection_kwargs(self, vector_size: int) -> Dict[str, Any]:
+        """Keyword arguments for `create_collection` (without the collection name)."""
+        kwargs: Dict[str, Any] = {"vectors_config": self.vectors_config(vector_size)}
+        hnsw_config = self.hnsw_config()
+        if hnsw_config is not None:
+            kwargs["hnsw_config"] = hnsw_config
+        quantization_config = self.quantization_config()
+        if quantization_config is not None:
+            kwargs["quantization_config"] = quantization_config
+        return kwargs
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "datatype": self.datatype,
+            "vectors_on_disk": self.vectors_on_disk,
+            "quantization": self.quantization,
+            "quantization_always_ram": self.quantization_always_ram,
+            "oversampling": self.oversampling,
+            "rescore": self.rescore,
+            "hnsw_m": self.hnsw_m,
+            "hnsw_ef_construct": self.hnsw_ef_construct,
+            "hnsw_payload_m": self.hnsw_payload_m,
+            "hnsw_ef": self.hnsw_ef,
+            "named_vectors": self.vector_models if self.named_vectors else None,
+        }
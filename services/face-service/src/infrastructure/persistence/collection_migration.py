@@ -0,0 +1,284 @@
+"""
+Rebuilds the face collection into the layout configured by the QDRANT_* environment (see
+CollectionLayout) and swaps the service alias to it, so searches and writes keep working during
+the migration.
+
+1. A new collection (`<alias>_<unix time>` unless --target is given) is created with the new
+   layout, the payload indexes of the current collection and the declared PAYLOAD_INDEXES.
+2. All points are copied page by page (scroll with vectors + payloads, then upsert), keeping a
+   fingerprint (hash of payload + vector) of every copied point.
+3. After indexing of the new collection finishes (status green), the old collection is re-synced
+   into the new one: points added or changed since they were copied (fingerprint differs) are
+   upserted, and points deleted since then are deleted. The alias is then switched in one atomic
+   `update_collection_aliases` call and a last re-sync picks up the writes made between the first
+   re-sync and the swap. After the swap the old collection no longer receives writes.
+
+A re-sync only touches points whose content changed in the old collection, so writes the service
+makes to the new collection after the swap are kept. The one exception is a point written to the
+old collection just before the swap and written again to the new one just after it: the last
+re-sync applies the older write. Each re-sync reads the whole old collection again, and the
+fingerprints take a few hundred bytes of memory per point.
+
+With QDRANT_NAMED_VECTORS=true, a collection with a single unnamed vector is converted to named
+vectors: the existing vectors are stored under --vector-name (default FACE_EMBEDDING_MODEL) and
+the other models' vectors are filled later by the re-embedding job (POST /admin/reembedding).
+
+If QDRANT_COLLECTION_NAME is still a physical collection (created before aliases were used), it
+has to be dropped before an alias with the same name can exist: pass --replace-collection to
+re-sync, delete it and create the alias back to back (writes between the re-sync and the delete
+are lost). Later migrations only move the alias.
+
+Usage (from services/face-service):
+
+    QDRANT_QUANTIZATION=scalar QDRANT_VECTORS_ON_DISK=true \\
+        python -m src.infrastructure.persistence.collection_migration --alias face_embeddings
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from qdrant_client import AsyncQdrantClient, models
+
+from src.infrastructure.persistence.collection_layout import CollectionLayout, ensure_payload_indexes
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+async def _resolve_alias(client: AsyncQdrantClient, alias: str) -> Optional[str]:
+    response = await client.get_aliases()
+    for description in response.aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+async def _copy_payload_indexes(client: AsyncQdrantClient, source: str, target: str):
+    info = await client.get_collection(collection_name=source)
+    for field_name, index_info in (info.payload_schema or {}).items():
+        await client.create_payload_index(
+            collection_name=target,
+            field_name=field_name,
+            field_schema=index_info.params or index_info.data_type,
+        )
+    # Bổ sung các index khai báo mà collection cũ còn thiếu (ví dụ family_id với is_tenant)
+    await ensure_payload_indexes(client, target)
+
+
+async def _source_vector_size(client: AsyncQdrantClient, source: str) -> int:
+    info = await client.get_collection(collection_name=source)
+    vectors = info.config.params.vectors
+    if not isinstance(vectors, models.VectorParams):
+        raise ValueError(f"Collection '{source}' uses named vectors; pass vector_size explicitly.")
+    return vectors.size
+
+
+def _fingerprint(point: models.Record) -> bytes:
+    content = json.dumps([point.payload, point.vector], sort_keys=True, default=str)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).digest()
+
+
+async def _sync_points(
+    client: AsyncQdrantClient,
+    source: str,
+    target: str,
+    batch_size: int,
+    fingerprints: Dict[Any, bytes],
+    vector_name: Optional[str] = None,
+) -> Tuple[int, int]:
+    """
+    Makes `target` match `source` for the points that changed since `fingerprints` was recorded:
+    upserts points that are new or whose payload/vector differ, deletes ids no longer in `source`.
+    Updates `fingerprints` in place; with an empty dict, this copies every point.
+    With `vector_name`, unnamed source vectors are stored as that named vector.
+    Returns (upserted, deleted).
+    """
+    upserted = 0
+    seen = set()
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        changed = []
+        for point in points:
+            seen.add(point.id)
+            fingerprint = _fingerprint(point)
+            if fingerprints.get(point.id) != fingerprint:
+                fingerprints[point.id] = fingerprint
+                changed.append(point)
+        if changed:
+            await client.upsert(
+                collection_name=target,
+                wait=True,
+                points=[
+                    models.PointStruct(
+                        id=point.id,
+                        vector={vector_name: point.vector}
+                        if vector_name and not isinstance(point.vector, dict) else point.vector,
+                        payload=point.payload,
+                    )
+                    for point in changed
+                ],
+            )
+            upserted += len(changed)
+        if offset is None:
+            break
+
+    deleted_ids = [point_id for point_id in fingerprints if point_id not in seen]
+    for chunk_start in range(0, len(deleted_ids), batch_size):
+        await client.delete(
+            collection_name=target,
+            points_selector=models.PointIdsList(points=deleted_ids[chunk_start:chunk_start + batch_size]),
+            wait=True,
+        )
+    for point_id in deleted_ids:
+        del fingerprints[point_id]
+    return upserted, len(deleted_ids)
+
+
+async def _wait_until_indexed(client: AsyncQdrantClient, collection_name: str, timeout_seconds: float):
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        info = await client.get_collection(collection_name=collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(
+                f"Collection '{collection_name}' still {info.status} after {timeout_seconds}s; alias not switched."
+            )
+        await asyncio.sleep(1.0)
+
+
+async def migrate_collection(
+    client: AsyncQdrantClient,
+    alias: str,
+    layout: Optional[CollectionLayout] = None,
+    target_name: Optional[str] = None,
+    vector_size: Optional[int] = None,
+    batch_size: int = 256,
+    replace_collection: bool = False,
+    drop_old: bool = False,
+    index_timeout_seconds: float = 600.0,
+    vector_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Copies the collection behind `alias` into a new collection built with `layout` and points
+    `alias` at it. Returns a report with the source/target names, the number of copied points and
+    the points re-synced (caught_up) or deleted because they changed in the source during the copy.
+    """
+    layout = layout or CollectionLayout()
+    start = time.perf_counter()
+    source = await _resolve_alias(client, alias)
+    physical = source is None
+    if physical:
+        if not await client.collection_exists(collection_name=alias):
+            raise ValueError(f"Neither an alias nor a collection named '{alias}' exists.")
+        if not replace_collection:
+            raise ValueError(
+                f"'{alias}' is a collection, not an alias. Re-run with replace_collection "
+                f"(--replace-collection) to replace it with an alias of the same name."
+            )
+        source = alias
+
+    target = target_name or f"{alias}_{int(time.time())}"
+    if await client.collection_exists(collection_name=target):
+        raise ValueError(f"Target collection '{target}' already exists.")
+    if layout.named_vectors:
+        vector_name = (vector_name or os.getenv("FACE_EMBEDDING_MODEL", "facenet")).lower()
+        if vector_name not in layout.vector_models:
+            raise ValueError(f"Vector name '{vector_name}' is not one of {layout.vector_models}.")
+    else:
+        vector_name = None
+        vector_size = vector_size or await _source_vector_size(client, source)
+
+    logger.info("Migrating '%s' (alias '%s') into '%s' with layout %s.", source, alias, target, layout.describe())
+    await client.create_collection(collection_name=target, **layout.collection_kwargs(vector_size))
+    await _copy_payload_indexes(client, source, target)
+    fingerprints: Dict[Any, bytes] = {}
+    copied, _ = await _sync_points(client, source, target, batch_size, fingerprints, vector_name=vector_name)
+    logger.info("Copied %d points from '%s' to '%s'.", copied, source, target)
+    await _wait_until_indexed(client, target, index_timeout_seconds)
+
+    # Đồng bộ lại các điểm được thêm/sửa/xóa trong lúc copy và chờ index, khi collection cũ vẫn nhận ghi
+    caught_up, deleted = await _sync_points(client, source, target, batch_size, fingerprints, vector_name=vector_name)
+    if physical:
+        # Tên alias đang là collection thật: xóa và tạo alias liền nhau ngay sau lần đồng bộ.
+        await client.delete_collection(collection_name=source)
+        await client.update_collection_aliases(change_aliases_operations=[
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=alias)),
+        ])
+    else:
+        await client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)),
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=alias)),
+        ])
+        # Sau khi đổi alias, collection cũ không còn nhận ghi: đồng bộ nốt các ghi trước thời điểm đổi alias.
+        late_upserted, late_deleted = await _sync_points(
+            client, source, target, batch_size, fingerprints, vector_name=vector_name
+        )
+        caught_up += late_upserted
+        deleted += late_deleted
+        if drop_old:
+            await client.delete_collection(collection_name=source)
+    logger.info(
+        "Alias '%s' now points to '%s' (%d points caught up, %d deleted).", alias, target, caught_up, deleted
+    )
+
+    return {
+        "alias": alias,
+        "source": source,
+        "target": target,
+        "copied": copied,
+        "caught_up": caught_up,
+        "deleted": deleted,
+        "source_dropped": physical or drop_old,
+        "layout": layout.describe(),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+async def _main(args: argparse.Namespace):
+    from src.infrastructure.persistence.qdrant_client import QdrantFaceRepository
+
+    client = QdrantFaceRepository._create_client()
+    try:
+        report = await migrate_collection(
+            client,
+            alias=args.alias,
+            target_name=args.target,
+            batch_size=args.batch_size,
+            replace_collection=args.replace_collection,
+            drop_old=args.drop_old,
+            index_timeout_seconds=args.index_timeout,
+            vector_name=args.vector_name,
+        )
+    finally:
+        await client.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alias", default=os.getenv("QDRANT_COLLECTION_NAME", "face_embeddings"),
+                        help="Alias the service uses (QDRANT_COLLECTION_NAME)")
+    parser.add_argument("--target", default=None, help="Name of the new collection (default: <alias>_<unix time>)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per scroll/upsert page")
+    parser.add_argument("--replace-collection", action="store_true",
+                        help="Allow replacing a physical collection named like the alias")
+    parser.add_argument("--drop-old", action="store_true", help="Delete the previous collection after the swap")
+    parser.add_argument("--index-timeout", type=float, default=600.0,
+                        help="Seconds to wait for the new collection to finish indexing before swapping")
+    parser.add_argument("--vector-name", default=None,
+                        help="Named vector that receives unnamed source vectors (default: FACE_EMBEDDING_MODEL)")
+    asyncio.run(_main(parser.parse_args()))
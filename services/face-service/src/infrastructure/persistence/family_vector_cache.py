@@ -0,0 +1,379 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.domain.interfaces.face_repository import IFaceRepository
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def _normalize_id(point_id: Any) -> Any:
+    # Qdrant trả id UUID ở dạng chữ thường có gạch nối; chuẩn hóa để khớp với id do client gửi lên.
+    if isinstance(point_id, int):
+        return point_id
+    try:
+        return str(uuid.UUID(str(point_id)))
+    except ValueError:
+        return point_id
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _FamilyIndex:
+    """Vectors of one family as a contiguous, L2-normalised float32 matrix plus ids and payloads."""
+
+    def __init__(self, ids: List[Any], payloads: List[Dict[str, Any]], vectors: np.ndarray):
+        self.ids = ids
+        self.payloads = payloads
+        self.matrix = np.ascontiguousarray(_unit_rows(vectors.astype(np.float32, copy=False)))
+        self.positions = {point_id: i for i, point_id in enumerate(ids)}
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        # Payload được ước lượng thô theo kích thước dict; đủ để áp ngân sách bộ nhớ.
+        return self.matrix.nbytes + sum(sys.getsizeof(payload) for payload in self.payloads)
+
+    def upsert(self, point_id: Any, vector: List[float], payload: Dict[str, Any]):
+        row = _unit_rows(np.asarray([vector], dtype=np.float32))
+        position = self.positions.get(point_id)
+        if position is not None:
+            self.matrix[position] = row[0]
+            self.payloads[position] = payload
+            return
+        self.positions[point_id] = len(self.ids)
+        self.ids.append(point_id)
+        self.payloads.append(payload)
+        self.matrix = np.vstack([self.matrix, row]) if len(self.ids) > 1 else row
+
+    def remove(self, point_ids: List[Any]):
+        drop = {self.positions[point_id] for point_id in point_ids if point_id in self.positions}
+        if not drop:
+            return
+        keep = [i for i in range(len(self.ids)) if i not in drop]
+        self.ids = [self.ids[i] for i in keep]
+        self.payloads = [self.payloads[i] for i in keep]
+        self.matrix = np.ascontiguousarray(self.matrix[keep])
+        self.positions = {point_id: i for i, point_id in enumerate(self.ids)}
+
+    def search(
+        self, queries: np.ndarray, top_k: int, threshold: float, member_id: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        if not self.ids:
+            return [[] for _ in range(len(queries))]
+        scores = _unit_rows(queries) @ self.matrix.T
+        if member_id is not None:
+            mask = np.array([payload.get("member_id") != member_id for payload in self.payloads])
+            scores[:, mask] = -np.inf
+
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append([
+                {"id": self.ids[i], "score": float(row[i]), "payload": self.payloads[i]}
+                for i in ordered
+                if row[i] >= threshold
+            ])
+        return results
+
+
+class CachedFaceRepository(IFaceRepository):
+    """
+    In-process cache of per-family vector matrices in front of another IFaceRepository.
+
+    Family-scoped searches are answered with one matrix product against the family's vectors
+    instead of a round trip to the vector database. Writes go through to the wrapped repository
+    and are applied to any cached family, so the face.add/face.delete events handled by the
+    message consumer keep the cache in sync. Families are evicted least-recently-used once the
+    memory budget is exceeded, and reloaded after `ttl_seconds` to bound staleness from writes
+    made by other service instances.
+    """
+
+    def __init__(
+        self,
+        repository: IFaceRepository,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        page_size: int = 1000,
+    ):
+        self.repository = repository
+        self.max_bytes = int(max_bytes or os.getenv("FAMILY_VECTOR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        self.ttl_seconds = float(
+            ttl_seconds if ttl_seconds is not None else os.getenv("FAMILY_VECTOR_CACHE_TTL_SECONDS", 300)
+        )
+        self.page_size = page_size
+        self._families: "OrderedDict[str, _FamilyIndex]" = OrderedDict()
+        self._face_families: Dict[Any, str] = {}
+        self._generations: Dict[str, int] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # --- Cache management ---
+
+    def _bump_generation(self, family_id: str):
+        self._generations[family_id] = self._generations.get(family_id, 0) + 1
+
+    def _drop_family(self, family_id: str):
+        index = self._families.pop(family_id, None)
+        if index is None:
+            return
+        self._bytes -= index.nbytes
+        for point_id in index.ids:
+            self._face_families.pop(point_id, None)
+
+    def _install(self, family_id: str, index: _FamilyIndex):
+        self._drop_family(family_id)
+        if index.nbytes > self.max_bytes:
+            logger.info("Family %s (%d bytes) exceeds the vector cache budget; not cached.", family_id, index.nbytes)
+            return
+        self._families[family_id] = index
+        self._bytes += index.nbytes
+        for point_id in index.ids:
+            self._face_families[point_id] = family_id
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._families:
+            family_id = next(iter(self._families))
+            self._drop_family(family_id)
+            self._evictions += 1
+            logger.info("Evicted family %s from the vector cache.", family_id)
+
+    def _cached(self, family_id: str) -> Optional[_FamilyIndex]:
+        index = self._families.get(family_id)
+        if index is None:
+            return None
+        if time.monotonic() - index.loaded_at > self.ttl_seconds:
+            self._drop_family(family_id)
+            return None
+        self._families.move_to_end(family_id)
+        return index
+
+    async def _load_family(self, family_id: str) -> _FamilyIndex:
+        ids, payloads, vectors = [], [], []
+        missing = 0
+        async for face in self.repository.iter_faces_by_family_id(
+            family_id, page_size=self.page_size, with_vectors=True
+        ):
+            # Điểm chưa có vector của model đang dùng (named vectors, trước khi re-embedding xong) cũng
+            # không được Qdrant trả về khi tìm kiếm: bỏ qua để giữ cùng kết quả.
+            if not face.get("vector"):
+                missing += 1
+                continue
+            ids.append(_normalize_id(face["id"]))
+            payloads.append(face["payload"] or {})
+            vectors.append(face["vector"])
+        if missing:
+            logger.info("Skipped %d faces of family %s without the active vector.", missing, family_id)
+        matrix = np.asarray(vectors, dtype=np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return _FamilyIndex(ids, payloads, matrix)
+
+    async def _get_family(self, family_id: str) -> _FamilyIndex:
+        index = self._cached(family_id)
+        if index is not None:
+            self._hits += 1
+            return index
+
+        lock = self._load_locks.setdefault(family_id, asyncio.Lock())
+        async with lock:
+            index = self._cached(family_id)
+            if index is not None:
+                self._hits += 1
+                return index
+            self._misses += 1
+            generation = self._generations.get(family_id, 0)
+            index = await self._load_family(family_id)
+            # Nếu có thao tác ghi trong lúc đang tải, ảnh chụp có thể đã cũ: dùng cho lần này nhưng không lưu.
+            if self._generations.get(family_id, 0) == generation:
+                self._install(family_id, index)
+            return index
+
+    def _apply_upsert(self, face_id: Any, vector: List[float], metadata: Dict[str, Any]):
+        face_id = _normalize_id(face_id)
+        family_id = metadata.get("family_id")
+        previous_family = self._face_families.get(face_id)
+        if previous_family is not None and previous_family != family_id:
+            self._apply_delete([face_id])
+        if family_id is None:
+            return
+        self._bump_generation(family_id)
+        index = self._families.get(family_id)
+        if index is None:
+            return
+        self._bytes -= index.nbytes
+        index.upsert(face_id, vector, metadata)
+        self._bytes += index.nbytes
+        self._face_families[face_id] = family_id
+        self._evict()
+
+    def _apply_delete(self, face_ids: List[Any]):
+        by_family: Dict[str, List[Any]] = {}
+        for face_id in map(_normalize_id, face_ids):
+            family_id = self._face_families.pop(face_id, None)
+            if family_id is not None:
+                by_family.setdefault(family_id, []).append(face_id)
+        for family_id, ids in by_family.items():
+            self._bump_generation(family_id)
+            index = self._families.get(family_id)
+            if index is None:
+                continue
+            self._bytes -= index.nbytes
+            index.remove(ids)
+            self._bytes += index.nbytes
+
+    def _apply_payload(self, payload: Dict[str, Any], face_ids: List[Any]):
+        for face_id in map(_normalize_id, face_ids):
+            family_id = self._face_families.get(face_id)
+            index = self._families.get(family_id) if family_id is not None else None
+            if index is None:
+                continue
+            position = index.positions[face_id]
+            index.payloads[position] = {**index.payloads[position], **payload}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "families": len(self._families),
+            "faces": len(self._face_families),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
+
+    # --- IFaceRepository ---
+
+    async def async_init(self):
+        await self.repository.async_init()
+
+    async def close(self):
+        await self.repository.close()
+
+    async def collection_stats(self) -> Dict[str, Any]:
+        return await self.repository.collection_stats()
+
+    async def get_faces_page(
+        self, limit: int, offset: Optional[Any] = None, missing_vector: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        return await self.repository.get_faces_page(limit, offset=offset, missing_vector=missing_vector)
+
+    async def count_faces(self, missing_vector: Optional[str] = None) -> int:
+        return await self.repository.count_faces(missing_vector=missing_vector)
+
+    async def update_face_vectors(self, vectors: Dict[Any, List[float]], vector_name: str) -> int:
+        # Cache chỉ giữ vector của model đang hoạt động; vector của model khác không ảnh hưởng tới cache
+        return await self.repository.update_face_vectors(vectors, vector_name)
+
+    async def set_faces_payload(self, updates: List[Tuple[Dict[str, Any], List[Any]]]) -> int:
+        updated = await self.repository.set_faces_payload(updates)
+        for payload, face_ids in updates:
+            self._apply_payload(payload, face_ids)
+        return updated
+
+    async def upsert_face_vector(self, face_id: str, vector: List[float], metadata: Dict[str, Any]):
+        await self.repository.upsert_face_vector(face_id, vector, metadata)
+        self._apply_upsert(face_id, vector, metadata)
+
+    async def upsert_face_vectors(self, faces: List[Dict[str, Any]], wait: bool = True) -> int:
+        count = await self.repository.upsert_face_vectors(faces, wait=wait)
+        for face in faces:
+            self._apply_upsert(face["face_id"], face["vector"], face["metadata"])
+        return count
+
+    async def search_similar_faces(
+        self,
+        query_vector: List[float],
+        family_id: Optional[str] = None,
+        member_id: Optional[str] = None,
+        top_k: int = 5,
+        threshold: float = 0.75,
+    ) -> List[Dict[str, Any]]:
+        if family_id is None:
+            return await self.repository.search_similar_faces(
+                query_vector, family_id=family_id, member_id=member_id, top_k=top_k, threshold=threshold
+            )
+        index = await self._get_family(family_id)
+        queries = np.asarray([query_vector], dtype=np.float32)
+        return index.search(queries, top_k, threshold, member_id=member_id)[0]
+
+    async def batch_search_similar_faces(
+        self,
+        query_vectors: List[List[float]],
+        family_id: Optional[str] = None,
+        top_k: int = 5,
+        threshold: float = 0.75,
+    ) -> List[List[Dict[str, Any]]]:
+        if family_id is None or not query_vectors:
+            return await self.repository.batch_search_similar_faces(
+                query_vectors, family_id=family_id, top_k=top_k, threshold=threshold
+            )
+        index = await self._get_family(family_id)
+        return index.search(np.asarray(query_vectors, dtype=np.float32), top_k, threshold)
+
+    async def get_faces_by_family_id(self, family_id: str, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        return await self.repository.get_faces_by_family_id(family_id, with_vectors=with_vectors)
+
+    async def get_faces_page_by_family_id(
+        self,
+        family_id: str,
+        limit: int,
+        offset: Optional[Any] = None,
+        with_vectors: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        return await self.repository.get_faces_page_by_family_id(
+            family_id, limit, offset=offset, with_vectors=with_vectors
+        )
+
+    def iter_faces_by_family_id(
+        self,
+        family_id: str,
+        page_size: int = 1000,
+        offset: Optional[Any] = None,
+        with_vectors: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        return self.repository.iter_faces_by_family_id(
+            family_id, page_size=page_size, offset=offset, with_vectors=with_vectors
+        )
+
+    async def delete_face(self, face_id: str) -> bool:
+        success = await self.repository.delete_face(face_id)
+        self._apply_delete([face_id])
+        return success
+
+    async def delete_faces(self, face_ids: List[str]) -> bool:
+        success = await self.repository.delete_faces(face_ids)
+        self._apply_delete(face_ids)
+        return success
+
+    async def delete_faces_by_family_id(self, family_id: str) -> bool:
+        success = await self.repository.delete_faces_by_family_id(family_id)
+        self._bump_generation(family_id)
+        self._drop_family(family_id)
+        return success
+
+    async def delete_faces_by_member_id(self, member_id: str) -> bool:
+        success = await self.repository.delete_faces_by_member_id(member_id)
+        self._apply_delete([
+            point_id
+            for index in self._families.values()
+            for point_id, payload in zip(index.ids, index.payloads)
+            if payload.get("member_id") == member_id
+        ])
+        return success
@@ -1,40 +1,143 @@
+import asyncio
 import os
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, models
 from qdrant_client.http.models import UpdateStatus
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 
+from src.application.services.instrumentation import timed_stage
 from src.domain.interfaces.face_repository import IFaceRepository
+from src.infrastructure.persistence.collection_layout import (
+    PAYLOAD_INDEXES,
+    CollectionLayout,
+    ensure_payload_indexes,
+    estimate_memory,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
 class QdrantFaceRepository(IFaceRepository):
-    def __init__(self, collection_name: Optional[str] = None):
+    def __init__(
+        self,
+        collection_name: Optional[str] = None,
+        client: Optional[AsyncQdrantClient] = None,
+        layout: Optional[CollectionLayout] = None,
+        vector_name: Optional[str] = None,
+    ):
+        # Có thể là tên alias: sau khi migration đổi alias, mọi thao tác tự chuyển sang collection mới.
         self.collection_name = collection_name or os.getenv("QDRANT_COLLECTION_NAME", "face_embeddings")
         self.vector_size = int(os.getenv("QDRANT_VECTOR_SIZE", 128))
-        self.client = QdrantClient(
+        # Bố cục lưu trữ (quantization, vector trên đĩa, HNSW) và search params tương ứng
+        self.layout = layout or CollectionLayout()
+        self.search_params = self.layout.search_params()
+        # Với named vectors, đọc/ghi dùng vector của model embedding đang hoạt động; None = vector không tên
+        self.vector_name = None
+        if self.layout.named_vectors:
+            self.vector_name = (vector_name or os.getenv("FACE_EMBEDDING_MODEL", "facenet")).lower()
+            if self.vector_name not in self.layout.vector_models:
+                raise ValueError(
+                    f"Embedding model '{self.vector_name}' has no named vector; QDRANT_VECTOR_MODELS="
+                    f"{self.layout.vector_models}."
+                )
+        # Payload index khai báo (member_id, face_id, local_db_id; family_id là khóa tenant)
+        self.payload_indexes = PAYLOAD_INDEXES
+        # Một AsyncQdrantClient duy nhất cho cả process (repository là singleton trong ModelRegistry),
+        # giữ pool kết nối keep-alive thay vì mở kết nối mới cho mỗi request.
+        self.client = client or self._create_client()
+        # Ghi hàng loạt: số điểm mỗi lần upsert và số lần upsert chạy song song
+        self.upsert_batch_size = max(1, int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", 256)))
+        self.upsert_parallelism = max(1, int(os.getenv("QDRANT_UPSERT_PARALLELISM", 4)))
+        # Tìm kiếm hàng loạt: số query mỗi lần gọi query_batch_points và số lần gọi song song
+        self.batch_search_chunk_size = max(1, int(os.getenv("QDRANT_BATCH_SEARCH_CHUNK_SIZE", 16)))
+        self.batch_search_parallelism = max(1, int(os.getenv("QDRANT_BATCH_SEARCH_PARALLELISM", 4)))
+        # Số điểm mỗi trang khi scroll toàn bộ một family
+        self.scroll_page_size = max(1, int(os.getenv("QDRANT_SCROLL_PAGE_SIZE", 1000)))
+
+    @staticmethod
+    def _create_client() -> AsyncQdrantClient:
+        pool_size = os.getenv("QDRANT_POOL_SIZE")
+        timeout = os.getenv("QDRANT_TIMEOUT_SECONDS")
+        return AsyncQdrantClient(
             host=os.getenv("QDRANT_HOST"),
             api_key=os.getenv("QDRANT_API_KEY"),
+            prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true",
+            grpc_port=int(os.getenv("QDRANT_GRPC_PORT", 6334)),
+            timeout=int(timeout) if timeout else None,
+            pool_size=int(pool_size) if pool_size else None,
         )
-        self._create_collection_if_not_exists()
 
-    def _create_collection_if_not_exists(self):
-        if not self.client.collection_exists(collection_name=self.collection_name):
-            logger.info(f"Collection '{self.collection_name}' does not exist. Creating it now...")
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(size=self.vector_size, distance=models.Distance.COSINE),
-            )
-            self.client.create_payload_index(
+    async def async_init(self):
+        await self._create_collection_if_not_exists()
+
+    async def close(self):
+        await self.client.close()
+
+    async def _create_collection_if_not_exists(self):
+        if not await self.client.collection_exists(collection_name=self.collection_name):
+            logger.info("Collection '%s' does not exist. Creating it now...", self.collection_name)
+            await self.client.create_collection(
                 collection_name=self.collection_name,
-                field_name="family_id",
-                field_schema=models.PayloadSchemaType.KEYWORD,
+                **self.layout.collection_kwargs(self.vector_size),
             )
-            logger.info(f"Collection '{self.collection_name}' created successfully with family_id index.")
+            logger.info("Collection '%s' created successfully.", self.collection_name)
         else:
-            logger.info(f"Collection '{self.collection_name}' already exists. Skipping creation.")
+            logger.info("Collection '%s' already exists. Skipping creation.", self.collection_name)
+        # Kiểm tra payload index ở mỗi lần khởi động: collection cũ chỉ có index family_id
+        created = await ensure_payload_indexes(self.client, self.collection_name, self.payload_indexes)
+        if created:
+            logger.info("Created payload indexes %s on collection '%s'.", created, self.collection_name)
+
+    async def collection_stats(self) -> Dict[str, Any]:
+        """
+        Segment/point counts, indexed payload fields, storage config and an estimate of the memory
+        used by vectors, quantized vectors and HNSW links.
+        """
+        info = await self.client.get_collection(collection_name=self.collection_name)
+        payload_schema = info.payload_schema or {}
+        vectors = info.config.params.vectors
+        quantization = info.config.quantization_config
+        return {
+            "collection_name": self.collection_name,
+            "status": getattr(info.status, "value", info.status),
+            "segments_count": info.segments_count,
+            "points_count": info.points_count,
+            "indexed_vectors_count": info.indexed_vectors_count,
+            "indexed_fields": {
+                field_name: {
+                    "data_type": getattr(index.data_type, "value", index.data_type),
+                    "is_tenant": bool(getattr(index.params, "is_tenant", False)),
+                    "points": index.points,
+                }
+                for field_name, index in payload_schema.items()
+            },
+            "missing_indexes": sorted(set(self.payload_indexes) - set(payload_schema)),
+            "vectors": (
+                {name: params.model_dump(mode="json", exclude_none=True) for name, params in vectors.items()}
+                if isinstance(vectors, dict) else vectors.model_dump(mode="json", exclude_none=True)
+            ),
+            "hnsw_config": info.config.hnsw_config.model_dump(mode="json", exclude_none=True),
+            "quantization": quantization.model_dump(mode="json", exclude_none=True) if quantization else None,
+            "memory": estimate_memory(info),
+        }
+
+    def _search_kwargs(self, key: str) -> Dict[str, Any]:
+        # Chỉ truyền search params khi bố cục cần (oversampling/rescore, hnsw_ef) và tên vector khi dùng named vectors
+        kwargs: Dict[str, Any] = {key: self.search_params} if self.search_params is not None else {}
+        if self.vector_name is not None:
+            kwargs["using"] = self.vector_name
+        return kwargs
+
+    def _point_vector(self, vector: Any) -> Any:
+        if self.vector_name is None or isinstance(vector, dict):
+            return vector
+        return {self.vector_name: vector}
+
+    def _read_vector(self, vector: Any) -> Any:
+        if self.vector_name is not None and isinstance(vector, dict):
+            return vector.get(self.vector_name)
+        return vector
 
     async def upsert_face_vector(self, face_id: str, vector: List[float], metadata: Dict[str, Any]):
         """
@@ -43,16 +146,41 @@ class QdrantFaceRepository(IFaceRepository):
         points = [
             models.PointStruct(
                 id=face_id,
-                vector=vector,
+                vector=self._point_vector(vector),
                 payload=metadata,
             )
         ]
-        self.client.upsert(
-            collection_name=self.collection_name,
-            wait=True,
-            points=points
-        )
-        logger.info(f"Upserted embedding for point_id: {face_id} to collection '{self.collection_name}'.")
+        with timed_stage("qdrant_upsert"):
+            await self.client.upsert(
+                collection_name=self.collection_name,
+                wait=True,
+                points=points
+            )
+        logger.info("Upserted embedding for point_id: %s to collection '%s'.", face_id, self.collection_name)
+
+    async def upsert_face_vectors(self, faces: List[Dict[str, Any]], wait: bool = True) -> int:
+        """
+        Inserts or updates many face vectors, split into chunks that are upserted concurrently.
+        """
+        points = [
+            models.PointStruct(id=face["face_id"], vector=self._point_vector(face["vector"]), payload=face["metadata"])
+            for face in faces
+        ]
+        if not points:
+            return 0
+        semaphore = asyncio.Semaphore(self.upsert_parallelism)
+
+        async def upsert_chunk(chunk: List[models.PointStruct]):
+            async with semaphore:
+                with timed_stage("qdrant_upsert"):
+                    await self.client.upsert(collection_name=self.collection_name, wait=wait, points=chunk)
+
+        await asyncio.gather(*(
+            upsert_chunk(points[start:start + self.upsert_batch_size])
+            for start in range(0, len(points), self.upsert_batch_size)
+        ))
+        logger.info("Upserted %d embeddings to collection '%s' (wait=%s).", len(points), self.collection_name, wait)
+        return len(points)
 
     async def search_similar_faces(
         self,
@@ -88,13 +216,15 @@ class QdrantFaceRepository(IFaceRepository):
                 must=qdrant_filter_conditions
             )
 
-        search_result_raw = self.client.query_points(
-            collection_name=self.collection_name,
-            query=query_vector,
-            limit=top_k,
-            query_filter=qdrant_filter,
-            score_threshold=threshold, # Use score_threshold here
-        )
+        with timed_stage("qdrant_search"):
+            search_result_raw = await self.client.query_points(
+                collection_name=self.collection_name,
+                query=query_vector,
+                limit=top_k,
+                query_filter=qdrant_filter,
+                score_threshold=threshold, # Use score_threshold here
+                **self._search_kwargs("search_params"),
+            )
         
         search_hits = search_result_raw.points
         
@@ -105,52 +235,163 @@ class QdrantFaceRepository(IFaceRepository):
                     "score": hit.score,
                     "payload": hit.payload
                 })   
-        logger.info(f"Qdrant search completed. Found {len(results)} hits above threshold. Results: "
-                    f"{[{'id': r['id'], 'score': r['score'], 'payload': r.get('payload', 'N/A')} for r in results]}")
+        logger.info("Qdrant search completed. Found %d hits above threshold.", len(results))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Qdrant search hits: %s", results)
         return results
 
-    async def get_faces_by_family_id(self, family_id: str) -> List[Dict[str, Any]]:
+    async def get_faces_by_family_id(self, family_id: str, with_vectors: bool = False) -> List[Dict[str, Any]]:
         """
-        Retrieves all faces associated with a given family ID.
+        Retrieves all faces associated with a given family ID, following scroll pages to the end.
+        """
+        results = [
+            face async for face in self.iter_faces_by_family_id(
+                family_id, page_size=self.scroll_page_size, with_vectors=with_vectors
+            )
+        ]
+        logger.info("Retrieved %d points with filter {'family_id': '%s'}.", len(results), family_id)
+        return results
+
+    async def get_faces_page_by_family_id(
+        self,
+        family_id: str,
+        limit: int,
+        offset: Optional[Any] = None,
+        with_vectors: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """
+        Retrieves one scroll page of the faces associated with a given family ID.
         """
-        payload_filter = {"family_id": family_id}
         qdrant_filter = models.Filter(
             must=[
                 models.FieldCondition(
-                    key=k,
-                    match=models.MatchValue(value=v)
-                ) for k, v in payload_filter.items()
+                    key="family_id",
+                    match=models.MatchValue(value=family_id)
+                )
             ]
         )
+        # Cursor đến từ query string: id dạng số phải được chuyển lại thành int.
+        if isinstance(offset, str) and offset.isdigit():
+            offset = int(offset)
 
-        hits, _ = self.client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=qdrant_filter,
-            limit=10000,
-            with_payload=True,
-            with_vectors=False,
-        )
+        with timed_stage("qdrant_scroll"):
+            hits, next_page_offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=qdrant_filter,
+                limit=limit,
+                offset=offset,
+                with_payload=True,
+                with_vectors=[self.vector_name] if with_vectors and self.vector_name else with_vectors,
+            )
         results = []
         for hit in hits:
-            results.append({
+            face = {
                 "id": hit.id,
                 "payload": hit.payload
-            })
-        logger.info(f"Retrieved {len(results)} points with filter {payload_filter}.")
-        return results
+            }
+            if with_vectors:
+                face["vector"] = self._read_vector(hit.vector)
+            results.append(face)
+        return results, next_page_offset
+
+    @staticmethod
+    def _missing_vector_filter(missing_vector: Optional[str]) -> Optional[models.Filter]:
+        if missing_vector is None:
+            return None
+        return models.Filter(must_not=[models.HasVectorCondition(has_vector=missing_vector)])
+
+    async def get_faces_page(
+        self,
+        limit: int,
+        offset: Optional[Any] = None,
+        missing_vector: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """
+        Retrieves one scroll page over the whole collection, optionally only points without the
+        named vector `missing_vector`.
+        """
+        with timed_stage("qdrant_scroll"):
+            hits, next_page_offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._missing_vector_filter(missing_vector),
+                limit=limit,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+        return [{"id": hit.id, "payload": hit.payload} for hit in hits], next_page_offset
+
+    async def count_faces(self, missing_vector: Optional[str] = None) -> int:
+        """
+        Counts the points of the collection, optionally only those without the named vector `missing_vector`.
+        """
+        response = await self.client.count(
+            collection_name=self.collection_name,
+            count_filter=self._missing_vector_filter(missing_vector),
+            exact=True,
+        )
+        return response.count
+
+    async def update_face_vectors(self, vectors: Dict[Any, List[float]], vector_name: str) -> int:
+        """
+        Sets the named vector `vector_name` of existing points, leaving their payload and other vectors untouched.
+        """
+        if not vectors:
+            return 0
+        with timed_stage("qdrant_upsert"):
+            await self.client.update_vectors(
+                collection_name=self.collection_name,
+                points=[
+                    models.PointVectors(id=face_id, vector={vector_name: vector})
+                    for face_id, vector in vectors.items()
+                ],
+                wait=True,
+            )
+        return len(vectors)
+
+    async def set_faces_payload(self, updates: List[Tuple[Dict[str, Any], List[Any]]]) -> int:
+        """
+        Sets payload fields on existing points with batched `set_payload` operations: every request
+        carries at most QDRANT_UPSERT_BATCH_SIZE points, spread over as many operations as needed.
+        """
+        operations: List[models.SetPayloadOperation] = []
+        batch_points = 0
+        updated = 0
+
+        async def flush():
+            with timed_stage("qdrant_set_payload"):
+                await self.client.batch_update_points(
+                    collection_name=self.collection_name, update_operations=operations, wait=True
+                )
+
+        for payload, face_ids in updates:
+            for start in range(0, len(face_ids), self.upsert_batch_size):
+                chunk = list(face_ids[start:start + self.upsert_batch_size])
+                operations.append(models.SetPayloadOperation(
+                    set_payload=models.SetPayload(payload=payload, points=chunk)
+                ))
+                batch_points += len(chunk)
+                updated += len(chunk)
+                if batch_points >= self.upsert_batch_size:
+                    await flush()
+                    operations, batch_points = [], 0
+        if operations:
+            await flush()
+        return updated
 
     async def delete_face(self, face_id: str) -> bool:
         """
         Deletes a specific face by its ID.
         """
         try:
-            response = self.client.delete(
-                collection_name=self.collection_name,
-                points_selector=models.PointIdsList(points=[face_id]),
-                wait=True
-            )
+            with timed_stage("qdrant_delete"):
+                response = await self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=models.PointIdsList(points=[face_id]),
+                    wait=True
+                )
             if response.status == UpdateStatus.COMPLETED:
-                logger.info(f"Point with ID {face_id} deleted successfully.")
+                logger.info("Point with ID %s deleted successfully.", face_id)
                 return True
             else:
                 logger.warning(f"Failed to delete point with ID {face_id}. Status: {response.status}")
@@ -159,6 +400,29 @@ class QdrantFaceRepository(IFaceRepository):
             logger.error(f"Error deleting point with ID {face_id}: {e}")
             return False
 
+    async def delete_faces(self, face_ids: List[str]) -> bool:
+        """
+        Deletes several faces by their IDs in a single request.
+        """
+        if not face_ids:
+            return True
+        try:
+            with timed_stage("qdrant_delete"):
+                response = await self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=models.PointIdsList(points=face_ids),
+                    wait=True
+                )
+            if response.status == UpdateStatus.COMPLETED:
+                logger.info("Deleted %d points successfully.", len(face_ids))
+                return True
+            else:
+                logger.warning(f"Failed to delete {len(face_ids)} points. Status: {response.status}")
+                return False
+        except Exception as e:
+            logger.error(f"Error deleting {len(face_ids)} points: {e}")
+            return False
+
     async def delete_faces_by_family_id(self, family_id: str) -> bool:
         """
         Deletes all faces associated with a given family ID.
@@ -173,15 +437,16 @@ class QdrantFaceRepository(IFaceRepository):
             ]
         )
         try:
-            response = self.client.delete(
-                collection_name=self.collection_name,
-                points_selector=models.PointSelector(
-                    filter=qdrant_filter
-                ),
-                wait=True
-            )
+            with timed_stage("qdrant_delete"):
+                response = await self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=models.FilterSelector(
+                        filter=qdrant_filter
+                    ),
+                    wait=True
+                )
             if response.status == UpdateStatus.COMPLETED:
-                logger.info(f"Deleted points with filter {payload_filter} successfully.")
+                logger.info("Deleted points with filter %s successfully.", payload_filter)
                 return True
             else:
                 logger.warning(f"Failed to delete points with filter {payload_filter}. Status: {response.status}")
@@ -204,15 +469,16 @@ class QdrantFaceRepository(IFaceRepository):
             ]
         )
         try:
-            response = self.client.delete(
-                collection_name=self.collection_name,
-                points_selector=models.PointSelector(
-                    filter=qdrant_filter
-                ),
-                wait=True
-            )
+            with timed_stage("qdrant_delete"):
+                response = await self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=models.FilterSelector(
+                        filter=qdrant_filter
+                    ),
+                    wait=True
+                )
             if response.status == UpdateStatus.COMPLETED:
-                logger.info(f"Deleted points with filter {payload_filter} successfully.")
+                logger.info("Deleted points with filter %s successfully.", payload_filter)
                 return True
             else:
                 logger.warning(f"Failed to delete points with filter {payload_filter}. Status: {response.status}")
@@ -256,26 +522,41 @@ class QdrantFaceRepository(IFaceRepository):
                     limit=top_k,
                     filter=qdrant_filter, # parameter name is 'filter'
                     score_threshold=threshold,
-                    with_payload=True
+                    with_payload=True,
+                    **self._search_kwargs("params"),
                 )
             )
 
-        batch_search_results_raw = self.client.query_batch_points(
-            collection_name=self.collection_name,
-            requests=batch_queries, # parameter name is 'requests'
-        )
-        
+        # Gửi theo từng nhóm nhỏ, song song có giới hạn, để một ảnh nhiều khuôn mặt
+        # không tạo thành một request lớn duy nhất.
+        semaphore = asyncio.Semaphore(self.batch_search_parallelism)
+
+        async def query_chunk(chunk: List[models.QueryRequest]):
+            async with semaphore:
+                with timed_stage("qdrant_batch_search"):
+                    return await self.client.query_batch_points(
+                        collection_name=self.collection_name,
+                        requests=chunk, # parameter name is 'requests'
+                    )
+
+        chunk_results = await asyncio.gather(*(
+            query_chunk(batch_queries[start:start + self.batch_search_chunk_size])
+            for start in range(0, len(batch_queries), self.batch_search_chunk_size)
+        ))
+
         all_results = []
-        for search_result_raw in batch_search_results_raw:
-            individual_results = []
-            for hit in search_result_raw.points:
-                logger.info(f"  Hit: id={hit.id}, score={hit.score}, payload={hit.payload}")
-                individual_results.append({
-                    "id": hit.id,
-                    "score": hit.score,
-                    "payload": hit.payload if hit.payload is not None else {}
-                })
-            all_results.append(individual_results)
-        
-        logger.info(f"Qdrant batch search completed for {len(query_vectors)} queries.")
+        for batch_search_results_raw in chunk_results:
+            for search_result_raw in batch_search_results_raw:
+                all_results.append([
+                    {
+                        "id": hit.id,
+                        "score": hit.score,
+                        "payload": hit.payload if hit.payload is not None else {}
+                    }
+                    for hit in search_result_raw.points
+                ])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Qdrant batch search hits: %s", all_results)
+
+        logger.info("Qdrant batch search completed for %d queries.", len(query_vectors))
         return all_results
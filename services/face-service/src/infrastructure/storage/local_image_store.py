@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from src.domain.interfaces.image_store import IImageStore
+from src.infrastructure.image_io import ImageDecodeError, decode_image
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class LocalFileImageStore(IImageStore):
+    """
+    Image store backed by a local directory, standing in for the object storage that hosts
+    `thumbnail_url` / `original_image_url` (IMAGE_STORE_DIR, default ./image_store).
+
+    A URL maps to `<root>/<host>/<path>`, so a mirror of the bucket (or a test fixture) can be
+    dropped in without renaming files. Files are read and decoded on the default thread pool.
+    """
+
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = os.path.abspath(root_dir or os.getenv("IMAGE_STORE_DIR", "./image_store"))
+
+    def path_for(self, url: str) -> str:
+        parsed = urlparse(url)
+        relative = os.path.normpath(os.path.join(parsed.netloc, parsed.path.lstrip("/")))
+        if relative.startswith(".."):
+            raise ValueError(f"Image URL escapes the store root: {url}")
+        return os.path.join(self.root_dir, relative)
+
+    def save(self, url: str, data: bytes) -> str:
+        path = self.path_for(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _read(self, url: str) -> Optional[np.ndarray]:
+        path = self.path_for(url)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            return decode_image(data)
+        except ImageDecodeError as e:
+            logger.warning("Stored image %s cannot be decoded: %s", path, e)
+            return None
+
+    async def load_image(self, url: str) -> Optional[np.ndarray]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, url)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from src.infrastructure.image_io import IMAGE_FORMATS, encode_image
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class ThumbnailGenerator:
+    """
+    Crops, downscales and encodes face thumbnails off the event loop.
+
+    Each face is cropped as a view of the decoded image, shrunk with INTER_AREA when its longest
+    side exceeds `max_side` (0 = keep the crop size) and encoded as PNG, JPEG or WebP. The faces
+    of one image are encoded in parallel on a dedicated thread pool (cv2 releases the GIL while
+    resizing and encoding), separate from the inference executor so thumbnails never take
+    inference slots.
+    """
+
+    def __init__(
+        self,
+        image_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        max_side: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.image_format = (image_format or os.getenv("THUMBNAIL_FORMAT", "png")).lower()
+        if self.image_format == "jpg":
+            self.image_format = "jpeg"
+        if self.image_format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Invalid THUMBNAIL_FORMAT '{self.image_format}'. Expected one of {sorted(IMAGE_FORMATS)}."
+            )
+        self.quality = min(100, max(1, int(quality or os.getenv("THUMBNAIL_QUALITY", 85))))
+        self.max_side = max(0, int(max_side if max_side is not None else os.getenv("THUMBNAIL_MAX_SIDE", 0)))
+        self.max_workers = max(1, int(max_workers or os.getenv("THUMBNAIL_WORKERS", min(4, os.cpu_count() or 1))))
+        self._executor = executor or ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="thumbnail")
+
+    @property
+    def media_type(self) -> str:
+        return IMAGE_FORMATS[self.image_format][1]
+
+    @property
+    def extension(self) -> str:
+        return IMAGE_FORMATS[self.image_format][0]
+
+    def render(self, image: np.ndarray, box: Sequence[int]) -> bytes:
+        """Encodes the crop `box` ([x, y, w, h]) of a BGR image as one thumbnail."""
+        x, y, w, h = [int(v) for v in box]
+        crop = image[max(0, y):y + h, max(0, x):x + w]
+        height, width = crop.shape[:2]
+        if self.max_side and max(height, width) > self.max_side:
+            scale = self.max_side / max(height, width)
+            crop = cv2.resize(
+                crop,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+        return encode_image(crop, self.image_format, self.quality)
+
+    async def render_many(self, image: np.ndarray, boxes: Sequence[Sequence[int]]) -> List[bytes]:
+        """Encodes one thumbnail per box, in parallel on the thumbnail thread pool."""
+        if not boxes:
+            return []
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self.render, image, box) for box in boxes
+        )))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "format": self.image_format,
+            "quality": self.quality,
+            "max_side": self.max_side,
+            "max_workers": self.max_workers,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
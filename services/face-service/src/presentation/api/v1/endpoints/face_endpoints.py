@@ -1,35 +1,113 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Body, Depends
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Body, Depends, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Literal, Optional, Dict, Any, Union
 import uuid
+import json
+import time
 import base64
-import io
-from PIL import Image
 import logging
 
-from src.domain.entities.models import BoundingBox, FaceDetectionResult, FaceMetadata, FaceSearchRequest, FaceSearchResult, FaceAddVectorRequest, FaceSearchVectorRequest, BatchFaceSearchVectorRequest
-from src.application.services.face_manager import FaceManager
-from src.presentation.dependencies import get_face_manager
+from src.domain.entities.models import BoundingBox, FaceDetectionResult, FaceMetadata, FaceSearchRequest, FaceSearchResult, FaceAddVectorRequest, BulkFaceAddVectorRequest, BulkOperationStatus, FamilyFacesPage, FamilyClusteringRequest, FamilyClusteringStatus, FaceSearchVectorRequest, BatchFaceSearchVectorRequest, BatchFaceSearchColumnarResult
+from src.application.services.face_manager import FaceManager, parse_upsample_mode
+from src.application.services.bulk_operations import BulkOperationTracker
+from src.application.services.instrumentation import timed_stage
+from src.presentation.dependencies import get_face_manager, get_bulk_operation_tracker, get_detection_cache, get_thumbnail_generator
+from src.infrastructure.detection_cache import DetectionResultCache
+from src.infrastructure.inference_executor import InferenceQueueFullError
+from src.infrastructure.detectors.detector_pool import UnknownDetectorTierError
+from src.infrastructure.image_io import ImageDecodeError, decode_image
+from src.infrastructure.thumbnails import ThumbnailGenerator
+from src.infrastructure.metrics import get_histogram
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-def _generate_thumbnail(image: Image.Image, bbox: List[int]) -> Optional[str]:
-    """Helper to generate base64 encoded thumbnail from cropped face."""
-    x, y, w, h = bbox
-    cropped_face = image.crop((x, y, x + w, y + h))
-    buffered = io.BytesIO()
-    cropped_face.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+batch_search_latency = get_histogram(
+    "batch_search_latency_seconds", buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+batch_search_size = get_histogram("batch_search_queries", buckets=(1, 2, 5, 10, 20, 50, 100))
 
-@router.post("/faces/detect", response_model=List[FaceDetectionResult])
+DuplicatePolicy = Literal["off", "skip", "merge", "flag"]
+DUPLICATE_POLICY_DESCRIPTION = (
+    "Near-duplicate handling within the family (default DUPLICATE_FACE_POLICY): skip, merge into the "
+    "existing face, flag with duplicate_of, or off."
+)
+
+def _multipart_detection_response(
+    results: List[FaceDetectionResult], thumbnails: List[bytes], thumbnail_generator: ThumbnailGenerator
+) -> Response:
+    """
+    multipart/form-data response: a "results" JSON part, then one binary part per thumbnail named
+    after the face id. Avoids the ~33% base64 inflation and the JSON escaping of large strings.
+    """
+    boundary = uuid.uuid4().hex
+    body = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="results"\r\n'
+        f"Content-Type: application/json\r\n\r\n".encode(),
+        json.dumps([result.model_dump(mode="json") for result in results]).encode(),
+        b"\r\n",
+    ]
+    for result, thumbnail in zip(results, thumbnails):
+        body += [
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{result.id}"; '
+            f'filename="{result.id}{thumbnail_generator.extension}"\r\n'
+            f"Content-Type: {thumbnail_generator.media_type}\r\n\r\n".encode(),
+            thumbnail,
+            b"\r\n",
+        ]
+    body.append(f"--{boundary}--\r\n".encode())
+    return Response(content=b"".join(body), media_type=f"multipart/form-data; boundary={boundary}")
+
+def _invalid_image(e: ImageDecodeError) -> HTTPException:
+    logger.warning(f"Could not decode uploaded image: {e}")
+    return HTTPException(status_code=400, detail=str(e))
+
+def _service_busy(e: InferenceQueueFullError) -> HTTPException:
+    """Maps a rejected inference job to 503 so clients back off instead of timing out."""
+    logger.warning(f"Rejecting request, inference queue is full: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Face service is busy. Please retry later.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+@router.post(
+    "/faces/detect",
+    response_model=List[FaceDetectionResult],
+    responses={200: {"content": {"multipart/form-data": {}}}},
+)
 async def detect_faces(
     file: UploadFile = File(...),
     return_crop: Optional[bool] = Query(
         False,
         description="Whether to return base64 encoded cropped face images",
     ),
-    face_manager: FaceManager = Depends(get_face_manager)
+    max_side: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Run detection on a copy downscaled to this longest side (0 = full resolution). Defaults to DETECTION_MAX_SIDE.",
+    ),
+    upsample: Optional[str] = Query(
+        None,
+        pattern="^(adaptive|[0-3])$",
+        description=(
+            "Detector upsampling: 0-3, or 'adaptive' to upsample only when no face is found. Defaults to DETECTION_UPSAMPLE. "
+            "Only affects dlib tiers; RetinaFace tiers ignore it (use a tier with a larger det_size for small faces)."
+        ),
+    ),
+    tier: Optional[str] = Query(
+        None,
+        description="Detector tier from FACE_DETECTOR_TIERS (e.g. 'fast', 'accurate'). Defaults to FACE_DETECTOR_DEFAULT_TIER.",
+    ),
+    response_format: str = Query(
+        "json",
+        pattern="^(json|multipart)$",
+        description="'json' returns thumbnails base64-encoded in each result; 'multipart' returns multipart/form-data with a 'results' JSON part and one binary thumbnail part per face, named after the face id.",
+    ),
+    face_manager: FaceManager = Depends(get_face_manager),
+    detection_cache: Optional[DetectionResultCache] = Depends(get_detection_cache),
+    thumbnail_generator: ThumbnailGenerator = Depends(get_thumbnail_generator),
 ):
     logger.info(
         "Received request to detect faces. Filename: %s, ReturnCrop: %s",
@@ -45,11 +123,30 @@ async def detect_faces(
 
     try:
         image_data = await file.read()
-        image = Image.open(io.BytesIO(image_data)).convert("RGB")
+        upsample_mode = parse_upsample_mode(upsample)
+        image = None
+        detected_faces_with_embeddings = None
+        cache_key = None
+        if detection_cache is not None:
+            # Ảnh gửi lại (gắn thẻ lại, retry) trả kết quả từ cache mà không cần decode hay suy luận
+            effective_max_side, effective_upsample = face_manager.resolve_detection_params(max_side, upsample_mode)
+            cache_key = detection_cache.make_key(
+                image_data, max_side=effective_max_side, upsample=effective_upsample, tier=tier
+            )
+            detected_faces_with_embeddings = await detection_cache.get_async(cache_key, endpoint="/faces/detect")
 
-        detected_faces_with_embeddings = face_manager.detect_and_embed_faces(image)
-        logger.info(f"Face manager returned {len(detected_faces_with_embeddings)} detections with embeddings.")
-        logger.debug(f"Detections with embeddings: {detected_faces_with_embeddings}")
+        if detected_faces_with_embeddings is None:
+            # Decode một lần thành mảng BGR; phát hiện, cắt khuôn mặt và thumbnail đều dùng chung mảng này
+            with timed_stage("decode"):
+                image = decode_image(image_data)
+            detected_faces_with_embeddings = await face_manager.detect_and_embed_faces_async(
+                image, max_side=max_side, upsample=upsample_mode, tier=tier
+            )
+            if cache_key is not None:
+                await detection_cache.put_async(cache_key, detected_faces_with_embeddings, endpoint="/faces/detect")
+        logger.info("Face manager returned %d detections with embeddings.", len(detected_faces_with_embeddings))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Detections with embeddings: %s", detected_faces_with_embeddings)
 
         if not detected_faces_with_embeddings:
             logger.info("No faces detected in the image.")
@@ -57,27 +154,46 @@ async def detect_faces(
                 status_code=404, detail="No faces detected in the image."
             )
 
+        if return_crop and image is None:
+            with timed_stage("decode"):
+                image = decode_image(image_data)
+
+        thumbnails: List[bytes] = []
+        if return_crop:
+            # Cắt, thu nhỏ và encode song song trên thread pool riêng, không chặn event loop
+            with timed_stage("thumbnails"):
+                thumbnails = await thumbnail_generator.render_many(
+                    image, [det_with_embed["box"] for det_with_embed in detected_faces_with_embeddings]
+                )
+        inline_thumbnails = return_crop and response_format == "json"
+
         results: List[FaceDetectionResult] = []
-        for det_with_embed in detected_faces_with_embeddings:
+        for index, det_with_embed in enumerate(detected_faces_with_embeddings):
             x, y, w, h = det_with_embed["box"]
             
             face_result = FaceDetectionResult(
                 id=str(uuid.uuid4()),
                 bounding_box=BoundingBox(x=int(x), y=int(y), width=int(w), height=int(h)),
                 confidence=float(det_with_embed["confidence"]),
-                thumbnail=_generate_thumbnail(image, det_with_embed["box"]) if return_crop else None,
+                thumbnail=base64.b64encode(thumbnails[index]).decode("ascii") if inline_thumbnails else None,
                 embedding=det_with_embed["embedding"],
+                landmarks=det_with_embed.get("landmarks"),
             )
             results.append(face_result)
-            logger.debug(
-                "Generated FaceDetectionResult: %s", face_result.model_dump_json()
-            )
 
-        logger.info(f"Returning {len(results)} face detection results.")
+        logger.info("Returning %d face detection results.", len(results))
+        if response_format == "multipart":
+            return _multipart_detection_response(results, thumbnails, thumbnail_generator)
         return results
 
     except HTTPException as e:
         raise e
+    except ImageDecodeError as e:
+        raise _invalid_image(e)
+    except UnknownDetectorTierError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except InferenceQueueFullError as e:
+        raise _service_busy(e)
     except Exception as e:
         logger.error(f"Face detection failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Face detection failed: {e}")
@@ -102,13 +218,18 @@ async def add_face_with_metadata(
 
     try:
         image_data = await file.read()
-        face_image = Image.open(io.BytesIO(image_data)).convert("RGB")
+        with timed_stage("decode"):
+            face_image = decode_image(image_data)
 
         metadata_dict = FaceMetadata.model_validate_json(metadata).model_dump()
 
         result = await face_manager.add_face(face_image, metadata_dict)
-        logger.info(f"Face added successfully: {result['face_id']}")
+        logger.info("Face added successfully: %s", result['face_id'])
         return result
+    except ImageDecodeError as e:
+        raise _invalid_image(e)
+    except InferenceQueueFullError as e:
+        raise _service_busy(e)
     except Exception as e:
         logger.error(f"Failed to add face: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to add face: {e}")
@@ -117,15 +238,16 @@ async def add_face_with_metadata(
 @router.post("/faces/vector", response_model=Dict[str, Any])
 async def add_face_by_vector(
     request: FaceAddVectorRequest,
+    duplicate_policy: Optional[DuplicatePolicy] = Query(None, description=DUPLICATE_POLICY_DESCRIPTION),
     face_manager: FaceManager = Depends(get_face_manager),
 ):
-    logger.info(
-        f"Received request to add face by vector for memberId: {request.metadata.member_id}"
-    )
+    logger.info("Received request to add face by vector for memberId: %s", request.metadata.member_id)
     try:
         metadata_dict = request.metadata.model_dump()
-        result = await face_manager.add_face_by_vector(request.vector, metadata_dict)
-        logger.info(f"Face added by vector successfully: {result['face_id']}")
+        result = await face_manager.add_face_by_vector(
+            request.vector, metadata_dict, duplicate_policy=duplicate_policy
+        )
+        logger.info("Face added by vector successfully: %s", result['face_id'])
         return result
     except Exception as e:
         logger.error(f"Failed to add face by vector: {e}", exc_info=True)
@@ -134,34 +256,112 @@ async def add_face_by_vector(
         )
 
 
+@router.post("/faces/vectors:bulk", response_model=BulkOperationStatus)
+async def add_faces_by_vectors_bulk(
+    request: BulkFaceAddVectorRequest,
+    response: Response,
+    duplicate_policy: Optional[DuplicatePolicy] = Query(None, description=DUPLICATE_POLICY_DESCRIPTION),
+    face_manager: FaceManager = Depends(get_face_manager),
+    tracker: BulkOperationTracker = Depends(get_bulk_operation_tracker),
+):
+    logger.info("Received bulk request to add %d faces by vector (wait=%s).", len(request.faces), request.wait)
+    faces = [{"vector": face.vector, "metadata": face.metadata.model_dump()} for face in request.faces]
+
+    def job():
+        return face_manager.add_faces_by_vectors(faces, wait=True, duplicate_policy=duplicate_policy)
+
+    try:
+        if request.wait:
+            result = await job()
+            return BulkOperationStatus(status="completed", **result)
+
+        # Ghi ở nền: job vẫn chờ Qdrant xác nhận (wait=True) để trạng thái "completed" là chính xác.
+        operation_id = tracker.submit(job, count=len(faces))
+        response.status_code = 202
+        return BulkOperationStatus(operation_id=operation_id, status="pending", count=len(faces))
+    except Exception as e:
+        logger.error(f"Failed to add faces by vector in bulk: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to add faces by vector in bulk: {e}")
+
+
+@router.get("/faces/vectors:bulk/{operation_id}", response_model=BulkOperationStatus)
+async def get_bulk_operation_status(
+    operation_id: str,
+    tracker: BulkOperationTracker = Depends(get_bulk_operation_tracker),
+):
+    operation = tracker.get(operation_id)
+    if operation is None:
+        raise HTTPException(status_code=404, detail=f"Bulk operation {operation_id} not found.")
+    result = operation["result"] or {}
+    return BulkOperationStatus(
+        operation_id=operation_id,
+        status=operation["status"],
+        count=result.get("count", operation.get("count", 0)),
+        face_ids=result.get("face_ids", []),
+        duplicates=result.get("duplicates", []),
+        error=operation["error"],
+    )
+
+
 @router.post("/faces/search_by_vector", response_model=List[FaceSearchResult])
 async def search_faces_by_vector(
     request: FaceSearchVectorRequest,
     face_manager: FaceManager = Depends(get_face_manager),
 ):
     logger.info(
-        f"Received request to search faces by vector. FamilyId: {request.family_id}, MemberId: {request.member_id}, TopK: {request.top_k}, Threshold: {request.threshold}"
+        "Received request to search faces by vector. FamilyId: %s, MemberId: %s, TopK: %s, Threshold: %s",
+        request.family_id, request.member_id, request.top_k, request.threshold,
     )
     try:
         search_results = await face_manager.search_similar_faces_by_vector(
             request.embedding, request.family_id, request.member_id, request.top_k, request.threshold
         )
-        logger.info(f"Returning {len(search_results)} search results by vector.")
+        logger.info("Returning %d search results by vector.", len(search_results))
         return search_results
     except Exception as e:
         logger.error(f"Failed to search faces by vector: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to search faces by vector: {e}")
 
 
-@router.get("/faces/family/{family_id}", response_model=List[Dict[str, Any]])
+async def _stream_family_faces_ndjson(faces: AsyncIterator[Dict[str, Any]], family_id: str) -> AsyncIterator[str]:
+    count = 0
+    try:
+        async for face in faces:
+            count += 1
+            yield json.dumps(face) + "\n"
+    except Exception as e:
+        # Header đã được gửi nên không thể trả về 500; dừng stream và ghi log.
+        logger.error(f"Failed while streaming faces for family {family_id} after {count} faces: {e}", exc_info=True)
+        return
+    logger.info("Streamed %d faces for family_id: %s", count, family_id)
+
+
+@router.get("/faces/family/{family_id}", response_model=Union[List[Dict[str, Any]], FamilyFacesPage])
 async def get_faces_by_family(
     family_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Page size; returns a page object with next_page_offset."),
+    offset: Optional[str] = Query(None, description="Cursor from next_page_offset of the previous page."),
+    with_vectors: bool = Query(False, description="Include each face's embedding under 'vector'."),
+    stream: bool = Query(False, description="Stream all faces as NDJSON (application/x-ndjson)."),
     face_manager: FaceManager = Depends(get_face_manager),
 ):
-    logger.info(f"Received request to get faces for family_id: {family_id}")
+    logger.info("Received request to get faces for family_id: %s", family_id)
     try:
-        faces = await face_manager.get_faces_by_family_id(family_id)
-        logger.info(f"Returning {len(faces)} faces for family_id: {family_id}")
+        if stream:
+            faces_iter = face_manager.iter_faces_by_family_id(
+                family_id, page_size=limit or 1000, offset=offset, with_vectors=with_vectors
+            )
+            return StreamingResponse(
+                _stream_family_faces_ndjson(faces_iter, family_id), media_type="application/x-ndjson"
+            )
+        if limit is not None:
+            faces, next_page_offset = await face_manager.get_faces_page_by_family_id(
+                family_id, limit, offset=offset, with_vectors=with_vectors
+            )
+            logger.info("Returning page of %d faces for family_id: %s", len(faces), family_id)
+            return FamilyFacesPage(faces=faces, next_page_offset=next_page_offset)
+        faces = await face_manager.get_faces_by_family_id(family_id, with_vectors=with_vectors)
+        logger.info("Returning %d faces for family_id: %s", len(faces), family_id)
         return faces
     except Exception as e:
         logger.error(
@@ -170,16 +370,63 @@ async def get_faces_by_family(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve faces: {e}")
 
 
+@router.post("/faces/family/{family_id}/clusters", response_model=FamilyClusteringStatus)
+async def cluster_family_faces(
+    family_id: str,
+    response: Response,
+    request: Optional[FamilyClusteringRequest] = None,
+    face_manager: FaceManager = Depends(get_face_manager),
+    tracker: BulkOperationTracker = Depends(get_bulk_operation_tracker),
+):
+    request = request or FamilyClusteringRequest()
+    logger.info("Received request to cluster faces of family %s (wait=%s).", family_id, request.wait)
+
+    def job():
+        return face_manager.cluster_family_faces(
+            family_id, threshold=request.threshold, min_cluster_size=request.min_cluster_size
+        )
+
+    try:
+        if request.wait:
+            result = await job()
+            return FamilyClusteringStatus(family_id=family_id, status="completed", result=result)
+
+        operation_id = tracker.submit(job, kind="cluster_family", family_id=family_id)
+        response.status_code = 202
+        return FamilyClusteringStatus(operation_id=operation_id, family_id=family_id, status="pending")
+    except Exception as e:
+        logger.error(f"Failed to cluster faces of family {family_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to cluster faces: {e}")
+
+
+@router.get("/faces/family/{family_id}/clusters/{operation_id}", response_model=FamilyClusteringStatus)
+async def get_family_clustering_status(
+    family_id: str,
+    operation_id: str,
+    tracker: BulkOperationTracker = Depends(get_bulk_operation_tracker),
+):
+    operation = tracker.get(operation_id)
+    if operation is None or operation.get("kind") != "cluster_family" or operation.get("family_id") != family_id:
+        raise HTTPException(status_code=404, detail=f"Clustering operation {operation_id} not found.")
+    return FamilyClusteringStatus(
+        operation_id=operation_id,
+        family_id=family_id,
+        status=operation["status"],
+        result=operation["result"],
+        error=operation["error"],
+    )
+
+
 @router.delete("/faces/{face_id}", response_model=Dict[str, str])
 async def delete_face_by_id(
     face_id: str,
     face_manager: FaceManager = Depends(get_face_manager),
 ):
-    logger.info(f"Received request to delete face with face_id: {face_id}")
+    logger.info("Received request to delete face with face_id: %s", face_id)
     try:
         success = await face_manager.delete_face(face_id)
         if success:
-            logger.info(f"Face {face_id} deleted successfully.")
+            logger.info("Face %s deleted successfully.", face_id)
             return {"message": f"Face {face_id} deleted successfully."}
         else:
             raise HTTPException(
@@ -198,11 +445,11 @@ async def delete_faces_by_family_id(
     family_id: str,
     face_manager: FaceManager = Depends(get_face_manager),
 ):
-    logger.info(f"Received request to delete faces for family_id: {family_id}")
+    logger.info("Received request to delete faces for family_id: %s", family_id)
     try:
         success = await face_manager.delete_faces_by_family_id(family_id)
         if success:
-            logger.info(f"Faces for family {family_id} deleted successfully.")
+            logger.info("Faces for family %s deleted successfully.", family_id)
             return {"message": f"Faces for family {family_id} deleted successfully."}
         else:
             raise HTTPException(
@@ -225,35 +472,51 @@ async def search_faces(
     request: FaceSearchRequest,
     face_manager: FaceManager = Depends(get_face_manager),
 ):
-    logger.info(
-        f"Received request to search faces. FamilyId: {request.family_id}, Limit: {request.limit}"
-    )
+    logger.info("Received request to search faces. FamilyId: %s, Limit: %s", request.family_id, request.limit)
     try:
         image_bytes = base64.b64decode(request.query_image)
-        query_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        with timed_stage("decode"):
+            query_image = decode_image(image_bytes)
 
         search_results = await face_manager.search_similar_faces(
             query_image, request.family_id, request.limit
         )
-        logger.info(f"Returning {len(search_results)} search results.")
+        logger.info("Returning %d search results.", len(search_results))
         return search_results
+    except ImageDecodeError as e:
+        raise _invalid_image(e)
+    except InferenceQueueFullError as e:
+        raise _service_busy(e)
     except Exception as e:
         logger.error(f"Failed to search faces: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to search faces: {e}")
 
-@router.post("/faces/batch-search-vectors", response_model=List[List[FaceSearchResult]])
+@router.post(
+    "/faces/batch-search-vectors",
+    response_model=Union[List[List[FaceSearchResult]], BatchFaceSearchColumnarResult],
+)
 async def batch_search_faces_by_vectors(
     request: BatchFaceSearchVectorRequest,
     face_manager: FaceManager = Depends(get_face_manager),
 ):
     logger.info(
-        f"Received request for batch search of faces by vectors. Number of vectors: {len(request.vectors)}, FamilyId: {request.family_id}, TopK: {request.top_k}, Threshold: {request.threshold}"
+        "Received request for batch search of faces by vectors. Number of vectors: %d, FamilyId: %s, TopK: %s, Threshold: %s",
+        len(request.vectors), request.family_id, request.top_k, request.threshold,
     )
     try:
+        started = time.perf_counter()
         search_results = await face_manager.search_similar_faces_by_vectors(
             request.vectors, request.family_id, request.top_k, request.threshold
         )
-        logger.info(f"Returning {len(search_results)} batch search results.")
+        batch_search_latency.observe(time.perf_counter() - started)
+        batch_search_size.observe(len(request.vectors))
+        logger.info("Returning %d batch search results.", len(search_results))
+        if request.columnar:
+            return BatchFaceSearchColumnarResult(
+                ids=[[str(hit["id"]) for hit in hits] for hits in search_results],
+                scores=[[hit["score"] for hit in hits] for hits in search_results],
+                payloads=[[hit["payload"] for hit in hits] for hits in search_results] if request.with_payload else None,
+            )
         return search_results
     except Exception as e:
         logger.error(f"Failed to perform batch search for faces by vectors: {e}", exc_info=True)
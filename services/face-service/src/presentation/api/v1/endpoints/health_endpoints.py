@@ -0,0 +1,137 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import Dict, Any, Optional
+import logging
+
+from src.infrastructure.embeddings.micro_batcher import EmbeddingMicroBatcher
+from src.infrastructure.inference_executor import InferenceExecutor
+from src.infrastructure.detection_cache import DetectionResultCache
+from src.infrastructure.detectors.detector_pool import DetectorPool
+from src.infrastructure.persistence.family_vector_cache import CachedFaceRepository
+from src.application.services.reembedding import ReembeddingJob
+from src.domain.interfaces.face_detector import IFaceDetector
+from src.domain.interfaces.face_repository import IFaceRepository
+from src.infrastructure.model_registry import ModelRegistry
+from src.infrastructure.metrics import registered_histograms, render_prometheus
+from src.presentation.dependencies import get_model_registry, get_embedding_batcher, get_inference_executor, get_detection_cache, get_face_detector, get_face_repository, get_reembedding_job
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+@router.get("/health/live", response_model=Dict[str, Any])
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", response_model=Dict[str, Any])
+async def readiness(registry: ModelRegistry = Depends(get_model_registry)):
+    """Reports ready only once every model in the registry has been loaded."""
+    body = {
+        "status": "ready" if registry.is_ready else "not_ready",
+        "models": registry.status(),
+    }
+    if not registry.is_ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@router.get("/stats/embedding-batcher", response_model=Dict[str, Any])
+async def embedding_batcher_stats(
+    embedding_batcher: Optional[EmbeddingMicroBatcher] = Depends(get_embedding_batcher),
+):
+    """Queue-depth and batch-size histograms of the cross-request embedding micro-batcher."""
+    if embedding_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_batcher.stats()}
+
+
+@router.get("/stats/inference-executor", response_model=Dict[str, Any])
+async def inference_executor_stats(
+    inference_executor: InferenceExecutor = Depends(get_inference_executor),
+):
+    """Concurrency limits and in-flight jobs of the CPU inference executor."""
+    return inference_executor.stats()
+
+
+@router.get("/stats/batch-search", response_model=Dict[str, Any])
+async def batch_search_stats():
+    """Per-batch latency and batch size histograms of POST /faces/batch-search-vectors."""
+    histograms = registered_histograms()
+    return {
+        name: histograms[name].snapshot()
+        for name in ("batch_search_latency_seconds", "batch_search_queries")
+        if name in histograms
+    }
+
+
+@router.get("/stats/detection-cache", response_model=Dict[str, Any])
+async def detection_cache_stats(
+    detection_cache: Optional[DetectionResultCache] = Depends(get_detection_cache),
+):
+    """Per-endpoint hit/miss counters and tier sizes of the detection result cache."""
+    if detection_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **detection_cache.stats()}
+
+
+@router.get("/stats/family-vector-cache", response_model=Dict[str, Any])
+async def family_vector_cache_stats(face_repository: IFaceRepository = Depends(get_face_repository)):
+    """Cached families, memory use and hit/miss/eviction counters of the per-family vector cache."""
+    if not isinstance(face_repository, CachedFaceRepository):
+        return {"enabled": False}
+    return {"enabled": True, **face_repository.stats()}
+
+
+@router.get("/stats/detectors", response_model=Dict[str, Any])
+async def detector_stats(face_detector: IFaceDetector = Depends(get_face_detector)):
+    """Configured detector tiers, their backend and per-tier detection latency histograms."""
+    if not isinstance(face_detector, DetectorPool):
+        return {"tiers": {}}
+    return face_detector.stats()
+
+
+@router.get("/admin/collection/stats", response_model=Dict[str, Any])
+async def collection_stats(face_repository: IFaceRepository = Depends(get_face_repository)):
+    """Segment counts, indexed payload fields and estimated memory of the face collection."""
+    return await face_repository.collection_stats()
+
+
+def _require_reembedding_job(job: Optional[ReembeddingJob]) -> ReembeddingJob:
+    if job is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Re-embedding is not configured: set FACE_EMBEDDING_BACKFILL_MODEL and QDRANT_NAMED_VECTORS=true.",
+        )
+    return job
+
+
+@router.post("/admin/reembedding", status_code=202, response_model=Dict[str, Any])
+async def start_reembedding(job: Optional[ReembeddingJob] = Depends(get_reembedding_job)):
+    """Starts backfilling the FACE_EMBEDDING_BACKFILL_MODEL vectors of all stored faces."""
+    job = _require_reembedding_job(job)
+    if not job.start():
+        raise HTTPException(status_code=409, detail="Re-embedding is already running.")
+    return job.progress()
+
+
+@router.get("/admin/reembedding", response_model=Dict[str, Any])
+async def reembedding_progress(job: Optional[ReembeddingJob] = Depends(get_reembedding_job)):
+    """Progress (processed/remaining faces), throughput and ETA of the re-embedding job."""
+    return _require_reembedding_job(job).progress()
+
+
+@router.delete("/admin/reembedding", response_model=Dict[str, Any])
+async def cancel_reembedding(job: Optional[ReembeddingJob] = Depends(get_reembedding_job)):
+    """Stops the re-embedding job after the page in progress."""
+    job = _require_reembedding_job(job)
+    if not job.cancel():
+        raise HTTPException(status_code=409, detail="Re-embedding is not running.")
+    return job.progress()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """All process-wide histograms and counters in the Prometheus text exposition format."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
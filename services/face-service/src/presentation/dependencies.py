@@ -1,51 +1,223 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from fastapi import Depends
 # from dotenv import load_dotenv # Đã xóa load_dotenv
 
 from src.domain.interfaces.face_detector import IFaceDetector
 from src.domain.interfaces.face_embedding import IFaceEmbedding
 from src.domain.interfaces.face_repository import IFaceRepository
+from src.domain.interfaces.image_store import IImageStore
 
 from src.infrastructure.detectors.dlib_detector import DlibFaceDetector
 from src.infrastructure.detectors.retinaface_detector import RetinaFaceDetector
+from src.infrastructure.detectors.detector_pool import DetectorPool, parse_detector_tiers
 from src.infrastructure.embeddings.facenet_embedding import FaceNetEmbeddingService
 from src.infrastructure.embeddings.arcface_embedding import ArcFaceEmbedding
+from src.infrastructure.embeddings.micro_batcher import EmbeddingMicroBatcher
 from src.infrastructure.persistence.qdrant_client import QdrantFaceRepository
+from src.infrastructure.persistence.family_vector_cache import CachedFaceRepository
+from src.infrastructure.persistence.collection_layout import CollectionLayout
+from src.infrastructure.storage.local_image_store import LocalFileImageStore
 from src.infrastructure.message_bus.consumer_impl import MessageConsumer
+from src.infrastructure.model_registry import ModelRegistry
+from src.infrastructure.detection_cache import DetectionResultCache
+from src.infrastructure.thumbnails import ThumbnailGenerator
+from src.infrastructure.inference_executor import (
+    InferenceExecutor,
+    ProcessPoolFaceDetector,
+    ProcessPoolFaceEmbedding,
+    create_component_process_pool,
+    warm_up_process_pool,
+)
 
 from src.application.services.face_manager import FaceManager
+from src.application.services.bulk_operations import BulkOperationTracker
+from src.application.services.reembedding import ReembeddingJob
 
 # Tải các biến môi trường từ tệp .env (Đã bị loại bỏ để ưu tiên biến môi trường từ Docker Compose)
 # load_dotenv()
 
-def get_face_detector() -> IFaceDetector:
-    detector_model = os.getenv("FACE_DETECTOR_MODEL", "dlib").lower()
-    if detector_model == "retinaface":
-        return RetinaFaceDetector()
-    elif detector_model == "dlib":
-        return DlibFaceDetector()
-    else:
-        raise ValueError(f"Mô hình phát hiện khuôn mặt không hợp lệ: {detector_model}. Chỉ chấp nhận 'dlib' hoặc 'retinaface'.")
+def _detector_tiers_spec() -> str:
+    # Mặc định một tier duy nhất "default" dùng FACE_DETECTOR_MODEL (tương thích cấu hình cũ)
+    return os.getenv("FACE_DETECTOR_TIERS") or f"default={os.getenv('FACE_DETECTOR_MODEL', 'dlib').lower()}"
 
-def get_face_embedding_service() -> IFaceEmbedding:
+def _create_dlib_process_pool() -> Optional[ProcessPoolExecutor]:
+    # dlib giữ GIL trong suốt quá trình suy luận nên được chạy trong process pool riêng (nếu bật);
+    # các model ONNX (retinaface/arcface) giải phóng GIL và chạy trong thread pool là đủ.
+    processes = int(os.getenv("DLIB_PROCESS_POOL_SIZE", 0))
+    if processes <= 0:
+        return None
+    factories = {}
+    if any(backend == "dlib" for backend, _ in parse_detector_tiers(_detector_tiers_spec()).values()):
+        factories["face_detector"] = DlibFaceDetector
+    if os.getenv("FACE_EMBEDDING_MODEL", "facenet").lower() == "facenet":
+        factories["face_embedding_service"] = FaceNetEmbeddingService
+    if not factories:
+        return None
+    pool = create_component_process_pool(factories, processes)
+    warm_up_process_pool(pool, processes)
+    return pool
+
+def _create_dlib_detector() -> IFaceDetector:
+    dlib_pool = model_registry.get("dlib_process_pool")
+    if dlib_pool is not None:
+        return ProcessPoolFaceDetector("face_detector", dlib_pool)
+    return DlibFaceDetector()
+
+def _create_face_detector() -> IFaceDetector:
+    # Các backend được tải song song (chỉ những backend có tier tham chiếu tới), chọn theo tier mỗi request
+    return DetectorPool(
+        {"dlib": _create_dlib_detector, "retinaface": RetinaFaceDetector},
+        parse_detector_tiers(_detector_tiers_spec()),
+        default_tier=os.getenv("FACE_DETECTOR_DEFAULT_TIER"),
+    )
+
+def _create_face_embedding_service() -> IFaceEmbedding:
     embedding_model = os.getenv("FACE_EMBEDDING_MODEL", "facenet").lower()
     print(f"DEBUG: FACE_EMBEDDING_MODEL detected as: {embedding_model}") # Debug print
     if embedding_model == "arcface":
         return ArcFaceEmbedding()
     elif embedding_model == "facenet":
+        dlib_pool = model_registry.get("dlib_process_pool")
+        if dlib_pool is not None:
+            return ProcessPoolFaceEmbedding("face_embedding_service", dlib_pool)
         return FaceNetEmbeddingService()
     else:
         raise ValueError(f"Mô hình nhúng khuôn mặt không hợp lệ: {embedding_model}. Chỉ chấp nhận 'facenet' hoặc 'arcface'.")
 
+def _backfill_embedding_model() -> Optional[str]:
+    # Model embedding đích khi chuyển model (ví dụ facenet -> arcface); None nếu không có backfill
+    model = os.getenv("FACE_EMBEDDING_BACKFILL_MODEL", "").lower()
+    if not model or model == os.getenv("FACE_EMBEDDING_MODEL", "facenet").lower():
+        return None
+    return model
+
+def _create_backfill_embedding_service() -> Optional[IFaceEmbedding]:
+    model = _backfill_embedding_model()
+    if model is None:
+        return None
+    if not CollectionLayout().named_vectors:
+        raise ValueError("FACE_EMBEDDING_BACKFILL_MODEL yêu cầu QDRANT_NAMED_VECTORS=true.")
+    if model == "arcface":
+        return ArcFaceEmbedding()
+    elif model == "facenet":
+        return FaceNetEmbeddingService()
+    raise ValueError(f"Mô hình nhúng backfill không hợp lệ: {model}. Chỉ chấp nhận 'facenet' hoặc 'arcface'.")
+
+def _create_image_store() -> IImageStore:
+    return LocalFileImageStore()
+
+def _create_reembedding_job() -> Optional[ReembeddingJob]:
+    backfill_service = get_backfill_embedding_service()
+    if backfill_service is None:
+        return None
+    return ReembeddingJob(
+        get_face_repository(),
+        backfill_service,
+        get_image_store(),
+        _backfill_embedding_model(),
+        inference_executor=get_inference_executor(),
+    )
+
+def _create_face_repository() -> IFaceRepository:
+    repository = QdrantFaceRepository()
+    if os.getenv("FAMILY_VECTOR_CACHE", "false").lower() == "true":
+        return CachedFaceRepository(repository)
+    return repository
+
+def _create_inference_executor() -> InferenceExecutor:
+    return InferenceExecutor()
+
+def _create_embedding_batcher() -> Optional[EmbeddingMicroBatcher]:
+    if os.getenv("EMBEDDING_MICRO_BATCHING", "true").lower() != "true":
+        return None
+    return EmbeddingMicroBatcher(get_face_embedding_service(), inference_executor=get_inference_executor())
+
+def _create_bulk_operation_tracker() -> BulkOperationTracker:
+    return BulkOperationTracker(max_operations=int(os.getenv("BULK_OPERATION_HISTORY", 1000)))
+
+def _create_detection_cache() -> Optional[DetectionResultCache]:
+    if os.getenv("DETECTION_CACHE", "false").lower() != "true":
+        return None
+    # Khóa cache gồm tên model; tăng DETECTION_CACHE_VERSION khi thay file model cùng tên để bỏ kết quả cũ.
+    model_id = "{}/{}+{}{}@{}".format(
+        _detector_tiers_spec(),
+        os.getenv("FACE_DETECTOR_DEFAULT_TIER", ""),
+        os.getenv("FACE_EMBEDDING_MODEL", "facenet").lower(),
+        "/aligned" if os.getenv("FACE_ALIGNMENT", "false").lower() == "true" else "",
+        os.getenv("DETECTION_CACHE_VERSION", "1"),
+    )
+    return DetectionResultCache(model_id)
+
+def _create_thumbnail_generator() -> ThumbnailGenerator:
+    return ThumbnailGenerator()
+
+# Registry dùng chung cho toàn bộ process: model chỉ được tải một lần (warm-up lúc khởi động)
+# và được chia sẻ giữa các route FastAPI và MessageConsumer.
+model_registry = ModelRegistry()
+model_registry.register("dlib_process_pool", _create_dlib_process_pool)
+model_registry.register("face_detector", _create_face_detector)
+model_registry.register("face_embedding_service", _create_face_embedding_service)
+model_registry.register("face_repository", _create_face_repository)
+model_registry.register("inference_executor", _create_inference_executor)
+model_registry.register("embedding_batcher", _create_embedding_batcher)
+model_registry.register("bulk_operation_tracker", _create_bulk_operation_tracker)
+model_registry.register("detection_cache", _create_detection_cache)
+model_registry.register("thumbnail_generator", _create_thumbnail_generator)
+model_registry.register("backfill_embedding_service", _create_backfill_embedding_service)
+model_registry.register("image_store", _create_image_store)
+model_registry.register("reembedding_job", _create_reembedding_job)
+
+def get_model_registry() -> ModelRegistry:
+    return model_registry
+
+def get_face_detector() -> IFaceDetector:
+    return model_registry.get("face_detector")
+
+def get_face_embedding_service() -> IFaceEmbedding:
+    return model_registry.get("face_embedding_service")
+
 def get_face_repository() -> IFaceRepository:
-    return QdrantFaceRepository()
+    return model_registry.get("face_repository")
+
+def get_inference_executor() -> InferenceExecutor:
+    return model_registry.get("inference_executor")
+
+def get_embedding_batcher() -> Optional[EmbeddingMicroBatcher]:
+    return model_registry.get("embedding_batcher")
+
+def get_bulk_operation_tracker() -> BulkOperationTracker:
+    return model_registry.get("bulk_operation_tracker")
+
+def get_detection_cache() -> Optional[DetectionResultCache]:
+    return model_registry.get("detection_cache")
+
+def get_thumbnail_generator() -> ThumbnailGenerator:
+    return model_registry.get("thumbnail_generator")
+
+def get_backfill_embedding_service() -> Optional[IFaceEmbedding]:
+    return model_registry.get("backfill_embedding_service")
+
+def get_image_store() -> IImageStore:
+    return model_registry.get("image_store")
+
+def get_reembedding_job() -> Optional[ReembeddingJob]:
+    return model_registry.get("reembedding_job")
 
 def get_face_manager(
     face_repository: IFaceRepository = Depends(get_face_repository),
     face_embedding_service: IFaceEmbedding = Depends(get_face_embedding_service),
     face_detector_service: IFaceDetector = Depends(get_face_detector),
+    embedding_batcher: Optional[EmbeddingMicroBatcher] = Depends(get_embedding_batcher),
+    inference_executor: InferenceExecutor = Depends(get_inference_executor),
+    backfill_embedding_service: Optional[IFaceEmbedding] = Depends(get_backfill_embedding_service),
 ) -> FaceManager:
-    return FaceManager(face_repository, face_embedding_service, face_detector_service)
+    return FaceManager(
+        face_repository, face_embedding_service, face_detector_service, embedding_batcher, inference_executor,
+        backfill_embedding_service=backfill_embedding_service,
+        backfill_vector_name=_backfill_embedding_model() if backfill_embedding_service is not None else None,
+    )
 
 def get_message_consumer() -> MessageConsumer:
     # Directly resolve dependencies when called outside FastAPI's request context
@@ -56,6 +228,9 @@ def get_message_consumer() -> MessageConsumer:
     face_manager_instance = get_face_manager(
         face_repository=face_repository_instance,
         face_embedding_service=face_embedding_service_instance,
-        face_detector_service=face_detector_service_instance
+        face_detector_service=face_detector_service_instance,
+        embedding_batcher=get_embedding_batcher(),
+        inference_executor=get_inference_executor(),
+        backfill_embedding_service=get_backfill_embedding_service(),
     )
     return MessageConsumer(face_manager_instance)
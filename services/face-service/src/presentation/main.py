@@ -2,26 +2,65 @@ from fastapi import FastAPI
 import uvicorn
 import logging
 import asyncio
+import os
 from contextlib import asynccontextmanager
 
+from src.application.services.instrumentation import add_stage_observer, add_value_observer
+from src.infrastructure.logging_config import configure_logging
+from src.infrastructure.metrics import observe_stage, observe_value
 from src.infrastructure.message_bus.consumer_impl import MessageConsumer
-from src.presentation.dependencies import get_message_consumer
-from src.presentation.api.v1.endpoints import face_endpoints
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format=("%(asctime)s - %(levelname)s - %(message)s")
+from src.presentation.dependencies import (
+    get_message_consumer,
+    get_model_registry,
+    get_embedding_batcher,
+    get_inference_executor,
+    get_face_repository,
+    get_detection_cache,
+    get_thumbnail_generator,
+    get_reembedding_job,
 )
+from src.presentation.api.v1.endpoints import face_endpoints, health_endpoints
+from src.presentation.server_timing import ServerTimingMiddleware
+
+# Configure logging (sau khi import để cấu hình được mức log của các module hot path)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Thời gian từng giai đoạn và các phân phối (số khuôn mặt/ảnh, kích thước lô embedding) được xuất ở /metrics
+add_stage_observer(observe_stage)
+add_value_observer(observe_value)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up application and message consumer...")
+    # Tải trước toàn bộ model trong một thread để không chặn event loop.
+    model_registry = get_model_registry()
+    if await asyncio.to_thread(model_registry.warm_up):
+        logger.info("All models loaded. Service is ready.")
+    else:
+        logger.error(f"Some models failed to load: {model_registry.status()}")
+    face_repository = get_face_repository()
+    await face_repository.async_init()
     message_consumer: MessageConsumer = get_message_consumer()
     asyncio.create_task(message_consumer.start())
     yield
     logger.info("Shutting down application and message consumer...")
     await message_consumer.stop()
+    reembedding_job = get_reembedding_job()
+    if reembedding_job is not None:
+        reembedding_job.cancel()
+    embedding_batcher = get_embedding_batcher()
+    if embedding_batcher is not None:
+        await embedding_batcher.stop()
+    get_inference_executor().shutdown()
+    get_thumbnail_generator().shutdown()
+    detection_cache = get_detection_cache()
+    if detection_cache is not None:
+        detection_cache.close()
+    await face_repository.close()
+    dlib_pool = model_registry.get("dlib_process_pool")
+    if dlib_pool is not None:
+        dlib_pool.shutdown(wait=False, cancel_futures=True)
 
 app = FastAPI(
     title="ImageFaceService",
@@ -33,7 +72,12 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Header Server-Timing cho từng request (tắt mặc định)
+if os.getenv("SERVER_TIMING_HEADER", "false").lower() == "true":
+    app.add_middleware(ServerTimingMiddleware)
+
 app.include_router(face_endpoints.router, prefix="")
+app.include_router(health_endpoints.router, prefix="")
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,41 @@
+from typing import List, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.application.services.instrumentation import begin_request_timings, end_request_timings, request_timings
+
+
+def format_server_timing(timings: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings)
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a `Server-Timing` header listing every stage (decode, detect, crop, embed, qdrant_*)
+    recorded while the request was handled, so browser dev tools and curl show where time went.
+
+    Implemented as plain ASGI middleware: stages are collected in a context variable owned by the
+    request, and the header is added when the response starts.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                timings = request_timings()
+                if timings:
+                    MutableHeaders(scope=message).append("Server-Timing", format_server_timing(timings))
+            await send(message)
+
+        token = begin_request_timings()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request_timings(token)
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 import numpy as np
 from PIL import Image
 import cv2 # Cần import cv2 vì nó được mock
@@ -10,7 +10,7 @@ from src.domain.interfaces.face_embedding import IFaceEmbedding
 
 class TestArcFaceEmbedding(unittest.TestCase):
 
-    @patch('src.infrastructure.embeddings.arcface_embedding.onnxruntime.InferenceSession')
+    @patch('src.infrastructure.embeddings.onnx_session.onnxruntime.InferenceSession')
     @patch('src.infrastructure.embeddings.arcface_embedding.os.path.join')
     def setUp(self, MockOsPathJoin, MockInferenceSession):
         # Mock os.path.join to return a predictable path
@@ -28,7 +28,7 @@ class TestArcFaceEmbedding(unittest.TestCase):
         self.face_embedding_service = ArcFaceEmbedding()
 
         # Ensure InferenceSession was called correctly
-        MockInferenceSession.assert_called_once_with('dummy/path/w600k_r50.onnx', providers=['CPUExecutionProvider'])
+        MockInferenceSession.assert_called_once_with('dummy/path/w600k_r50.onnx', sess_options=ANY, providers=['CPUExecutionProvider'])
 
         # Create a dummy PIL Image for testing
         self.dummy_pil_image = Image.new('RGB', (100, 100), color='red')
@@ -93,3 +93,71 @@ class TestArcFaceEmbedding(unittest.TestCase):
             self.face_embedding_service.get_embedding(self.dummy_pil_image)
         self.mock_rec_session.run.assert_called_once()
 
+    def test_get_embeddings_runs_single_batched_inference(self):
+        # Test case when several crops are embedded in one ONNX run
+        self.mock_np_expand_dims.side_effect = lambda arr, axis: np.zeros((1, 3, 112, 112), dtype=np.float32)
+        self.mock_rec_session.run.return_value = [np.random.rand(3, 512).astype(np.float32)]
+
+        embeddings = self.face_embedding_service.get_embeddings([self.dummy_pil_image] * 3)
+
+        self.assertEqual(len(embeddings), 3)
+        self.assertTrue(all(len(embedding) == 512 for embedding in embeddings))
+        self.mock_rec_session.run.assert_called_once()
+        args, kwargs = self.mock_rec_session.run.call_args
+        self.assertEqual(args[1][self.mock_rec_session.get_inputs.return_value[0].name].shape, (3, 3, 112, 112))
+
+    def test_get_embeddings_chunks_by_max_batch_size(self):
+        # Test case when the number of crops exceeds max_batch_size
+        self.face_embedding_service.max_batch_size = 2
+        self.mock_np_expand_dims.side_effect = lambda arr, axis: np.zeros((1, 3, 112, 112), dtype=np.float32)
+        self.mock_rec_session.run.side_effect = [
+            [np.random.rand(2, 512).astype(np.float32)],
+            [np.random.rand(1, 512).astype(np.float32)],
+        ]
+
+        embeddings = self.face_embedding_service.get_embeddings([self.dummy_pil_image] * 3)
+
+        self.assertEqual(len(embeddings), 3)
+        self.assertEqual(self.mock_rec_session.run.call_count, 2)
+
+    def test_to_bgr_uses_numpy_crops_without_copy(self):
+        # BGR crops sliced from the decoded image are passed through as-is
+        image_bgr = np.zeros((50, 50, 3), dtype=np.uint8)
+        crop = image_bgr[5:25, 10:30]
+        self.assertIs(self.face_embedding_service._to_bgr(crop), crop)
+
+    def test_to_bgr_warps_aligned_faces_to_input_size(self):
+        # AlignedFace inputs are warped from the full image straight to 112x112 (no crop, no resize)
+        from src.domain.interfaces.face_embedding import AlignedFace
+        from src.infrastructure.embeddings.face_alignment import ARCFACE_TEMPLATE
+
+        image_bgr = np.zeros((400, 400, 3), dtype=np.uint8)
+        aligned = self.face_embedding_service._to_bgr(AlignedFace(image_bgr, ARCFACE_TEMPLATE * 2 + 50))
+
+        self.assertEqual(aligned.shape, (112, 112, 3))
+        self.assertTrue(self.face_embedding_service.supports_alignment)
+
+    def test_get_embeddings_empty_input(self):
+        self.assertEqual(self.face_embedding_service.get_embeddings([]), [])
+        self.mock_rec_session.run.assert_not_called()
+
+
+class TestArcFaceModelVariant(unittest.TestCase):
+
+    @patch('src.infrastructure.embeddings.arcface_embedding.os.path.exists', return_value=True)
+    @patch('src.infrastructure.embeddings.onnx_session.onnxruntime.InferenceSession')
+    def test_int8_variant_loads_quantized_model(self, MockInferenceSession, MockExists):
+        service = ArcFaceEmbedding(model_variant="int8")
+        self.assertEqual(service.model_variant, "int8")
+        self.assertTrue(MockInferenceSession.call_args[0][0].endswith("w600k_r50.int8.onnx"))
+
+    @patch('src.infrastructure.embeddings.arcface_embedding.os.path.exists', return_value=False)
+    @patch('src.infrastructure.embeddings.onnx_session.onnxruntime.InferenceSession')
+    def test_int8_variant_falls_back_when_missing(self, MockInferenceSession, MockExists):
+        service = ArcFaceEmbedding(model_variant="int8")
+        self.assertEqual(service.model_variant, "fp32")
+        self.assertTrue(MockInferenceSession.call_args[0][0].endswith("w600k_r50.onnx"))
+
+    def test_invalid_variant(self):
+        with self.assertRaises(ValueError):
+            ArcFaceEmbedding(model_variant="fp16")
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+
+from src.application.services.bulk_operations import BulkOperationTracker
+
+
+@pytest.mark.asyncio
+async def test_operation_completes_with_result():
+    """
+    Kiểm tra job nền chuyển sang trạng thái completed và lưu kết quả.
+    """
+    tracker = BulkOperationTracker()
+
+    async def job():
+        await asyncio.sleep(0)
+        return {"count": 2, "face_ids": ["a", "b"]}
+
+    operation_id = tracker.submit(job, count=2)
+    assert tracker.get(operation_id)["status"] in ("pending", "running")
+    await asyncio.sleep(0.01)
+
+    operation = tracker.get(operation_id)
+    assert operation["status"] == "completed"
+    assert operation["result"] == {"count": 2, "face_ids": ["a", "b"]}
+    assert operation["finished_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_operation_records_error():
+    tracker = BulkOperationTracker()
+
+    async def job():
+        raise RuntimeError("qdrant unavailable")
+
+    operation_id = tracker.submit(job)
+    await asyncio.sleep(0.01)
+
+    operation = tracker.get(operation_id)
+    assert operation["status"] == "failed"
+    assert operation["error"] == "qdrant unavailable"
+    assert tracker.get("unknown") is None
+
+
+@pytest.mark.asyncio
+async def test_history_is_bounded_to_finished_operations():
+    tracker = BulkOperationTracker(max_operations=2)
+
+    async def job():
+        return {}
+
+    first = tracker.submit(job)
+    await asyncio.sleep(0.01)
+    second = tracker.submit(job)
+    third = tracker.submit(job)
+    await asyncio.sleep(0.01)
+
+    assert tracker.get(first) is None
+    assert tracker.get(second)["status"] == "completed"
+    assert tracker.get(third)["status"] == "completed"
@@ -0,0 +1,118 @@
+import uuid
+
+import pytest
+from qdrant_client import AsyncQdrantClient, models
+
+from src.infrastructure.persistence.collection_layout import CollectionLayout
+from src.infrastructure.persistence import collection_migration as migration
+from src.infrastructure.persistence.collection_migration import migrate_collection
+
+
+async def _seed(client: AsyncQdrantClient, collection_name: str, count: int):
+    await client.create_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE),
+    )
+    await client.upsert(
+        collection_name=collection_name,
+        points=[
+            models.PointStruct(id=str(uuid.uuid4()), vector=[1.0, float(i), 0.0, 1.0], payload={"family_id": "fam"})
+            for i in range(count)
+        ],
+    )
+
+
+def _scalar_layout() -> CollectionLayout:
+    return CollectionLayout(quantization="scalar", vectors_on_disk=True, hnsw_m=8)
+
+
+@pytest.mark.asyncio
+async def test_migrate_collection_swaps_alias_atomically():
+    client = AsyncQdrantClient(":memory:")
+    await _seed(client, "faces_v1", 7)
+    await client.update_collection_aliases(change_aliases_operations=[
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name="faces_v1", alias_name="faces")),
+    ])
+
+    report = await migrate_collection(client, "faces", _scalar_layout(), target_name="faces_v2", batch_size=3)
+
+    assert report["source"] == "faces_v1"
+    assert report["target"] == "faces_v2"
+    assert report["copied"] == 7
+    assert report["caught_up"] == 0
+    assert report["deleted"] == 0
+    assert not report["source_dropped"]
+    aliases = (await client.get_aliases()).aliases
+    assert [(a.alias_name, a.collection_name) for a in aliases] == [("faces", "faces_v2")]
+    assert (await client.count(collection_name="faces")).count == 7
+    assert await client.collection_exists(collection_name="faces_v1")
+
+
+@pytest.mark.asyncio
+async def test_migrate_collection_resyncs_writes_made_during_copy(monkeypatch):
+    client = AsyncQdrantClient(":memory:")
+    await _seed(client, "faces_v1", 4)
+    await client.update_collection_aliases(change_aliases_operations=[
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name="faces_v1", alias_name="faces")),
+    ])
+    ids = sorted(point.id for point in (await client.scroll(collection_name="faces_v1", limit=10))[0])
+    new_id = str(uuid.uuid4())
+    wait_until_indexed = migration._wait_until_indexed
+    update_aliases = client.update_collection_aliases
+
+    async def writes_during_copy(*args):
+        await wait_until_indexed(*args)
+        await client.set_payload(collection_name="faces_v1", payload={"member_id": "m1"}, points=[ids[0]])
+        await client.delete(collection_name="faces_v1", points_selector=models.PointIdsList(points=[ids[1]]))
+        await client.upsert(collection_name="faces_v1", points=[
+            models.PointStruct(id=new_id, vector=[0.0, 1.0, 1.0, 0.0], payload={"family_id": "fam"}),
+        ])
+
+    async def writes_around_swap(**kwargs):
+        # Ghi vào collection cũ ngay trước khi đổi alias, và vào collection mới ngay sau đó
+        await client.delete(collection_name="faces_v1", points_selector=models.PointIdsList(points=[ids[2]]))
+        await update_aliases(**kwargs)
+        await client.set_payload(collection_name="faces_v2", payload={"member_id": "m3"}, points=[ids[3]])
+
+    monkeypatch.setattr(migration, "_wait_until_indexed", writes_during_copy)
+    monkeypatch.setattr(client, "update_collection_aliases", writes_around_swap)
+
+    report = await migrate_collection(client, "faces", _scalar_layout(), target_name="faces_v2", batch_size=3)
+
+    assert report["copied"] == 4
+    assert report["caught_up"] == 2
+    assert report["deleted"] == 2
+    points = {point.id: point.payload for point in (await client.scroll(collection_name="faces_v2", limit=10))[0]}
+    assert set(points) == {ids[0], ids[3], new_id}
+    assert points[ids[0]]["member_id"] == "m1"
+    assert points[ids[3]]["member_id"] == "m3"
+
+
+@pytest.mark.asyncio
+async def test_migrate_collection_requires_opt_in_to_replace_physical_collection():
+    client = AsyncQdrantClient(":memory:")
+    await _seed(client, "faces", 3)
+
+    with pytest.raises(ValueError, match="replace_collection"):
+        await migrate_collection(client, "faces", _scalar_layout())
+
+    report = await migrate_collection(
+        client, "faces", _scalar_layout(), target_name="faces_v2", replace_collection=True
+    )
+
+    assert report["source_dropped"]
+    aliases = (await client.get_aliases()).aliases
+    assert [(a.alias_name, a.collection_name) for a in aliases] == [("faces", "faces_v2")]
+    assert (await client.count(collection_name="faces")).count == 3
+
+
+@pytest.mark.asyncio
+async def test_migrate_collection_rejects_unknown_alias_and_existing_target():
+    client = AsyncQdrantClient(":memory:")
+    with pytest.raises(ValueError, match="Neither"):
+        await migrate_collection(client, "missing")
+
+    await _seed(client, "faces", 1)
+    await _seed(client, "faces_v2", 1)
+    with pytest.raises(ValueError, match="already exists"):
+        await migrate_collection(client, "faces", target_name="faces_v2", replace_collection=True)
@@ -0,0 +1,97 @@
+import pytest
+
+from src.infrastructure.detection_cache import DetectionResultCache
+
+
+RESULTS = [{"box": [10, 20, 30, 40], "confidence": 0.98, "embedding": [0.1, 0.2, 0.3]}]
+
+
+@pytest.fixture
+def cache():
+    return DetectionResultCache("dlib+facenet@1", max_entries=10, max_bytes=1024 * 1024, ttl_seconds=3600, disk_dir="")
+
+
+def test_key_depends_on_bytes_model_and_params(cache):
+    key = cache.make_key(b"image", max_side=0, upsample=None)
+    assert key == cache.make_key(b"image", upsample=None, max_side=0)
+    assert key != cache.make_key(b"other", max_side=0, upsample=None)
+    assert key != cache.make_key(b"image", max_side=1024, upsample=None)
+    other_model = DetectionResultCache("retinaface+arcface@1", disk_dir="")
+    assert key != other_model.make_key(b"image", max_side=0, upsample=None)
+
+
+def test_get_put_and_endpoint_counters(cache):
+    key = cache.make_key(b"image")
+    assert cache.get(key, endpoint="/faces/detect") is None
+    cache.put(key, RESULTS, endpoint="/faces/detect")
+    assert cache.get(key, endpoint="/faces/detect") == RESULTS
+
+    # Kết quả rỗng (không có khuôn mặt) cũng được cache, khác với miss (None)
+    empty_key = cache.make_key(b"empty")
+    cache.put(empty_key, [], endpoint="/faces/detect")
+    assert cache.get(empty_key, endpoint="/faces/detect") == []
+
+    counters = cache.stats()["endpoints"]["/faces/detect"]
+    assert counters["memory_hits"] == 2
+    assert counters["misses"] == 1
+    assert counters["stores"] == 2
+    assert counters["hit_ratio"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_memory_lru_evicts_by_entries_and_bytes():
+    cache = DetectionResultCache("m", max_entries=2, max_bytes=1024 * 1024, ttl_seconds=0, disk_dir="")
+    cache.put("a", RESULTS)
+    cache.put("b", RESULTS)
+    cache.get("a")
+    cache.put("c", RESULTS)
+    assert cache.get("b") is None
+    assert cache.get("a") == RESULTS
+    assert cache.stats()["memory"]["evictions"] == 1
+
+    small = DetectionResultCache("m", max_entries=100, max_bytes=100, ttl_seconds=0, disk_dir="")
+    small.put("a", RESULTS)
+    small.put("b", RESULTS)
+    assert small.get("a") is None
+    assert small.stats()["memory"]["bytes"] <= 100
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    cache.put("k", RESULTS)
+    import src.infrastructure.detection_cache as module
+    real_time = module.time.time
+    monkeypatch.setattr(module.time, "time", lambda: real_time() + 7200)
+    assert cache.get("k") is None
+    assert cache.stats()["memory"]["entries"] == 0
+
+
+def test_disk_tier_survives_restart_and_promotes(tmp_path):
+    first = DetectionResultCache("m", max_entries=10, max_bytes=1024 * 1024, ttl_seconds=0, disk_dir=str(tmp_path))
+    first.put("k", RESULTS)
+    first.close()
+
+    second = DetectionResultCache("m", max_entries=10, max_bytes=1024 * 1024, ttl_seconds=0, disk_dir=str(tmp_path))
+    assert second.get("k", endpoint="/faces/detect") == RESULTS
+    assert second.get("k", endpoint="/faces/detect") == RESULTS
+    counters = second.stats()["endpoints"]["/faces/detect"]
+    assert counters["disk_hits"] == 1
+    assert counters["memory_hits"] == 1
+    second.close()
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = DetectionResultCache("m", max_entries=1, max_bytes=1024 * 1024, ttl_seconds=0, disk_dir=str(tmp_path), disk_max_bytes=200)
+    for key in ("a", "b", "c"):
+        cache.put(key, RESULTS)
+    stats = cache.stats()["disk"]
+    assert stats["bytes"] <= 200
+    assert stats["evictions"] >= 1
+    assert cache.get("c") == RESULTS
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_async_access_with_disk_tier(tmp_path):
+    cache = DetectionResultCache("m", disk_dir=str(tmp_path))
+    await cache.put_async("k", RESULTS)
+    assert await cache.get_async("k") == RESULTS
+    cache.close()
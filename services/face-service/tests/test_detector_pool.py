@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+
+from src.domain.interfaces.face_detector import IFaceDetector
+from src.infrastructure.detectors.detector_pool import DetectorPool, UnknownDetectorTierError, parse_detector_tiers
+
+
+def test_parse_detector_tiers():
+    tiers = parse_detector_tiers("fast=retinaface:320, accurate=RetinaFace:1024,legacy=dlib")
+    assert tiers == {"fast": ("retinaface", 320), "accurate": ("retinaface", 1024), "legacy": ("dlib", None)}
+    with pytest.raises(ValueError):
+        parse_detector_tiers("fast")
+    with pytest.raises(ValueError):
+        parse_detector_tiers("")
+
+
+@pytest.fixture
+def backends():
+    return {"dlib": Mock(spec=IFaceDetector), "retinaface": Mock(spec=IFaceDetector)}
+
+
+def _pool(backends, spec, default_tier=None):
+    factories = {name: Mock(return_value=backend) for name, backend in backends.items()}
+    return DetectorPool(factories, parse_detector_tiers(spec), default_tier=default_tier), factories
+
+
+def test_only_referenced_backends_are_loaded_once(backends):
+    pool, factories = _pool(backends, "fast=retinaface:320,accurate=retinaface:1024")
+    factories["retinaface"].assert_called_once()
+    factories["dlib"].assert_not_called()
+    assert set(pool.backends) == {"retinaface"}
+
+
+def test_tiers_route_to_backend_with_options(backends):
+    backends["retinaface"].detect_faces.return_value = [{"box": [1, 2, 3, 4], "confidence": 0.9}]
+    backends["dlib"].detect_faces.return_value = []
+    pool, _ = _pool(backends, "fast=retinaface:320,legacy=dlib", default_tier="legacy")
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+
+    assert pool.detect_faces(image, tier="fast") == [{"box": [1, 2, 3, 4], "confidence": 0.9}]
+    backends["retinaface"].detect_faces.assert_called_once_with(image, upsample=None, det_size=320)
+
+    pool.detect_faces(image, upsample=1)
+    backends["dlib"].detect_faces.assert_called_once_with(image, upsample=1)
+
+    with pytest.raises(UnknownDetectorTierError):
+        pool.detect_faces(image, tier="turbo")
+
+
+def test_upsample_improves_recall_follows_tier_backend(backends):
+    backends["dlib"].upsample_improves_recall.return_value = True
+    backends["retinaface"].upsample_improves_recall.return_value = False
+    pool, _ = _pool(backends, "fast=retinaface:320,legacy=dlib")
+
+    assert pool.upsample_improves_recall() is False
+    assert pool.upsample_improves_recall(tier="legacy") is True
+
+
+def test_latency_is_recorded_per_tier(backends):
+    backends["retinaface"].detect_faces.return_value = []
+    pool, _ = _pool(backends, "pooltest_fast=retinaface:320,pooltest_legacy=dlib")
+    before = pool.stats()["tiers"]["pooltest_fast"]["latency_seconds"]["count"]
+    pool.detect_faces(np.zeros((10, 10, 3), dtype=np.uint8))
+
+    stats = pool.stats()
+    assert stats["default_tier"] == "pooltest_fast"
+    assert stats["tiers"]["pooltest_fast"]["latency_seconds"]["count"] == before + 1
+    assert stats["tiers"]["pooltest_fast"]["backend"] == "retinaface"
+
+
+def test_invalid_configuration(backends):
+    with pytest.raises(ValueError):
+        _pool(backends, "fast=mtcnn")
+    with pytest.raises(ValueError):
+        _pool(backends, "legacy=dlib:320")
+    with pytest.raises(ValueError):
+        _pool(backends, "fast=retinaface:320", default_tier="accurate")
@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.infrastructure.embeddings.face_alignment import (
+    ARCFACE_TEMPLATE,
+    estimate_similarity_transform,
+    warp_aligned_face,
+)
+
+
+def _similarity(points, angle, scale, shift):
+    c, s = np.cos(angle), np.sin(angle)
+    rotation = scale * np.array([[c, -s], [s, c]])
+    return points @ rotation.T + shift
+
+
+def test_estimate_similarity_transform_recovers_exact_transform():
+    landmarks = _similarity(ARCFACE_TEMPLATE, angle=0.3, scale=2.5, shift=np.array([400.0, 250.0]))
+
+    matrix = estimate_similarity_transform(landmarks, ARCFACE_TEMPLATE)
+
+    mapped = landmarks @ matrix[:, :2].T + matrix[:, 2]
+    np.testing.assert_allclose(mapped, ARCFACE_TEMPLATE, atol=1e-3)
+
+
+def test_warp_aligned_face_maps_landmarks_onto_template():
+    # Ảnh có một điểm sáng ở vị trí mũi; sau khi warp, điểm đó phải nằm ở vị trí mũi của template
+    landmarks = _similarity(ARCFACE_TEMPLATE, angle=-0.2, scale=3.0, shift=np.array([200.0, 100.0]))
+    image = np.zeros((800, 800, 3), dtype=np.uint8)
+    nose_x, nose_y = np.round(landmarks[2]).astype(int)
+    image[nose_y - 3:nose_y + 4, nose_x - 3:nose_x + 4] = 255
+
+    aligned = warp_aligned_face(image, landmarks, 112)
+
+    assert aligned.shape == (112, 112, 3)
+    bright_y, bright_x = np.argwhere(aligned[:, :, 0] > 128).mean(axis=0)
+    assert abs(bright_x - ARCFACE_TEMPLATE[2, 0]) < 1.5
+    assert abs(bright_y - ARCFACE_TEMPLATE[2, 1]) < 1.5
@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, Mock
+
+from src.application.services.face_clustering import IncrementalFaceClusterer
+from src.application.services.face_manager import FaceManager
+from src.domain.interfaces.face_detector import IFaceDetector
+from src.domain.interfaces.face_embedding import IFaceEmbedding
+from src.domain.interfaces.face_repository import IFaceRepository
+
+
+def _brute_force_components(matrix: np.ndarray, threshold: float) -> list:
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    linked = unit @ unit.T >= threshold
+    labels = [-1] * len(matrix)
+    for start in range(len(matrix)):
+        if labels[start] != -1:
+            continue
+        stack = [start]
+        labels[start] = start
+        while stack:
+            node = stack.pop()
+            for neighbour in np.nonzero(linked[node])[0]:
+                if labels[neighbour] == -1:
+                    labels[neighbour] = start
+                    stack.append(neighbour)
+    return labels
+
+
+def test_blocked_clustering_matches_full_similarity_matrix():
+    """
+    Kiểm tra phân cụm theo trang và theo khối cho cùng kết quả với ma trận tương đồng đầy đủ.
+    """
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(12, 32))
+    matrix = np.vstack([center + rng.normal(scale=0.15, size=(rng.integers(1, 9), 32)) for center in centers])
+    matrix = matrix[rng.permutation(len(matrix))]
+
+    clusterer = IncrementalFaceClusterer(threshold=0.8, block_size=5)
+    for start in range(0, len(matrix), 7):
+        page = matrix[start:start + 7]
+        clusterer.add(list(range(start, start + len(page))), page.tolist())
+
+    assert clusterer.labels().tolist() == _brute_force_components(matrix, 0.8)
+
+
+def test_clusters_are_linked_transitively_and_rooted_at_first_face():
+    """
+    Kiểm tra các khuôn mặt nối nhau qua chuỗi cặp giống nhau thuộc cùng cụm, gốc là khuôn mặt đầu tiên.
+    """
+    clusterer = IncrementalFaceClusterer(threshold=0.9, block_size=2)
+    clusterer.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    clusterer.add(["c", "d"], [[0.94, 0.34], [0.77, 0.64]])
+
+    labels = clusterer.labels()
+
+    assert labels.tolist() == [0, 1, 0, 0]
+    assert clusterer.cluster_sizes(labels).tolist() == [3, 1, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_cluster_family_faces_writes_changed_cluster_ids():
+    """
+    Kiểm tra cluster_family_faces đọc embedding theo trang và chỉ ghi payload của các khuôn mặt đổi cụm.
+    """
+    faces = [
+        {"id": "f1", "payload": {"family_id": "fam", "cluster_id": "f1", "cluster_size": 2}, "vector": [1.0, 0.0]},
+        {"id": "f2", "payload": {"family_id": "fam"}, "vector": [0.0, 1.0]},
+        {"id": "f3", "payload": {"family_id": "fam", "cluster_id": "f1", "cluster_size": 2}, "vector": [0.99, 0.1]},
+        {"id": "f4", "payload": {"family_id": "fam"}, "vector": [0.98, 0.15]},
+        {"id": "f5", "payload": {"family_id": "fam", "cluster_id": "old", "cluster_size": 2}, "vector": [-1.0, 0.0]},
+        # Chưa có vector của model đang dùng: cụm của lần chạy trước bị xóa
+        {"id": "f6", "payload": {"family_id": "fam", "cluster_id": "f1", "cluster_size": 2}, "vector": None},
+        {"id": "f7", "payload": {"family_id": "fam"}, "vector": None},
+    ]
+    repository = AsyncMock(spec=IFaceRepository)
+
+    async def get_page(family_id, limit, offset=None, with_vectors=False):
+        start = offset or 0
+        return faces[start:start + limit], (start + limit if start + limit < len(faces) else None)
+
+    repository.get_faces_page_by_family_id.side_effect = get_page
+    repository.set_faces_payload.side_effect = lambda updates: sum(len(ids) for _, ids in updates)
+    manager = FaceManager(repository, Mock(spec=IFaceEmbedding), Mock(spec=IFaceDetector))
+    manager.clustering_page_size = 2
+
+    result = await manager.cluster_family_faces("fam", threshold=0.9, min_cluster_size=2)
+
+    assert repository.get_faces_page_by_family_id.await_count == 4
+    repository.set_faces_payload.assert_awaited_once()
+    updates = repository.set_faces_payload.await_args.args[0]
+    assert sorted((payload["cluster_id"] or "", payload["cluster_size"] or 0, ids) for payload, ids in updates) == [
+        ("", 0, ["f5", "f6"]),
+        ("f1", 3, ["f1", "f3", "f4"]),
+    ]
+    assert result["faces"] == 5
+    assert result["clusters"] == 1
+    assert result["clustered_faces"] == 3
+    assert result["unclustered_faces"] == 2
+    assert result["skipped_faces"] == 2
+    assert result["updated"] == 5
@@ -69,6 +69,15 @@ class TestDlibFaceDetector(unittest.TestCase):
         self.assertEqual(detected_faces[1]['confidence'], 0.99)
         self.mock_dlib_detector.assert_called_once()
 
+    def test_detect_faces_upsample(self):
+        # Test case for the default (1) and per-call upsample counts passed to dlib
+        self.mock_dlib_detector.return_value = []
+        self.face_detector.detect_faces(self.dummy_image)
+        self.assertEqual(self.mock_dlib_detector.call_args[0][1], 1)
+
+        self.face_detector.detect_faces(self.dummy_image, upsample=0)
+        self.assertEqual(self.mock_dlib_detector.call_args[0][1], 0)
+
     @patch('src.infrastructure.detectors.dlib_detector.cv2.cvtColor', side_effect=Exception("CV2 Error"))
     def test_detect_faces_exception_handling(self, mock_cvtColor):
         # Test case for exception handling during face detection
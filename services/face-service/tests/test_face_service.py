@@ -1,6 +1,7 @@
 import pytest
+import numpy as np
 from unittest.mock import Mock, patch, AsyncMock
-from src.application.services.face_manager import FaceManager
+from src.application.services.face_manager import FaceManager, _deduplicate_vectors
 from src.infrastructure.persistence.qdrant_client import QdrantFaceRepository
 from src.infrastructure.embeddings.facenet_embedding import FaceNetEmbeddingService
 from src.domain.interfaces.face_detector import IFaceDetector # Import IFaceDetector
@@ -99,7 +100,7 @@ async def test_get_faces_by_family_id(face_manager_instance, mock_qdrant_reposit
     
     faces = await face_manager_instance.get_faces_by_family_id(family_id)
     
-    mock_qdrant_repository.get_faces_by_family_id.assert_called_once_with(family_id)
+    mock_qdrant_repository.get_faces_by_family_id.assert_called_once_with(family_id, with_vectors=False)
     assert len(faces) == 2
     assert faces[0]["id"] == "face1"
     assert faces[1]["payload"]["memberId"] == "mem2"
@@ -213,6 +214,25 @@ async def test_add_face_by_vector_success(face_manager_instance, mock_qdrant_rep
     assert result["embedding"] == vector
     assert result["metadata"]["member_id"] == metadata["member_id"]
 
+@pytest.mark.asyncio
+async def test_add_faces_by_vectors_success(face_manager_instance, mock_qdrant_repository):
+    """
+    Kiểm tra add_faces_by_vectors ghi tất cả khuôn mặt bằng một lần upsert_face_vectors.
+    """
+    mock_qdrant_repository.upsert_face_vectors = AsyncMock(return_value=2)
+    faces = [
+        {"vector": [0.2] * 128, "metadata": {"member_id": "m1", "family_id": "f1", "face_id": "face1"}},
+        {"vector": [0.3] * 128, "metadata": {"member_id": "m2", "family_id": "f1", "face_id": "face2"}},
+    ]
+
+    result = await face_manager_instance.add_faces_by_vectors(faces, wait=False)
+
+    assert result == {"count": 2, "face_ids": ["face1", "face2"]}
+    args, kwargs = mock_qdrant_repository.upsert_face_vectors.call_args
+    assert [item["face_id"] for item in args[0]] == ["face1", "face2"]
+    assert kwargs["wait"] is False
+    mock_qdrant_repository.upsert_face_vector.assert_not_called()
+
 @pytest.mark.asyncio
 async def test_add_face_by_vector_missing_metadata(face_manager_instance):
     """
@@ -220,4 +240,334 @@ async def test_add_face_by_vector_missing_metadata(face_manager_instance):
     """
     vector = [0.2] * 128
     with pytest.raises(ValueError, match="Metadata phải chứa 'member_id' và 'family_id'."):
-        await face_manager_instance.add_face_by_vector(vector, {"localDbId": "local456"})
\ No newline at end of file
+        await face_manager_instance.add_face_by_vector(vector, {"localDbId": "local456"})
+
+
+def test_detect_and_embed_faces_uses_batched_embeddings(face_manager_instance, mock_face_detector_service, mock_face_embedding_service, dummy_image):
+    """
+    Kiểm tra detect_and_embed_faces tạo embedding cho mọi khuôn mặt bằng một lần gọi get_embeddings.
+    """
+    mock_face_detector_service.detect_faces.return_value = [
+        {'box': [10, 10, 20, 20], 'confidence': 0.99},
+        {'box': [50, 50, 20, 20], 'confidence': 0.95},
+    ]
+    mock_face_embedding_service.get_embeddings.return_value = [[0.1] * 128, []]
+
+    results = face_manager_instance.detect_and_embed_faces(dummy_image)
+
+    mock_face_embedding_service.get_embeddings.assert_called_once()
+    assert len(mock_face_embedding_service.get_embeddings.call_args[0][0]) == 2
+    mock_face_embedding_service.get_embedding.assert_not_called()
+    # Khuôn mặt có embedding rỗng bị bỏ qua
+    assert len(results) == 1
+    assert results[0]['box'] == [8, 8, 24, 24]
+    assert results[0]['confidence'] == 0.99
+
+
+def test_detect_and_embed_faces_crops_are_views_of_bgr_image(face_manager_instance, mock_face_detector_service, mock_face_embedding_service):
+    """
+    Kiểm tra ảnh BGR được truyền nguyên vẹn cho detector và các crop là view (không sao chép) của nó.
+    """
+    image_bgr = np.zeros((100, 120, 3), dtype=np.uint8)
+    mock_face_detector_service.detect_faces.return_value = [{'box': [10, 20, 30, 40], 'confidence': 0.9}]
+    mock_face_embedding_service.get_embeddings.return_value = [[0.1] * 128]
+
+    results = face_manager_instance.detect_and_embed_faces(image_bgr)
+
+    assert mock_face_detector_service.detect_faces.call_args[0][0] is image_bgr
+    crop = mock_face_embedding_service.get_embeddings.call_args[0][0][0]
+    assert np.shares_memory(crop, image_bgr)
+    assert crop.shape == (48, 36, 3)
+    assert results[0]['box'] == [7, 16, 36, 48]
+
+
+def test_detect_on_downscaled_image_rescales_boxes(face_manager_instance, mock_face_detector_service, mock_face_embedding_service):
+    """
+    Kiểm tra phát hiện chạy trên bản thu nhỏ, box được quy đổi về ảnh gốc và crop lấy từ ảnh gốc.
+    """
+    image_bgr = np.zeros((1000, 2000, 3), dtype=np.uint8)
+    mock_face_detector_service.detect_faces.return_value = [{'box': [100, 50, 40, 40], 'confidence': 0.9}]
+    mock_face_embedding_service.get_embeddings.return_value = [[0.1] * 128]
+
+    results = face_manager_instance.detect_and_embed_faces(image_bgr, max_side=500)
+
+    assert mock_face_detector_service.detect_faces.call_args[0][0].shape == (250, 500, 3)
+    assert results[0]['box'] == [384, 184, 192, 192]  # box x4 rồi thêm 10% đệm
+    crop = mock_face_embedding_service.get_embeddings.call_args[0][0][0]
+    assert np.shares_memory(crop, image_bgr)
+    assert crop.shape == (192, 192, 3)
+
+
+def test_adaptive_upsample_only_when_no_faces_found(face_manager_instance, mock_face_detector_service, mock_face_embedding_service):
+    """
+    Kiểm tra chế độ adaptive: chạy không phóng to trước, chỉ phóng to khi không tìm thấy khuôn mặt.
+    """
+    image_bgr = np.zeros((100, 100, 3), dtype=np.uint8)
+    mock_face_embedding_service.get_embeddings.return_value = [[0.1] * 128]
+    mock_face_detector_service.upsample_improves_recall.return_value = True
+
+    mock_face_detector_service.detect_faces.side_effect = [[{'box': [10, 10, 20, 20], 'confidence': 0.9}]]
+    face_manager_instance.detect_and_embed_faces(image_bgr, upsample="adaptive")
+    assert [c.kwargs["upsample"] for c in mock_face_detector_service.detect_faces.call_args_list] == [0]
+
+    mock_face_detector_service.detect_faces.reset_mock()
+    mock_face_detector_service.detect_faces.side_effect = [[], [{'box': [10, 10, 20, 20], 'confidence': 0.9}]]
+    results = face_manager_instance.detect_and_embed_faces(image_bgr, upsample="adaptive")
+    assert [c.kwargs["upsample"] for c in mock_face_detector_service.detect_faces.call_args_list] == [0, 1]
+    assert len(results) == 1
+
+
+def test_adaptive_upsample_single_pass_for_fixed_input_detectors(face_manager_instance, mock_face_detector_service):
+    """
+    Kiểm tra chế độ adaptive với detector có input cố định (RetinaFace): chỉ chạy một lượt với mặc định của detector.
+    """
+    mock_face_detector_service.upsample_improves_recall.return_value = False
+    mock_face_detector_service.detect_faces.return_value = []
+
+    face_manager_instance.detect_and_embed_faces(np.zeros((100, 100, 3), dtype=np.uint8), upsample="adaptive")
+
+    mock_face_detector_service.detect_faces.assert_called_once()
+    assert "upsample" not in mock_face_detector_service.detect_faces.call_args.kwargs
+
+
+def test_aligned_faces_use_detector_landmarks(face_manager_instance, mock_face_detector_service, mock_face_embedding_service):
+    """
+    Kiểm tra khi bật FACE_ALIGNMENT: không cắt khuôn mặt mà truyền ảnh gốc + landmark (đã quy đổi về ảnh gốc) cho embedding service.
+    """
+    from src.domain.interfaces.face_embedding import AlignedFace
+
+    image_bgr = np.zeros((1000, 2000, 3), dtype=np.uint8)
+    landmarks = [[110.0, 60.0], [130.0, 60.0], [120.0, 70.0], [112.0, 80.0], [128.0, 80.0]]
+    mock_face_detector_service.detect_faces.return_value = [
+        {'box': [100, 50, 40, 40], 'confidence': 0.9, 'landmarks': landmarks},
+        {'box': [300, 50, 40, 40], 'confidence': 0.8},  # detector không trả landmark: vẫn cắt như cũ
+    ]
+    mock_face_embedding_service.supports_alignment = True
+    mock_face_embedding_service.get_embeddings.return_value = [[0.1] * 128, [0.2] * 128]
+    face_manager_instance.face_alignment = True
+
+    results = face_manager_instance.detect_and_embed_faces(image_bgr, max_side=500)
+
+    aligned, cropped = mock_face_embedding_service.get_embeddings.call_args[0][0]
+    assert isinstance(aligned, AlignedFace)
+    assert aligned.image is image_bgr
+    np.testing.assert_allclose(aligned.landmarks, np.asarray(landmarks) * 4)
+    assert isinstance(cropped, np.ndarray)
+    assert results[0]['landmarks'] == [[x * 4, y * 4] for x, y in landmarks]
+    assert 'landmarks' not in results[1]
+
+
+@pytest.mark.asyncio
+async def test_add_face_uses_embedding_batcher_when_configured(mock_qdrant_repository, mock_face_embedding_service, mock_face_detector_service, dummy_image):
+    """
+    Kiểm tra add_face lấy embedding qua micro-batcher khi được cấu hình.
+    """
+    mock_batcher = Mock()
+    mock_batcher.embed = AsyncMock(return_value=[[0.3] * 128])
+    manager = FaceManager(mock_qdrant_repository, mock_face_embedding_service, mock_face_detector_service, mock_batcher)
+
+    result = await manager.add_face(dummy_image, {"member_id": "m1", "family_id": "f1", "face_id": "face1"})
+
+    mock_batcher.embed.assert_awaited_once_with([dummy_image])
+    mock_face_embedding_service.get_embedding.assert_not_called()
+    assert result["embedding"] == [0.3] * 128
+
+
+@pytest.mark.asyncio
+async def test_add_face_writes_backfill_vector_during_model_switch(mock_qdrant_repository, mock_face_embedding_service, mock_face_detector_service, dummy_image):
+    """
+    Kiểm tra add_face ghi thêm vector của model đích khi đang chuyển model embedding.
+    """
+    backfill_service = Mock()
+    backfill_service.get_embedding.return_value = [0.2] * 512
+    mock_qdrant_repository.update_face_vectors = AsyncMock(return_value=1)
+    manager = FaceManager(
+        mock_qdrant_repository, mock_face_embedding_service, mock_face_detector_service,
+        backfill_embedding_service=backfill_service, backfill_vector_name="arcface",
+    )
+
+    result = await manager.add_face(dummy_image, {"member_id": "m1", "family_id": "f1", "face_id": "face1"})
+
+    assert result["embedding"] == [0.1] * 128
+    mock_qdrant_repository.upsert_face_vector.assert_awaited_once()
+    mock_qdrant_repository.update_face_vectors.assert_awaited_once_with({"face1": [0.2] * 512}, "arcface")
+
+
+@pytest.mark.asyncio
+async def test_detect_and_embed_faces_records_stage_timings(face_manager_instance, mock_face_detector_service, mock_face_embedding_service, dummy_image):
+    """
+    Kiểm tra detect_and_embed_faces_async ghi nhận thời gian từng giai đoạn, số khuôn mặt mỗi ảnh và kích thước lô embedding.
+    """
+    from src.application.services import instrumentation
+
+    values = []
+
+    def value_observer(name, value):
+        values.append((name, value))
+
+    mock_face_detector_service.detect_faces.return_value = [
+        {'box': [10, 10, 20, 20], 'confidence': 0.99},
+        {'box': [50, 50, 20, 20], 'confidence': 0.95},
+    ]
+    mock_face_embedding_service.get_embeddings.return_value = [[0.1] * 128, [0.2] * 128]
+    instrumentation.add_value_observer(value_observer)
+    token = instrumentation.begin_request_timings()
+    try:
+        await face_manager_instance.detect_and_embed_faces_async(dummy_image)
+        stages = [stage for stage, _ in instrumentation.request_timings()]
+    finally:
+        instrumentation.end_request_timings(token)
+        instrumentation.remove_value_observer(value_observer)
+
+    assert stages == ["detect", "crop", "embed"]
+    assert ("faces_detected_per_image", 2) in values
+    assert ("embedding_inference_batch_size", 2) in values
+
+
+@pytest.mark.asyncio
+async def test_add_face_by_vector_skips_near_duplicate_in_family(face_manager_instance, mock_qdrant_repository):
+    """
+    Kiểm tra add_face_by_vector với policy "skip" không lưu khuôn mặt trùng với một khuôn mặt đã có trong family
+    (bỏ qua kết quả tìm kiếm là chính khuôn mặt đó).
+    """
+    mock_qdrant_repository.batch_search_similar_faces = AsyncMock(return_value=[[
+        {"id": "face1", "score": 1.0, "payload": {}},
+        {"id": "existing", "score": 0.99, "payload": {}},
+    ]])
+    metadata = {"member_id": "m1", "family_id": "f1", "face_id": "face1"}
+
+    result = await face_manager_instance.add_face_by_vector([0.1] * 128, metadata, duplicate_policy="skip")
+
+    mock_qdrant_repository.batch_search_similar_faces.assert_awaited_once_with(
+        [[0.1] * 128], family_id="f1", top_k=2, threshold=face_manager_instance.duplicate_threshold
+    )
+    mock_qdrant_repository.upsert_face_vector.assert_not_called()
+    assert result["duplicate"] == {"duplicate_of": "existing", "score": 0.99, "action": "skipped"}
+
+
+@pytest.mark.asyncio
+async def test_add_face_by_vector_flags_near_duplicate(face_manager_instance, mock_qdrant_repository):
+    """
+    Kiểm tra policy "flag" vẫn lưu khuôn mặt nhưng ghi duplicate_of và duplicate_score vào payload.
+    """
+    mock_qdrant_repository.batch_search_similar_faces = AsyncMock(return_value=[[
+        {"id": "existing", "score": 0.98, "payload": {}},
+    ]])
+    metadata = {"member_id": "m1", "family_id": "f1", "face_id": "face1"}
+
+    await face_manager_instance.add_face_by_vector([0.1] * 128, metadata, duplicate_policy="flag")
+
+    stored_metadata = mock_qdrant_repository.upsert_face_vector.await_args.args[2]
+    assert stored_metadata["duplicate_of"] == "existing"
+    assert stored_metadata["duplicate_score"] == 0.98
+    assert "duplicate_of" not in metadata
+
+
+@pytest.mark.asyncio
+async def test_add_faces_by_vectors_merges_duplicates_in_one_pass(face_manager_instance, mock_qdrant_repository):
+    """
+    Kiểm tra add_faces_by_vectors với policy "merge": các vector trùng nhau trong lô và trùng với index được
+    phát hiện bằng một lệnh batch search cho mỗi family, và face_id của bản trùng được gộp vào 'merged_face_ids'.
+    """
+    def face(face_id, vector, family_id="f1"):
+        return {"vector": vector, "metadata": {"member_id": "m1", "family_id": family_id, "face_id": face_id}}
+
+    faces = [
+        face("a", [1.0, 0.0, 0.0]),
+        face("b", [0.0, 1.0, 0.0]),
+        face("a2", [0.999, 0.01, 0.0]),
+        face("c", [0.0, 0.0, 1.0]),
+        face("d", [1.0, 0.0, 0.0], family_id="f2"),
+    ]
+
+    async def batch_search(query_vectors, family_id=None, top_k=5, threshold=0.75):
+        if family_id == "f1":
+            return [[], [{"id": "existing", "score": 0.995, "payload": {"merged_face_ids": ["old"]}}], [], []]
+        return [[]]
+
+    mock_qdrant_repository.batch_search_similar_faces = AsyncMock(side_effect=batch_search)
+    mock_qdrant_repository.upsert_face_vectors = AsyncMock(side_effect=lambda items, wait=True: len(items))
+    mock_qdrant_repository.set_faces_payload = AsyncMock(return_value=1)
+
+    result = await face_manager_instance.add_faces_by_vectors(faces, duplicate_policy="merge")
+
+    assert mock_qdrant_repository.batch_search_similar_faces.await_count == 2
+    stored = mock_qdrant_repository.upsert_face_vectors.await_args.args[0]
+    assert [item["face_id"] for item in stored] == ["a", "c", "d"]
+    assert stored[0]["metadata"]["merged_face_ids"] == ["a2"]
+    mock_qdrant_repository.set_faces_payload.assert_awaited_once_with(
+        [({"merged_face_ids": ["old", "b"]}, ["existing"])]
+    )
+    assert result["count"] == 3
+    assert result["face_ids"] == ["a", "c", "d"]
+    assert [(d["face_id"], d["duplicate_of"], d["action"]) for d in result["duplicates"]] == [
+        ("b", "existing", "merged"),
+        ("a2", "a", "merged"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_add_faces_by_vectors_scores_each_face_against_stored_matches(face_manager_instance, mock_qdrant_repository):
+    """
+    Kiểm tra nhóm trùng trong lô không bắc cầu: A~B, B~C, A không ~ C, chỉ A trùng với khuôn mặt đã lưu. B thuộc
+    nhóm của A nhưng không đạt ngưỡng với khuôn mặt đã lưu nên chỉ là bản trùng của A trong lô; C được lưu.
+    """
+    def at(degrees):
+        return [float(np.cos(np.radians(degrees))), float(np.sin(np.radians(degrees)))]
+
+    stored = {"stored": at(-10)}
+
+    async def batch_search(query_vectors, family_id=None, top_k=5, threshold=0.75):
+        results = []
+        for query in query_vectors:
+            hits = [
+                {"id": face_id, "score": float(np.dot(query, vector)), "payload": {}}
+                for face_id, vector in stored.items()
+            ]
+            results.append([hit for hit in hits if hit["score"] >= threshold][:top_k])
+        return results
+
+    face_manager_instance.duplicate_threshold = 0.97
+    mock_qdrant_repository.batch_search_similar_faces = AsyncMock(side_effect=batch_search)
+    mock_qdrant_repository.upsert_face_vectors = AsyncMock(side_effect=lambda items, wait=True: len(items))
+    faces = [
+        {"vector": at(angle), "metadata": {"member_id": "m1", "family_id": "f1", "face_id": face_id}}
+        for face_id, angle in (("a", 0), ("b", 12), ("c", 24))
+    ]
+
+    result = await face_manager_instance.add_faces_by_vectors(faces, duplicate_policy="skip")
+
+    assert [(d["face_id"], d["duplicate_of"]) for d in result["duplicates"]] == [("a", "stored"), ("b", "a")]
+    assert result["face_ids"] == ["c"]
+
+
+def test_deduplicate_vectors_same_groups_across_blocks():
+    """
+    Kiểm tra loại trùng theo khối cho cùng kết quả với một khối duy nhất, kể cả khi bản trùng nằm ở khối khác.
+    """
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(6, 16))
+    vectors = np.concatenate([base, base[[0, 3, 3]] + 1e-4, base[[5]]]).tolist()
+
+    representatives, assignment = _deduplicate_vectors(vectors, 0.999)
+
+    assert representatives == [0, 1, 2, 3, 4, 5]
+    assert assignment == [0, 1, 2, 3, 4, 5, 0, 3, 3, 5]
+    assert _deduplicate_vectors(vectors, 0.999, block_size=4) == (representatives, assignment)
+
+
+@pytest.mark.asyncio
+async def test_search_by_vectors_dedups_with_threshold_read_at_init(monkeypatch, mock_qdrant_repository, mock_face_embedding_service, mock_face_detector_service):
+    """
+    Kiểm tra BATCH_SEARCH_DEDUP_THRESHOLD được đọc một lần khi khởi tạo và dùng để gom các vector query gần trùng.
+    """
+    monkeypatch.setenv("BATCH_SEARCH_DEDUP_THRESHOLD", "0.9")
+    manager = FaceManager(mock_qdrant_repository, mock_face_embedding_service, mock_face_detector_service)
+    monkeypatch.setenv("BATCH_SEARCH_DEDUP_THRESHOLD", "1.0")
+    mock_qdrant_repository.batch_search_similar_faces = AsyncMock(return_value=[[{"id": "f1", "score": 0.9}]])
+
+    results = await manager.search_similar_faces_by_vectors([[1.0, 0.0], [0.99, 0.05]])
+
+    assert manager.batch_search_dedup_threshold == 0.9
+    assert mock_qdrant_repository.batch_search_similar_faces.await_args.args[0] == [[1.0, 0.0]]
+    assert results == [[{"id": "f1", "score": 0.9}], [{"id": "f1", "score": 0.9}]]
@@ -0,0 +1,140 @@
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock
+
+from src.domain.interfaces.face_repository import IFaceRepository
+from src.infrastructure.persistence.family_vector_cache import CachedFaceRepository
+
+
+FAMILY_FACES = [
+    {"id": "11111111-1111-1111-1111-111111111111", "payload": {"family_id": "fam", "member_id": "m1"}, "vector": [1.0, 0.0, 0.0]},
+    {"id": "22222222-2222-2222-2222-222222222222", "payload": {"family_id": "fam", "member_id": "m2"}, "vector": [0.0, 1.0, 0.0]},
+    {"id": "33333333-3333-3333-3333-333333333333", "payload": {"family_id": "fam", "member_id": "m1"}, "vector": [0.7, 0.7, 0.0]},
+]
+
+
+@pytest.fixture
+def mock_repository():
+    mock = AsyncMock(spec=IFaceRepository)
+
+    async def iter_faces(family_id, page_size=1000, offset=None, with_vectors=False):
+        for face in FAMILY_FACES if family_id == "fam" else []:
+            yield dict(face)
+
+    mock.iter_faces_by_family_id = iter_faces
+    mock.delete_face.return_value = True
+    mock.upsert_face_vectors.side_effect = lambda faces, wait=True: len(faces)
+    return mock
+
+
+@pytest.fixture
+def cached_repository(mock_repository):
+    return CachedFaceRepository(mock_repository, max_bytes=10 * 1024 * 1024, ttl_seconds=300)
+
+
+@pytest.mark.asyncio
+async def test_search_is_served_from_local_matrix(cached_repository, mock_repository):
+    """
+    Kiểm tra tìm kiếm theo family dùng ma trận cục bộ (cosine) và chỉ tải family một lần.
+    """
+    results = await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id="fam", top_k=2, threshold=0.5)
+
+    assert [r["id"] for r in results] == [FAMILY_FACES[0]["id"], FAMILY_FACES[2]["id"]]
+    assert results[0]["score"] == pytest.approx(1.0)
+    assert results[1]["score"] == pytest.approx(np.sqrt(0.5))
+    mock_repository.search_similar_faces.assert_not_called()
+
+    await cached_repository.search_similar_faces([0.0, 1.0, 0.0], family_id="fam", threshold=0.5)
+    stats = cached_repository.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["faces"] == 3
+
+
+@pytest.mark.asyncio
+async def test_member_filter_and_batch_search(cached_repository):
+    results = await cached_repository.search_similar_faces(
+        [0.0, 1.0, 0.0], family_id="fam", member_id="m1", top_k=5, threshold=0.0
+    )
+    assert {r["payload"]["member_id"] for r in results} == {"m1"}
+
+    batch = await cached_repository.batch_search_similar_faces(
+        [[1.0, 0.0, 0.0], [0.0, 2.0, 0.0]], family_id="fam", top_k=1, threshold=0.9
+    )
+    assert [[r["id"] for r in hits] for hits in batch] == [[FAMILY_FACES[0]["id"]], [FAMILY_FACES[1]["id"]]]
+
+
+@pytest.mark.asyncio
+async def test_search_without_family_goes_to_repository(cached_repository, mock_repository):
+    mock_repository.search_similar_faces.return_value = [{"id": "remote", "score": 0.9, "payload": {}}]
+    results = await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id=None)
+    assert results[0]["id"] == "remote"
+    mock_repository.search_similar_faces.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_writes_keep_cached_family_in_sync(cached_repository, mock_repository):
+    """
+    Kiểm tra thêm/xóa khuôn mặt (như sự kiện face.add/face.delete của consumer) cập nhật cache.
+    """
+    await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id="fam")
+
+    new_id = "44444444-4444-4444-4444-444444444444"
+    await cached_repository.upsert_face_vector(new_id.upper(), [0.0, 0.0, 1.0], {"family_id": "fam", "member_id": "m3"})
+    mock_repository.upsert_face_vector.assert_called_once()
+    results = await cached_repository.search_similar_faces([0.0, 0.0, 1.0], family_id="fam", top_k=1, threshold=0.9)
+    assert [r["id"] for r in results] == [new_id]
+
+    await cached_repository.delete_face(FAMILY_FACES[0]["id"])
+    results = await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id="fam", threshold=0.9)
+    assert results == []
+    assert cached_repository.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_families_are_evicted_lru_under_memory_budget(mock_repository):
+    cached_repository = CachedFaceRepository(mock_repository, max_bytes=10 * 1024 * 1024)
+    await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id="fam")
+    family_bytes = cached_repository.stats()["bytes"]
+
+    cached_repository.max_bytes = family_bytes
+    await cached_repository.upsert_face_vector("55555555-5555-5555-5555-555555555555", [1.0, 1.0, 1.0], {"family_id": "fam"})
+
+    stats = cached_repository.stats()
+    assert stats["families"] == 0
+    assert stats["bytes"] == 0
+    assert stats["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_set_faces_payload_updates_cached_payloads(cached_repository, mock_repository):
+    """
+    Kiểm tra set_faces_payload ghi xuống repository và cập nhật payload của family đang được cache.
+    """
+    await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id="fam", top_k=1, threshold=0.5)
+    mock_repository.set_faces_payload.return_value = 1
+    updates = [({"cluster_id": FAMILY_FACES[0]["id"]}, [FAMILY_FACES[0]["id"]])]
+
+    assert await cached_repository.set_faces_payload(updates) == 1
+    mock_repository.set_faces_payload.assert_awaited_once_with(updates)
+
+    results = await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id="fam", top_k=1, threshold=0.5)
+    assert results[0]["payload"] == {"family_id": "fam", "member_id": "m1", "cluster_id": FAMILY_FACES[0]["id"]}
+
+
+@pytest.mark.asyncio
+async def test_faces_without_active_vector_are_not_cached(mock_repository):
+    """
+    Kiểm tra khuôn mặt chưa có vector của model đang dùng (named vectors) bị bỏ qua khi tải family.
+    """
+    async def iter_faces(family_id, page_size=1000, offset=None, with_vectors=False):
+        yield {"id": 1, "payload": {"family_id": "fam"}, "vector": [1.0, 0.0, 0.0]}
+        yield {"id": 2, "payload": {"family_id": "fam"}, "vector": None}
+
+    mock_repository.iter_faces_by_family_id = iter_faces
+    cached_repository = CachedFaceRepository(mock_repository, max_bytes=10 * 1024 * 1024, ttl_seconds=300)
+
+    results = await cached_repository.search_similar_faces([1.0, 0.0, 0.0], family_id="fam", top_k=5, threshold=0.0)
+
+    assert [hit["id"] for hit in results] == [1]
+    assert cached_repository.stats()["faces"] == 1
@@ -0,0 +1,61 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.infrastructure.image_io import ImageDecodeError, decode_image, encode_image, encode_png, to_bgr_array
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_decode_png_returns_bgr_array():
+    """
+    Kiểm tra decode_image trả về mảng BGR uint8 (H, W, 3) từ ảnh PNG RGB.
+    """
+    image = decode_image(_encode(Image.new("RGB", (40, 30), color=(255, 0, 0)), "PNG"))
+
+    assert image.shape == (30, 40, 3)
+    assert image.dtype == np.uint8
+    assert tuple(image[0, 0]) == (0, 0, 255)
+
+
+def test_decode_grayscale_and_rgba_become_three_channel_bgr():
+    gray = decode_image(_encode(Image.new("L", (8, 8), color=128), "PNG"))
+    rgba = decode_image(_encode(Image.new("RGBA", (8, 8), color=(0, 255, 0, 10)), "PNG"))
+
+    assert gray.shape == (8, 8, 3)
+    assert tuple(rgba[0, 0]) == (0, 255, 0)
+
+
+def test_decode_invalid_bytes_raises():
+    with pytest.raises(ImageDecodeError):
+        decode_image(b"not an image")
+    with pytest.raises(ImageDecodeError):
+        decode_image(b"")
+
+
+def test_to_bgr_array_and_encode_png_round_trip():
+    image = to_bgr_array(Image.new("RGB", (10, 10), color=(1, 2, 3)))
+    assert tuple(image[0, 0]) == (3, 2, 1)
+    # View cắt từ ảnh gốc (không liên tục trong bộ nhớ) vẫn encode được
+    decoded = decode_image(encode_png(image[2:6, 3:9]))
+    assert decoded.shape == (4, 6, 3)
+    assert tuple(decoded[0, 0]) == (3, 2, 1)
+
+
+@pytest.mark.parametrize("image_format", ["png", "jpeg", "webp"])
+def test_encode_image_formats_round_trip(image_format):
+    image = np.full((20, 30, 3), (40, 80, 120), dtype=np.uint8)
+    decoded = decode_image(encode_image(image, image_format, quality=90))
+    assert decoded.shape == (20, 30, 3)
+    assert np.abs(decoded.astype(int) - image.astype(int)).max() <= 3
+
+
+def test_encode_image_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        encode_image(np.zeros((4, 4, 3), dtype=np.uint8), "gif")
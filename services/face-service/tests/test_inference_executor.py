@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import pytest
+
+from src.infrastructure.inference_executor import InferenceExecutor, InferenceQueueFullError
+
+
+@pytest.mark.asyncio
+async def test_run_executes_off_the_event_loop():
+    """
+    Kiểm tra hàm CPU-bound được chạy trong thread khác với event loop.
+    """
+    executor = InferenceExecutor(max_workers=2, max_queue=0)
+    try:
+        loop_thread = threading.get_ident()
+        worker_thread = await executor.run(threading.get_ident)
+        assert worker_thread != loop_thread
+        assert executor.inflight == 0
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_rejects_when_queue_is_full():
+    """
+    Kiểm tra executor từ chối job mới khi đã đủ max_workers + max_queue job đang xử lý.
+    """
+    executor = InferenceExecutor(max_workers=1, max_queue=1, retry_after=7)
+    release = threading.Event()
+    try:
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert executor.inflight == 2
+
+        with pytest.raises(InferenceQueueFullError) as exc_info:
+            await executor.run(release.wait)
+        assert exc_info.value.retry_after == 7
+
+        release.set()
+        await asyncio.gather(*running)
+        assert executor.inflight == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_keeps_slot_until_job_finishes():
+    """
+    Kiểm tra khi request đang chờ bị hủy, slot chỉ được trả khi worker chạy xong job, nên job mới vẫn bị từ chối.
+    """
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        release.wait()
+
+    try:
+        waiting = asyncio.ensure_future(executor.run(job))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert executor.inflight == 1
+        with pytest.raises(InferenceQueueFullError):
+            await executor.run(lambda: 42)
+
+        release.set()
+        for _ in range(100):
+            if executor.inflight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await executor.run(lambda: 42) == 42
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_exceptions_and_releases_slot():
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("dlib error")
+
+    try:
+        with pytest.raises(ValueError, match="dlib error"):
+            await executor.run(fail)
+        assert executor.inflight == 0
+        assert await executor.run(lambda: 42) == 42
+    finally:
+        executor.shutdown()
+
+
+def test_process_pool_component_calls_model_in_worker_process():
+    """
+    Kiểm tra proxy chuyển lời gọi sang component được khởi tạo trong process con.
+    """
+    from src.infrastructure.inference_executor import (
+        ProcessPoolComponent,
+        create_component_process_pool,
+        warm_up_process_pool,
+    )
+
+    pool = create_component_process_pool({"component": list}, processes=1)
+    try:
+        warm_up_process_pool(pool, 1)
+        proxy = ProcessPoolComponent("component", pool)
+        assert proxy._call("__len__") == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_request_context():
+    """
+    Kiểm tra thời gian giai đoạn đo trong thread của executor được ghi vào context của request gọi nó.
+    """
+    from src.application.services import instrumentation
+
+    def work():
+        with instrumentation.timed_stage("detect"):
+            return 1
+
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    token = instrumentation.begin_request_timings()
+    try:
+        await executor.run(work)
+        assert [stage for stage, _ in instrumentation.request_timings()] == ["detect"]
+    finally:
+        instrumentation.end_request_timings(token)
+        executor.shutdown()
@@ -0,0 +1,59 @@
+import json
+import logging
+
+from src.infrastructure.logging_config import JsonFormatter, RateLimitFilter, TextFormatter, configure_logging
+
+
+def _record(msg="Returning %d search results.", args=(3,), level=logging.INFO):
+    return logging.LogRecord("test.hot_path", level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_filter_drops_excess_records_per_template(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.infrastructure.logging_config.time.monotonic", lambda: now[0])
+    rate_filter = RateLimitFilter(per_second=2)
+
+    assert [rate_filter.filter(_record()) for _ in range(4)] == [True, True, False, False]
+    # Template khác có bucket riêng; WARNING luôn được ghi
+    assert rate_filter.filter(_record(msg="Face added successfully: %s", args=("f1",)))
+    assert rate_filter.filter(_record(level=logging.WARNING))
+
+    now[0] += 1.0
+    record = _record()
+    assert rate_filter.filter(record)
+    assert record.suppressed == 2
+
+
+def test_rate_limit_filter_evicts_least_recently_used_templates():
+    rate_filter = RateLimitFilter(per_second=1, max_templates=2)
+    rate_filter.filter(_record(msg="a"))
+    rate_filter.filter(_record(msg="b"))
+    rate_filter.filter(_record(msg="a"))
+    rate_filter.filter(_record(msg="c"))
+
+    assert list(rate_filter._buckets) == [("test.hot_path", "a"), ("test.hot_path", "c")]
+
+
+def test_formatters_report_suppressed_records():
+    record = _record()
+    record.suppressed = 7
+    assert TextFormatter("%(message)s").format(record) == "Returning 3 search results. (+7 similar suppressed)"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Returning 3 search results."
+    assert entry["logger"] == "test.hot_path"
+    assert entry["suppressed"] == 7
+
+
+def test_configure_logging_full_dumps_switch():
+    name = "test.logging_config.hot"
+    hot_logger = logging.getLogger(name)
+    hot_logger.setLevel(logging.INFO)
+
+    configure_logging(async_handler=False, hot_path_rate_limit=5, full_dumps=False, hot_path_loggers=[name])
+    assert [type(f) for f in hot_logger.filters] == [RateLimitFilter]
+    assert not hot_logger.isEnabledFor(logging.DEBUG)
+
+    # Bật dump đầy đủ: DEBUG được bật và không còn giới hạn tốc độ
+    configure_logging(async_handler=False, hot_path_rate_limit=5, full_dumps=True, hot_path_loggers=[name])
+    assert hot_logger.filters == []
+    assert hot_logger.isEnabledFor(logging.DEBUG)
@@ -29,7 +29,7 @@ def mock_all_services_session_scope():
     os.environ["QDRANT_COLLECTION_NAME"] = "test_collection_name"
 
     try:
-        with patch('src.infrastructure.persistence.qdrant_client.QdrantClient') as MockActualQdrantClient, \
+        with patch('src.infrastructure.persistence.qdrant_client.AsyncQdrantClient') as MockActualQdrantClient, \
              patch('src.infrastructure.persistence.qdrant_client.QdrantFaceRepository') as MockQdrantFaceRepository, \
              patch('src.infrastructure.embeddings.facenet_embedding.FaceNetEmbeddingService') as MockFaceNetEmbeddingService, \
              patch('src.infrastructure.detectors.dlib_detector.DlibFaceDetector') as MockDlibFaceDetector:
@@ -42,7 +42,9 @@ def mock_all_services_session_scope():
 
             mock_qdrant_instance = MockQdrantFaceRepository.return_value
             mock_qdrant_instance.upsert_face_vector = AsyncMock(return_value=None)
+            mock_qdrant_instance.upsert_face_vectors = AsyncMock(side_effect=lambda faces, wait=True: len(faces))
             mock_qdrant_instance.get_faces_by_family_id = AsyncMock(return_value=[])
+            mock_qdrant_instance.get_faces_page_by_family_id = AsyncMock(return_value=([], None))
             mock_qdrant_instance.delete_face = AsyncMock(return_value=True)
             mock_qdrant_instance.delete_faces_by_family_id = AsyncMock(return_value=True)
             mock_qdrant_instance.search_similar_faces = AsyncMock(return_value=[])
@@ -79,10 +81,13 @@ def reset_mocks_for_each_test(mock_all_services_session_scope):
         {'box': (10, 10, 50, 50), 'confidence': 0.99}
     ]
     mock_all_services_session_scope["face_embedding_service"].get_embedding.return_value = [0.1] * 128
+    mock_all_services_session_scope["face_embedding_service"].get_embeddings.side_effect = lambda crops: [[0.1] * 128 for _ in crops]
     
     # Reset QdrantFaceRepository mocks
     mock_all_services_session_scope["qdrant_repository"].upsert_face_vector.reset_mock()
+    mock_all_services_session_scope["qdrant_repository"].upsert_face_vectors.reset_mock()
     mock_all_services_session_scope["qdrant_repository"].get_faces_by_family_id.reset_mock()
+    mock_all_services_session_scope["qdrant_repository"].get_faces_page_by_family_id.reset_mock()
     mock_all_services_session_scope["qdrant_repository"].delete_face.reset_mock()
     mock_all_services_session_scope["qdrant_repository"].delete_faces_by_family_id.reset_mock()
     mock_all_services_session_scope["qdrant_repository"].search_similar_faces.reset_mock()
@@ -206,6 +211,76 @@ def test_add_face_by_vector_endpoint(client, dummy_metadata, mock_all_services_s
     mock_all_services_session_scope["face_embedding_service"].get_embedding.assert_not_called()
 
 
+def test_add_faces_by_vectors_bulk_endpoint(client, dummy_metadata, mock_all_services_session_scope):
+    """
+    Test POST /faces/vectors:bulk writes all faces with a single batched upsert.
+    """
+    faces = []
+    for _ in range(3):
+        metadata = dict(dummy_metadata, face_id=str(uuid.uuid4()))
+        faces.append({"vector": [0.5] * 128, "metadata": metadata})
+
+    response = client.post("/faces/vectors:bulk", json={"faces": faces})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "completed"
+    assert body["count"] == 3
+    assert body["face_ids"] == [face["metadata"]["face_id"] for face in faces]
+    mock_all_services_session_scope["qdrant_repository"].upsert_face_vectors.assert_called_once()
+    mock_all_services_session_scope["qdrant_repository"].upsert_face_vector.assert_not_called()
+
+
+def test_add_faces_by_vectors_bulk_endpoint_rejects_oversized_batch(client, dummy_metadata, mock_all_services_session_scope):
+    """
+    Test POST /faces/vectors:bulk rejects more than MAX_BULK_FACES faces with 422.
+    """
+    from src.domain.entities.models import MAX_BULK_FACES
+
+    face = {"vector": [0.5] * 4, "metadata": dummy_metadata}
+    response = client.post("/faces/vectors:bulk", json={"faces": [face] * (MAX_BULK_FACES + 1)})
+
+    assert response.status_code == 422
+    mock_all_services_session_scope["qdrant_repository"].upsert_face_vectors.assert_not_called()
+
+
+def test_add_faces_by_vectors_bulk_endpoint_async_mode(client, dummy_metadata):
+    """
+    Test POST /faces/vectors:bulk with wait=false returns 202 and a pollable operation id.
+    """
+    faces = [{"vector": [0.5] * 128, "metadata": dict(dummy_metadata, face_id=str(uuid.uuid4()))}]
+
+    response = client.post("/faces/vectors:bulk", json={"faces": faces, "wait": False})
+
+    assert response.status_code == 202
+    operation_id = response.json()["operation_id"]
+    status_response = client.get(f"/faces/vectors:bulk/{operation_id}")
+    assert status_response.status_code == 200
+    assert status_response.json()["status"] in ("pending", "running", "completed")
+    assert client.get("/faces/vectors:bulk/unknown-operation").status_code == 404
+
+
+def test_add_faces_by_vectors_bulk_endpoint_skips_duplicates(client, dummy_metadata, mock_all_services_session_scope):
+    """
+    Test POST /faces/vectors:bulk?duplicate_policy=skip stores only faces without a near-duplicate.
+    """
+    repository = mock_all_services_session_scope["qdrant_repository"]
+    repository.batch_search_similar_faces.return_value = [[{"id": "existing", "score": 0.99, "payload": {}}], []]
+    repository.upsert_face_vectors.return_value = 1
+    faces = [
+        {"vector": [1.0] + [0.0] * 127, "metadata": dict(dummy_metadata, face_id="dup")},
+        {"vector": [0.0, 1.0] + [0.0] * 126, "metadata": dict(dummy_metadata, face_id="new")},
+    ]
+
+    response = client.post("/faces/vectors:bulk", params={"duplicate_policy": "skip"}, json={"faces": faces})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["face_ids"] == ["new"]
+    assert body["duplicates"] == [{"face_id": "dup", "duplicate_of": "existing", "score": 0.99, "action": "skipped"}]
+    assert client.post("/faces/vectors:bulk", params={"duplicate_policy": "drop"}, json={"faces": faces}).status_code == 422
+
+
 def test_get_faces_by_family_endpoint(client, mock_all_services_session_scope):
     """
     Test GET /faces/family/{family_id} endpoint.
@@ -218,7 +293,82 @@ def test_get_faces_by_family_endpoint(client, mock_all_services_session_scope):
     assert response.status_code == 200
     assert len(response.json()) == 1
     assert response.json()[0]["id"] == "face1"
-    mock_all_services_session_scope["qdrant_repository"].get_faces_by_family_id.assert_called_once_with(family_id)
+    mock_all_services_session_scope["qdrant_repository"].get_faces_by_family_id.assert_called_once_with(family_id, with_vectors=False)
+
+def test_cluster_family_faces_endpoint(client, mock_all_services_session_scope):
+    """
+    Test POST /faces/family/{family_id}/clusters stores cluster ids, inline or as a pollable operation.
+    """
+    family_id = "family-clusters"
+    repository = mock_all_services_session_scope["qdrant_repository"]
+    repository.get_faces_page_by_family_id.return_value = (
+        [
+            {"id": "face1", "payload": {"family_id": family_id}, "vector": [1.0, 0.0]},
+            {"id": "face2", "payload": {"family_id": family_id}, "vector": [0.99, 0.05]},
+        ],
+        None,
+    )
+    repository.set_faces_payload = AsyncMock(return_value=2)
+
+    response = client.post(f"/faces/family/{family_id}/clusters", json={"threshold": 0.9, "wait": True})
+
+    assert response.status_code == 200
+    assert response.json()["result"]["clusters"] == 1
+    assert response.json()["result"]["updated"] == 2
+    repository.set_faces_payload.assert_awaited_once_with(
+        [({"cluster_id": "face1", "cluster_size": 2}, ["face1", "face2"])]
+    )
+
+    response = client.post(f"/faces/family/{family_id}/clusters")
+    assert response.status_code == 202
+    operation_id = response.json()["operation_id"]
+    status_response = client.get(f"/faces/family/{family_id}/clusters/{operation_id}")
+    assert status_response.status_code == 200
+    assert status_response.json()["status"] in ("pending", "running", "completed")
+    assert client.get(f"/faces/family/other-family/clusters/{operation_id}").status_code == 404
+
+def test_get_faces_by_family_endpoint_paginated(client, mock_all_services_session_scope):
+    """
+    Test GET /faces/family/{family_id} with limit/offset returns a page with next_page_offset.
+    """
+    family_id = "family-paged"
+    repository = mock_all_services_session_scope["qdrant_repository"]
+    repository.get_faces_page_by_family_id.return_value = (
+        [{"id": "face2", "payload": {"family_id": family_id}}],
+        "face3",
+    )
+
+    response = client.get(f"/faces/family/{family_id}", params={"limit": 1, "offset": "face2"})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "faces": [{"id": "face2", "payload": {"family_id": family_id}}],
+        "next_page_offset": "face3",
+    }
+    repository.get_faces_page_by_family_id.assert_called_once_with(family_id, 1, offset="face2", with_vectors=False)
+
+
+def test_get_faces_by_family_endpoint_ndjson_stream(client, mock_all_services_session_scope):
+    """
+    Test GET /faces/family/{family_id}?stream=true streams every face as one NDJSON line.
+    """
+    family_id = "family-stream"
+    faces = [{"id": f"face{i}", "payload": {"family_id": family_id}, "vector": [0.1, 0.2]} for i in range(3)]
+
+    async def iter_faces(family_id, page_size=1000, offset=None, with_vectors=False):
+        for face in faces:
+            yield face
+
+    repository = mock_all_services_session_scope["qdrant_repository"]
+    with patch.object(repository, "iter_faces_by_family_id", side_effect=iter_faces, create=True) as mock_iter:
+        response = client.get(f"/faces/family/{family_id}", params={"stream": "true", "with_vectors": "true"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == faces
+    assert mock_iter.call_args.kwargs["with_vectors"] is True
+
 
 def test_delete_face_endpoint(client, mock_all_services_session_scope):
     """
@@ -287,7 +437,7 @@ def test_detect_faces_endpoint(client, dummy_image_bytes, mock_all_services_sess
             'embedding': [0.1] * 512 # ArcFace usually returns 512-dim embeddings
         }
     ]
-    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces', return_value=mock_detected_faces) as mock_detect_and_embed:
+    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces_async', new_callable=AsyncMock, return_value=mock_detected_faces) as mock_detect_and_embed:
         response = client.post(
             "/faces/detect",
             files={"file": ("test.png", dummy_image_bytes, "image/png")}
@@ -302,11 +452,48 @@ def test_detect_faces_endpoint(client, dummy_image_bytes, mock_all_services_sess
         mock_all_services_session_scope["face_detector"].detect_faces.assert_not_called()
         mock_all_services_session_scope["face_embedding_service"].get_embedding.assert_not_called()
 
+def test_detect_faces_endpoint_detection_options(client, dummy_image_bytes):
+    """
+    Test POST /faces/detect forwards max_side and upsample query parameters.
+    """
+    mock_detected_faces = [{'box': [10, 10, 40, 40], 'confidence': 0.99, 'embedding': [0.1] * 512}]
+    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces_async', new_callable=AsyncMock, return_value=mock_detected_faces) as mock_detect_and_embed:
+        response = client.post(
+            "/faces/detect?max_side=1024&upsample=adaptive&tier=fast",
+            files={"file": ("test.png", dummy_image_bytes, "image/png")}
+        )
+        assert response.status_code == 200
+        assert mock_detect_and_embed.call_args.kwargs == {"max_side": 1024, "upsample": "adaptive", "tier": "fast"}
+
+    response = client.post(
+        "/faces/detect?upsample=9",
+        files={"file": ("test.png", dummy_image_bytes, "image/png")}
+    )
+    assert response.status_code == 422
+
+def test_detect_faces_endpoint_unknown_tier(client, dummy_image_bytes):
+    """
+    Test POST /faces/detect answers 400 for a detector tier that is not configured.
+    """
+    from src.infrastructure.detectors.detector_pool import UnknownDetectorTierError
+
+    with patch(
+        'src.application.services.face_manager.FaceManager.detect_and_embed_faces_async',
+        new_callable=AsyncMock,
+        side_effect=UnknownDetectorTierError("Unknown detector tier 'turbo'."),
+    ):
+        response = client.post(
+            "/faces/detect?tier=turbo",
+            files={"file": ("test.png", dummy_image_bytes, "image/png")}
+        )
+    assert response.status_code == 400
+    assert "turbo" in response.json()["detail"]
+
 def test_detect_faces_endpoint_no_faces(client, dummy_image_bytes, mock_all_services_session_scope):
     """
     Test POST /faces/detect endpoint when no faces are detected.
     """
-    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces', return_value=[]) as mock_detect_and_embed:
+    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces_async', new_callable=AsyncMock, return_value=[]) as mock_detect_and_embed:
         response = client.post(
             "/faces/detect",
             files={"file": ("test.png", dummy_image_bytes, "image/png")}
@@ -326,7 +513,7 @@ def test_detect_faces_endpoint_return_crop(client, dummy_image_bytes, mock_all_s
             'embedding': [0.1] * 512
         }
     ]
-    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces', return_value=mock_detected_faces) as mock_detect_and_embed:
+    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces_async', new_callable=AsyncMock, return_value=mock_detected_faces) as mock_detect_and_embed:
         response = client.post(
             "/faces/detect?return_crop=true",
             files={"file": ("test.png", dummy_image_bytes, "image/png")}
@@ -337,11 +524,22 @@ def test_detect_faces_endpoint_return_crop(client, dummy_image_bytes, mock_all_s
         assert response.json()[0]["thumbnail"] is not None
         mock_detect_and_embed.assert_called_once()
 
+def test_detect_faces_endpoint_invalid_image(client):
+    """
+    Test POST /faces/detect returns 400 when the upload cannot be decoded as an image.
+    """
+    response = client.post(
+        "/faces/detect",
+        files={"file": ("broken.jpg", b"definitely not a jpeg", "image/jpeg")},
+    )
+    assert response.status_code == 400
+    assert "Invalid image data" in response.json()["detail"]
+
 def test_batch_search_faces_by_vectors_endpoint(client, mock_all_services_session_scope):
     """
     Test POST /faces/batch-search-vectors endpoint.
     """
-    vectors_to_search = [[0.1]*128, [0.2]*128]
+    vectors_to_search = [[0.1]*128, [0.2]*64 + [-0.2]*64]
     family_id = "e4757d91-509b-4ac0-8807-8d0b82e3b7ec"
     top_k = 2
     threshold = 0.5
@@ -370,4 +568,209 @@ def test_batch_search_faces_by_vectors_endpoint(client, mock_all_services_sessio
     assert response.json() == mock_search_results
     mock_all_services_session_scope["qdrant_repository"].batch_search_similar_faces.assert_called_once_with(
         vectors_to_search, family_id=family_id, top_k=top_k, threshold=threshold
-    )
\ No newline at end of file
+    )
+
+def test_batch_search_faces_by_vectors_columnar_endpoint(client, mock_all_services_session_scope):
+    """
+    Test POST /faces/batch-search-vectors with columnar=true, including deduplicated query vectors.
+    """
+    repository = mock_all_services_session_scope["qdrant_repository"]
+    repository.batch_search_similar_faces.return_value = [
+        [{"id": "face1", "score": 0.9, "payload": {"member_id": "member1"}}],
+        [],
+    ]
+    payload = {
+        "vectors": [[0.1] * 128, [0.2] * 128, [0.2] * 64 + [-0.2] * 64],  # hai vector đầu cùng hướng
+        "top_k": 1,
+        "columnar": True,
+        "with_payload": False,
+    }
+
+    response = client.post("/faces/batch-search-vectors", json=payload)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "ids": [["face1"], ["face1"], []],
+        "scores": [[0.9], [0.9], []],
+        "payloads": None,
+    }
+    args, _ = repository.batch_search_similar_faces.call_args
+    assert args[0] == [payload["vectors"][0], payload["vectors"][2]]
+    stats = client.get("/stats/batch-search").json()
+    assert stats["batch_search_latency_seconds"]["count"] >= 1
+
+
+def test_readiness_endpoint_reports_model_state(client):
+    """
+    Test GET /health/ready returns 503 until every registered model is loaded.
+    """
+    from src.presentation.main import app as fastapi_app
+    from src.presentation.dependencies import get_model_registry
+    from src.infrastructure.model_registry import ModelRegistry
+
+    registry = ModelRegistry()
+    registry.register("face_detector", Mock(return_value=Mock()))
+    fastapi_app.dependency_overrides[get_model_registry] = lambda: registry
+    try:
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "not_ready"
+
+        registry.warm_up()
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["models"]["face_detector"]["loaded"] is True
+    finally:
+        fastapi_app.dependency_overrides.pop(get_model_registry, None)
+
+
+def test_detect_faces_endpoint_returns_503_when_inference_queue_full(client, dummy_image_bytes):
+    """
+    Test POST /faces/detect answers 503 with Retry-After when the inference executor is saturated.
+    """
+    from src.infrastructure.inference_executor import InferenceQueueFullError
+
+    with patch(
+        'src.application.services.face_manager.FaceManager.detect_and_embed_faces_async',
+        new_callable=AsyncMock,
+        side_effect=InferenceQueueFullError("queue full", retry_after=3),
+    ):
+        response = client.post(
+            "/faces/detect",
+            files={"file": ("test.png", dummy_image_bytes, "image/png")}
+        )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+
+def test_detect_faces_endpoint_serves_repeated_images_from_cache(client, dummy_image_bytes):
+    """
+    Test POST /faces/detect answers re-submitted images from the detection result cache.
+    """
+    from src.presentation.main import app as fastapi_app
+    from src.presentation.dependencies import get_detection_cache
+    from src.infrastructure.detection_cache import DetectionResultCache
+
+    cache = DetectionResultCache("test", disk_dir="")
+    fastapi_app.dependency_overrides[get_detection_cache] = lambda: cache
+    mock_detected_faces = [{'box': [10, 10, 40, 40], 'confidence': 0.99, 'embedding': [0.1] * 512}]
+    try:
+        with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces_async', new_callable=AsyncMock, return_value=mock_detected_faces) as mock_detect_and_embed:
+            for _ in range(2):
+                response = client.post(
+                    "/faces/detect?return_crop=true",
+                    files={"file": ("test.png", dummy_image_bytes, "image/png")}
+                )
+                assert response.status_code == 200
+                assert response.json()[0]["bounding_box"] == {"x": 10, "y": 10, "width": 40, "height": 40}
+                assert response.json()[0]["thumbnail"] is not None
+            mock_detect_and_embed.assert_called_once()
+
+        stats = client.get("/stats/detection-cache").json()
+        assert stats["enabled"] is True
+        assert stats["endpoints"]["/faces/detect"]["memory_hits"] == 1
+        assert stats["endpoints"]["/faces/detect"]["misses"] == 1
+    finally:
+        fastapi_app.dependency_overrides.pop(get_detection_cache, None)
+
+
+def test_metrics_endpoint_exposes_stage_histograms(client, dummy_image_bytes, dummy_metadata):
+    """
+    Test GET /metrics returns Prometheus text including the decode stage recorded by POST /faces.
+    """
+    dummy_metadata["face_id"] = str(uuid.uuid4())
+    client.post(
+        "/faces",
+        files={"file": ("test.png", dummy_image_bytes, "image/png")},
+        data={"metadata": json.dumps(dummy_metadata)}
+    )
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE face_service_stage_duration_seconds histogram" in response.text
+    assert 'face_service_stage_duration_seconds_count{stage="decode"}' in response.text
+
+
+def test_server_timing_header_lists_request_stages(client, dummy_image_bytes, dummy_metadata):
+    """
+    Test the Server-Timing middleware reports the stages of the request it wraps.
+    """
+    from src.presentation.main import app as fastapi_app
+    from src.presentation.server_timing import ServerTimingMiddleware
+
+    timed_client = TestClient(ServerTimingMiddleware(fastapi_app))
+    dummy_metadata["face_id"] = str(uuid.uuid4())
+    response = timed_client.post(
+        "/faces",
+        files={"file": ("test.png", dummy_image_bytes, "image/png")},
+        data={"metadata": json.dumps(dummy_metadata)}
+    )
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("decode;dur=")
+
+    # Request không đi qua giai đoạn nào thì không có header
+    assert "Server-Timing" not in timed_client.get("/health/live").headers
+
+
+def test_detect_faces_endpoint_multipart_thumbnails(client, dummy_image_bytes):
+    """
+    Test POST /faces/detect?response_format=multipart returns binary thumbnails instead of base64 JSON.
+    """
+    from email.parser import BytesParser
+    from email.policy import HTTP
+
+    mock_detected_faces = [{'box': [10, 10, 40, 40], 'confidence': 0.99, 'embedding': [0.1] * 512}]
+    with patch('src.application.services.face_manager.FaceManager.detect_and_embed_faces_async', new_callable=AsyncMock, return_value=mock_detected_faces):
+        response = client.post(
+            "/faces/detect?return_crop=true&response_format=multipart",
+            files={"file": ("test.png", dummy_image_bytes, "image/png")}
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("multipart/form-data; boundary=")
+
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + response.headers["content-type"].encode() + b"\r\n\r\n" + response.content
+    )
+    results_part, thumbnail_part = list(message.iter_parts())
+    assert results_part.get_param("name", header="content-disposition") == "results"
+    results = json.loads(results_part.get_content())
+    assert results[0]["thumbnail"] is None
+    assert thumbnail_part.get_param("name", header="content-disposition") == results[0]["id"]
+    assert thumbnail_part.get_content_type() == "image/png"
+    thumbnail = Image.open(io.BytesIO(thumbnail_part.get_payload(decode=True)))
+    assert thumbnail.size == (40, 40)
+
+
+def test_collection_stats_endpoint(client, mock_all_services_session_scope):
+    """
+    Test GET /admin/collection/stats returns the repository's collection statistics.
+    """
+    mock_all_services_session_scope["qdrant_repository"].collection_stats = AsyncMock(return_value={
+        "segments_count": 3,
+        "indexed_fields": {"family_id": {"data_type": "keyword", "is_tenant": True, "points": 10}},
+        "memory": {"estimated_ram_bytes": 1024},
+    })
+
+    response = client.get("/admin/collection/stats")
+
+    assert response.status_code == 200
+    assert response.json()["segments_count"] == 3
+    assert response.json()["indexed_fields"]["family_id"]["is_tenant"] is True
+
+
+def test_family_vector_cache_stats_endpoint_disabled(client):
+    """
+    Test GET /stats/family-vector-cache reports the cache as disabled when the repository is not cached.
+    """
+    response = client.get("/stats/family-vector-cache")
+    assert response.status_code == 200
+    assert response.json() == {"enabled": False}
+
+
+def test_reembedding_endpoints_require_backfill_model(client):
+    """
+    Test /admin/reembedding returns 400 when FACE_EMBEDDING_BACKFILL_MODEL is not configured.
+    """
+    assert client.post("/admin/reembedding").status_code == 400
+    assert client.get("/admin/reembedding").status_code == 400
@@ -240,3 +240,159 @@ async def test_consumer_start_stop(message_consumer_instance, mock_aio_pika_conn
     # Stop the consumer
     await message_consumer_instance.stop()
     mock_connection.close.assert_called_once()
+
+
+def _added_message(face_id: str, delivery_tag: int):
+    metadata = MetadataModel(
+        family_id="family1",
+        member_id="member1",
+        face_id=face_id,
+        bounding_box=BoundingBoxModel(x=1.5, y=2.5, width=3.0, height=4.0),
+        confidence=0.9,
+    )
+    message = AsyncMock(spec=aio_pika.abc.AbstractIncomingMessage)
+    message.body = MemberFaceAddedMessage(
+        face_add_request=FaceAddRequestModel(vector=[0.1] * 128, metadata=metadata),
+        member_face_local_id=face_id,
+    ).model_dump_json().encode()
+    message.routing_key = MessageBusConstants.RoutingKeys.MEMBER_FACE_ADDED
+    message.delivery_tag = delivery_tag
+    message.redelivered = False
+    return message
+
+
+def _deleted_message(vector_db_id: str, delivery_tag: int):
+    message = AsyncMock(spec=aio_pika.abc.AbstractIncomingMessage)
+    message.body = MemberFaceDeletedMessage(
+        member_face_id=vector_db_id, vector_db_id=vector_db_id, member_id="member1", family_id="family1"
+    ).model_dump_json().encode()
+    message.routing_key = MessageBusConstants.RoutingKeys.MEMBER_FACE_DELETED
+    message.delivery_tag = delivery_tag
+    message.redelivered = False
+    return message
+
+
+@pytest.fixture
+def batching_consumer(mock_face_manager):
+    mock_face_manager.add_faces_by_vectors = AsyncMock(return_value={"count": 0, "face_ids": []})
+    mock_face_manager.delete_faces = AsyncMock(return_value=True)
+    return MessageConsumer(face_manager=mock_face_manager, batching=True, batch_size=4, batch_window_ms=20)
+
+
+@pytest.mark.asyncio
+async def test_batching_consumer_sets_prefetch(batching_consumer, mock_aio_pika_connection):
+    """Prefetch is applied with basic_qos and defaults to twice the batch size."""
+    _, _, mock_channel, _, _ = mock_aio_pika_connection
+    await batching_consumer._connect()
+    mock_channel.set_qos.assert_called_once_with(prefetch_count=8)
+
+
+@pytest.mark.asyncio
+async def test_batching_consumer_coalesces_full_batch(batching_consumer, mock_face_manager):
+    """A full batch becomes one upsert and one delete, acked once with multiple=True."""
+    messages = [
+        _added_message("face1", 1),
+        _added_message("face2", 2),
+        _deleted_message("face2", 3),  # add rồi delete cùng face_id trong lô -> chỉ còn delete
+        _deleted_message("face3", 4),
+    ]
+    for message in messages:
+        await batching_consumer._dispatch_message(message)
+
+    mock_face_manager.add_faces_by_vectors.assert_called_once()
+    adds = mock_face_manager.add_faces_by_vectors.call_args.args[0]
+    assert [item["metadata"]["face_id"] for item in adds] == ["face1"]
+    assert adds[0]["metadata"]["bounding_box"] == {"x": 1, "y": 2, "width": 3, "height": 4}
+    mock_face_manager.delete_faces.assert_called_once_with(["face2", "face3"])
+    mock_face_manager.add_face_by_vector.assert_not_called()
+    mock_face_manager.delete_face.assert_not_called()
+
+    messages[-1].ack.assert_called_once_with(multiple=True)
+    for message in messages[:-1]:
+        message.ack.assert_not_called()
+        message.process.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_batching_consumer_flushes_after_window(batching_consumer, mock_face_manager):
+    """A partial batch is flushed once the batch window expires."""
+    message = _added_message("face1", 7)
+    await batching_consumer._dispatch_message(message)
+    mock_face_manager.add_faces_by_vectors.assert_not_called()
+
+    await asyncio.sleep(0.1)
+
+    mock_face_manager.add_faces_by_vectors.assert_called_once()
+    mock_face_manager.delete_faces.assert_not_called()
+    message.ack.assert_called_once_with(multiple=True)
+    assert batching_consumer.stats()["batches"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_batch_does_not_cancel_timer_flush_in_progress(batching_consumer, mock_face_manager):
+    """Filling a batch while a timer flush is writing must not cancel it: both batches are written and acked."""
+    release = asyncio.Event()
+    writing = asyncio.Event()
+
+    async def slow_add(faces, wait=True):
+        writing.set()
+        await release.wait()
+        return {"count": len(faces), "face_ids": []}
+
+    mock_face_manager.add_faces_by_vectors = AsyncMock(side_effect=slow_add)
+    first = _added_message("face0", 1)
+    await batching_consumer._dispatch_message(first)
+    await asyncio.wait_for(writing.wait(), timeout=1)  # timer đã lấy lô đầu và đang ghi
+
+    batch = [_added_message(f"face{i}", i + 1) for i in range(1, 5)]
+    for message in batch[:-1]:
+        await batching_consumer._dispatch_message(message)
+    full_flush = asyncio.create_task(batching_consumer._dispatch_message(batch[-1]))
+    await asyncio.sleep(0.05)
+    release.set()
+    await asyncio.wait_for(full_flush, timeout=1)
+
+    assert mock_face_manager.add_faces_by_vectors.await_count == 2
+    first.ack.assert_called_once_with(multiple=True)
+    batch[-1].ack.assert_called_once_with(multiple=True)
+    first.nack.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_batching_consumer_requeues_failed_batch_once(batching_consumer, mock_face_manager):
+    """A failed write requeues the batch, but a redelivered batch is dropped."""
+    mock_face_manager.add_faces_by_vectors.side_effect = RuntimeError("Qdrant unavailable")
+
+    first = _added_message("face1", 1)
+    batching_consumer._pending.append(first)
+    await batching_consumer._flush()
+    first.nack.assert_called_once_with(multiple=True, requeue=True)
+    first.ack.assert_not_called()
+
+    redelivered = _added_message("face1", 2)
+    redelivered.redelivered = True
+    batching_consumer._pending.append(redelivered)
+    await batching_consumer._flush()
+    redelivered.nack.assert_called_once_with(multiple=True, requeue=False)
+
+
+@pytest.mark.asyncio
+async def test_consumer_records_lag_processing_and_outcome(message_consumer_instance, mock_face_manager):
+    """Lag (from the AMQP timestamp), processing time and outcome are recorded per routing key."""
+    from datetime import datetime, timedelta, timezone
+    from src.infrastructure.metrics import get_counter, get_histogram
+
+    routing_key = MessageBusConstants.RoutingKeys.MEMBER_FACE_ADDED
+    lag = get_histogram("consumer_lag_seconds", (), labels={"routing_key": routing_key})
+    processing = get_histogram("consumer_processing_seconds", (), labels={"routing_key": routing_key})
+    processed = get_counter("consumer_messages_total", labels={"routing_key": routing_key, "outcome": "processed"})
+    lag_before, processing_before, processed_before = lag.snapshot(), processing.snapshot()["count"], processed.value
+
+    message = _added_message("face1", 1)
+    message.timestamp = datetime.now(timezone.utc) - timedelta(seconds=5)
+    await message_consumer_instance._dispatch_message(message)
+
+    assert lag.snapshot()["count"] == lag_before["count"] + 1
+    assert lag.snapshot()["sum"] - lag_before["sum"] == pytest.approx(5, abs=1)
+    assert processing.snapshot()["count"] == processing_before + 1
+    assert processed.value == processed_before + 1
@@ -0,0 +1,78 @@
+import pytest
+
+from src.application.services import instrumentation
+from src.infrastructure.metrics import get_counter, get_histogram, observe_stage, registered_histograms, render_prometheus
+
+
+@pytest.fixture
+def stage_observations():
+    observed = []
+
+    def observer(stage, seconds):
+        observed.append((stage, seconds))
+
+    instrumentation.add_stage_observer(observer)
+    yield observed
+    instrumentation.remove_stage_observer(observer)
+
+
+def test_labelled_histograms_are_separate_series():
+    fast = get_histogram("metrics_test_latency_seconds", (0.1, 1), labels={"tier": "fast"})
+    slow = get_histogram("metrics_test_latency_seconds", (0.1, 1), labels={"tier": "slow"})
+    assert fast is not slow
+    assert fast is get_histogram("metrics_test_latency_seconds", (0.1, 1), labels={"tier": "fast"})
+    assert 'metrics_test_latency_seconds{tier="fast"}' in registered_histograms()
+
+
+def test_render_prometheus_histogram_and_counter():
+    histogram = get_histogram(
+        "metrics_test_render_seconds", (0.1, 1), labels={"stage": "detect"}, documentation="Render test."
+    )
+    histogram.reset()
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    counter = get_counter("metrics_test_messages_total", labels={"outcome": "processed"})
+    counter.reset()
+    counter.inc()
+    counter.inc(2)
+
+    text = render_prometheus()
+    assert "# HELP metrics_test_render_seconds Render test." in text
+    assert "# TYPE metrics_test_render_seconds histogram" in text
+    assert 'metrics_test_render_seconds_bucket{le="0.1",stage="detect"} 1' in text
+    assert 'metrics_test_render_seconds_bucket{le="1",stage="detect"} 2' in text
+    assert 'metrics_test_render_seconds_bucket{le="+Inf",stage="detect"} 2' in text
+    assert 'metrics_test_render_seconds_sum{stage="detect"} 0.55' in text
+    assert 'metrics_test_render_seconds_count{stage="detect"} 2' in text
+    assert "# TYPE metrics_test_messages_total counter" in text
+    assert 'metrics_test_messages_total{outcome="processed"} 3' in text
+
+
+def test_label_values_are_escaped():
+    get_counter("metrics_test_escape_total", labels={"routing_key": 'a"b\\c'}).inc()
+    assert 'metrics_test_escape_total{routing_key="a\\"b\\\\c"} 1' in render_prometheus()
+
+
+def test_timed_stage_notifies_observers_and_request_timings(stage_observations):
+    token = instrumentation.begin_request_timings()
+    try:
+        with instrumentation.timed_stage("decode"):
+            pass
+        with pytest.raises(RuntimeError):
+            with instrumentation.timed_stage("detect"):
+                raise RuntimeError("detector failed")
+        timings = instrumentation.request_timings()
+    finally:
+        instrumentation.end_request_timings(token)
+
+    # Giai đoạn lỗi vẫn được đo
+    assert [stage for stage, _ in timings] == ["decode", "detect"]
+    assert [stage for stage, _ in stage_observations] == ["decode", "detect"]
+    assert instrumentation.request_timings() == []
+
+
+def test_observe_stage_records_stage_histogram():
+    before = get_histogram("face_service_stage_duration_seconds", (), labels={"stage": "metrics_test"}).snapshot()["count"]
+    observe_stage("metrics_test", 0.02)
+    after = get_histogram("face_service_stage_duration_seconds", (), labels={"stage": "metrics_test"}).snapshot()
+    assert after["count"] == before + 1
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+
+from src.infrastructure.embeddings.micro_batcher import EmbeddingMicroBatcher
+from src.domain.interfaces.face_embedding import IFaceEmbedding
+
+
+@pytest.fixture
+def mock_embedding_service():
+    mock = Mock(spec=IFaceEmbedding)
+    mock.get_embeddings.side_effect = lambda crops: [[float(crop)] * 4 for crop in crops]
+    return mock
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_batch(mock_embedding_service):
+    """
+    Kiểm tra các request đồng thời được gom vào một lần gọi get_embeddings.
+    """
+    batcher = EmbeddingMicroBatcher(mock_embedding_service, max_batch_size=16, max_wait_ms=50)
+    try:
+        results = await asyncio.gather(
+            batcher.embed([1, 2]),
+            batcher.embed([3]),
+            batcher.embed([4, 5, 6]),
+        )
+    finally:
+        await batcher.stop()
+
+    assert results == [
+        [[1.0] * 4, [2.0] * 4],
+        [[3.0] * 4],
+        [[4.0] * 4, [5.0] * 4, [6.0] * 4],
+    ]
+    mock_embedding_service.get_embeddings.assert_called_once_with([1, 2, 3, 4, 5, 6])
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 1
+    assert stats["batch_size"]["sum"] == 6
+    assert stats["queue_depth"]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_at_max_batch_size(mock_embedding_service):
+    batcher = EmbeddingMicroBatcher(mock_embedding_service, max_batch_size=2, max_wait_ms=50)
+    try:
+        results = await batcher.embed([1, 2, 3, 4, 5])
+    finally:
+        await batcher.stop()
+
+    assert [embedding[0] for embedding in results] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert all(len(call.args[0]) <= 2 for call in mock_embedding_service.get_embeddings.call_args_list)
+    assert mock_embedding_service.get_embeddings.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_embedding_errors_propagate_to_callers(mock_embedding_service):
+    mock_embedding_service.get_embeddings.side_effect = RuntimeError("ONNX Runtime error")
+    batcher = EmbeddingMicroBatcher(mock_embedding_service, max_batch_size=4, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError, match="ONNX Runtime error"):
+            await batcher.embed([1])
+        # Worker vẫn tiếp tục phục vụ sau lỗi
+        mock_embedding_service.get_embeddings.side_effect = lambda crops: [[0.5] for _ in crops]
+        assert await batcher.embed([2]) == [[0.5]]
+    finally:
+        await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_empty_input_does_not_touch_model(mock_embedding_service):
+    batcher = EmbeddingMicroBatcher(mock_embedding_service, max_batch_size=4, max_wait_ms=1)
+    assert await batcher.embed([]) == []
+    mock_embedding_service.get_embeddings.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_batches_go_through_inference_executor_admission(mock_embedding_service):
+    """
+    Kiểm tra lô embedding được chạy qua InferenceExecutor và bị từ chối (InferenceQueueFullError) khi executor đầy.
+    """
+    from src.infrastructure.inference_executor import InferenceExecutor, InferenceQueueFullError
+
+    executor = InferenceExecutor(max_workers=1, max_queue=0, retry_after=7)
+    batcher = EmbeddingMicroBatcher(mock_embedding_service, max_batch_size=4, max_wait_ms=0, inference_executor=executor)
+    try:
+        assert await batcher.embed([1, 2]) == [[1.0] * 4, [2.0] * 4]
+
+        executor._acquire()  # Executor bận với một job khác
+        try:
+            with pytest.raises(InferenceQueueFullError) as excinfo:
+                await batcher.embed([3])
+        finally:
+            executor._release()
+        assert excinfo.value.retry_after == 7
+        assert await batcher.embed([4]) == [[4.0] * 4]
+    finally:
+        await batcher.stop()
+        executor.shutdown()
+    assert executor.inflight == 0
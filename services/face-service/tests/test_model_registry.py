@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import Mock
+
+from src.infrastructure.model_registry import ModelRegistry
+
+
+def test_get_builds_component_once():
+    """
+    Kiểm tra rằng factory chỉ được gọi một lần và instance được chia sẻ.
+    """
+    factory = Mock(return_value=object())
+    registry = ModelRegistry()
+    registry.register("detector", factory)
+
+    first = registry.get("detector")
+    second = registry.get("detector")
+
+    assert first is second
+    factory.assert_called_once()
+
+
+def test_get_unknown_component_raises():
+    registry = ModelRegistry()
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_warm_up_marks_registry_ready():
+    registry = ModelRegistry()
+    registry.register("detector", Mock(return_value="detector"))
+    registry.register("embedder", Mock(return_value="embedder"))
+
+    assert registry.is_ready is False
+    assert registry.warm_up() is True
+    assert registry.is_ready is True
+    status = registry.status()
+    assert status["detector"]["loaded"] is True
+    assert status["embedder"]["load_seconds"] is not None
+
+
+def test_warm_up_records_failures_without_raising():
+    registry = ModelRegistry()
+    registry.register("detector", Mock(return_value="detector"))
+    registry.register("embedder", Mock(side_effect=RuntimeError("model file missing")))
+
+    assert registry.warm_up() is False
+    status = registry.status()
+    assert status["detector"]["loaded"] is True
+    assert status["embedder"]["loaded"] is False
+    assert "model file missing" in status["embedder"]["error"]
+
+
+def test_reset_drops_cached_instances():
+    factory = Mock(side_effect=lambda: object())
+    registry = ModelRegistry()
+    registry.register("detector", factory)
+
+    first = registry.get("detector")
+    registry.reset()
+    second = registry.get("detector")
+
+    assert first is not second
+    assert factory.call_count == 2
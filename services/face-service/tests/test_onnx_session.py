@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import onnxruntime
+import pytest
+from onnxruntime.datasets import get_example
+
+from src.infrastructure.embeddings.onnx_session import (
+    build_session_options,
+    create_inference_session,
+    quantized_model_path,
+)
+
+
+def test_quantized_model_path():
+    assert quantized_model_path("models/w600k_r50.onnx") == "models/w600k_r50.int8.onnx"
+
+
+def test_build_session_options_from_env(monkeypatch):
+    monkeypatch.setenv("TEST_ONNX_INTRA_OP_THREADS", "2")
+    monkeypatch.setenv("TEST_ONNX_INTER_OP_THREADS", "1")
+    monkeypatch.setenv("TEST_ONNX_GRAPH_OPTIMIZATION", "basic")
+    monkeypatch.setenv("TEST_ONNX_EXECUTION_MODE", "parallel")
+    monkeypatch.setenv("TEST_ONNX_ENABLE_MEM_ARENA", "false")
+
+    options = build_session_options("TEST_ONNX")
+
+    assert options.intra_op_num_threads == 2
+    assert options.inter_op_num_threads == 1
+    assert options.graph_optimization_level == onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert options.execution_mode == onnxruntime.ExecutionMode.ORT_PARALLEL
+    assert options.enable_cpu_mem_arena is False
+
+
+def test_build_session_options_rejects_unknown_level(monkeypatch):
+    monkeypatch.setenv("TEST_ONNX_GRAPH_OPTIMIZATION", "maximum")
+    with pytest.raises(ValueError):
+        build_session_options("TEST_ONNX")
+
+
+def test_optimized_model_is_serialized_then_reused(monkeypatch, tmp_path):
+    model_path = get_example("sigmoid.onnx")
+    monkeypatch.setenv("TEST_ONNX_OPTIMIZED_MODEL_DIR", str(tmp_path))
+    x = np.random.rand(3, 4, 5).astype(np.float32)
+
+    first = create_inference_session(model_path, "TEST_ONNX")
+    optimized = tmp_path / "sigmoid.all.opt.onnx"
+    assert optimized.exists()
+
+    second = create_inference_session(model_path, "TEST_ONNX")
+    name = first.get_inputs()[0].name
+    np.testing.assert_allclose(first.run(None, {name: x})[0], second.run(None, {name: x})[0])
+    assert os.path.getmtime(optimized) >= os.path.getmtime(model_path)
@@ -1,16 +1,18 @@
 import os
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, patch, AsyncMock
 from qdrant_client import models
 from qdrant_client.http.models import UpdateStatus # Import UpdateStatus for testing
+from src.infrastructure.persistence.collection_layout import CollectionLayout
 from src.infrastructure.persistence.qdrant_client import QdrantFaceRepository
 from src.domain.interfaces.face_repository import IFaceRepository
 
 @pytest.fixture
 def mock_qdrant_client():
-    """Fixture to provide a mocked QdrantClient instance."""
-    with patch('src.infrastructure.persistence.qdrant_client.QdrantClient') as MockClient:
-        mock_instance = MockClient.return_value
+    """Fixture to provide a mocked AsyncQdrantClient instance."""
+    with patch('src.infrastructure.persistence.qdrant_client.AsyncQdrantClient') as MockClient:
+        mock_instance = AsyncMock()
+        MockClient.return_value = mock_instance
         yield mock_instance
 
 @pytest.fixture
@@ -21,13 +23,12 @@ def qdrant_repository_instance(mock_qdrant_client, monkeypatch):
     monkeypatch.setenv("QDRANT_COLLECTION_NAME", "env_test_collection")
     monkeypatch.setenv("QDRANT_VECTOR_SIZE", "128") # Ensure vector size is set
 
-    mock_qdrant_client.collection_exists.return_value = False # Force collection creation logic
     service = QdrantFaceRepository(collection_name=None)
-    mock_qdrant_client.collection_exists.return_value = True # For subsequent checks, assume it exists
     yield service
 
 
-def test_qdrant_repository_init_creates_collection(mock_qdrant_client, monkeypatch):
+@pytest.mark.asyncio
+async def test_qdrant_repository_init_creates_collection(mock_qdrant_client, monkeypatch):
     """
     Kiểm tra rằng collection được tạo nếu nó chưa tồn tại khi collection_name không được cung cấp.
     """
@@ -37,23 +38,31 @@ def test_qdrant_repository_init_creates_collection(mock_qdrant_client, monkeypat
     monkeypatch.setenv("QDRANT_VECTOR_SIZE", "128")
 
     mock_qdrant_client.collection_exists.return_value = False
+    mock_qdrant_client.get_collection.return_value = Mock(payload_schema={})
     
     repository = QdrantFaceRepository(collection_name=None)
+    await repository.async_init()
     
     mock_qdrant_client.collection_exists.assert_called_once_with(collection_name="new_env_collection")
     mock_qdrant_client.create_collection.assert_called_once_with(
         collection_name="new_env_collection",
         vectors_config=models.VectorParams(size=128, distance=models.Distance.COSINE),
     )
-    mock_qdrant_client.create_payload_index.assert_called_once_with(
-        collection_name="new_env_collection",
-        field_name="family_id",
-        field_schema=models.PayloadSchemaType.KEYWORD,
-    )
+    indexes = {
+        call.kwargs["field_name"]: call.kwargs["field_schema"]
+        for call in mock_qdrant_client.create_payload_index.call_args_list
+    }
+    assert indexes == {
+        "family_id": models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+        "member_id": models.PayloadSchemaType.KEYWORD,
+        "face_id": models.PayloadSchemaType.KEYWORD,
+        "local_db_id": models.PayloadSchemaType.KEYWORD,
+    }
     assert repository.collection_name == "new_env_collection"
 
 
-def test_qdrant_repository_init_does_not_recreate_existing_collection(mock_qdrant_client, monkeypatch):
+@pytest.mark.asyncio
+async def test_qdrant_repository_init_does_not_recreate_existing_collection(mock_qdrant_client, monkeypatch):
     """
     Kiểm tra rằng collection không được tạo lại nếu nó đã tồn tại khi collection_name không được cung cấp.
     """
@@ -63,8 +72,20 @@ def test_qdrant_repository_init_does_not_recreate_existing_collection(mock_qdran
     monkeypatch.setenv("QDRANT_VECTOR_SIZE", "128")
 
     mock_qdrant_client.collection_exists.return_value = True
+    mock_qdrant_client.get_collection.return_value = Mock(payload_schema={
+        "family_id": models.PayloadIndexInfo(
+            data_type=models.PayloadSchemaType.KEYWORD,
+            params=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+            points=10,
+        ),
+        **{
+            field: models.PayloadIndexInfo(data_type=models.PayloadSchemaType.KEYWORD, points=10)
+            for field in ("member_id", "face_id", "local_db_id")
+        },
+    })
     
     repository = QdrantFaceRepository(collection_name=None)
+    await repository.async_init()
     
     mock_qdrant_client.collection_exists.assert_called_once_with(collection_name="existing_env_collection")
     mock_qdrant_client.create_collection.assert_not_called()
@@ -73,6 +94,126 @@ def test_qdrant_repository_init_does_not_recreate_existing_collection(mock_qdran
     mock_qdrant_client.create_payload_index.assert_not_called()
     assert repository.collection_name == "existing_env_collection"
 
+@pytest.mark.asyncio
+async def test_qdrant_repository_creates_collection_with_configured_layout(mock_qdrant_client, monkeypatch):
+    """
+    Kiểm tra collection mới được tạo theo bố cục cấu hình: float16, vector gốc trên đĩa, scalar quantization và HNSW.
+    """
+    monkeypatch.setenv("QDRANT_VECTOR_DATATYPE", "float16")
+    monkeypatch.setenv("QDRANT_VECTORS_ON_DISK", "true")
+    monkeypatch.setenv("QDRANT_QUANTIZATION", "scalar")
+    monkeypatch.setenv("QDRANT_HNSW_M", "0")
+    monkeypatch.setenv("QDRANT_HNSW_PAYLOAD_M", "16")
+    mock_qdrant_client.collection_exists.return_value = False
+    mock_qdrant_client.get_collection.return_value = Mock(payload_schema={})
+
+    repository = QdrantFaceRepository(collection_name="faces")
+    await repository.async_init()
+
+    kwargs = mock_qdrant_client.create_collection.call_args.kwargs
+    assert kwargs["vectors_config"] == models.VectorParams(
+        size=128, distance=models.Distance.COSINE, datatype=models.Datatype.FLOAT16, on_disk=True
+    )
+    assert kwargs["hnsw_config"] == models.HnswConfigDiff(m=0, payload_m=16)
+    assert kwargs["quantization_config"].scalar.type == models.ScalarType.INT8
+    assert kwargs["quantization_config"].scalar.always_ram is True
+
+
+@pytest.mark.asyncio
+async def test_search_uses_oversampling_and_rescoring_with_quantization(mock_qdrant_client):
+    """
+    Kiểm tra search và batch search gửi kèm oversampling/rescore khi collection dùng binary quantization.
+    """
+    layout = CollectionLayout(quantization="binary", oversampling=3.0, hnsw_ef=64)
+    repository = QdrantFaceRepository(collection_name="faces", client=mock_qdrant_client, layout=layout)
+    mock_qdrant_client.query_points.return_value = Mock(points=[])
+    mock_qdrant_client.query_batch_points.return_value = [Mock(points=[])]
+
+    await repository.search_similar_faces([0.1] * 128)
+    await repository.batch_search_similar_faces([[0.1] * 128])
+
+    expected = models.SearchParams(
+        hnsw_ef=64, quantization=models.QuantizationSearchParams(rescore=True, oversampling=3.0)
+    )
+    assert mock_qdrant_client.query_points.call_args.kwargs["search_params"] == expected
+    request = mock_qdrant_client.query_batch_points.call_args.kwargs["requests"][0]
+    assert request.params == expected
+    assert CollectionLayout(quantization="none").search_params() is None
+
+
+@pytest.mark.asyncio
+async def test_async_init_adds_missing_indexes_and_tenant_flag(mock_qdrant_client):
+    """
+    Kiểm tra collection cũ (chỉ có index family_id thường) được bổ sung index còn thiếu và is_tenant cho family_id.
+    """
+    mock_qdrant_client.collection_exists.return_value = True
+    mock_qdrant_client.get_collection.return_value = Mock(payload_schema={
+        "family_id": models.PayloadIndexInfo(data_type=models.PayloadSchemaType.KEYWORD, points=10),
+        "member_id": models.PayloadIndexInfo(data_type=models.PayloadSchemaType.KEYWORD, points=10),
+    })
+    repository = QdrantFaceRepository(collection_name="faces", client=mock_qdrant_client)
+
+    await repository.async_init()
+
+    created = [call.kwargs["field_name"] for call in mock_qdrant_client.create_payload_index.call_args_list]
+    assert created == ["family_id", "face_id", "local_db_id"]
+
+
+@pytest.mark.asyncio
+async def test_collection_stats_reports_segments_indexes_and_memory(mock_qdrant_client):
+    """
+    Kiểm tra collection_stats trả về số segment, các trường đã index và ước lượng bộ nhớ.
+    """
+    mock_qdrant_client.get_collection.return_value = models.CollectionInfo(
+        status=models.CollectionStatus.GREEN,
+        optimizer_status=models.OptimizersStatusOneOf.OK,
+        indexed_vectors_count=1000,
+        points_count=1000,
+        segments_count=3,
+        payload_schema={
+            "family_id": models.PayloadIndexInfo(
+                data_type=models.PayloadSchemaType.KEYWORD,
+                params=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+                points=1000,
+            ),
+        },
+        config=models.CollectionConfig(
+            params=models.CollectionParams(
+                vectors=models.VectorParams(size=128, distance=models.Distance.COSINE, on_disk=True),
+            ),
+            hnsw_config=models.HnswConfig(m=16, ef_construct=100, full_scan_threshold=10000),
+            optimizer_config=models.OptimizersConfig(
+                deleted_threshold=0.2, vacuum_min_vector_number=1000, default_segment_number=0, flush_interval_sec=5,
+            ),
+            wal_config=models.WalConfig(wal_capacity_mb=32, wal_segments_ahead=0),
+            quantization_config=models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True),
+            ),
+        ),
+    )
+    repository = QdrantFaceRepository(collection_name="faces", client=mock_qdrant_client)
+
+    stats = await repository.collection_stats()
+
+    assert stats["segments_count"] == 3
+    assert stats["indexed_fields"]["family_id"] == {"data_type": "keyword", "is_tenant": True, "points": 1000}
+    assert stats["missing_indexes"] == ["face_id", "local_db_id", "member_id"]
+    assert stats["memory"]["original_vectors_bytes"] == 1000 * 128 * 4
+    assert stats["memory"]["estimated_mmap_bytes"] == 1000 * 128 * 4
+    assert stats["memory"]["estimated_ram_bytes"] == 1000 * 128 + 1000 * 2 * 16 * 4
+
+
+def test_collection_layout_rejects_unknown_quantization():
+    with pytest.raises(ValueError, match="QDRANT_QUANTIZATION"):
+        CollectionLayout(quantization="product")
+
+
+def test_collection_layout_rejects_uint8_datatype():
+    # Embedding float trong [-1, 1] không lưu được dưới dạng uint8
+    with pytest.raises(ValueError, match="QDRANT_VECTOR_DATATYPE"):
+        CollectionLayout(datatype="uint8")
+
+
 @pytest.mark.asyncio
 async def test_upsert_face_vector(qdrant_repository_instance, mock_qdrant_client):
     """
@@ -92,6 +233,42 @@ async def test_upsert_face_vector(qdrant_repository_instance, mock_qdrant_client
     assert kwargs['points'][0].vector == vector
     assert kwargs['points'][0].payload == metadata
 
+@pytest.mark.asyncio
+async def test_upsert_face_vectors_in_chunks(qdrant_repository_instance, mock_qdrant_client):
+    """
+    Kiểm tra upsert_face_vectors chia các điểm thành nhiều lô theo upsert_batch_size.
+    """
+    qdrant_repository_instance.upsert_batch_size = 2
+    faces = [{"face_id": f"face_{i}", "vector": [0.1] * 128, "metadata": {"family_id": "abc"}} for i in range(5)]
+
+    count = await qdrant_repository_instance.upsert_face_vectors(faces, wait=False)
+
+    assert count == 5
+    assert mock_qdrant_client.upsert.call_count == 3
+    chunks = [call.kwargs["points"] for call in mock_qdrant_client.upsert.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [point.id for chunk in chunks for point in chunk] == [face["face_id"] for face in faces]
+    assert all(call.kwargs["wait"] is False for call in mock_qdrant_client.upsert.call_args_list)
+
+@pytest.mark.asyncio
+async def test_set_faces_payload_batches_set_payload_operations(qdrant_repository_instance, mock_qdrant_client):
+    """
+    Kiểm tra set_faces_payload gửi các thao tác set_payload theo lô, mỗi request tối đa upsert_batch_size điểm.
+    """
+    qdrant_repository_instance.upsert_batch_size = 2
+    updates = [
+        ({"cluster_id": "a", "cluster_size": 3}, ["f1", "f2", "f3"]),
+        ({"cluster_id": None, "cluster_size": None}, ["f4"]),
+    ]
+
+    updated = await qdrant_repository_instance.set_faces_payload(updates)
+
+    assert updated == 4
+    batches = [call.kwargs["update_operations"] for call in mock_qdrant_client.batch_update_points.call_args_list]
+    assert [[op.set_payload.points for op in batch] for batch in batches] == [[["f1", "f2"]], [["f3"], ["f4"]]]
+    assert batches[1][1].set_payload.payload == {"cluster_id": None, "cluster_size": None}
+    assert all(call.kwargs["wait"] is True for call in mock_qdrant_client.batch_update_points.call_args_list)
+
 @pytest.mark.asyncio
 async def test_search_similar_faces(qdrant_repository_instance, mock_qdrant_client):
     """
@@ -179,6 +356,76 @@ async def test_get_faces_by_family_id(qdrant_repository_instance, mock_qdrant_cl
     assert results[0]["id"] == "scroll_id"
     assert results[0]["payload"] == {"familyId": family_id, "memberId": "member_xyz"}
 
+@pytest.mark.asyncio
+async def test_get_faces_by_family_id_follows_all_scroll_pages(qdrant_repository_instance, mock_qdrant_client):
+    """
+    Kiểm tra get_faces_by_family_id đi qua mọi trang scroll thay vì cắt ở trang đầu tiên.
+    """
+    def hit(point_id):
+        mock_hit = Mock()
+        mock_hit.id = point_id
+        mock_hit.payload = {"family_id": "big_family"}
+        mock_hit.vector = [0.5] * 4
+        return mock_hit
+
+    mock_qdrant_client.scroll.side_effect = [
+        ([hit("a"), hit("b")], "c"),
+        ([hit("c")], None),
+    ]
+
+    results = await qdrant_repository_instance.get_faces_by_family_id("big_family", with_vectors=True)
+
+    assert [face["id"] for face in results] == ["a", "b", "c"]
+    assert results[0]["vector"] == [0.5] * 4
+    offsets = [call.kwargs["offset"] for call in mock_qdrant_client.scroll.call_args_list]
+    assert offsets == [None, "c"]
+    assert all(call.kwargs["with_vectors"] is True for call in mock_qdrant_client.scroll.call_args_list)
+
+@pytest.mark.asyncio
+async def test_get_faces_page_by_family_id(qdrant_repository_instance, mock_qdrant_client):
+    """
+    Kiểm tra get_faces_page_by_family_id trả về con trỏ trang tiếp theo và chuyển cursor số về int.
+    """
+    mock_hit = Mock()
+    mock_hit.id = 11
+    mock_hit.payload = {"family_id": "fam"}
+    mock_qdrant_client.scroll.return_value = ([mock_hit], 12)
+
+    faces, next_page_offset = await qdrant_repository_instance.get_faces_page_by_family_id("fam", 1, offset="11")
+
+    assert faces == [{"id": 11, "payload": {"family_id": "fam"}}]
+    assert next_page_offset == 12
+    kwargs = mock_qdrant_client.scroll.call_args.kwargs
+    assert kwargs["limit"] == 1
+    assert kwargs["offset"] == 11
+    assert kwargs["with_vectors"] is False
+
+@pytest.mark.asyncio
+async def test_batch_search_similar_faces_in_chunks(qdrant_repository_instance, mock_qdrant_client):
+    """
+    Kiểm tra batch_search_similar_faces chia query thành nhiều lần gọi query_batch_points và giữ thứ tự kết quả.
+    """
+    qdrant_repository_instance.batch_search_chunk_size = 2
+
+    def query_batch_points(collection_name, requests):
+        responses = []
+        for request in requests:
+            hit = Mock()
+            hit.id = f"hit_{request.query[0]}"
+            hit.score = 0.9
+            hit.payload = None
+            responses.append(Mock(points=[hit]))
+        return responses
+
+    mock_qdrant_client.query_batch_points.side_effect = query_batch_points
+    query_vectors = [[float(i)] * 4 for i in range(5)]
+
+    results = await qdrant_repository_instance.batch_search_similar_faces(query_vectors, family_id="fam", top_k=1)
+
+    assert mock_qdrant_client.query_batch_points.call_count == 3
+    assert [hits[0]["id"] for hits in results] == [f"hit_{float(i)}" for i in range(5)]
+    assert results[0][0]["payload"] == {}
+
 @pytest.mark.asyncio
 async def test_delete_face_success(qdrant_repository_instance, mock_qdrant_client):
     """
@@ -218,3 +465,22 @@ async def test_delete_face_failure(qdrant_repository_instance, mock_qdrant_clien
     assert success is False
 
 
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, field", [
+    ("delete_faces_by_family_id", "family_id"),
+    ("delete_faces_by_member_id", "member_id"),
+])
+async def test_delete_faces_by_payload_uses_filter_selector(qdrant_repository_instance, mock_qdrant_client, method, field):
+    """
+    Kiểm tra xóa theo family_id/member_id dùng FilterSelector với bộ lọc tương ứng.
+    """
+    mock_qdrant_client.delete.return_value = Mock(status=UpdateStatus.COMPLETED)
+
+    success = await getattr(qdrant_repository_instance, method)("value_1")
+
+    assert success is True
+    selector = mock_qdrant_client.delete.call_args.kwargs["points_selector"]
+    assert isinstance(selector, models.FilterSelector)
+    assert selector.filter.must[0].key == field
+    assert selector.filter.must[0].match.value == "value_1"
@@ -0,0 +1,146 @@
+import uuid
+
+import cv2
+import numpy as np
+import pytest
+from qdrant_client import AsyncQdrantClient, models
+
+from src.application.services.reembedding import ReembeddingJob
+from src.domain.interfaces.face_embedding import IFaceEmbedding
+from src.infrastructure.persistence.collection_layout import CollectionLayout
+from src.infrastructure.persistence.collection_migration import migrate_collection
+from src.infrastructure.persistence.qdrant_client import QdrantFaceRepository
+from src.infrastructure.storage.local_image_store import LocalFileImageStore
+
+
+class _MeanColorEmbedding(IFaceEmbedding):
+    """512-d embedding of the mean BGR colour, so the vector reveals which image was embedded."""
+
+    def get_embedding(self, face_image):
+        mean = np.asarray(face_image, dtype=np.float32).reshape(-1, 3).mean(axis=0)
+        return [float(v) for v in mean] + [1.0] * 509
+
+
+def _png(color, size=(40, 40)) -> bytes:
+    image = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    image[:] = color
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def _named_layout() -> CollectionLayout:
+    return CollectionLayout(named_vectors=True, vector_models=["facenet", "arcface"])
+
+
+async def _repository() -> QdrantFaceRepository:
+    repository = QdrantFaceRepository(
+        collection_name="faces", client=AsyncQdrantClient(":memory:"), layout=_named_layout(), vector_name="facenet"
+    )
+    await repository.async_init()
+    return repository
+
+
+def test_local_image_store_maps_urls_under_root(tmp_path):
+    store = LocalFileImageStore(str(tmp_path))
+
+    path = store.path_for("https://res.cloudinary.com/demo/image/upload/v1/thumb.png")
+
+    assert path == str(tmp_path / "res.cloudinary.com" / "demo" / "image" / "upload" / "v1" / "thumb.png")
+    with pytest.raises(ValueError):
+        store.path_for("file:///../../etc/passwd")
+
+
+@pytest.mark.asyncio
+async def test_named_vectors_route_reads_and_writes_to_active_model():
+    repository = await _repository()
+    await repository.upsert_face_vector(str(uuid.uuid4()), [1.0] + [0.0] * 127, {"family_id": "fam"})
+
+    hits = await repository.search_similar_faces([1.0] + [0.0] * 127, family_id="fam", threshold=0.5)
+    faces = await repository.get_faces_by_family_id("fam", with_vectors=True)
+
+    assert len(hits) == 1
+    assert len(faces[0]["vector"]) == 128
+    assert await repository.count_faces(missing_vector="arcface") == 1
+
+
+@pytest.mark.asyncio
+async def test_reembedding_job_backfills_missing_vectors(tmp_path):
+    repository = await _repository()
+    store = LocalFileImageStore(str(tmp_path))
+    store.save("https://cdn.example.com/thumb_1.png", _png((10, 20, 30)))
+    original = np.zeros((100, 100, 3), dtype=np.uint8)
+    original[50:90, 50:90] = (200, 100, 50)
+    store.save("https://cdn.example.com/original_2.jpg", cv2.imencode(".png", original)[1].tobytes())
+    faces = [
+        ({"thumbnail_url": "https://cdn.example.com/thumb_1.png"}, (10.0, 20.0, 30.0)),
+        ({"original_image_url": "https://cdn.example.com/original_2.jpg",
+          "bounding_box": {"x": 50, "y": 50, "width": 40, "height": 40}}, (200.0, 100.0, 50.0)),
+        ({"thumbnail_url": "https://cdn.example.com/missing.png"}, None),
+    ]
+    ids = [str(uuid.uuid4()) for _ in faces]
+    await repository.upsert_face_vectors([
+        {"face_id": face_id, "vector": [0.5] * 128, "metadata": {"family_id": "fam", **payload}}
+        for face_id, (payload, _) in zip(ids, faces)
+    ])
+
+    job = ReembeddingJob(repository, _MeanColorEmbedding(), store, "arcface", batch_size=2)
+    progress = await job.run()
+
+    assert progress["status"] == "completed"
+    assert (progress["total"], progress["embedded"], progress["skipped"], progress["remaining"]) == (3, 2, 1, 0)
+    assert progress["faces_per_second"] > 0
+    points = await repository.client.retrieve("faces", ids=ids, with_vectors=True)
+    vectors = {point.id: point.vector for point in points}
+    for face_id, (_, expected) in zip(ids, faces):
+        assert len(vectors[face_id]["facenet"]) == 128
+        if expected is None:
+            assert "arcface" not in vectors[face_id]
+        else:
+            # Qdrant chuẩn hóa vector COSINE: so sánh theo hướng
+            expected_vector = np.asarray(list(expected) + [1.0] * 509)
+            np.testing.assert_allclose(
+                vectors[face_id]["arcface"], expected_vector / np.linalg.norm(expected_vector), rtol=1e-4
+            )
+
+    # Chạy lại chỉ duyệt các khuôn mặt vẫn còn thiếu vector
+    rerun = await job.run()
+    assert (rerun["total"], rerun["embedded"], rerun["skipped"]) == (1, 0, 1)
+
+
+@pytest.mark.asyncio
+async def test_migration_moves_unnamed_vectors_into_named_layout():
+    client = AsyncQdrantClient(":memory:")
+    await client.create_collection(
+        collection_name="faces_v1",
+        vectors_config=models.VectorParams(size=128, distance=models.Distance.COSINE),
+    )
+    await client.upsert(
+        collection_name="faces_v1",
+        points=[models.PointStruct(id=str(uuid.uuid4()), vector=[0.1] * 128, payload={"family_id": "fam"})],
+    )
+    await client.update_collection_aliases(change_aliases_operations=[
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name="faces_v1", alias_name="faces")),
+    ])
+
+    await migrate_collection(client, "faces", _named_layout(), target_name="faces_v2", vector_name="facenet")
+
+    info = await client.get_collection(collection_name="faces_v2")
+    assert set(info.config.params.vectors) == {"facenet", "arcface"}
+    point = (await client.scroll(collection_name="faces", with_vectors=True))[0][0]
+    assert set(point.vector) == {"facenet"}
+
+
+@pytest.mark.asyncio
+async def test_reembedding_job_runs_once_at_a_time_and_can_be_cancelled(tmp_path):
+    repository = await _repository()
+    await repository.upsert_face_vectors([
+        {"face_id": str(uuid.uuid4()), "vector": [0.5] * 128, "metadata": {"family_id": "fam"}} for _ in range(4)
+    ])
+    job = ReembeddingJob(repository, _MeanColorEmbedding(), LocalFileImageStore(str(tmp_path)), "arcface", batch_size=1)
+
+    assert job.start() is True
+    assert job.start() is False
+    assert job.cancel() is True
+    await job._task
+
+    assert job.progress()["status"] == "cancelled"
+    assert job.cancel() is False
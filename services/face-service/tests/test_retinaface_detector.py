@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 import numpy as np
 
 # Import the class to be tested
@@ -8,65 +8,98 @@ from src.domain.interfaces.face_detector import IFaceDetector
 
 class TestRetinaFaceDetector(unittest.TestCase):
 
-    @patch('src.infrastructure.detectors.retinaface_detector.FaceAnalysis')
-    def setUp(self, MockFaceAnalysis):
+    @patch('src.infrastructure.detectors.retinaface_detector.model_zoo.get_model')
+    def setUp(self, MockGetModel):
         # Setup run before each test method
-        self.mock_app_instance = MockFaceAnalysis.return_value
-        self.face_detector = RetinaFaceDetector()
-        
-        # Ensure prepare is called during initialization
-        self.mock_app_instance.prepare.assert_called_once_with(ctx_id=0, det_size=(640, 640))
+        self.mock_model = MockGetModel.return_value
+        self.mock_model.detect.return_value = (np.empty((0, 5), dtype=np.float32), None)
+        self.face_detector = RetinaFaceDetector(model_path='dummy/det_10g.onnx')
+
+        # Only the detection model is loaded, and prepared with the default input size
+        MockGetModel.assert_called_once_with('dummy/det_10g.onnx', providers=['CPUExecutionProvider'])
+        self.mock_model.prepare.assert_called_once_with(ctx_id=0, input_size=(640, 640), det_thresh=0.5)
 
         # Create a dummy image for testing
         self.dummy_image = np.zeros((100, 100, 3), dtype=np.uint8)
 
+    def _detections(self, *rows):
+        return np.array(rows, dtype=np.float32), None
+
     def test_detect_faces_no_face(self):
         # Test case when no faces are detected
-        self.mock_app_instance.get.return_value = []
         detected_faces = self.face_detector.detect_faces(self.dummy_image)
         self.assertEqual(detected_faces, [])
-        self.mock_app_instance.get.assert_called_once_with(self.dummy_image)
+        self.mock_model.detect.assert_called_once_with(self.dummy_image, input_size=(640, 640))
 
     def test_detect_faces_one_face(self):
         # Test case when one face is detected
-        mock_face = MagicMock()
-        mock_face.bbox = np.array([10, 20, 40, 60]) # x1, y1, x2, y2
-        mock_face.det_score = 0.95
-        self.mock_app_instance.get.return_value = [mock_face]
+        self.mock_model.detect.return_value = self._detections([10, 20, 40, 60, 0.95])  # x1, y1, x2, y2, score
 
         detected_faces = self.face_detector.detect_faces(self.dummy_image)
 
         self.assertEqual(len(detected_faces), 1)
         # Expected box format: [x, y, w, h]
         self.assertEqual(detected_faces[0]['box'], [10, 20, 30, 40])
-        self.assertEqual(detected_faces[0]['confidence'], 0.95)
-        self.mock_app_instance.get.assert_called_once_with(self.dummy_image)
+        self.assertAlmostEqual(detected_faces[0]['confidence'], 0.95, places=5)
 
-    def test_detect_faces_multiple_faces(self):
-        # Test case when multiple faces are detected
-        mock_face1 = MagicMock()
-        mock_face1.bbox = np.array([10, 10, 50, 50]) # x1, y1, x2, y2 -> x,y,w,h = 10,10,40,40
-        mock_face1.det_score = 0.98
+    def test_detect_faces_returns_landmarks(self):
+        # Test case when the model predicts 5-point landmarks: they are returned in original image coordinates
+        kps = np.array([[[40, 50], [60, 50], [50, 60], [42, 70], [58, 70]]], dtype=np.float32)
+        self.mock_model.detect.return_value = (np.array([[20, 40, 80, 120, 0.9]], dtype=np.float32), kps)
+
+        detected_faces = self.face_detector.detect_faces(self.dummy_image)
+
+        self.assertEqual(detected_faces[0]['landmarks'], kps[0].tolist())
+
+    def test_detect_faces_det_size_per_call(self):
+        # Test case when a caller (detector tier) asks for a smaller network input
+        self.face_detector.detect_faces(self.dummy_image, det_size=320)
+        self.mock_model.detect.assert_called_once_with(self.dummy_image, input_size=(320, 320))
 
-        mock_face2 = MagicMock()
-        mock_face2.bbox = np.array([60, 60, 90, 90]) # x1, y1, x2, y2 -> x,y,w,h = 60,60,30,30
-        mock_face2.det_score = 0.92
+    def test_detect_faces_ignores_upsample(self):
+        # Test case when upsample is requested: the network input is fixed, so the image is passed through unchanged
+        self.mock_model.detect.return_value = self._detections([20.0, 40.0, 80.0, 120.0, 0.9])
 
-        self.mock_app_instance.get.return_value = [mock_face1, mock_face2]
+        detected_faces = self.face_detector.detect_faces(self.dummy_image, upsample=1)
+
+        self.mock_model.detect.assert_called_once_with(self.dummy_image, input_size=(640, 640))
+        self.assertEqual(detected_faces[0]['box'], [20, 40, 60, 80])
+
+    def test_detect_faces_multiple_faces(self):
+        # Test case when multiple faces are detected
+        self.mock_model.detect.return_value = self._detections(
+            [10, 10, 50, 50, 0.98],  # x,y,w,h = 10,10,40,40
+            [60, 60, 90, 90, 0.92],  # x,y,w,h = 60,60,30,30
+        )
 
         detected_faces = self.face_detector.detect_faces(self.dummy_image)
 
         self.assertEqual(len(detected_faces), 2)
         self.assertEqual(detected_faces[0]['box'], [10, 10, 40, 40])
-        self.assertEqual(detected_faces[0]['confidence'], 0.98)
+        self.assertAlmostEqual(detected_faces[0]['confidence'], 0.98, places=5)
         self.assertEqual(detected_faces[1]['box'], [60, 60, 30, 30])
-        self.assertEqual(detected_faces[1]['confidence'], 0.92)
-        self.mock_app_instance.get.assert_called_once_with(self.dummy_image)
+        self.assertAlmostEqual(detected_faces[1]['confidence'], 0.92, places=5)
 
     def test_detect_faces_insightface_error(self):
-        # Test case for when insightface.app.FaceAnalysis.get raises an exception
-        self.mock_app_instance.get.side_effect = Exception("InsightFace error")
+        # Test case for when the insightface detection model raises an exception
+        self.mock_model.detect.side_effect = Exception("InsightFace error")
         with self.assertRaises(Exception):
             self.face_detector.detect_faces(self.dummy_image)
-        self.mock_app_instance.get.assert_called_once_with(self.dummy_image)
+        self.mock_model.detect.assert_called_once()
+
+    @patch('src.infrastructure.detectors.retinaface_detector.model_zoo.get_model', return_value=None)
+    def test_unrecognised_model_file(self, MockGetModel):
+        with self.assertRaises(ValueError):
+            RetinaFaceDetector(model_path='dummy/not_a_detector.onnx')
+
+    @patch('src.infrastructure.detectors.retinaface_detector.model_zoo.get_model')
+    def test_explicit_zero_det_thresh_is_kept(self, MockGetModel):
+        RetinaFaceDetector(model_path='dummy/det_10g.onnx', det_thresh=0.0)
+        MockGetModel.return_value.prepare.assert_called_once_with(ctx_id=0, input_size=(640, 640), det_thresh=0.0)
+
+    def test_upsample_does_not_improve_recall(self):
+        # Ảnh luôn được resize về input cố định nên phóng to trước không tìm thêm được mặt
+        self.assertFalse(self.face_detector.upsample_improves_recall())
 
+    def test_is_face_detector(self):
+        self.assertIsInstance(self.face_detector, IFaceDetector)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.infrastructure.image_io import decode_image
+from src.infrastructure.thumbnails import ThumbnailGenerator
+
+
+@pytest.fixture
+def image():
+    image = np.zeros((400, 600, 3), dtype=np.uint8)
+    image[100:300, 200:400] = (0, 0, 255)
+    return image
+
+
+def test_render_downscales_to_max_side(image):
+    generator = ThumbnailGenerator(image_format="jpeg", quality=80, max_side=50, max_workers=1)
+    try:
+        thumbnail = decode_image(generator.render(image, [200, 100, 200, 100]))
+        assert thumbnail.shape == (25, 50, 3)
+        assert generator.media_type == "image/jpeg"
+    finally:
+        generator.shutdown()
+
+
+def test_render_keeps_small_crops_and_clips_to_image(image):
+    generator = ThumbnailGenerator(image_format="png", max_side=0, max_workers=1)
+    try:
+        thumbnail = decode_image(generator.render(image, [-10, -10, 40, 30]))
+        assert thumbnail.shape == (20, 30, 3)
+    finally:
+        generator.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_render_many_keeps_box_order(image):
+    generator = ThumbnailGenerator(image_format="webp", quality=90, max_side=64, max_workers=2)
+    try:
+        boxes = [[200, 100, 200, 200], [0, 0, 32, 16]]
+        thumbnails = await generator.render_many(image, boxes)
+        assert [decode_image(t).shape[:2] for t in thumbnails] == [(64, 64), (16, 32)]
+        assert await generator.render_many(image, []) == []
+    finally:
+        generator.shutdown()
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError):
+        ThumbnailGenerator(image_format="gif")
+    generator = ThumbnailGenerator(image_format="JPG", max_workers=1)
+    assert generator.image_format == "jpeg"
+    generator.shutdown()